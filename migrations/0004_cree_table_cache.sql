@@ -0,0 +1,11 @@
+CREATE TABLE cache (
+    espace TEXT NOT NULL,
+    cle TEXT NOT NULL,
+    valeur JSONB NOT NULL,
+    etiquettes TEXT[] NOT NULL DEFAULT '{}',
+    expire_le TIMESTAMPTZ NOT NULL,
+    derniere_utilisation TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (espace, cle)
+);
+
+CREATE INDEX index_cache_derniere_utilisation ON cache (espace, derniere_utilisation);
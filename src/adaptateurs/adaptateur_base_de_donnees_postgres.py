@@ -11,6 +11,7 @@ from configuration import BaseDeDonnees
 from infra.chiffrement.chiffrement import (
     ServiceDeChiffrement,
 )
+from infra.postgres.curseur_mesure import CurseurMesure
 from infra.postgres.encodeurs_json import EncodeurJson
 from schemas.retour_utilisatrice import Interaction, Conversation
 from .adaptateur_base_de_donnees import AdaptateurBaseDeDonnees
@@ -69,7 +70,7 @@ class AdaptateurBaseDeDonneesPostgres(AdaptateurBaseDeDonnees):
         return json.dumps(interaction_chiffree, cls=EncodeurJson)
 
     def _get_curseur(self):
-        return self._connexion.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        return self._connexion.cursor(cursor_factory=CurseurMesure)
 
     def ferme_connexion(self) -> None:
         if self._connexion:
@@ -1,31 +1,40 @@
+from typing import Optional
+
 import httpx
-import requests
-from fastapi import Response
+from fastapi import Request, Response
 from pydantic import BaseModel
 
 
 class AdaptateurExecuteurDeRequetes:
+    def __init__(self, client_http: Optional[httpx.AsyncClient] = None) -> None:
+        self.client_http = (
+            client_http if client_http is not None else httpx.AsyncClient()
+        )
+
     async def get_asynchrone(self, url: str) -> Response:
         try:
-            async with httpx.AsyncClient() as client:
-                reponse = await client.get(url, follow_redirects=True)
-                reponse.raise_for_status()
-
-                return Response(
-                    content=reponse.content,
-                    media_type=reponse.headers.get("content-type"),
-                )
+            reponse = await self.client_http.get(url, follow_redirects=True)
+            reponse.raise_for_status()
+
+            return Response(
+                content=reponse.content,
+                media_type=reponse.headers.get("content-type"),
+            )
         except Exception:
             return Response(status_code=502)
 
-    def recupere(self, url: str, base_model: type[BaseModel]):
-        session = requests.Session()
-        reponse = session.get(url)
+    async def recupere(self, url: str, base_model: type[BaseModel]):
+        reponse = await self.client_http.get(url)
         reponse.raise_for_status()
         if isinstance(reponse.json(), list):
             return [base_model.model_validate(item) for item in reponse.json()]
         return base_model.model_validate(reponse.json())
 
+    async def ferme(self) -> None:
+        await self.client_http.aclose()
+
 
-def fabrique_adaptateur_executeur_de_requetes() -> AdaptateurExecuteurDeRequetes:
-    return AdaptateurExecuteurDeRequetes()
+def fabrique_adaptateur_executeur_de_requetes(
+    request: Request,
+) -> AdaptateurExecuteurDeRequetes:
+    return request.app.state.executeur_de_requetes
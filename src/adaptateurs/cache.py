@@ -0,0 +1,273 @@
+import asyncio
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+from configuration import BaseDeDonnees, Cache, TypeCache, logging
+from infra.postgres.curseur_mesure import CurseurMesure
+
+
+class StatistiquesCache(NamedTuple):
+    nombre_succes: int
+    nombre_echecs: int
+
+    @property
+    def taux_succes(self) -> float:
+        nombre_lectures = self.nombre_succes + self.nombre_echecs
+        if nombre_lectures == 0:
+            return 0.0
+        return self.nombre_succes / nombre_lectures
+
+
+class AdaptateurCache(ABC):
+    """
+    Cache clé → valeur sérialisable en JSON, avec durée de vie et éviction des
+    entrées les moins récemment utilisées. Chaque entrée porte des étiquettes
+    (par exemple la collection interrogée) qui permettent de la purger.
+    """
+
+    def __init__(self) -> None:
+        self.nombre_succes = 0
+        self.nombre_echecs = 0
+
+    async def recupere(self, cle: str) -> Optional[Any]:
+        valeur = await self._lis(cle)
+        if valeur is None:
+            self.nombre_echecs += 1
+        else:
+            self.nombre_succes += 1
+        return valeur
+
+    async def enregistre(
+        self, cle: str, valeur: Any, etiquettes: Iterable[str] = ()
+    ) -> None:
+        await self._ecris(cle, valeur, frozenset(etiquettes))
+
+    @property
+    def statistiques(self) -> StatistiquesCache:
+        return StatistiquesCache(
+            nombre_succes=self.nombre_succes, nombre_echecs=self.nombre_echecs
+        )
+
+    @abstractmethod
+    def purge(self, etiquette: Optional[str] = None) -> int:
+        pass
+
+    @abstractmethod
+    async def _lis(self, cle: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    async def _ecris(self, cle: str, valeur: Any, etiquettes: frozenset[str]) -> None:
+        pass
+
+
+class EntreeCache(NamedTuple):
+    valeur: Any
+    etiquettes: frozenset[str]
+    expire_a: float
+
+
+class AdaptateurCacheMemoire(AdaptateurCache):
+    def __init__(
+        self,
+        taille_maximum: int,
+        duree_de_vie: float,
+        horloge: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__()
+        self.taille_maximum = taille_maximum
+        self.duree_de_vie = duree_de_vie
+        self.horloge = horloge
+        self._entrees: OrderedDict[str, EntreeCache] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def purge(self, etiquette: Optional[str] = None) -> int:
+        with self._lock:
+            cles = [
+                cle
+                for cle, entree in self._entrees.items()
+                if etiquette is None or etiquette in entree.etiquettes
+            ]
+            for cle in cles:
+                del self._entrees[cle]
+            return len(cles)
+
+    async def _lis(self, cle: str) -> Optional[Any]:
+        with self._lock:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return None
+            if entree.expire_a <= self.horloge():
+                del self._entrees[cle]
+                return None
+            self._entrees.move_to_end(cle)
+            return entree.valeur
+
+    async def _ecris(self, cle: str, valeur: Any, etiquettes: frozenset[str]) -> None:
+        with self._lock:
+            self._entrees[cle] = EntreeCache(
+                valeur=valeur,
+                etiquettes=etiquettes,
+                expire_a=self.horloge() + self.duree_de_vie,
+            )
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_maximum:
+                self._entrees.popitem(last=False)
+
+
+class AdaptateurCachePostgres(AdaptateurCache):
+    """
+    Cache partagé entre les instances du serveur, dans la table `cache`
+    (_cf._ migrations). Chaque cache y occupe son propre espace.
+    Les lectures et écritures s'exécutent hors de la boucle d'évènements, sur
+    les `taille_pool` connexions d'un pool : au-delà, elles attendent qu'une
+    connexion se libère. Une base indisponible équivaut à une entrée
+    absente et n'empêche pas de répondre. Les entrées expirées ou au-delà de
+    `taille_maximum` sont évincées au plus une fois par `intervalle_eviction`
+    secondes.
+    """
+
+    def __init__(
+        self,
+        configuration: BaseDeDonnees,
+        espace: str,
+        taille_maximum: int,
+        duree_de_vie: float,
+        taille_pool: int = 5,
+        intervalle_eviction: float = 60.0,
+        horloge: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__()
+        self.espace = espace
+        self.taille_maximum = taille_maximum
+        self.duree_de_vie = duree_de_vie
+        self.intervalle_eviction = intervalle_eviction
+        self.horloge = horloge
+        self._prochaine_eviction = horloge()
+        # Le premier sémaphore fait attendre les coroutines sans occuper de
+        # fil ; le second protège aussi les accès synchrones (purge).
+        self._acces_asynchrones = asyncio.Semaphore(taille_pool)
+        self._connexions_disponibles = threading.BoundedSemaphore(taille_pool)
+        self._pool = ThreadedConnectionPool(
+            0,
+            taille_pool,
+            host=configuration.hote,
+            database=configuration.nom,
+            user=configuration.utilisateur,
+            password=configuration.mot_de_passe,
+            port=configuration.port,
+        )
+
+    @contextmanager
+    def _get_curseur(self) -> Iterator[CurseurMesure]:
+        with self._connexions_disponibles:
+            connexion = self._pool.getconn()
+            defaillante = False
+            try:
+                connexion.autocommit = True
+                yield connexion.cursor(cursor_factory=CurseurMesure)
+            except psycopg2.Error:
+                defaillante = True
+                raise
+            finally:
+                self._pool.putconn(connexion, close=defaillante)
+
+    def purge(self, etiquette: Optional[str] = None) -> int:
+        with self._get_curseur() as curseur:
+            if etiquette is None:
+                curseur.execute("DELETE FROM cache WHERE espace = %s", (self.espace,))
+            else:
+                curseur.execute(
+                    "DELETE FROM cache WHERE espace = %s AND %s = ANY(etiquettes)",
+                    (self.espace, etiquette),
+                )
+            return curseur.rowcount
+
+    async def _lis(self, cle: str) -> Optional[Any]:
+        try:
+            async with self._acces_asynchrones:
+                return await asyncio.to_thread(self.__lis, cle)
+        except psycopg2.Error as erreur:
+            logging.warning(
+                f"Lecture impossible dans le cache « {self.espace} » : {erreur}"
+            )
+            return None
+
+    async def _ecris(self, cle: str, valeur: Any, etiquettes: frozenset[str]) -> None:
+        try:
+            async with self._acces_asynchrones:
+                await asyncio.to_thread(self.__ecris, cle, valeur, etiquettes)
+        except psycopg2.Error as erreur:
+            logging.warning(
+                f"Écriture impossible dans le cache « {self.espace} » : {erreur}"
+            )
+
+    def __lis(self, cle: str) -> Optional[Any]:
+        with self._get_curseur() as curseur:
+            curseur.execute(
+                "UPDATE cache SET derniere_utilisation = NOW() "
+                "WHERE espace = %s AND cle = %s AND expire_le > NOW() RETURNING valeur",
+                (self.espace, cle),
+            )
+            ligne = curseur.fetchone()
+            return ligne["valeur"] if ligne else None
+
+    def __ecris(self, cle: str, valeur: Any, etiquettes: frozenset[str]) -> None:
+        with self._get_curseur() as curseur:
+            curseur.execute(
+                "INSERT INTO cache (espace, cle, valeur, etiquettes, expire_le, derniere_utilisation) "
+                "VALUES (%s, %s, %s, %s, NOW() + make_interval(secs => %s), NOW()) "
+                "ON CONFLICT (espace, cle) DO UPDATE SET valeur = EXCLUDED.valeur, "
+                "etiquettes = EXCLUDED.etiquettes, expire_le = EXCLUDED.expire_le, "
+                "derniere_utilisation = EXCLUDED.derniere_utilisation",
+                (
+                    self.espace,
+                    cle,
+                    json.dumps(valeur),
+                    sorted(etiquettes),
+                    self.duree_de_vie,
+                ),
+            )
+        if self.horloge() >= self._prochaine_eviction:
+            self._prochaine_eviction = self.horloge() + self.intervalle_eviction
+            self.evince()
+
+    def evince(self) -> int:
+        with self._get_curseur() as curseur:
+            curseur.execute(
+                "DELETE FROM cache WHERE espace = %s AND (expire_le <= NOW() OR cle IN ("
+                "SELECT cle FROM cache WHERE espace = %s "
+                "ORDER BY derniere_utilisation DESC OFFSET %s))",
+                (self.espace, self.espace, self.taille_maximum),
+            )
+            return curseur.rowcount
+
+    def ferme_connexion(self) -> None:
+        self._pool.closeall()
+
+
+def fabrique_adaptateur_cache(
+    configuration: Cache, espace: str, base_de_donnees: BaseDeDonnees
+) -> Optional[AdaptateurCache]:
+    match configuration.type_cache:
+        case TypeCache.MEMOIRE:
+            return AdaptateurCacheMemoire(
+                configuration.taille_maximum, configuration.duree_de_vie
+            )
+        case TypeCache.POSTGRES:
+            return AdaptateurCachePostgres(
+                base_de_donnees,
+                espace,
+                configuration.taille_maximum,
+                configuration.duree_de_vie,
+                taille_pool=configuration.taille_pool,
+            )
+    return None
@@ -0,0 +1,207 @@
+import asyncio
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from configuration import EntrepotChunks
+from schemas.albert import RechercheChunk, RechercheMetadonnees, ResultatRecherche
+
+CleChunk = tuple[str, int]
+
+
+class AdaptateurEntrepotChunks(ABC):
+    """
+    Conserve localement les chunks de la collection ANSSI Lab, indexés par
+    (identifiant du document, identifiant du chunk), afin de ne pas solliciter
+    Albert à chaque résultat jeopardy.
+    """
+
+    @abstractmethod
+    async def recupere(
+        self, id_document: str, id_chunk: int
+    ) -> Optional[ResultatRecherche]:
+        pass
+
+    @abstractmethod
+    async def enregistre(
+        self, id_document: str, id_chunk: int, resultat: ResultatRecherche
+    ) -> None:
+        pass
+
+    @abstractmethod
+    def pre_remplis(self, chunks: Iterable[tuple[str, int, ResultatRecherche]]) -> int:
+        pass
+
+
+class AdaptateurEntrepotChunksMemoire(AdaptateurEntrepotChunks):
+    def __init__(self, taille_maximum: int) -> None:
+        self.taille_maximum = taille_maximum
+        self._chunks: OrderedDict[CleChunk, ResultatRecherche] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def recupere(
+        self, id_document: str, id_chunk: int
+    ) -> Optional[ResultatRecherche]:
+        return self._recupere(id_document, id_chunk)
+
+    async def enregistre(
+        self, id_document: str, id_chunk: int, resultat: ResultatRecherche
+    ) -> None:
+        self._enregistre(id_document, id_chunk, resultat)
+
+    def pre_remplis(self, chunks: Iterable[tuple[str, int, ResultatRecherche]]) -> int:
+        nombre = 0
+        for id_document, id_chunk, resultat in chunks:
+            self._enregistre(id_document, id_chunk, resultat)
+            nombre += 1
+        return nombre
+
+    def _recupere(self, id_document: str, id_chunk: int) -> Optional[ResultatRecherche]:
+        with self._lock:
+            resultat = self._chunks.get((id_document, id_chunk))
+            if resultat is not None:
+                self._chunks.move_to_end((id_document, id_chunk))
+            return resultat
+
+    def _enregistre(
+        self, id_document: str, id_chunk: int, resultat: ResultatRecherche
+    ) -> None:
+        with self._lock:
+            self._chunks[(id_document, id_chunk)] = resultat
+            self._chunks.move_to_end((id_document, id_chunk))
+            while len(self._chunks) > self.taille_maximum:
+                self._chunks.popitem(last=False)
+
+
+class AdaptateurEntrepotChunksSQLite(AdaptateurEntrepotChunks):
+    """
+    Entrepôt persistant : un cache LRU en mémoire devant un fichier SQLite.
+    Chaque collection porte une version ; lorsqu'elle diffère de celle
+    enregistrée (ré-indexation), les chunks de la collection sont purgés.
+    Les accès au fichier sont faits hors de la boucle d'évènements.
+    """
+
+    def __init__(
+        self,
+        chemin: str,
+        id_collection: int,
+        version_collection: str,
+        taille_cache_memoire: int,
+    ) -> None:
+        self.id_collection = id_collection
+        self._cache = AdaptateurEntrepotChunksMemoire(taille_cache_memoire)
+        self._lock = threading.Lock()
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False)
+        self._cree_les_tables()
+        self._invalide_si_nouvelle_version(version_collection)
+
+    def _cree_les_tables(self) -> None:
+        with self._lock, self._connexion:
+            self._connexion.execute(
+                "CREATE TABLE IF NOT EXISTS versions_collections ("
+                "id_collection INTEGER PRIMARY KEY, version TEXT NOT NULL)"
+            )
+            self._connexion.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id_collection INTEGER NOT NULL, "
+                "id_document TEXT NOT NULL, "
+                "id_chunk INTEGER NOT NULL, "
+                "contenu TEXT NOT NULL, "
+                "source_url TEXT NOT NULL, "
+                "page INTEGER NOT NULL, "
+                "nom_document TEXT NOT NULL, "
+                "PRIMARY KEY (id_collection, id_document, id_chunk))"
+            )
+
+    def _invalide_si_nouvelle_version(self, version_collection: str) -> None:
+        with self._lock, self._connexion:
+            ligne = self._connexion.execute(
+                "SELECT version FROM versions_collections WHERE id_collection = ?",
+                (self.id_collection,),
+            ).fetchone()
+            if ligne is not None and ligne[0] == version_collection:
+                return
+            self._connexion.execute(
+                "DELETE FROM chunks WHERE id_collection = ?", (self.id_collection,)
+            )
+            self._connexion.execute(
+                "INSERT OR REPLACE INTO versions_collections (id_collection, version) VALUES (?, ?)",
+                (self.id_collection, version_collection),
+            )
+
+    async def recupere(
+        self, id_document: str, id_chunk: int
+    ) -> Optional[ResultatRecherche]:
+        resultat = await self._cache.recupere(id_document, id_chunk)
+        if resultat is not None:
+            return resultat
+        resultat = await asyncio.to_thread(self._lis, id_document, id_chunk)
+        if resultat is not None:
+            await self._cache.enregistre(id_document, id_chunk, resultat)
+        return resultat
+
+    async def enregistre(
+        self, id_document: str, id_chunk: int, resultat: ResultatRecherche
+    ) -> None:
+        await asyncio.to_thread(self.pre_remplis, [(id_document, id_chunk, resultat)])
+
+    def _lis(self, id_document: str, id_chunk: int) -> Optional[ResultatRecherche]:
+        with self._lock:
+            ligne = self._connexion.execute(
+                "SELECT contenu, source_url, page, nom_document FROM chunks "
+                "WHERE id_collection = ? AND id_document = ? AND id_chunk = ?",
+                (self.id_collection, id_document, id_chunk),
+            ).fetchone()
+        if ligne is None:
+            return None
+        contenu, source_url, page, nom_document = ligne
+        return ResultatRecherche(
+            chunk=RechercheChunk(
+                content=contenu,
+                metadata=RechercheMetadonnees(
+                    source_url=source_url, page=page, nom_document=nom_document
+                ),
+            ),
+            score=1.0,
+        )
+
+    def pre_remplis(self, chunks: Iterable[tuple[str, int, ResultatRecherche]]) -> int:
+        lignes = []
+        for id_document, id_chunk, resultat in chunks:
+            self._cache.pre_remplis([(id_document, id_chunk, resultat)])
+            lignes.append(
+                (
+                    self.id_collection,
+                    id_document,
+                    id_chunk,
+                    resultat.chunk.content,
+                    resultat.chunk.metadata.source_url,
+                    resultat.chunk.metadata.page,
+                    resultat.chunk.metadata.nom_document,
+                )
+            )
+        with self._lock, self._connexion:
+            self._connexion.executemany(
+                "INSERT OR REPLACE INTO chunks (id_collection, id_document, id_chunk, "
+                "contenu, source_url, page, nom_document) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                lignes,
+            )
+        return len(lignes)
+
+    def ferme(self) -> None:
+        self._connexion.close()
+
+
+def fabrique_adaptateur_entrepot_chunks(
+    configuration: EntrepotChunks, id_collection: int
+) -> AdaptateurEntrepotChunks:
+    if configuration.chemin is None:
+        return AdaptateurEntrepotChunksMemoire(configuration.taille_cache_memoire)
+    return AdaptateurEntrepotChunksSQLite(
+        chemin=configuration.chemin,
+        id_collection=id_collection,
+        version_collection=configuration.version_collection,
+        taille_cache_memoire=configuration.taille_cache_memoire,
+    )
@@ -8,6 +8,9 @@ from uuid import UUID
 
 from configuration import BaseDeDonnees, recupere_configuration
 from infra.logger import log
+from infra.metriques import EVENEMENTS_JOURNAL_EN_ATTENTE
+from infra.postgres.curseur_mesure import CurseurMesure
+from infra.traces import trace
 from schemas.retour_utilisatrice import TagPositif, TagNegatif
 from schemas.type_utilisateur import TypeUtilisateur
 
@@ -30,6 +33,8 @@ class DonneesConversationCreee(Donnees):
     type_utilisateur: TypeUtilisateur
     question: Optional[str] = None
     sources: Optional[list[ParagrapheRetourne]] = None
+    durees: Optional[dict[str, int]] = None
+    nombre_jetons_prompt: Optional[int] = None
 
 
 class DonneesInteractionAjoutee(DonneesConversationCreee):
@@ -100,14 +105,18 @@ class AdaptateurJournalPostgres(AdaptateurJournal):
         self._connexion.autocommit = True
 
     def consigne_evenement(self, type: TypeEvenement, donnees: Donnees):
-        curseur = self._get_curseur()
-        curseur.execute(
-            "INSERT INTO journal_mqc.evenements (date, type, donnees) VALUES (%s, %s, %s)",
-            (datetime.datetime.now(), type, donnees.model_dump_json()),
-        )
+        with (
+            trace("journal", {"journal.type_evenement": str(type)}),
+            EVENEMENTS_JOURNAL_EN_ATTENTE.suit(),
+        ):
+            curseur = self._get_curseur()
+            curseur.execute(
+                "INSERT INTO journal_mqc.evenements (date, type, donnees) VALUES (%s, %s, %s)",
+                (datetime.datetime.now(), type, donnees.model_dump_json()),
+            )
 
     def _get_curseur(self):
-        return self._connexion.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        return self._connexion.cursor(cursor_factory=CurseurMesure)
 
     def ferme_connexion(self) -> None:
         if self._connexion:
@@ -1,10 +1,15 @@
-from fastapi import APIRouter
-from typing import Dict
+from fastapi import APIRouter, Request
+from typing import Any, Dict
 
 from api.api_avis import api_avis
 from api.api_retour import api_retour
 from api.api_conversation import api_conversation
 from api.recherche import api_recherche
+from services.fabrique_service_albert import (
+    COMPTEUR_RECHERCHE_SPECULATIVE,
+    MUTUALISATION_DES_QUESTIONS,
+    DepotCaches,
+)
 
 api = APIRouter(prefix="/api")
 api.include_router(api_recherche)
@@ -17,3 +22,49 @@ api_developpement = APIRouter(prefix="/api")
 @api_developpement.get("/sante")
 def route_sante() -> Dict[str, str]:
     return {"status": "ok"}
+
+
+@api_developpement.get("/sante/connexions-albert")
+def route_sante_connexions_albert(request: Request) -> Dict[str, Any]:
+    client = getattr(request.app.state, "client_albert", None)
+    if client is None:
+        return {"status": "aucun client Albert initialisé"}
+    statistiques = client.statistiques_connexions()
+    return {
+        **statistiques._asdict(),
+        "taux_reutilisation": statistiques.taux_reutilisation,
+    }
+
+
+@api_developpement.get("/sante/disjoncteurs-albert")
+def route_sante_disjoncteurs_albert(request: Request) -> list[Dict[str, Any]]:
+    client = getattr(request.app.state, "client_albert", None)
+    if client is None:
+        return []
+    return [etat._asdict() for etat in client.etats_disjoncteurs()]
+
+
+@api_developpement.get("/sante/caches")
+def route_sante_caches() -> Dict[str, Any]:
+    return {
+        espace: {**statistiques._asdict(), "taux_succes": statistiques.taux_succes}
+        for espace, statistiques in DepotCaches.statistiques().items()
+    }
+
+
+@api_developpement.get("/sante/recherche-speculative")
+def route_sante_recherche_speculative() -> Dict[str, Any]:
+    statistiques = COMPTEUR_RECHERCHE_SPECULATIVE.statistiques
+    return {
+        **statistiques._asdict(),
+        "taux_reutilisation": statistiques.taux_reutilisation,
+    }
+
+
+@api_developpement.get("/sante/mutualisation-questions")
+def route_sante_mutualisation_questions() -> Dict[str, Any]:
+    statistiques = MUTUALISATION_DES_QUESTIONS.statistiques
+    return {
+        **statistiques._asdict(),
+        "taux_mutualisation": statistiques.taux_mutualisation,
+    }
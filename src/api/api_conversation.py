@@ -1,6 +1,9 @@
+from typing import AsyncIterator, Callable
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.sse import EventSourceResponse, ServerSentEvent
+from pydantic import BaseModel
 
 from adaptateurs import AdaptateurBaseDeDonnees
 from adaptateurs.chiffrement import (
@@ -14,14 +17,17 @@ from infra.fast_api.fabrique_adaptateur_base_de_donnees import (
 from question.question import (
     ConfigurationQuestion,
     cree_conversation,
+    cree_conversation_en_flux,
     DemandeConversationUtilisateur,
     ResultatConversation,
     ResultatConversationEnErreur,
     ajoute_interaction,
+    ajoute_interaction_en_flux,
     DemandeInteractionUtilisateur,
     ResultatConversationInconnue,
     TypeErreur,
 )
+from schemas.albert import FragmentReponse
 from schemas.api import (
     QuestionRequete,
     ReponseDemandeConversationAPI,
@@ -35,7 +41,7 @@ api_conversation = APIRouter(prefix="/conversation")
 
 
 @api_conversation.post("/")
-def route_initie_conversation(
+async def route_initie_conversation(
     request: QuestionRequete,
     service_albert: ServiceAlbert = Depends(fabrique_service_albert),
     adaptateur_chiffrement: AdaptateurChiffrement = Depends(
@@ -55,7 +61,7 @@ def route_initie_conversation(
         adaptateur_journal=adaptateur_journal,
         adaptateur_chiffrement=adaptateur_chiffrement,
     )
-    resultat_interaction = cree_conversation(
+    resultat_interaction = await cree_conversation(
         configuration,
         DemandeConversationUtilisateur(
             question=question,
@@ -81,8 +87,83 @@ def route_initie_conversation(
             )
 
 
+@api_conversation.post("/flux", response_class=EventSourceResponse)
+async def route_initie_conversation_en_flux(
+    request: QuestionRequete,
+    service_albert: ServiceAlbert = Depends(fabrique_service_albert),
+    adaptateur_chiffrement: AdaptateurChiffrement = Depends(
+        fabrique_adaptateur_chiffrement
+    ),
+    adaptateur_base_de_donnees: AdaptateurBaseDeDonnees = Depends(
+        fabrique_adaptateur_base_de_donnees
+    ),
+    adaptateur_journal: AdaptateurJournal = Depends(fabrique_adaptateur_journal),
+    type_utilisateur: str | None = None,
+) -> AsyncIterator[ServerSentEvent]:
+    configuration: ConfigurationQuestion = ConfigurationQuestion(
+        service_albert=service_albert,
+        adaptateur_base_de_donnees=adaptateur_base_de_donnees,
+        adaptateur_journal=adaptateur_journal,
+        adaptateur_chiffrement=adaptateur_chiffrement,
+    )
+    async for evenement in cree_conversation_en_flux(
+        configuration,
+        DemandeConversationUtilisateur(
+            question=request.question,
+        ),
+        extrais_type_utilisateur(adaptateur_chiffrement, type_utilisateur),
+    ):
+        yield _en_evenement_serveur(
+            evenement,
+            lambda resultat: ReponseDemandeConversationAPI.depuis_reponse_albert(
+                resultat.id_interaction,
+                str(resultat.id_conversation),
+                resultat.reponse_question,
+            ),
+        )
+
+
+@api_conversation.post("/{id_conversation}/flux", response_class=EventSourceResponse)
+async def route_conversation_ajoute_interaction_en_flux(
+    id_conversation: str,
+    request: QuestionRequete,
+    service_albert: ServiceAlbert = Depends(fabrique_service_albert),
+    adaptateur_chiffrement: AdaptateurChiffrement = Depends(
+        fabrique_adaptateur_chiffrement
+    ),
+    adaptateur_base_de_donnees: AdaptateurBaseDeDonnees = Depends(
+        fabrique_adaptateur_base_de_donnees
+    ),
+    adaptateur_journal: AdaptateurJournal = Depends(fabrique_adaptateur_journal),
+    type_utilisateur: str | None = None,
+) -> AsyncIterator[ServerSentEvent]:
+    configuration: ConfigurationQuestion = ConfigurationQuestion(
+        service_albert=service_albert,
+        adaptateur_base_de_donnees=adaptateur_base_de_donnees,
+        adaptateur_journal=adaptateur_journal,
+        adaptateur_chiffrement=adaptateur_chiffrement,
+    )
+    async for evenement in ajoute_interaction_en_flux(
+        configuration,
+        DemandeInteractionUtilisateur(
+            question=request.question,
+            conversation=UUID(id_conversation),
+        ),
+        extrais_type_utilisateur(adaptateur_chiffrement, type_utilisateur),
+    ):
+        yield _en_evenement_serveur(
+            evenement,
+            lambda resultat: (
+                ReponseConversationAjouteInteractionAPI.depuis_reponse_albert(
+                    resultat.id_interaction,
+                    resultat.reponse_question,
+                )
+            ),
+        )
+
+
 @api_conversation.post("/{id_conversation}", status_code=201)
-def route_conversation_ajoute_interaction(
+async def route_conversation_ajoute_interaction(
     id_conversation: str,
     request: QuestionRequete,
     service_albert: ServiceAlbert = Depends(fabrique_service_albert),
@@ -103,7 +184,7 @@ def route_conversation_ajoute_interaction(
         adaptateur_journal=adaptateur_journal,
         adaptateur_chiffrement=adaptateur_chiffrement,
     )
-    resultat_interaction = ajoute_interaction(
+    resultat_interaction = await ajoute_interaction(
         configuration,
         DemandeInteractionUtilisateur(
             question=question,
@@ -133,6 +214,26 @@ def route_conversation_ajoute_interaction(
             )
 
 
+def _en_evenement_serveur(
+    evenement: FragmentReponse
+    | ResultatConversation
+    | ResultatConversationEnErreur
+    | ResultatConversationInconnue,
+    mappe_le_resultat: Callable[[ResultatConversation], BaseModel],
+) -> ServerSentEvent:
+    match evenement:
+        case FragmentReponse():
+            return ServerSentEvent(
+                event="fragment", data={"contenu": evenement.contenu}
+            )
+        case ResultatConversation():
+            return ServerSentEvent(event="fin", data=mappe_le_resultat(evenement))
+        case _:
+            return ServerSentEvent(
+                event="erreur", data={"message": evenement.message_mqc}
+            )
+
+
 def extrais_type_utilisateur(
     adaptateur_chiffrement: AdaptateurChiffrement, type_utilisateur: str | None
 ) -> TypeUtilisateur:
@@ -9,8 +9,8 @@ api_recherche = APIRouter(prefix="/recherche")
 
 
 @api_recherche.post("/")
-def route_recherche(
+async def route_recherche(
     request: QuestionRequete,
     service_albert: ServiceAlbert = Depends(fabrique_service_albert),
 ) -> list[Paragraphe]:
-    return service_albert.recherche_paragraphes(request.question)
+    return await service_albert.recherche_paragraphes(request.question)
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Response
+
+from infra.metriques import (
+    REGISTRE_METRIQUES,
+    TYPE_CONTENU_EXPOSITION,
+    MetriqueCalculee,
+)
+from services.fabrique_service_albert import DepotCaches
+
+metriques = APIRouter()
+
+REGISTRE_METRIQUES.enregistre(
+    MetriqueCalculee(
+        "mqc_cache_succes_total",
+        "Lectures de cache réussies",
+        "counter",
+        ["espace"],
+        lambda: [
+            ((espace,), statistiques.nombre_succes)
+            for espace, statistiques in DepotCaches.statistiques().items()
+        ],
+    )
+)
+REGISTRE_METRIQUES.enregistre(
+    MetriqueCalculee(
+        "mqc_cache_echecs_total",
+        "Lectures de cache infructueuses",
+        "counter",
+        ["espace"],
+        lambda: [
+            ((espace,), statistiques.nombre_echecs)
+            for espace, statistiques in DepotCaches.statistiques().items()
+        ],
+    )
+)
+REGISTRE_METRIQUES.enregistre(
+    MetriqueCalculee(
+        "mqc_cache_taux_succes",
+        "Part des lectures de cache réussies",
+        "gauge",
+        ["espace"],
+        lambda: [
+            ((espace,), statistiques.taux_succes)
+            for espace, statistiques in DepotCaches.statistiques().items()
+        ],
+    )
+)
+
+
+@metriques.get("/metrics", include_in_schema=False)
+def route_metriques() -> Response:
+    return Response(
+        content=REGISTRE_METRIQUES.expose(), media_type=TYPE_CONTENU_EXPOSITION
+    )
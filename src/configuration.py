@@ -26,11 +26,22 @@ class VariablesEnvironnementNecessaires(TypedDict):
 
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+logging.getLogger("durees_etapes").setLevel(
+    logging.INFO
+    if os.getenv("JOURNALISE_DUREES_ETAPES", "false").lower() == "true"
+    else logging.WARNING
+)
 
 
 class TypeReclasseur(StrEnum):
     BGE = "bge"
     LLM = "llm"
+    CASCADE = "cascade"
+
+
+class DispositionMessages(StrEnum):
+    DOCUMENTS_DANS_LE_SYSTEME = "documents_dans_le_systeme"
+    PREFIXE_STABLE = "prefixe_stable"
 
 
 class Albert(NamedTuple):
@@ -43,6 +54,12 @@ class Albert(NamedTuple):
         temps_reponse_maximum_recherche_paragraphes: float
         utilise_recherche_hybride: bool
         decalage_index_Albert_et_numero_de_page_lecteur: int
+        taille_pool_connexions: int = 100
+        duree_keep_alive_connexions: float = 30.0
+        utilise_http2: bool = False
+        seuil_echecs_disjoncteur: int = 5
+        duree_ouverture_disjoncteur: float = 30.0
+        duree_appel_lent_disjoncteur: float = 3.0
 
     class Service(NamedTuple):
         collection_nom_anssi_lab: str
@@ -55,6 +72,24 @@ class Albert(NamedTuple):
         nombre_paragraphes: int
         url_msc: str
         type_reclasseur: TypeReclasseur = TypeReclasseur.BGE
+        concurrence_maximum_chunks_jeopardy: int = 5
+        delai_maximum_chunks_jeopardy: float = 3.0
+        delai_maximum_recherche_jeopardy: float = 5.0
+        recherche_speculative_active: bool = False
+        seuil_similarite_recherche_speculative: float = 0.9
+        delai_maximum_pose_question: float = 0.0
+        part_budget_avant_doublon: float = 1.0
+        cache_reponses_sert_les_violations: bool = False
+        reponse_maitrisee_locale_active: bool = False
+        seuil_reponse_maitrisee_locale: float = 0.9
+        budget_jetons_prompt: int = 8000
+        disposition_messages: DispositionMessages = (
+            DispositionMessages.DOCUMENTS_DANS_LE_SYSTEME
+        )
+        jetons_maximum_par_passage_reclasseur_llm: int = 0
+        sortie_structuree_reclasseur_llm: bool = False
+        taille_selection_reclasseur_cascade: int = 8
+        marge_reclasseur_cascade: float = 0.2
 
     client: Client
     service: Service
@@ -68,6 +103,39 @@ class BaseDeDonnees(NamedTuple):
     nom: str
 
 
+class EntrepotChunks(NamedTuple):
+    chemin: Optional[str]
+    version_collection: str
+    taille_cache_memoire: int
+
+
+class TypeCache(StrEnum):
+    AUCUN = "aucun"
+    MEMOIRE = "memoire"
+    POSTGRES = "postgres"
+
+
+class Cache(NamedTuple):
+    type_cache: TypeCache
+    duree_de_vie: float
+    taille_maximum: int
+    version: str = ""
+    taille_pool: int = 5
+
+
+class TypeExportateurTraces(StrEnum):
+    AUCUN = "aucun"
+    FICHIER = "fichier"
+    OTLP = "otlp"
+
+
+class Traces(NamedTuple):
+    type_exportateur: TypeExportateurTraces
+    fichier: str
+    url_otlp: str
+    nom_service: str
+
+
 class Chiffrement(NamedTuple):
     clef_chiffrement: str | None
     sel_de_hachage: str
@@ -96,12 +164,19 @@ class Configuration(NamedTuple):
     base_de_donnees_journal: Optional[BaseDeDonnees]
     chiffrement: Chiffrement
     sentry: Sentry
+    entrepot_chunks: EntrepotChunks
+    cache_recherche: Cache
+    cache_reclassement: Cache
+    cache_reformulation: Cache
+    cache_reponses: Cache
+    traces: Traces
     hote: str
     port: int
     mode: Mode
     max_requetes_par_minute: int
     est_alpha_test: bool
     mode_maintenance: bool
+    expose_metriques: bool
 
 
 def _recupere_configuration_postgres(
@@ -116,6 +191,16 @@ def _recupere_configuration_postgres(
     )
 
 
+def _recupere_configuration_cache(prefixe: str) -> Cache:
+    return Cache(
+        type_cache=TypeCache(os.getenv(f"{prefixe}_TYPE", "aucun")),
+        duree_de_vie=float(os.getenv(f"{prefixe}_DUREE_DE_VIE", "3600")),
+        taille_maximum=int(os.getenv(f"{prefixe}_TAILLE_MAXIMUM", "1000")),
+        version=os.getenv(f"{prefixe}_VERSION", ""),
+        taille_pool=int(os.getenv(f"{prefixe}_TAILLE_POOL", "5")),
+    )
+
+
 def _recupere_configuration_journal(mode: Mode) -> Optional[BaseDeDonnees]:
     return (
         BaseDeDonnees(
@@ -178,7 +263,9 @@ def recupere_configuration() -> Configuration:
     )
     configuration_albert = Albert(
         client=Albert.Client(
-            base_url="https://albert.api.etalab.gouv.fr/v1",
+            base_url=os.getenv(
+                "ALBERT_BASE_URL", "https://albert.api.etalab.gouv.fr/v1"
+            ),
             api_key=variables_environnement["ALBERT_API_KEY"],
             modele_reponse=variables_environnement["ALBERT_MODELE"],
             modele_reformulation=variables_environnement["ALBERT_MODELE_REFORMULATION"],
@@ -195,6 +282,22 @@ def recupere_configuration() -> Configuration:
             decalage_index_Albert_et_numero_de_page_lecteur=int(
                 os.getenv("DECALAGE_INDEX_ALBERT_ET_NUMERO_DE_PAGE_LECTEUR", 0)
             ),
+            taille_pool_connexions=int(
+                os.getenv("ALBERT_TAILLE_POOL_CONNEXIONS", "100")
+            ),
+            duree_keep_alive_connexions=float(
+                os.getenv("ALBERT_DUREE_KEEP_ALIVE_CONNEXIONS", "30.0")
+            ),
+            utilise_http2=os.getenv("ALBERT_UTILISE_HTTP2", "false").lower() == "true",
+            seuil_echecs_disjoncteur=int(
+                os.getenv("ALBERT_DISJONCTEUR_SEUIL_ECHECS", "5")
+            ),
+            duree_ouverture_disjoncteur=float(
+                os.getenv("ALBERT_DISJONCTEUR_DUREE_OUVERTURE", "30.0")
+            ),
+            duree_appel_lent_disjoncteur=float(
+                os.getenv("ALBERT_DISJONCTEUR_DUREE_APPEL_LENT", "3.0")
+            ),
         ),
         service=Albert.Service(
             collection_nom_anssi_lab=os.getenv(
@@ -213,6 +316,56 @@ def recupere_configuration() -> Configuration:
             nombre_paragraphes=int(os.getenv("NOMBRE_PARAGRAPHES", 10)),
             type_reclasseur=TypeReclasseur(os.getenv("TYPE_RECLASSEUR", "bge")),
             url_msc=os.getenv("URL_MSC", "https://messervices.cyber.gouv.fr"),
+            concurrence_maximum_chunks_jeopardy=int(
+                os.getenv("JEOPARDY_CONCURRENCE_MAXIMUM_CHUNKS", "5")
+            ),
+            delai_maximum_chunks_jeopardy=float(
+                os.getenv("JEOPARDY_DELAI_MAXIMUM_CHUNKS", "3.0")
+            ),
+            delai_maximum_recherche_jeopardy=float(
+                os.getenv("JEOPARDY_DELAI_MAXIMUM_RECHERCHE", "5.0")
+            ),
+            recherche_speculative_active=os.getenv(
+                "RECHERCHE_SPECULATIVE_ACTIVE", "false"
+            ).lower()
+            == "true",
+            seuil_similarite_recherche_speculative=float(
+                os.getenv("RECHERCHE_SPECULATIVE_SEUIL_SIMILARITE", "0.9")
+            ),
+            delai_maximum_pose_question=float(
+                os.getenv("DELAI_MAXIMUM_POSE_QUESTION", "0")
+            ),
+            part_budget_avant_doublon=float(
+                os.getenv("PART_BUDGET_AVANT_DOUBLON", "1")
+            ),
+            cache_reponses_sert_les_violations=os.getenv(
+                "CACHE_REPONSES_SERT_LES_VIOLATIONS", "false"
+            ).lower()
+            == "true",
+            reponse_maitrisee_locale_active=os.getenv(
+                "REPONSE_MAITRISEE_LOCALE_ACTIVE", "false"
+            ).lower()
+            == "true",
+            seuil_reponse_maitrisee_locale=float(
+                os.getenv("SEUIL_REPONSE_MAITRISEE_LOCALE", "0.9")
+            ),
+            budget_jetons_prompt=int(os.getenv("BUDGET_JETONS_PROMPT", "8000")),
+            disposition_messages=DispositionMessages(
+                os.getenv("DISPOSITION_MESSAGES", "documents_dans_le_systeme")
+            ),
+            jetons_maximum_par_passage_reclasseur_llm=int(
+                os.getenv("RECLASSEUR_LLM_JETONS_MAXIMUM_PAR_PASSAGE", "0")
+            ),
+            sortie_structuree_reclasseur_llm=os.getenv(
+                "RECLASSEUR_LLM_SORTIE_STRUCTUREE", "false"
+            ).lower()
+            == "true",
+            taille_selection_reclasseur_cascade=int(
+                os.getenv("RECLASSEUR_CASCADE_TAILLE_SELECTION", "8")
+            ),
+            marge_reclasseur_cascade=float(
+                os.getenv("RECLASSEUR_CASCADE_MARGE", "0.2")
+            ),
         ),
     )
     configuration_base_de_donnees = _recupere_configuration_postgres(
@@ -234,12 +387,33 @@ def recupere_configuration() -> Configuration:
         ),
     )
 
+    configuration_entrepot_chunks = EntrepotChunks(
+        chemin=os.getenv("ENTREPOT_CHUNKS_CHEMIN"),
+        version_collection=os.getenv("ENTREPOT_CHUNKS_VERSION_COLLECTION", ""),
+        taille_cache_memoire=int(
+            os.getenv("ENTREPOT_CHUNKS_TAILLE_CACHE_MEMOIRE", "2000")
+        ),
+    )
+
     return Configuration(
         albert=configuration_albert,
         base_de_donnees=configuration_base_de_donnees,
         base_de_donnees_journal=configuration_base_de_donnees_journal,
         chiffrement=configuration_chiffrement,
         sentry=configuration_sentry,
+        entrepot_chunks=configuration_entrepot_chunks,
+        cache_recherche=_recupere_configuration_cache("CACHE_RECHERCHE"),
+        cache_reclassement=_recupere_configuration_cache("CACHE_RECLASSEMENT"),
+        cache_reformulation=_recupere_configuration_cache("CACHE_REFORMULATION"),
+        cache_reponses=_recupere_configuration_cache("CACHE_REPONSES"),
+        traces=Traces(
+            type_exportateur=TypeExportateurTraces(
+                os.getenv("TRACES_EXPORTATEUR", "aucun")
+            ),
+            fichier=os.getenv("TRACES_FICHIER", "traces.jsonl"),
+            url_otlp=os.getenv("TRACES_URL_OTLP", "http://localhost:4318"),
+            nom_service=os.getenv("TRACES_NOM_SERVICE", "mqc"),
+        ),
         hote=variables_environnement["HOST"],
         port=variables_environnement["PORT"],
         mode=mode,
@@ -248,4 +422,5 @@ def recupere_configuration() -> Configuration:
         ),
         est_alpha_test=os.getenv("ALPHA_TEST", "false").lower() == "true",
         mode_maintenance=os.getenv("MODE_MAINTENANCE", "false").lower() == "true",
+        expose_metriques=os.getenv("EXPOSE_METRIQUES", "false").lower() == "true",
     )
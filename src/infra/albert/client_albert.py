@@ -1,11 +1,32 @@
-import requests
-from openai import APITimeoutError, APIConnectionError
-from openai import OpenAI
+import hashlib
+import importlib.util
+import json
+import re
+import unicodedata
+from contextlib import contextmanager
+
+import httpx
+from openai import APITimeoutError, APIConnectionError, APIStatusError
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, omit
 from openai.types.chat import ChatCompletionMessageParam
 from openai.types.chat.chat_completion import Choice
-from typing import Callable
+from openai.types.shared_params import ResponseFormatJSONSchema
+from typing import Any, AsyncGenerator, Callable, Iterator, NamedTuple, Optional
 
+from adaptateurs.cache import AdaptateurCache
 from configuration import logging, Albert
+from infra.albert.disjoncteur import (
+    Disjoncteur,
+    DisjoncteurOuvert,
+    EtatCourantDisjoncteur,
+    est_une_defaillance,
+)
+from infra.metriques import (
+    APPELS_ALBERT_EN_COURS,
+    DUREE_APPELS_ALBERT,
+    ERREURS_APPELS_ALBERT,
+)
+from infra.traces import span_courant, trace
 from schemas.albert import (
     RecherchePayload,
     ReclassePayload,
@@ -26,20 +47,133 @@ from services.exceptions import (
 )
 
 
-class ClientAlbertHttp(requests.Session):
-    def __init__(self, base_url: str, token: str):
-        super().__init__()
-        self.base_url = base_url
-        self.headers = {"Authorization": f"Bearer {token}"}
+class StatistiquesConnexions(NamedTuple):
+    taille_pool: int
+    nombre_requetes: int
+    nombre_connexions_ouvertes: int
+
+    @property
+    def taux_reutilisation(self) -> float:
+        if self.nombre_requetes == 0:
+            return 0.0
+        return 1 - self.nombre_connexions_ouvertes / self.nombre_requetes
 
-    def request(
-        self, method: str | bytes, url: str | bytes, *args, **kwargs
-    ) -> requests.Response:
-        if type(url) is str:
-            url = f"{self.base_url}{url}"
-        elif type(url) is bytes:
-            url = b"%b%b" % (self.base_url.encode("utf-8"), url)
-        return super().request(method, url, *args, **kwargs)
+
+class TransportAlbert(httpx.AsyncHTTPTransport):
+    """
+    Pool de connexions partagé par toutes les requêtes à destination d'Albert.
+    On compte les requêtes émises et les connexions TCP effectivement ouvertes
+    afin de mesurer la part des requêtes qui réutilisent une connexion existante.
+    """
+
+    def __init__(self, taille_pool: int, duree_keep_alive: float, http2: bool):
+        super().__init__(
+            limits=httpx.Limits(
+                max_connections=taille_pool,
+                max_keepalive_connections=taille_pool,
+                keepalive_expiry=duree_keep_alive,
+            ),
+            http2=http2,
+        )
+        self.taille_pool = taille_pool
+        self.nombre_requetes = 0
+        self.nombre_connexions_ouvertes = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.nombre_requetes += 1
+        request.extensions["trace"] = self._trace
+        span = span_courant()
+        if span is not None:
+            request.headers["traceparent"] = span.traceparent
+        return await super().handle_async_request(request)
+
+    async def _trace(self, evenement: str, _informations: dict[str, Any]) -> None:
+        if evenement == "connection.connect_tcp.complete":
+            self.nombre_connexions_ouvertes += 1
+
+    @property
+    def statistiques(self) -> StatistiquesConnexions:
+        return StatistiquesConnexions(
+            taille_pool=self.taille_pool,
+            nombre_requetes=self.nombre_requetes,
+            nombre_connexions_ouvertes=self.nombre_connexions_ouvertes,
+        )
+
+
+def mappe_chunk_albert(brut: dict, decalage_numero_de_page: int) -> ResultatRecherche:
+    meta_dict = brut.get("metadata", {})
+    metadata = RechercheMetadonnees(
+        source_url=meta_dict.get("source_url", ""),
+        page=meta_dict.get("page", 0) + decalage_numero_de_page,
+        nom_document=meta_dict.get("nom_document", ""),
+    )
+    chunk = RechercheChunk(
+        content=brut.get("content", ""),
+        metadata=metadata,
+    )
+    return ResultatRecherche(
+        chunk=chunk,
+        score=1.0,
+    )
+
+
+def normalise_question(question: str) -> str:
+    texte = " ".join(unicodedata.normalize("NFKC", question).casefold().split())
+    return re.sub(r"\s+([?!.,;:])", r"\1", texte).rstrip(" ?!.")
+
+
+def cle_de_recherche(payload: RecherchePayload) -> str:
+    return hashlib.sha256(
+        json.dumps(
+            [
+                sorted(payload.collection_ids),
+                payload.method,
+                payload.limit,
+                normalise_question(payload.prompt),
+            ],
+            ensure_ascii=False,
+        ).encode()
+    ).hexdigest()
+
+
+def etiquette_collection(id_collection: int) -> str:
+    return f"collection:{id_collection}"
+
+
+class ClientAlbertHttp(httpx.AsyncClient):
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        super().__init__(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=None,
+            transport=transport,
+        )
+
+
+ROUTE_RECHERCHE = "/search"
+ROUTE_CHUNKS = "/documents/chunks"
+ROUTE_RECLASSEMENT = "/rerank"
+ROUTE_COMPLETION = "/chat/completions"
+ROUTES_ALBERT = (ROUTE_RECHERCHE, ROUTE_CHUNKS, ROUTE_RECLASSEMENT, ROUTE_COMPLETION)
+
+
+@contextmanager
+def mesure_appel_albert(route: str, modele: str = "") -> Iterator[None]:
+    with (
+        trace(f"albert {route}", {"albert.route": route, "albert.modele": modele}),
+        APPELS_ALBERT_EN_COURS.suit(route=route),
+        DUREE_APPELS_ALBERT.chronometre(route=route, modele=modele),
+    ):
+        try:
+            yield
+        except Exception:
+            ERREURS_APPELS_ALBERT.incremente(route=route, modele=modele)
+            raise
 
 
 class ClientAlbertApi(ClientAlbert):
@@ -52,12 +186,16 @@ class ClientAlbertApi(ClientAlbert):
 
     def __init__(
         self,
-        client_openai: OpenAI,
-        client_http: requests.Session,
+        client_openai: AsyncOpenAI,
+        client_http: httpx.AsyncClient,
         configuration: Albert.Client,  # type: ignore [name-defined]
+        transport: TransportAlbert | None = None,
+        cache_recherche: Optional[AdaptateurCache] = None,
     ):
         self.client_openai = client_openai
         self.client_http = client_http
+        self.transport = transport
+        self.cache_recherche = cache_recherche
         self.modele_reponse = configuration.modele_reponse
         self.temps_reponse_maximum_recherche_paragraphes = (
             configuration.temps_reponse_maximum_recherche_paragraphes
@@ -65,8 +203,38 @@ class ClientAlbertApi(ClientAlbert):
         self.decalage_index_Albert_et_numero_de_page_lecteur = (
             configuration.decalage_index_Albert_et_numero_de_page_lecteur
         )
+        self.disjoncteurs = {
+            route: Disjoncteur(
+                route,
+                seuil_echecs=configuration.seuil_echecs_disjoncteur,
+                duree_ouverture=configuration.duree_ouverture_disjoncteur,
+                duree_appel_lent=configuration.duree_appel_lent_disjoncteur,
+            )
+            for route in ROUTES_ALBERT
+        }
+
+    def statistiques_connexions(self) -> StatistiquesConnexions | None:
+        return self.transport.statistiques if self.transport else None
+
+    def etats_disjoncteurs(self) -> list[EtatCourantDisjoncteur]:
+        return [d.etat_courant for d in self.disjoncteurs.values()]
+
+    def purge_cache_recherche(self, id_collection: Optional[int] = None) -> int:
+        """
+        À appeler lors de la ré-indexation d'une collection (ou de toutes, sans
+        argument) : les recherches en cache la concernant sont supprimées.
+        """
+        if self.cache_recherche is None:
+            return 0
+        return self.cache_recherche.purge(
+            etiquette_collection(id_collection) if id_collection is not None else None
+        )
+
+    async def ferme(self) -> None:
+        await self.client_openai.close()
+        await self.client_http.aclose()
 
-    def recherche(self, payload: RecherchePayload) -> list[ResultatRecherche]:
+    async def recherche(self, payload: RecherchePayload) -> list[ResultatRecherche]:
         def _mappeur(chunk_dict: dict, score: str) -> ResultatRecherche:
             meta_dict = chunk_dict.get("metadata", {})
             metadata = RechercheMetadonnees(
@@ -85,9 +253,9 @@ class ClientAlbertApi(ClientAlbert):
                 score=float(score),
             )
 
-        return self._execute_la_recherche(payload, _mappeur)
+        return await self._execute_la_recherche(payload, _mappeur)
 
-    def recherche_jeopardy(
+    async def recherche_jeopardy(
         self, payload: RecherchePayload
     ) -> list[ResultatRechercheJeopardy]:
         def _mappeur(chunk_dict: dict, score: str) -> ResultatRechercheJeopardy:
@@ -106,26 +274,43 @@ class ClientAlbertApi(ClientAlbert):
                 score=float(score),
             )
 
-        return self._execute_la_recherche(payload, _mappeur)
+        return await self._execute_la_recherche(payload, _mappeur)
 
-    def _execute_la_recherche[R](
+    async def _execute_la_recherche[R](
         self, payload: RecherchePayload, mappeur: Callable[[dict, str], R]
     ) -> list[R]:
-        try:
-            reponse: requests.Response = self.client_http.post(
-                "/search",
-                json=payload._asdict(),
-                timeout=self.temps_reponse_maximum_recherche_paragraphes,
-            )
-            reponse.raise_for_status()
-            brut = reponse.json()
-            donnees = brut.get("data", [])
-            resultats: list[R] = []
+        cle = cle_de_recherche(payload)
+        donnees = (
+            await self.cache_recherche.recupere(cle) if self.cache_recherche else None
+        )
+        if donnees is None:
+            donnees = await self._interroge_la_recherche(payload)
+            if self.cache_recherche is not None and donnees:
+                await self.cache_recherche.enregistre(
+                    cle,
+                    donnees,
+                    [etiquette_collection(i) for i in payload.collection_ids],
+                )
+        return [mappeur(r.get("chunk", {}), r.get("score", "0.0")) for r in donnees]
 
-            for r in donnees:
-                chunk_dict = r.get("chunk", {})
-                resultats.append(mappeur(chunk_dict, r.get("score", "0.0")))
-        except (requests.HTTPError, requests.Timeout) as erreur:
+    async def _interroge_la_recherche(self, payload: RecherchePayload) -> list[dict]:
+        try:
+            with (
+                self.disjoncteurs[ROUTE_RECHERCHE].protege(),
+                mesure_appel_albert(ROUTE_RECHERCHE),
+            ):
+                reponse: httpx.Response = await self.client_http.post(
+                    "/search",
+                    json=payload._asdict(),
+                    timeout=self.temps_reponse_maximum_recherche_paragraphes,
+                )
+                reponse.raise_for_status()
+            return reponse.json().get("data", [])
+        except (
+            httpx.HTTPStatusError,
+            httpx.TimeoutException,
+            DisjoncteurOuvert,
+        ) as erreur:
             logging.error(
                 f"Route `/search` de l'API Albert retourne une erreur: {erreur}"
             )
@@ -133,56 +318,44 @@ class ClientAlbertApi(ClientAlbert):
                 "Impossible de récupérer les éléments documentaires relatifs à la question posée."
             ) from erreur
 
-        return resultats
-
-    def recherche_chunk_par_id(
+    async def recherche_chunk_par_id(
         self, id_document: str, id_chunk: int
     ) -> ResultatRecherche:
         try:
-            reponse: requests.Response = self.client_http.get(
-                f"/documents/{id_document}/chunks/{id_chunk}",
-                timeout=self.temps_reponse_maximum_recherche_paragraphes,
-            )
-            reponse.raise_for_status()
-            brut = reponse.json()
-            meta_dict = brut.get("metadata", {})
-
-            metadata = RechercheMetadonnees(
-                source_url=meta_dict.get("source_url", ""),
-                page=meta_dict.get("page", 0)
-                + self.decalage_index_Albert_et_numero_de_page_lecteur,
-                nom_document=meta_dict.get("nom_document", ""),
-            )
-            chunk = RechercheChunk(
-                content=brut.get("content", ""),
-                metadata=metadata,
-            )
-            return ResultatRecherche(
-                chunk=chunk,
-                score=1.0,
+            with (
+                self.disjoncteurs[ROUTE_CHUNKS].protege(),
+                mesure_appel_albert(ROUTE_CHUNKS),
+            ):
+                reponse: httpx.Response = await self.client_http.get(
+                    f"/documents/{id_document}/chunks/{id_chunk}",
+                    timeout=self.temps_reponse_maximum_recherche_paragraphes,
+                )
+                reponse.raise_for_status()
+            return mappe_chunk_albert(
+                reponse.json(), self.decalage_index_Albert_et_numero_de_page_lecteur
             )
 
-        except (requests.HTTPError, requests.Timeout) as erreur:
+        except (
+            httpx.HTTPStatusError,
+            httpx.TimeoutException,
+            DisjoncteurOuvert,
+        ) as erreur:
             logging.error(
                 f"Route `/documents/{id_document}/chunks/{id_chunk}` de l'API Albert retourne une erreur: {erreur}"
             )
-            return ResultatRecherche(
-                chunk=RechercheChunk(
-                    content="",
-                    metadata=RechercheMetadonnees(
-                        source_url="", page=0, nom_document=""
-                    ),
-                ),
-                score=0.0,
-            )
+            return ResultatRecherche.vide()
 
-    def reclasse(self, payload: ReclassePayload) -> ReclasseReponse:
+    async def reclasse(self, payload: ReclassePayload) -> ReclasseReponse:
         try:
-            reponse = self.client_http.post(
-                "/rerank",
-                json=payload._asdict(),
-            )
-            reponse.raise_for_status()
+            with (
+                self.disjoncteurs[ROUTE_RECLASSEMENT].protege(),
+                mesure_appel_albert(ROUTE_RECLASSEMENT, payload.model),
+            ):
+                reponse = await self.client_http.post(
+                    "/rerank",
+                    json=payload._asdict(),
+                )
+                reponse.raise_for_status()
             brut = reponse.json()
 
             donnees = brut.get("results", [])
@@ -201,7 +374,11 @@ class ClientAlbertApi(ClientAlbert):
             return ReclasseReponse(
                 data=resultats,
             )
-        except (requests.HTTPError, requests.Timeout) as erreur:
+        except (
+            httpx.HTTPStatusError,
+            httpx.TimeoutException,
+            DisjoncteurOuvert,
+        ) as erreur:
             logging.error(
                 f"Route `/rerank` de l'API Albert retourne une erreur: {erreur}"
             )
@@ -209,38 +386,119 @@ class ClientAlbertApi(ClientAlbert):
                 "Impossible de récupérer une réponse pour la question posée."
             )
 
-    def recupere_propositions(
+    async def recupere_propositions(
         self,
         messages: list[ChatCompletionMessageParam],
         modele: str | None = None,
         temperature: float | None = None,
+        format_reponse: ResponseFormatJSONSchema | None = None,
     ) -> list[Choice]:
         modele_a_utiliser = modele if modele else self.modele_reponse
         try:
-            propositions_albert = self.client_openai.chat.completions.create(
-                messages=messages,
-                model=modele_a_utiliser,
-                stream=False,
-                temperature=temperature,
-            ).choices
-            return propositions_albert
-
-        except (APITimeoutError, APIConnectionError) as erreur:
+            with (
+                self.disjoncteurs[ROUTE_COMPLETION].protege(),
+                mesure_appel_albert(ROUTE_COMPLETION, modele_a_utiliser),
+            ):
+                completion = await self.client_openai.chat.completions.create(
+                    messages=messages,
+                    model=modele_a_utiliser,
+                    stream=False,
+                    temperature=temperature,
+                    response_format=(
+                        format_reponse if format_reponse is not None else omit
+                    ),
+                )
+            return completion.choices
+
+        except (
+            APITimeoutError,
+            APIConnectionError,
+            APIStatusError,
+            DisjoncteurOuvert,
+        ) as erreur:
+            logging.error(f"le chat completion d’Albert retourne une erreur: {erreur}")
+            raise ErreurCommunicationModele(
+                "Impossible de récupérer une réponse pour la question posée."
+            )
+
+    async def recupere_propositions_en_flux(
+        self,
+        messages: list[ChatCompletionMessageParam],
+        modele: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncGenerator[str, None]:
+        modele_a_utiliser = modele if modele else self.modele_reponse
+        try:
+            with (
+                self.disjoncteurs[ROUTE_COMPLETION].protege(),
+                mesure_appel_albert(ROUTE_COMPLETION, modele_a_utiliser),
+            ):
+                flux = await self.client_openai.chat.completions.create(
+                    messages=messages,
+                    model=modele_a_utiliser,
+                    stream=True,
+                    temperature=temperature,
+                )
+        except (
+            APITimeoutError,
+            APIConnectionError,
+            APIStatusError,
+            DisjoncteurOuvert,
+        ) as erreur:
             logging.error(f"le chat completion d’Albert retourne une erreur: {erreur}")
             raise ErreurCommunicationModele(
                 "Impossible de récupérer une réponse pour la question posée."
             )
+        try:
+            async for morceau in flux:
+                if morceau.choices and morceau.choices[0].delta.content:
+                    yield morceau.choices[0].delta.content
+        except (APITimeoutError, APIConnectionError, APIStatusError) as erreur:
+            ERREURS_APPELS_ALBERT.incremente(
+                route=ROUTE_COMPLETION, modele=modele_a_utiliser
+            )
+            if est_une_defaillance(erreur):
+                self.disjoncteurs[ROUTE_COMPLETION].enregistre_un_echec()
+            logging.error(
+                f"le flux de chat completion d’Albert retourne une erreur: {erreur}"
+            )
+            raise ErreurCommunicationModele(
+                "Impossible de récupérer une réponse pour la question posée."
+            )
+        finally:
+            await flux.close()
+
+
+def _http2_disponible() -> bool:
+    return importlib.util.find_spec("h2") is not None
 
 
-def fabrique_client_albert(configuration: Albert.Client) -> ClientAlbertApi:  # type: ignore [name-defined]
-    client_openai = OpenAI(
+def fabrique_client_albert(
+    configuration: Albert.Client,  # type: ignore [name-defined]
+    cache_recherche: Optional[AdaptateurCache] = None,
+) -> ClientAlbertApi:
+    utilise_http2 = configuration.utilise_http2 and _http2_disponible()
+    if configuration.utilise_http2 and not utilise_http2:
+        logging.warning(
+            "HTTP/2 demandé pour Albert mais le paquet `h2` n'est pas installé : utilisation d'HTTP/1.1"
+        )
+    transport = TransportAlbert(
+        taille_pool=configuration.taille_pool_connexions,
+        duree_keep_alive=configuration.duree_keep_alive_connexions,
+        http2=utilise_http2,
+    )
+    client_openai = AsyncOpenAI(
         base_url=configuration.base_url,
         api_key=configuration.api_key,
         timeout=configuration.temps_reponse_maximum_pose_question,
+        http_client=DefaultAsyncHttpxClient(transport=transport),
     )
     client_http = ClientAlbertHttp(
         base_url=configuration.base_url,
         token=configuration.api_key,
+        transport=transport,
     )
 
-    return ClientAlbertApi(client_openai, client_http, configuration)
+    return ClientAlbertApi(
+        client_openai, client_http, configuration, transport, cache_recherche
+    )
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from enum import StrEnum
+from typing import Callable, Iterator, NamedTuple
+
+import httpx
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+from configuration import logging
+
+DEFAILLANCES_ALBERT: tuple[type[BaseException], ...] = (
+    httpx.TransportError,
+    APITimeoutError,
+    APIConnectionError,
+)
+
+
+def est_une_defaillance(erreur: BaseException) -> bool:
+    """
+    Une réponse d'erreur n'est une défaillance d'Albert que pour un code 5xx
+    ou 429 : les autres codes 4xx tiennent à la requête elle-même et ne
+    doivent pas ouvrir le disjoncteur partagé par toutes les questions.
+    """
+    if isinstance(erreur, httpx.HTTPStatusError):
+        return _est_un_code_de_defaillance(erreur.response.status_code)
+    if isinstance(erreur, APIStatusError):
+        return _est_un_code_de_defaillance(erreur.status_code)
+    return isinstance(erreur, DEFAILLANCES_ALBERT)
+
+
+def _est_un_code_de_defaillance(code: int) -> bool:
+    return code >= 500 or code == 429
+
+
+class EtatDisjoncteur(StrEnum):
+    FERME = "ferme"
+    OUVERT = "ouvert"
+    SEMI_OUVERT = "semi_ouvert"
+
+
+class EtatCourantDisjoncteur(NamedTuple):
+    route: str
+    etat: EtatDisjoncteur
+    echecs_consecutifs: int
+    nombre_rejets: int
+
+
+class DisjoncteurOuvert(Exception):
+    def __init__(self, route: str):
+        super().__init__(f"Disjoncteur ouvert sur la route `{route}` de l'API Albert")
+        self.route = route
+
+
+class Disjoncteur:
+    """
+    Coupe les appels à une route d'Albert après `seuil_echecs` défaillances
+    consécutives : tant qu'il est ouvert, les appels échouent immédiatement
+    plutôt que d'attendre le délai de la requête. Après `duree_ouverture`, un
+    unique appel d'essai est autorisé (semi-ouvert) : son succès referme le
+    disjoncteur, son échec le rouvre.
+
+    Un appel annulé après avoir duré au moins `duree_appel_lent` compte aussi
+    comme un échec : c'est ainsi que se termine un appel coupé par nos propres
+    délais, et un Albert trop lent pour eux doit ouvrir le disjoncteur.
+    """
+
+    def __init__(
+        self,
+        route: str,
+        seuil_echecs: int,
+        duree_ouverture: float,
+        duree_appel_lent: float = 3.0,
+        horloge: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.route = route
+        self.seuil_echecs = seuil_echecs
+        self.duree_ouverture = duree_ouverture
+        self.duree_appel_lent = duree_appel_lent
+        self.horloge = horloge
+        self.etat = EtatDisjoncteur.FERME
+        self.echecs_consecutifs = 0
+        self.nombre_rejets = 0
+        self._ouvert_depuis = 0.0
+        self._essai_en_cours = False
+
+    @property
+    def etat_courant(self) -> EtatCourantDisjoncteur:
+        return EtatCourantDisjoncteur(
+            route=self.route,
+            etat=self.etat,
+            echecs_consecutifs=self.echecs_consecutifs,
+            nombre_rejets=self.nombre_rejets,
+        )
+
+    @contextmanager
+    def protege(self) -> Iterator[None]:
+        if not self._autorise():
+            self.nombre_rejets += 1
+            raise DisjoncteurOuvert(self.route)
+        debut = self.horloge()
+        try:
+            yield
+        except BaseException as erreur:
+            if est_une_defaillance(erreur) or self._est_une_annulation_tardive(
+                erreur, debut
+            ):
+                self.enregistre_un_echec()
+            else:
+                self._essai_en_cours = False
+            raise
+        else:
+            self._enregistre_un_succes()
+
+    def _autorise(self) -> bool:
+        if (
+            self.etat is EtatDisjoncteur.OUVERT
+            and self.horloge() - self._ouvert_depuis >= self.duree_ouverture
+        ):
+            self.etat = EtatDisjoncteur.SEMI_OUVERT
+        if self.etat is EtatDisjoncteur.OUVERT:
+            return False
+        if self.etat is EtatDisjoncteur.SEMI_OUVERT:
+            if self._essai_en_cours:
+                return False
+            self._essai_en_cours = True
+        return True
+
+    def _enregistre_un_succes(self) -> None:
+        if self.etat is not EtatDisjoncteur.FERME:
+            logging.info(f"Disjoncteur refermé sur la route `{self.route}`")
+        self.etat = EtatDisjoncteur.FERME
+        self.echecs_consecutifs = 0
+        self._essai_en_cours = False
+
+    def _est_une_annulation_tardive(self, erreur: BaseException, debut: float) -> bool:
+        return (
+            isinstance(erreur, asyncio.CancelledError)
+            and self.horloge() - debut >= self.duree_appel_lent
+        )
+
+    def enregistre_un_echec(self) -> None:
+        self.echecs_consecutifs += 1
+        self._essai_en_cours = False
+        if (
+            self.etat is EtatDisjoncteur.SEMI_OUVERT
+            or self.echecs_consecutifs >= self.seuil_echecs
+        ):
+            if self.etat is not EtatDisjoncteur.OUVERT:
+                logging.warning(
+                    f"Disjoncteur ouvert sur la route `{self.route}` après {self.echecs_consecutifs} échec(s) consécutif(s)"
+                )
+            self.etat = EtatDisjoncteur.OUVERT
+            self._ouvert_depuis = self.horloge()
@@ -0,0 +1,462 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterable, NamedTuple, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from configuration import logging
+from infra.albert.client_albert import (
+    ROUTE_CHUNKS,
+    ROUTE_COMPLETION,
+    ROUTE_RECHERCHE,
+    ROUTE_RECLASSEMENT,
+    ROUTES_ALBERT,
+)
+from infra.index_lexical import IndexBM25, tokenise
+from services.contexte import estime_les_jetons
+
+QUANTILE_99_LOI_NORMALE = 2.326
+TAILLE_BLOC_CACHE_DE_PREFIXES = 64
+
+
+class LoiDeLatence(NamedTuple):
+    """
+    `fixe:duree`, `uniforme:minimum:maximum` ou `lognormale:mediane:p99`,
+    durées en secondes.
+    """
+
+    nature: str
+    parametres: tuple[float, ...]
+
+    @classmethod
+    def depuis_texte(cls, texte: str) -> "LoiDeLatence":
+        nature, *parametres = texte.split(":")
+        attendus = {"fixe": 1, "uniforme": 2, "lognormale": 2}
+        if nature not in attendus or len(parametres) != attendus[nature]:
+            raise ValueError(f"Loi de latence invalide : {texte}")
+        return cls(nature, tuple(float(p) for p in parametres))
+
+    def tire(self, generateur: random.Random) -> float:
+        match self.nature:
+            case "uniforme":
+                return generateur.uniform(*self.parametres)
+            case "lognormale":
+                mediane, p99 = self.parametres
+                if mediane <= 0:
+                    return 0.0
+                sigma = (
+                    math.log(p99 / mediane) / QUANTILE_99_LOI_NORMALE
+                    if p99 > mediane
+                    else 0.0
+                )
+                return generateur.lognormvariate(math.log(mediane), sigma)
+        return self.parametres[0]
+
+
+AUCUNE_LATENCE = LoiDeLatence("fixe", (0.0,))
+
+
+class ComportementRoute(NamedTuple):
+    latence: LoiDeLatence = AUCUNE_LATENCE
+    taux_erreur: float = 0.0
+    requetes_par_seconde: Optional[float] = None
+
+
+class ParametresFauxServeur(NamedTuple):
+    comportements: dict[str, ComportementRoute] = {}
+    jetons_par_seconde: Optional[float] = None
+    nombre_mots_reponse: int = 50
+    graine: Optional[int] = None
+    jetons_prefill_par_seconde: Optional[float] = None
+    capacite_cache_de_prefixes: int = 0
+
+
+class CacheDePrefixes:
+    """
+    Imite le cache de préfixes d'un serveur d'inférence (à la manière de
+    vLLM) : le prompt est découpé en blocs de taille fixe, chacun identifié
+    par son contenu et celui de tous les blocs qui le précèdent. Seuls les
+    blocs du plus long préfixe déjà vu échappent au calcul initial (prefill).
+    Les blocs les moins récemment utilisés sont évincés au-delà de `capacite`.
+    """
+
+    def __init__(
+        self, capacite: int, taille_bloc: int = TAILLE_BLOC_CACHE_DE_PREFIXES
+    ) -> None:
+        self.capacite = capacite
+        self.taille_bloc = taille_bloc
+        self._blocs: OrderedDict[str, None] = OrderedDict()
+
+    def consulte(self, prompt: str) -> int:
+        """Retourne le nombre de caractères du prompt déjà en cache, puis l'y ajoute."""
+        empreinte = hashlib.sha256()
+        en_cache = 0
+        prefixe_connu = True
+        for debut in range(0, len(prompt) - self.taille_bloc + 1, self.taille_bloc):
+            empreinte.update(prompt[debut : debut + self.taille_bloc].encode())
+            cle = empreinte.hexdigest()
+            if prefixe_connu and cle in self._blocs:
+                en_cache += self.taille_bloc
+                self._blocs.move_to_end(cle)
+                continue
+            prefixe_connu = False
+            self._blocs[cle] = None
+            if len(self._blocs) > self.capacite:
+                self._blocs.popitem(last=False)
+        return en_cache
+
+
+def _prompt_a_plat(messages: list[dict]) -> str:
+    return "".join(
+        f"<|{m.get('role', '')}|>\n{m.get('content', '')}<|fin|>\n" for m in messages
+    )
+
+
+class LimiteDeDebit:
+    """Seau à jetons : au-delà de `requetes_par_seconde`, les requêtes sont refusées."""
+
+    def __init__(self, requetes_par_seconde: float) -> None:
+        self.requetes_par_seconde = requetes_par_seconde
+        self.capacite = max(1.0, requetes_par_seconde)
+        self._jetons = self.capacite
+        self._derniere_mise_a_jour = time.monotonic()
+
+    def autorise(self) -> bool:
+        maintenant = time.monotonic()
+        self._jetons = min(
+            self.capacite,
+            self._jetons
+            + (maintenant - self._derniere_mise_a_jour) * self.requetes_par_seconde,
+        )
+        self._derniere_mise_a_jour = maintenant
+        if self._jetons < 1:
+            return False
+        self._jetons -= 1
+        return True
+
+
+class CorpusFauxServeur:
+    """
+    Chunks servis par le faux serveur, lus depuis un export JSON Lines de
+    collection (même format que pour le pré-remplissage de l'entrepôt de
+    chunks). Un chunk portant `collection_id` n'est retourné que pour cette
+    collection, les autres le sont pour toutes.
+    """
+
+    def __init__(self, chunks: list[dict]) -> None:
+        self.chunks = chunks
+        self._par_identifiant = {
+            (str(_id_document(chunk)), int(chunk["id"])): chunk for chunk in chunks
+        }
+        self._index_par_collection: dict[int, IndexBM25] = {}
+
+    @classmethod
+    def depuis_lignes(cls, lignes: Iterable[str]) -> "CorpusFauxServeur":
+        return cls([json.loads(ligne) for ligne in lignes if ligne.strip()])
+
+    @classmethod
+    def depuis_chemin(cls, chemin: Path) -> "CorpusFauxServeur":
+        with chemin.open(encoding="utf-8") as fichier:
+            return cls.depuis_lignes(fichier)
+
+    def chunk(self, id_document: str, id_chunk: int) -> Optional[dict]:
+        return self._par_identifiant.get((id_document, id_chunk))
+
+    def recherche(
+        self, collection_ids: list[int], prompt: str, limite: int
+    ) -> list[tuple[dict, float]]:
+        resultats: list[tuple[dict, float]] = []
+        for id_collection in collection_ids:
+            index = self.__index(id_collection)
+            resultats.extend(
+                (self.chunks[int(c.identifiant)], c.couverture)
+                for c in index.meilleures_correspondances(tokenise(prompt), limite)
+            )
+        return sorted(resultats, key=lambda r: r[1], reverse=True)[:limite]
+
+    def __index(self, id_collection: int) -> IndexBM25:
+        if id_collection not in self._index_par_collection:
+            self._index_par_collection[id_collection] = IndexBM25(
+                {
+                    str(position): (tokenise(chunk.get("content", "")), [])
+                    for position, chunk in enumerate(self.chunks)
+                    if chunk.get("collection_id") in (None, id_collection)
+                }
+            )
+        return self._index_par_collection[id_collection]
+
+
+def _id_document(chunk: dict) -> Any:
+    return chunk.get("id_document") or chunk.get("metadata", {}).get("document_id")
+
+
+def _pertinence(requete: str, document: str) -> float:
+    index = IndexBM25({"document": (tokenise(document), [])})
+    return index.couverture(tokenise(requete), "document")
+
+
+def _reponse_simulee(messages: list[dict], nombre_mots: int) -> str:
+    """
+    Reprend le dernier message de l'utilisateur, complété de mots tirés des
+    instructions système (les documents transmis) jusqu'à `nombre_mots`.
+    """
+    dernier_message = next(
+        (m.get("content", "") for m in reversed(messages) if m.get("role") == "user"),
+        "",
+    )
+    question = dernier_message.rpartition("Question :\n")[2]
+    mots_systeme = " ".join(
+        m.get("content", "") for m in messages if m.get("role") == "system"
+    ).split() or ["Albert"]
+    complement = [mots_systeme[i % len(mots_systeme)] for i in range(nombre_mots)]
+    return " ".join([question, *complement]).strip()
+
+
+def fabrique_faux_serveur_albert(
+    corpus: CorpusFauxServeur, parametres: ParametresFauxServeur
+) -> FastAPI:
+    """
+    Serveur imitant les routes de l'API Albert utilisées par `ClientAlbertApi`,
+    afin de mesurer performances et résilience sans accès au réseau. Latences,
+    taux d'erreur (503) et débits maximum (429) sont configurables par route.
+    Avec `jetons_prefill_par_seconde`, la génération ne commence qu'après le
+    calcul initial des jetons du prompt absents du cache de préfixes.
+    """
+    generateur = random.Random(parametres.graine)
+    cache_de_prefixes = CacheDePrefixes(parametres.capacite_cache_de_prefixes)
+    limites = {
+        route: LimiteDeDebit(comportement.requetes_par_seconde)
+        for route, comportement in parametres.comportements.items()
+        if comportement.requetes_par_seconde
+    }
+    serveur = FastAPI(title="Faux serveur Albert")
+
+    async def _simule(route: str) -> None:
+        comportement = parametres.comportements.get(route, ComportementRoute())
+        limite = limites.get(route)
+        if limite is not None and not limite.autorise():
+            raise HTTPException(status_code=429, detail="Trop de requêtes")
+        await asyncio.sleep(comportement.latence.tire(generateur))
+        if generateur.random() < comportement.taux_erreur:
+            raise HTTPException(status_code=503, detail="Erreur simulée")
+
+    @serveur.post(ROUTE_RECHERCHE)
+    async def recherche(requete: Request) -> dict:
+        await _simule(ROUTE_RECHERCHE)
+        payload = await requete.json()
+        return {
+            "object": "list",
+            "data": [
+                {
+                    "method": payload.get("method", "semantic"),
+                    "score": score,
+                    "chunk": c,
+                }
+                for c, score in corpus.recherche(
+                    payload.get("collection_ids", []),
+                    payload.get("prompt", ""),
+                    payload.get("limit", 10),
+                )
+            ],
+        }
+
+    @serveur.get("/documents/{id_document}/chunks/{id_chunk}")
+    async def chunk(id_document: str, id_chunk: int) -> dict:
+        await _simule(ROUTE_CHUNKS)
+        trouve = corpus.chunk(id_document, id_chunk)
+        if trouve is None:
+            raise HTTPException(status_code=404, detail="Chunk inconnu")
+        return trouve
+
+    @serveur.post(ROUTE_RECLASSEMENT)
+    async def reclasse(requete: Request) -> dict:
+        await _simule(ROUTE_RECLASSEMENT)
+        payload = await requete.json()
+        scores = [
+            (index, _pertinence(payload.get("query", ""), document))
+            for index, document in enumerate(payload.get("documents", []))
+        ]
+        return {
+            "object": "list",
+            "results": [
+                {"object": "rerank", "relevance_score": score, "index": index}
+                for index, score in sorted(scores, key=lambda s: s[1], reverse=True)
+            ],
+        }
+
+    async def _simule_le_prefill(messages: list[dict]) -> tuple[int, int]:
+        """Retourne le nombre de jetons du prompt et celui des jetons en cache."""
+        prompt = _prompt_a_plat(messages)
+        en_cache = cache_de_prefixes.consulte(prompt)
+        if parametres.jetons_prefill_par_seconde:
+            await asyncio.sleep(
+                estime_les_jetons(prompt[en_cache:])
+                / parametres.jetons_prefill_par_seconde
+            )
+        return estime_les_jetons(prompt), estime_les_jetons(prompt[:en_cache])
+
+    @serveur.post(ROUTE_COMPLETION)
+    async def complete(requete: Request) -> Any:
+        await _simule(ROUTE_COMPLETION)
+        payload = await requete.json()
+        modele = payload.get("model", "")
+        jetons_prompt, jetons_en_cache = await _simule_le_prefill(
+            payload.get("messages", [])
+        )
+        texte = _reponse_simulee(
+            payload.get("messages", []), parametres.nombre_mots_reponse
+        )
+        identifiant = f"faux-{uuid.uuid4()}"
+        if payload.get("stream"):
+            return StreamingResponse(
+                _flux_de_completion(
+                    identifiant, modele, texte, parametres.jetons_par_seconde
+                ),
+                media_type="text/event-stream",
+            )
+        if parametres.jetons_par_seconde:
+            await asyncio.sleep(len(texte.split()) / parametres.jetons_par_seconde)
+        return {
+            "id": identifiant,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": modele,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": texte},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": jetons_prompt,
+                "completion_tokens": len(texte.split()),
+                "total_tokens": jetons_prompt + len(texte.split()),
+                "prompt_tokens_details": {"cached_tokens": jetons_en_cache},
+            },
+        }
+
+    return serveur
+
+
+async def _flux_de_completion(
+    identifiant: str, modele: str, texte: str, jetons_par_seconde: Optional[float]
+) -> AsyncIterator[str]:
+    def _morceau(delta: dict, fin: Optional[str] = None) -> str:
+        return (
+            "data: "
+            + json.dumps(
+                {
+                    "id": identifiant,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": modele,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": fin}],
+                },
+                ensure_ascii=False,
+            )
+            + "\n\n"
+        )
+
+    yield _morceau({"role": "assistant", "content": ""})
+    for position, mot in enumerate(texte.split(" ")):
+        if jetons_par_seconde:
+            await asyncio.sleep(1 / jetons_par_seconde)
+        yield _morceau({"content": mot if position == 0 else f" {mot}"})
+    yield _morceau({}, fin="stop")
+    yield "data: [DONE]\n\n"
+
+
+def _par_route[T](valeurs: list[str], conversion: Callable[[str], T]) -> dict[str, T]:
+    resultat = {}
+    for valeur in valeurs:
+        route, _, brut = valeur.partition("=")
+        if route not in ROUTES_ALBERT:
+            raise ValueError(
+                f"Route inconnue : {route} (parmi {', '.join(ROUTES_ALBERT)})"
+            )
+        resultat[route] = conversion(brut)
+    return resultat
+
+
+def lis_les_parametres(
+    arguments: list[str],
+) -> tuple[argparse.Namespace, ParametresFauxServeur]:
+    analyseur = argparse.ArgumentParser(description="Faux serveur de l'API Albert")
+    analyseur.add_argument("corpus", type=Path, help="Export JSON Lines des chunks")
+    analyseur.add_argument("--hote", default="127.0.0.1")
+    analyseur.add_argument("--port", type=int, default=8001)
+    analyseur.add_argument(
+        "--latence",
+        action="append",
+        default=[],
+        help="ROUTE=LOI, par exemple /search=lognormale:0.2:1.5",
+    )
+    analyseur.add_argument(
+        "--taux-erreur",
+        action="append",
+        default=[],
+        help="ROUTE=TAUX, par exemple /rerank=0.05",
+    )
+    analyseur.add_argument(
+        "--requetes-par-seconde",
+        action="append",
+        default=[],
+        help="ROUTE=DEBIT, au-delà duquel la route répond 429",
+    )
+    analyseur.add_argument("--jetons-par-seconde", type=float, default=None)
+    analyseur.add_argument("--nombre-mots-reponse", type=int, default=50)
+    analyseur.add_argument("--graine", type=int, default=None)
+    analyseur.add_argument(
+        "--jetons-prefill-par-seconde",
+        type=float,
+        default=None,
+        help="Débit du calcul initial des jetons du prompt absents du cache",
+    )
+    analyseur.add_argument(
+        "--cache-de-prefixes",
+        type=int,
+        default=0,
+        help=f"Capacité du cache de préfixes, en blocs de {TAILLE_BLOC_CACHE_DE_PREFIXES} caractères",
+    )
+    lus = analyseur.parse_args(arguments)
+
+    latences = _par_route(lus.latence, LoiDeLatence.depuis_texte)
+    taux_erreur = _par_route(lus.taux_erreur, float)
+    debits = _par_route(lus.requetes_par_seconde, float)
+    comportements = {
+        route: ComportementRoute(
+            latence=latences.get(route, AUCUNE_LATENCE),
+            taux_erreur=taux_erreur.get(route, 0.0),
+            requetes_par_seconde=debits.get(route),
+        )
+        for route in ROUTES_ALBERT
+    }
+    return lus, ParametresFauxServeur(
+        comportements=comportements,
+        jetons_par_seconde=lus.jetons_par_seconde,
+        nombre_mots_reponse=lus.nombre_mots_reponse,
+        graine=lus.graine,
+        jetons_prefill_par_seconde=lus.jetons_prefill_par_seconde,
+        capacite_cache_de_prefixes=lus.cache_de_prefixes,
+    )
+
+
+if __name__ == "__main__":
+    lus, parametres = lis_les_parametres(sys.argv[1:])
+    corpus = CorpusFauxServeur.depuis_chemin(lus.corpus)
+    logging.info(f"Faux serveur Albert : {len(corpus.chunks)} chunk(s) chargé(s)")
+    uvicorn.run(
+        fabrique_faux_serveur_albert(corpus, parametres), host=lus.hote, port=lus.port
+    )
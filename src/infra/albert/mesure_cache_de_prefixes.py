@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from openai import AsyncOpenAI
+
+from configuration import DispositionMessages
+from infra.albert.faux_serveur_albert import CorpusFauxServeur
+from infra.charge.generateur_de_charge import (
+    QUESTIONS_PAR_DEFAUT,
+    RELANCES_PAR_DEFAUT,
+    MesureRequete,
+    StatistiquesRoute,
+    calcule_les_statistiques,
+    formate_en_tableau,
+)
+from services.contexte import AssembleurDeContexte, Echange, compose_les_messages
+
+
+class ParametresMesure(NamedTuple):
+    nombre_conversations: int = 10
+    nombre_tours: int = 4
+    nombre_paragraphes: int = 5
+    budget_jetons: int = 8000
+    modele: str = "albert-large"
+
+
+class TourDeConversation(NamedTuple):
+    question: str
+    paragraphes: list[str]
+
+
+def prepare_les_conversations(
+    chunks: list[str], parametres: ParametresMesure, generateur: random.Random
+) -> list[list[TourDeConversation]]:
+    """
+    Conversations rejouées à l'identique pour chaque disposition : une question
+    puis des relances, chacune accompagnée de paragraphes tirés du corpus.
+    """
+    return [
+        [
+            TourDeConversation(
+                question=f"Question :\n{generateur.choice(QUESTIONS_PAR_DEFAUT if tour == 0 else RELANCES_PAR_DEFAUT)}",
+                paragraphes=generateur.sample(
+                    chunks, min(parametres.nombre_paragraphes, len(chunks))
+                ),
+            )
+            for tour in range(parametres.nombre_tours)
+        ]
+        for _ in range(parametres.nombre_conversations)
+    ]
+
+
+async def _mesure_le_premier_jeton(
+    client: AsyncOpenAI, modele: str, messages: list
+) -> tuple[float, str]:
+    debut = time.perf_counter()
+    premier_jeton = None
+    reponse = []
+    flux = await client.chat.completions.create(
+        model=modele, messages=messages, stream=True
+    )
+    async for morceau in flux:
+        if morceau.choices and morceau.choices[0].delta.content:
+            if premier_jeton is None:
+                premier_jeton = time.perf_counter() - debut
+            reponse.append(morceau.choices[0].delta.content)
+    return (
+        premier_jeton if premier_jeton is not None else time.perf_counter() - debut,
+        "".join(reponse),
+    )
+
+
+async def mesure_les_dispositions(
+    client: AsyncOpenAI,
+    prompt_systeme: str,
+    conversations: list[list[TourDeConversation]],
+    parametres: ParametresMesure,
+) -> list[StatistiquesRoute]:
+    """
+    Temps jusqu'au premier jeton de chaque disposition des messages, par tour
+    de conversation. Chaque conversation est jouée successivement dans toutes
+    les dispositions, pour que l'état du cache de préfixes ne favorise aucune
+    d'elles.
+    """
+    assembleur = AssembleurDeContexte(parametres.budget_jetons)
+    mesures: list[MesureRequete] = []
+    debut = time.perf_counter()
+    for conversation in conversations:
+        for disposition in DispositionMessages:
+            echanges: list[Echange] = []
+            for numero, tour in enumerate(conversation, start=1):
+                contexte = assembleur.assemble(
+                    prompt_systeme.format(chunks=""),
+                    tour.question,
+                    tour.paragraphes,
+                    echanges,
+                )
+                messages = compose_les_messages(
+                    disposition, prompt_systeme, contexte, tour.question
+                )
+                try:
+                    duree, reponse = await _mesure_le_premier_jeton(
+                        client, parametres.modele, messages
+                    )
+                except Exception:
+                    mesures.append(MesureRequete(f"{disposition} #{numero}", 0, None))
+                    break
+                mesures.append(MesureRequete(f"{disposition} #{numero}", duree, 200))
+                echanges.insert(0, Echange(tour.question, reponse))
+    return calcule_les_statistiques(mesures, time.perf_counter() - debut)
+
+
+async def _lance(arguments: argparse.Namespace) -> list[StatistiquesRoute]:
+    parametres = ParametresMesure(
+        nombre_conversations=arguments.conversations,
+        nombre_tours=arguments.tours,
+        nombre_paragraphes=arguments.paragraphes,
+        budget_jetons=arguments.budget_jetons,
+        modele=arguments.modele,
+    )
+    corpus = CorpusFauxServeur.depuis_chemin(arguments.corpus)
+    conversations = prepare_les_conversations(
+        [c.get("content", "") for c in corpus.chunks],
+        parametres,
+        random.Random(arguments.graine),
+    )
+    client = AsyncOpenAI(base_url=arguments.url, api_key="cle", max_retries=0)
+    return await mesure_les_dispositions(
+        client,
+        arguments.prompt.read_text(encoding="utf-8"),
+        conversations,
+        parametres,
+    )
+
+
+if __name__ == "__main__":
+    analyseur = argparse.ArgumentParser(
+        description="Temps jusqu'au premier jeton selon la disposition des messages"
+    )
+    analyseur.add_argument(
+        "url", help="Adresse du faux serveur Albert, par exemple http://127.0.0.1:8001"
+    )
+    analyseur.add_argument("corpus", type=Path, help="Export JSON Lines des chunks")
+    analyseur.add_argument(
+        "--prompt", type=Path, default=Path("templates/prompt_assistant_cyber.txt")
+    )
+    analyseur.add_argument("--conversations", type=int, default=10)
+    analyseur.add_argument("--tours", type=int, default=4)
+    analyseur.add_argument("--paragraphes", type=int, default=5)
+    analyseur.add_argument("--budget-jetons", type=int, default=8000)
+    analyseur.add_argument("--modele", default="albert-large")
+    analyseur.add_argument("--graine", type=int, default=None)
+    analyseur.add_argument("--rapport", type=Path, help="Fichier du rapport JSON")
+    arguments = analyseur.parse_args()
+
+    statistiques = asyncio.run(_lance(arguments))
+    rapport = json.dumps([s._asdict() for s in statistiques], indent=2)
+    if arguments.rapport:
+        arguments.rapport.write_text(rapport, encoding="utf-8")
+    else:
+        print(rapport)
+    print(formate_en_tableau(statistiques), file=sys.stderr)
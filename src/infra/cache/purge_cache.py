@@ -0,0 +1,21 @@
+import sys
+
+from adaptateurs.cache import AdaptateurCachePostgres
+from configuration import logging, recupere_configuration
+from infra.albert.client_albert import etiquette_collection
+
+if __name__ == "__main__":
+    configuration = recupere_configuration()
+    espace = sys.argv[1]
+    id_collection = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    cache = AdaptateurCachePostgres(
+        configuration.base_de_donnees,
+        espace,
+        configuration.cache_recherche.taille_maximum,
+        configuration.cache_recherche.duree_de_vie,
+    )
+    nombre = cache.purge(
+        etiquette_collection(id_collection) if id_collection is not None else None
+    )
+    cache.ferme_connexion()
+    logging.info(f"{nombre} entrée(s) supprimée(s) du cache « {espace} »")
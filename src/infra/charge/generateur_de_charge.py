@@ -0,0 +1,310 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+import httpx
+
+ROUTE_INITIE_CONVERSATION = "POST /api/conversation/"
+ROUTE_AJOUTE_INTERACTION = "POST /api/conversation/{id}"
+ROUTE_RETOUR = "POST /api/retour/"
+ROUTE_SOURCE = "GET /source"
+
+QUESTIONS_PAR_DEFAUT = [
+    "Qu'est-ce que le MFA ?",
+    "Comment sécuriser mes mots de passe ?",
+    "Comment sauvegarder les données de mon entreprise ?",
+    "Que faire en cas de rançongiciel ?",
+    "Comment sécuriser le télétravail ?",
+    "Qui contacter en cas de cyberattaque ?",
+]
+RELANCES_PAR_DEFAUT = [
+    "Peux-tu détailler ?",
+    "Et pour une petite entreprise ?",
+    "Quelles sont les priorités ?",
+]
+
+
+class ScenarioDeCharge(NamedTuple):
+    """
+    Parcours d'un utilisateur : une première question, puis des relances avec
+    la probabilité `probabilite_relance` (jusqu'à `nombre_maximum_tours`
+    questions). Après chaque réponse, il consulte une source et donne son avis
+    selon les probabilités correspondantes.
+    """
+
+    questions: list[str]
+    relances: list[str]
+    probabilite_relance: float = 0.4
+    nombre_maximum_tours: int = 4
+    probabilite_retour: float = 0.2
+    probabilite_clic_source: float = 0.3
+    temps_de_reflexion: float = 0.0
+
+
+class MesureRequete(NamedTuple):
+    route: str
+    duree: float
+    statut: Optional[int]
+
+    @property
+    def en_erreur(self) -> bool:
+        return self.statut is None or self.statut >= 400
+
+
+class StatistiquesRoute(NamedTuple):
+    route: str
+    nombre_requetes: int
+    nombre_erreurs: int
+    taux_erreur: float
+    requetes_par_seconde: float
+    p50: float
+    p95: float
+    p99: float
+
+
+def centile(durees_triees: list[float], quantile: float) -> float:
+    if not durees_triees:
+        return 0.0
+    rang = math.ceil(round(quantile * len(durees_triees), 9))
+    return durees_triees[min(max(rang, 1), len(durees_triees)) - 1]
+
+
+def calcule_les_statistiques(
+    mesures: list[MesureRequete], duree_totale: float
+) -> list[StatistiquesRoute]:
+    par_route: dict[str, list[MesureRequete]] = {}
+    for mesure in mesures:
+        par_route.setdefault(mesure.route, []).append(mesure)
+    statistiques = []
+    for route, mesures_route in par_route.items():
+        durees = sorted(m.duree for m in mesures_route)
+        nombre_erreurs = sum(1 for m in mesures_route if m.en_erreur)
+        statistiques.append(
+            StatistiquesRoute(
+                route=route,
+                nombre_requetes=len(mesures_route),
+                nombre_erreurs=nombre_erreurs,
+                taux_erreur=nombre_erreurs / len(mesures_route),
+                requetes_par_seconde=(
+                    len(mesures_route) / duree_totale if duree_totale > 0 else 0.0
+                ),
+                p50=centile(durees, 0.5),
+                p95=centile(durees, 0.95),
+                p99=centile(durees, 0.99),
+            )
+        )
+    return sorted(statistiques, key=lambda s: s.route)
+
+
+def formate_en_tableau(statistiques: list[StatistiquesRoute]) -> str:
+    entetes = [
+        "Route",
+        "Requêtes",
+        "Erreurs",
+        "RPS",
+        "p50 (ms)",
+        "p95 (ms)",
+        "p99 (ms)",
+    ]
+    lignes = [
+        [
+            s.route,
+            str(s.nombre_requetes),
+            f"{s.taux_erreur:.1%}",
+            f"{s.requetes_par_seconde:.2f}",
+            f"{s.p50 * 1000:.0f}",
+            f"{s.p95 * 1000:.0f}",
+            f"{s.p99 * 1000:.0f}",
+        ]
+        for s in statistiques
+    ]
+    largeurs = [
+        max(len(ligne[i]) for ligne in [entetes, *lignes]) for i in range(len(entetes))
+    ]
+    return "\n".join(
+        "  ".join(
+            cellule.ljust(largeur) if i == 0 else cellule.rjust(largeur)
+            for i, (cellule, largeur) in enumerate(zip(ligne, largeurs))
+        )
+        for ligne in [entetes, *lignes]
+    )
+
+
+class GenerateurDeCharge:
+    """
+    Simule `nombre_utilisateurs` utilisateurs simultanés qui enchaînent des
+    parcours (_cf._ `ScenarioDeCharge`) contre un serveur démarré, et mesure
+    la durée et le statut de chaque requête.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        scenario: ScenarioDeCharge,
+        generateur: Optional[random.Random] = None,
+    ) -> None:
+        self.client = client
+        self.scenario = scenario
+        self.generateur = generateur or random.Random()
+        self.mesures: list[MesureRequete] = []
+
+    async def execute(
+        self, nombre_utilisateurs: int, duree: float
+    ) -> list[StatistiquesRoute]:
+        debut = time.monotonic()
+        echeance = debut + duree
+
+        async def _utilisateur() -> None:
+            while time.monotonic() < echeance:
+                await self.parcours_utilisateur()
+
+        await asyncio.gather(*(_utilisateur() for _ in range(nombre_utilisateurs)))
+        return calcule_les_statistiques(self.mesures, time.monotonic() - debut)
+
+    async def parcours_utilisateur(self) -> None:
+        reponse = await self._mesure(
+            ROUTE_INITIE_CONVERSATION,
+            "POST",
+            "/api/conversation/",
+            json={"question": self.generateur.choice(self.scenario.questions)},
+        )
+        if reponse is None:
+            return
+        id_conversation = reponse["id_conversation"]
+        nombre_tours = 1
+        while True:
+            await self._reagit_a_la_reponse(id_conversation, reponse)
+            if (
+                nombre_tours >= self.scenario.nombre_maximum_tours
+                or self.generateur.random() >= self.scenario.probabilite_relance
+            ):
+                return
+            await self._reflechit()
+            reponse = await self._mesure(
+                ROUTE_AJOUTE_INTERACTION,
+                "POST",
+                f"/api/conversation/{id_conversation}",
+                json={"question": self.generateur.choice(self.scenario.relances)},
+            )
+            if reponse is None:
+                return
+            nombre_tours += 1
+
+    async def _reagit_a_la_reponse(
+        self, id_conversation: str, reponse: dict[str, Any]
+    ) -> None:
+        paragraphes = reponse.get("paragraphes", [])
+        if (
+            paragraphes
+            and self.generateur.random() < self.scenario.probabilite_clic_source
+        ):
+            await self._reflechit()
+            await self._mesure(
+                ROUTE_SOURCE, "GET", self.generateur.choice(paragraphes)["url"]
+            )
+        if self.generateur.random() < self.scenario.probabilite_retour:
+            await self._reflechit()
+            await self._mesure(
+                ROUTE_RETOUR,
+                "POST",
+                "/api/retour/",
+                json={
+                    "id_conversation": id_conversation,
+                    "id_interaction": reponse["id_interaction"],
+                    "retour": {"type": self.generateur.choice(["positif", "negatif"])},
+                },
+            )
+
+    async def _reflechit(self) -> None:
+        if self.scenario.temps_de_reflexion > 0:
+            await asyncio.sleep(
+                self.generateur.expovariate(1 / self.scenario.temps_de_reflexion)
+            )
+
+    async def _mesure(
+        self, route: str, methode: str, url: str, **options: Any
+    ) -> Optional[dict[str, Any]]:
+        debut = time.monotonic()
+        try:
+            reponse = await self.client.request(methode, url, **options)
+        except httpx.HTTPError:
+            self.mesures.append(MesureRequete(route, time.monotonic() - debut, None))
+            return None
+        self.mesures.append(
+            MesureRequete(route, time.monotonic() - debut, reponse.status_code)
+        )
+        if reponse.status_code >= 300 or not reponse.content:
+            return None
+        return reponse.json()
+
+
+def _lis_les_lignes(chemin: Optional[Path], par_defaut: list[str]) -> list[str]:
+    if chemin is None:
+        return par_defaut
+    return [
+        ligne.strip()
+        for ligne in chemin.read_text(encoding="utf-8").splitlines()
+        if ligne.strip()
+    ]
+
+
+async def _lance(arguments: argparse.Namespace) -> list[StatistiquesRoute]:
+    scenario = ScenarioDeCharge(
+        questions=_lis_les_lignes(arguments.questions, QUESTIONS_PAR_DEFAUT),
+        relances=_lis_les_lignes(arguments.relances, RELANCES_PAR_DEFAUT),
+        probabilite_relance=arguments.probabilite_relance,
+        nombre_maximum_tours=arguments.nombre_maximum_tours,
+        probabilite_retour=arguments.probabilite_retour,
+        probabilite_clic_source=arguments.probabilite_clic_source,
+        temps_de_reflexion=arguments.temps_de_reflexion,
+    )
+    async with httpx.AsyncClient(
+        base_url=arguments.url,
+        timeout=arguments.delai_requete,
+        limits=httpx.Limits(max_connections=arguments.utilisateurs),
+    ) as client:
+        generateur = GenerateurDeCharge(
+            client, scenario, random.Random(arguments.graine)
+        )
+        return await generateur.execute(arguments.utilisateurs, arguments.duree)
+
+
+if __name__ == "__main__":
+    analyseur = argparse.ArgumentParser(
+        description="Test de charge de l'API de conversation"
+    )
+    analyseur.add_argument(
+        "url", help="Adresse du serveur, par exemple http://127.0.0.1:8000"
+    )
+    analyseur.add_argument("--utilisateurs", type=int, default=10)
+    analyseur.add_argument("--duree", type=float, default=60.0, help="En secondes")
+    analyseur.add_argument("--questions", type=Path, help="Une question par ligne")
+    analyseur.add_argument("--relances", type=Path, help="Une relance par ligne")
+    analyseur.add_argument("--probabilite-relance", type=float, default=0.4)
+    analyseur.add_argument("--nombre-maximum-tours", type=int, default=4)
+    analyseur.add_argument("--probabilite-retour", type=float, default=0.2)
+    analyseur.add_argument("--probabilite-clic-source", type=float, default=0.3)
+    analyseur.add_argument(
+        "--temps-de-reflexion",
+        type=float,
+        default=0.0,
+        help="Pause moyenne en secondes entre deux actions d'un utilisateur",
+    )
+    analyseur.add_argument("--delai-requete", type=float, default=120.0)
+    analyseur.add_argument("--graine", type=int, default=None)
+    analyseur.add_argument("--rapport", type=Path, help="Fichier du rapport JSON")
+    arguments = analyseur.parse_args()
+
+    statistiques = asyncio.run(_lance(arguments))
+    rapport = json.dumps([s._asdict() for s in statistiques], indent=2)
+    if arguments.rapport:
+        arguments.rapport.write_text(rapport, encoding="utf-8")
+    else:
+        print(rapport)
+    print(formate_en_tableau(statistiques), file=sys.stderr)
@@ -0,0 +1,49 @@
+import json
+import sys
+from typing import Iterable, Iterator
+
+from adaptateurs.entrepot_chunks import fabrique_adaptateur_entrepot_chunks
+from configuration import logging, recupere_configuration
+from infra.albert.client_albert import mappe_chunk_albert
+from schemas.albert import ResultatRecherche
+
+
+def lis_export_collection(
+    lignes: Iterable[str], decalage_numero_de_page: int
+) -> Iterator[tuple[str, int, ResultatRecherche]]:
+    """
+    Lit un export de collection au format JSON Lines : un chunk Albert par ligne,
+    tel que retourné par `/documents/{id_document}/chunks`, complété de
+    `id_document` lorsque celui-ci n'est pas déjà présent dans `metadata.document_id`.
+    """
+    for ligne in lignes:
+        if not ligne.strip():
+            continue
+        brut = json.loads(ligne)
+        id_document = brut.get("id_document") or brut["metadata"]["document_id"]
+        yield (
+            str(id_document),
+            int(brut["id"]),
+            mappe_chunk_albert(brut, decalage_numero_de_page),
+        )
+
+
+if __name__ == "__main__":
+    configuration = recupere_configuration()
+    if configuration.entrepot_chunks.chemin is None:
+        logging.error(
+            "ENTREPOT_CHUNKS_CHEMIN n'est pas défini : un entrepôt en mémoire ne survivrait pas au pré-remplissage"
+        )
+        sys.exit(1)
+    entrepot = fabrique_adaptateur_entrepot_chunks(
+        configuration.entrepot_chunks,
+        configuration.albert.service.id_collection_anssi_lab,
+    )
+    with open(sys.argv[1], encoding="utf-8") as export:
+        nombre = entrepot.pre_remplis(
+            lis_export_collection(
+                export,
+                configuration.albert.client.decalage_index_Albert_et_numero_de_page_lecteur,
+            )
+        )
+    logging.info(f"{nombre} chunk(s) enregistré(s) dans l'entrepôt de chunks")
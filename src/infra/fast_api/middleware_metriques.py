@@ -0,0 +1,43 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from infra.metriques import DUREE_REQUETES_HTTP, REQUETES_HTTP_EN_COURS
+
+ROUTE_INCONNUE = "autre"
+
+
+class MiddlewareMetriques:
+    """
+    Mesure la durée de chaque requête HTTP jusqu'à l'envoi complet de la
+    réponse (flux compris), par route déclarée plutôt que par chemin afin de
+    borner le nombre de séries.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        statut = 500
+
+        async def _envoie(message: Message) -> None:
+            nonlocal statut
+            if message["type"] == "http.response.start":
+                statut = message["status"]
+            await send(message)
+
+        debut = time.perf_counter()
+        with REQUETES_HTTP_EN_COURS.suit():
+            try:
+                await self.app(scope, receive, _envoie)
+            finally:
+                DUREE_REQUETES_HTTP.observe(
+                    time.perf_counter() - debut,
+                    methode=scope["method"],
+                    route=getattr(scope.get("route"), "path", ROUTE_INCONNUE),
+                    statut=str(statut),
+                )
@@ -0,0 +1,39 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from infra.traces import trace
+
+ROUTE_INCONNUE = "autre"
+
+
+class MiddlewareTraces:
+    """
+    Ouvre le span racine de chaque requête HTTP (ou continue la trace reçue
+    dans l'en-tête `traceparent`), nommé d'après la route déclarée.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        entetes = dict(scope["headers"])
+        traceparent = entetes.get(b"traceparent", b"").decode("latin-1")
+        with trace(
+            scope["method"], {"http.method": scope["method"]}, traceparent
+        ) as span:
+
+            async def _envoie(message: Message) -> None:
+                if span is not None and message["type"] == "http.response.start":
+                    span.attributs["http.status_code"] = message["status"]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, _envoie)
+            finally:
+                if span is not None:
+                    route = getattr(scope.get("route"), "path", ROUTE_INCONNUE)
+                    span.nom = f"{scope['method']} {route}"
+                    span.attributs["http.route"] = route
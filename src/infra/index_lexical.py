@@ -0,0 +1,134 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Mapping, NamedTuple, Optional
+
+SEPARATEURS = re.compile(r"[^0-9a-z]+")
+APOSTROPHES = re.compile(r"['’`]")
+
+
+def tokenise(texte: str) -> list[str]:
+    """
+    Sans accents, en minuscules, apostrophes supprimées (« l'ANSSI » donne
+    `lanssi`, comme dans les identifiants des réponses maîtrisées).
+    """
+    sans_accents = "".join(
+        caractere
+        for caractere in unicodedata.normalize("NFKD", texte.casefold())
+        if not unicodedata.combining(caractere)
+    )
+    return [
+        token for token in SEPARATEURS.split(APOSTROPHES.sub("", sans_accents)) if token
+    ]
+
+
+class Correspondance(NamedTuple):
+    identifiant: str
+    score: float
+    couverture: float
+
+
+class IndexBM25:
+    """
+    Index BM25 en mémoire sur des documents déjà découpés en champs : le
+    classement tient compte de tous les champs, la couverture (part pondérée
+    par l'IDF des mots de la requête présents dans le document) ne tient
+    compte que du champ principal.
+    """
+
+    def __init__(
+        self,
+        documents: Mapping[str, tuple[list[str], list[str]]],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self._champs_principaux = {
+            identifiant: frozenset(principal)
+            for identifiant, (principal, _) in documents.items()
+        }
+        self._frequences = {
+            identifiant: Counter(principal + secondaire)
+            for identifiant, (principal, secondaire) in documents.items()
+        }
+        self._longueurs = {
+            identifiant: sum(frequences.values())
+            for identifiant, frequences in self._frequences.items()
+        }
+        self._longueur_moyenne = (
+            sum(self._longueurs.values()) / len(self._longueurs)
+            if self._longueurs
+            else 0.0
+        )
+        frequences_documentaires: Counter[str] = Counter()
+        for frequences in self._frequences.values():
+            frequences_documentaires.update(frequences.keys())
+        nombre_documents = len(self._frequences)
+        self._idf = {
+            token: math.log(1 + (nombre_documents - n + 0.5) / (n + 0.5))
+            for token, n in frequences_documentaires.items()
+        }
+        self._idf_inconnu = math.log(1 + (nombre_documents + 0.5) / 0.5)
+
+    def idf(self, token: str) -> float:
+        return self._idf.get(token, self._idf_inconnu)
+
+    def score(self, requete: list[str], identifiant: str) -> float:
+        frequences = self._frequences[identifiant]
+        normalisation = self.k1 * (
+            1 - self.b + self.b * self._longueurs[identifiant] / self._longueur_moyenne
+        )
+        return sum(
+            self.idf(token)
+            * frequences[token]
+            * (self.k1 + 1)
+            / (frequences[token] + normalisation)
+            for token in requete
+            if token in frequences
+        )
+
+    def couverture(self, requete: list[str], identifiant: str) -> float:
+        tokens = set(requete)
+        poids_total = sum(self.idf(token) for token in tokens)
+        if poids_total == 0:
+            return 0.0
+        principal = self._champs_principaux[identifiant]
+        poids_couvert = sum(self.idf(token) for token in tokens if token in principal)
+        return poids_couvert / poids_total
+
+    def meilleures_correspondances(
+        self, requete: list[str], nombre: int = 2
+    ) -> list[Correspondance]:
+        scores = sorted(
+            (
+                (self.score(requete, identifiant), identifiant)
+                for identifiant in self._frequences
+            ),
+            reverse=True,
+        )
+        return [
+            Correspondance(
+                identifiant=identifiant,
+                score=score,
+                couverture=self.couverture(requete, identifiant),
+            )
+            for score, identifiant in scores[:nombre]
+            if score > 0
+        ]
+
+    def meilleure_correspondance(
+        self, requete: list[str], marge: float
+    ) -> Optional[Correspondance]:
+        """
+        Retourne le document le mieux classé, à condition que son score
+        dépasse celui du suivant d'au moins `marge` (en proportion).
+        """
+        correspondances = self.meilleures_correspondances(requete)
+        if not correspondances:
+            return None
+        meilleure, *suivantes = correspondances
+        if suivantes and meilleure.score < suivantes[0].score * (1 + marge):
+            return None
+        return meilleure
@@ -1,13 +1,29 @@
 import json
 from pathlib import Path
-from typing import Optional
+from typing import NamedTuple, Optional
 
 import requests
 
+from infra.index_lexical import IndexBM25, tokenise
+
+MARGE_REPONSE_MAITRISEE_LOCALE = 0.2
+
+
+class ReponseMaitriseeTrouvee(NamedTuple):
+    id_reponse: str
+    reponse: str
+    confiance: float
+
 
 class MappingReponsesMaitrisees:
     def __init__(self, mapping: dict[str, str]):
         self._mapping = mapping
+        self._index = IndexBM25(
+            {
+                id_reponse: (tokenise(id_reponse), tokenise(reponse))
+                for id_reponse, reponse in mapping.items()
+            }
+        )
 
     @classmethod
     def depuis_chemin(cls, chemin: Path) -> "MappingReponsesMaitrisees":
@@ -24,3 +40,21 @@ class MappingReponsesMaitrisees:
 
     def resoudre(self, id_reponse: str) -> Optional[str]:
         return self._mapping.get(id_reponse)
+
+    def cherche(self, question: str) -> Optional[ReponseMaitriseeTrouvee]:
+        """
+        Recherche locale de la réponse maîtrisée correspondant à la question.
+        Les questions sont celles qu'encodent les identifiants du mapping ; la
+        confiance est la part des mots de la question (pondérés par leur rareté)
+        qu'on y retrouve.
+        """
+        correspondance = self._index.meilleure_correspondance(
+            tokenise(question), marge=MARGE_REPONSE_MAITRISEE_LOCALE
+        )
+        if correspondance is None:
+            return None
+        return ReponseMaitriseeTrouvee(
+            id_reponse=correspondance.identifiant,
+            reponse=self._mapping[correspondance.identifiant],
+            confiance=correspondance.couverture,
+        )
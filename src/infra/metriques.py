@@ -0,0 +1,286 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Sequence
+
+TYPE_CONTENU_EXPOSITION = "text/plain; version=0.0.4; charset=utf-8"
+
+BORNES_PAR_DEFAUT = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+Etiquettes = tuple[tuple[str, str], ...]
+Echantillon = tuple[str, Etiquettes, float]
+
+
+def _formate_valeur(valeur: float) -> str:
+    if math.isinf(valeur):
+        return "+Inf" if valeur > 0 else "-Inf"
+    if valeur == int(valeur):
+        return str(int(valeur))
+    return repr(valeur)
+
+
+def _echappe(valeur: str) -> str:
+    return valeur.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formate_etiquettes(etiquettes: Etiquettes) -> str:
+    if not etiquettes:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{nom}="{_echappe(valeur)}"' for nom, valeur in etiquettes)
+        + "}"
+    )
+
+
+class Metrique(ABC):
+    """
+    Métrique exposée au format texte de Prometheus. Chaque combinaison de
+    valeurs des `noms_etiquettes` forme une série distincte.
+    """
+
+    type_metrique: str
+
+    def __init__(self, nom: str, aide: str, noms_etiquettes: Sequence[str] = ()):
+        self.nom = nom
+        self.aide = aide
+        self.noms_etiquettes = tuple(noms_etiquettes)
+        self._lock = threading.Lock()
+
+    def _etiquettes(self, etiquettes: dict[str, str]) -> tuple[str, ...]:
+        if set(etiquettes) != set(self.noms_etiquettes):
+            raise ValueError(
+                f"La métrique {self.nom} attend les étiquettes {self.noms_etiquettes}"
+            )
+        return tuple(str(etiquettes[nom]) for nom in self.noms_etiquettes)
+
+    def _nomme(self, valeurs: tuple[str, ...]) -> Etiquettes:
+        return tuple(zip(self.noms_etiquettes, valeurs))
+
+    def expose(self) -> str:
+        lignes = [
+            f"# HELP {self.nom} {_echappe(self.aide)}",
+            f"# TYPE {self.nom} {self.type_metrique}",
+        ]
+        lignes.extend(
+            f"{self.nom}{suffixe}{_formate_etiquettes(etiquettes)} {_formate_valeur(valeur)}"
+            for suffixe, etiquettes, valeur in self.echantillons()
+        )
+        return "\n".join(lignes)
+
+    @abstractmethod
+    def echantillons(self) -> Iterable[Echantillon]:
+        pass
+
+
+class Compteur(Metrique):
+    type_metrique = "counter"
+
+    def __init__(self, nom: str, aide: str, noms_etiquettes: Sequence[str] = ()):
+        super().__init__(nom, aide, noms_etiquettes)
+        self._valeurs: dict[tuple[str, ...], float] = {} if noms_etiquettes else {(): 0}
+
+    def incremente(self, valeur: float = 1, /, **etiquettes: str) -> None:
+        cle = self._etiquettes(etiquettes)
+        with self._lock:
+            self._valeurs[cle] = self._valeurs.get(cle, 0) + valeur
+
+    def valeur(self, **etiquettes: str) -> float:
+        return self._valeurs.get(self._etiquettes(etiquettes), 0)
+
+    def echantillons(self) -> Iterable[Echantillon]:
+        with self._lock:
+            valeurs = list(self._valeurs.items())
+        return [("", self._nomme(cle), valeur) for cle, valeur in valeurs]
+
+
+class Jauge(Compteur):
+    type_metrique = "gauge"
+
+    def decremente(self, valeur: float = 1, /, **etiquettes: str) -> None:
+        self.incremente(-valeur, **etiquettes)
+
+    @contextmanager
+    def suit(self, **etiquettes: str) -> Iterator[None]:
+        """Compte les exécutions en cours du bloc."""
+        self.incremente(**etiquettes)
+        try:
+            yield
+        finally:
+            self.decremente(**etiquettes)
+
+
+class SerieHistogramme:
+    def __init__(self, nombre_bornes: int) -> None:
+        self.comptes = [0] * nombre_bornes
+        self.nombre = 0
+        self.somme = 0.0
+
+
+class Histogramme(Metrique):
+    type_metrique = "histogram"
+
+    def __init__(
+        self,
+        nom: str,
+        aide: str,
+        noms_etiquettes: Sequence[str] = (),
+        bornes: Sequence[float] = BORNES_PAR_DEFAUT,
+    ):
+        super().__init__(nom, aide, noms_etiquettes)
+        self.bornes = tuple(sorted(bornes))
+        self._series: dict[tuple[str, ...], SerieHistogramme] = {}
+
+    def observe(self, valeur: float, /, **etiquettes: str) -> None:
+        cle = self._etiquettes(etiquettes)
+        with self._lock:
+            serie = self._series.setdefault(cle, SerieHistogramme(len(self.bornes)))
+            for i, borne in enumerate(self.bornes):
+                if valeur <= borne:
+                    serie.comptes[i] += 1
+            serie.nombre += 1
+            serie.somme += valeur
+
+    @contextmanager
+    def chronometre(self, **etiquettes: str) -> Iterator[None]:
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - debut, **etiquettes)
+
+    def nombre_observations(self, **etiquettes: str) -> int:
+        serie = self._series.get(self._etiquettes(etiquettes))
+        return serie.nombre if serie else 0
+
+    def echantillons(self) -> Iterable[Echantillon]:
+        echantillons: list[Echantillon] = []
+        with self._lock:
+            for cle, serie in self._series.items():
+                etiquettes = self._nomme(cle)
+                for borne, compte in zip(self.bornes, serie.comptes):
+                    echantillons.append(
+                        (
+                            "_bucket",
+                            (*etiquettes, ("le", _formate_valeur(borne))),
+                            compte,
+                        )
+                    )
+                echantillons.append(
+                    ("_bucket", (*etiquettes, ("le", "+Inf")), serie.nombre)
+                )
+                echantillons.append(("_sum", etiquettes, serie.somme))
+                echantillons.append(("_count", etiquettes, serie.nombre))
+        return echantillons
+
+
+class MetriqueCalculee(Metrique):
+    """
+    Métrique dont les valeurs sont lues au moment de l'exposition, par exemple
+    à partir des statistiques déjà tenues par un composant.
+    """
+
+    def __init__(
+        self,
+        nom: str,
+        aide: str,
+        type_metrique: str,
+        noms_etiquettes: Sequence[str],
+        lecture: Callable[[], Iterable[tuple[tuple[str, ...], float]]],
+    ):
+        super().__init__(nom, aide, noms_etiquettes)
+        self.type_metrique = type_metrique
+        self.lecture = lecture
+
+    def echantillons(self) -> Iterable[Echantillon]:
+        return [("", self._nomme(cle), valeur) for cle, valeur in self.lecture()]
+
+
+class RegistreMetriques:
+    def __init__(self) -> None:
+        self._metriques: dict[str, Metrique] = {}
+        self._lock = threading.Lock()
+
+    def enregistre[M: Metrique](self, metrique: M) -> M:
+        with self._lock:
+            self._metriques[metrique.nom] = metrique
+        return metrique
+
+    def expose(self) -> str:
+        with self._lock:
+            metriques = list(self._metriques.values())
+        return "\n".join(metrique.expose() for metrique in metriques) + "\n"
+
+
+REGISTRE_METRIQUES = RegistreMetriques()
+
+DUREE_REQUETES_HTTP = REGISTRE_METRIQUES.enregistre(
+    Histogramme(
+        "mqc_requetes_http_duree_secondes",
+        "Durée de traitement des requêtes HTTP, jusqu'à la fin de la réponse",
+        ["methode", "route", "statut"],
+    )
+)
+REQUETES_HTTP_EN_COURS = REGISTRE_METRIQUES.enregistre(
+    Jauge("mqc_requetes_http_en_cours", "Requêtes HTTP en cours de traitement")
+)
+DUREE_APPELS_ALBERT = REGISTRE_METRIQUES.enregistre(
+    Histogramme(
+        "mqc_appels_albert_duree_secondes",
+        "Durée des appels à l'API Albert (jusqu'aux en-têtes pour les flux)",
+        ["route", "modele"],
+    )
+)
+ERREURS_APPELS_ALBERT = REGISTRE_METRIQUES.enregistre(
+    Compteur(
+        "mqc_appels_albert_erreurs_total",
+        "Appels à l'API Albert en erreur",
+        ["route", "modele"],
+    )
+)
+APPELS_ALBERT_EN_COURS = REGISTRE_METRIQUES.enregistre(
+    Jauge("mqc_appels_albert_en_cours", "Appels à l'API Albert en cours", ["route"])
+)
+DUREE_REQUETES_BASE_DE_DONNEES = REGISTRE_METRIQUES.enregistre(
+    Histogramme(
+        "mqc_requetes_base_de_donnees_duree_secondes",
+        "Durée des requêtes SQL",
+        ["base", "operation"],
+    )
+)
+JETONS_PROMPT = REGISTRE_METRIQUES.enregistre(
+    Histogramme(
+        "mqc_prompt_jetons",
+        "Nombre estimé de jetons du prompt de génération",
+        bornes=[500, 1000, 2000, 4000, 8000, 16000, 32000],
+    )
+)
+RECLASSEMENTS_EN_CASCADE = REGISTRE_METRIQUES.enregistre(
+    Compteur(
+        "mqc_reclassements_cascade_total",
+        "Reclassements en cascade, selon que le juge LLM a été sollicité ou évité",
+        ["juge_llm"],
+    )
+)
+EVENEMENTS_JOURNAL_EN_ATTENTE = REGISTRE_METRIQUES.enregistre(
+    Jauge(
+        "mqc_journal_evenements_en_attente",
+        "Évènements du journal en cours d'écriture",
+    )
+)
@@ -0,0 +1,34 @@
+import psycopg2.extras
+
+from infra.metriques import DUREE_REQUETES_BASE_DE_DONNEES
+from infra.traces import trace
+
+
+def operation_sql(requete: str | bytes) -> str:
+    if isinstance(requete, bytes):
+        requete = requete[:32].decode(errors="ignore")
+    mots = requete.split(maxsplit=1)
+    return mots[0].upper() if mots else ""
+
+
+class CurseurMesure(psycopg2.extras.RealDictCursor):
+    """
+    Curseur qui mesure la durée de chaque requête, par base et par type
+    d'opération (`SELECT`, `INSERT`…), et la trace.
+    """
+
+    def execute(self, query, vars=None):
+        base = self.connection.info.dbname
+        operation = operation_sql(query)
+        with (
+            trace(
+                f"postgres {operation}",
+                {
+                    "db.system": "postgresql",
+                    "db.name": base,
+                    "db.operation": operation,
+                },
+            ),
+            DUREE_REQUETES_BASE_DE_DONNEES.chronometre(base=base, operation=operation),
+        ):
+            return super().execute(query, vars)
@@ -0,0 +1,275 @@
+import json
+import logging
+import queue
+import re
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import httpx
+
+from configuration import Traces, TypeExportateurTraces
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+STATUT_OK = 1
+STATUT_ERREUR = 2
+
+
+class Span:
+    """
+    Étape d'une trace, au sens d'OpenTelemetry : identifiée dans sa trace,
+    rattachée à l'étape parente, avec des attributs et un statut d'erreur.
+    """
+
+    def __init__(
+        self,
+        nom: str,
+        id_trace: str,
+        id_parent: Optional[str],
+        attributs: Optional[dict[str, Any]] = None,
+    ) -> None:
+        self.nom = nom
+        self.id_trace = id_trace
+        self.id_span = secrets.token_hex(8)
+        self.id_parent = id_parent
+        self.attributs = dict(attributs or {})
+        self.debut = time.time_ns()
+        self.fin: Optional[int] = None
+        self.erreur: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.id_trace}-{self.id_span}-01"
+
+    def en_otlp(self) -> dict[str, Any]:
+        span: dict[str, Any] = {
+            "traceId": self.id_trace,
+            "spanId": self.id_span,
+            "name": self.nom,
+            "kind": 1,
+            "startTimeUnixNano": str(self.debut),
+            "endTimeUnixNano": str(self.fin or self.debut),
+            "attributes": [
+                {"key": cle, "value": _valeur_otlp(valeur)}
+                for cle, valeur in self.attributs.items()
+            ],
+            "status": (
+                {"code": STATUT_ERREUR, "message": self.erreur}
+                if self.erreur is not None
+                else {"code": STATUT_OK}
+            ),
+        }
+        if self.id_parent is not None:
+            span["parentSpanId"] = self.id_parent
+        return span
+
+
+def _valeur_otlp(valeur: Any) -> dict[str, Any]:
+    if isinstance(valeur, bool):
+        return {"boolValue": valeur}
+    if isinstance(valeur, int):
+        return {"intValue": str(valeur)}
+    if isinstance(valeur, float):
+        return {"doubleValue": valeur}
+    return {"stringValue": str(valeur)}
+
+
+def en_requete_otlp(spans: list[Span], nom_service: str) -> dict[str, Any]:
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": nom_service}}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": nom_service},
+                        "spans": [span.en_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class ExportateurTraces(ABC):
+    @abstractmethod
+    def exporte(self, span: Span) -> None:
+        pass
+
+    def ferme(self) -> None:
+        pass
+
+
+class ExportateurTracesMemoire(ExportateurTraces):
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def exporte(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+class ExportateurTracesParLots(ExportateurTraces):
+    """
+    Les spans terminés sont exportés par lots depuis un fil dédié, afin de ne
+    jamais bloquer la boucle d'évènements.
+    """
+
+    def __init__(
+        self,
+        nom_service: str,
+        taille_lot: int = 512,
+        intervalle: float = 5.0,
+    ) -> None:
+        self.nom_service = nom_service
+        self.taille_lot = taille_lot
+        self.intervalle = intervalle
+        self._spans: queue.Queue[Optional[Span]] = queue.Queue()
+        self._fil = threading.Thread(target=self._exporte_en_continu, daemon=True)
+        self._fil.start()
+
+    def exporte(self, span: Span) -> None:
+        self._spans.put(span)
+
+    def ferme(self) -> None:
+        self._spans.put(None)
+        self._fil.join()
+
+    def _exporte_en_continu(self) -> None:
+        termine = False
+        while not termine:
+            lot: list[Span] = []
+            echeance = time.monotonic() + self.intervalle
+            while len(lot) < self.taille_lot:
+                try:
+                    span = self._spans.get(
+                        timeout=max(echeance - time.monotonic(), 0.001)
+                    )
+                except queue.Empty:
+                    break
+                if span is None:
+                    termine = True
+                    break
+                lot.append(span)
+            if lot:
+                try:
+                    self._envoie(en_requete_otlp(lot, self.nom_service))
+                except Exception as erreur:
+                    logging.warning(f"Export de {len(lot)} spans impossible : {erreur}")
+
+    @abstractmethod
+    def _envoie(self, requete: dict[str, Any]) -> None:
+        pass
+
+
+class ExportateurTracesFichier(ExportateurTracesParLots):
+    """
+    Une requête OTLP/JSON par ligne, comme l'exportateur `file` du collecteur
+    OpenTelemetry : le fichier peut être rejoué vers un collecteur.
+    """
+
+    def __init__(self, chemin: Path, nom_service: str, **options: Any) -> None:
+        self.chemin = chemin
+        super().__init__(nom_service, **options)
+
+    def _envoie(self, requete: dict[str, Any]) -> None:
+        with self.chemin.open("a", encoding="utf-8") as fichier:
+            fichier.write(json.dumps(requete) + "\n")
+
+
+class ExportateurTracesOtlp(ExportateurTracesParLots):
+    """Envoie les spans à un collecteur OTLP/HTTP, encodés en JSON."""
+
+    def __init__(
+        self,
+        url: str,
+        nom_service: str,
+        client: Optional[httpx.Client] = None,
+        **options: Any,
+    ) -> None:
+        self.url = f"{url.rstrip('/')}/v1/traces"
+        self.client = client or httpx.Client(timeout=10)
+        super().__init__(nom_service, **options)
+
+    def _envoie(self, requete: dict[str, Any]) -> None:
+        self.client.post(self.url, json=requete).raise_for_status()
+
+
+_exportateur: Optional[ExportateurTraces] = None
+_span_courant: ContextVar[Optional[Span]] = ContextVar("span_courant", default=None)
+
+
+def configure_l_exportateur_de_traces(
+    exportateur: Optional[ExportateurTraces],
+) -> None:
+    global _exportateur
+    _exportateur = exportateur
+
+
+def span_courant() -> Optional[Span]:
+    return _span_courant.get()
+
+
+@contextmanager
+def trace(
+    nom: str,
+    attributs: Optional[dict[str, Any]] = None,
+    traceparent: Optional[str] = None,
+) -> Iterator[Optional[Span]]:
+    """
+    Ouvre un span, enfant du span courant, ou du `traceparent` (W3C) reçu pour
+    continuer une trace existante. Sans exportateur configuré, ne fait rien.
+    """
+    exportateur = _exportateur
+    if exportateur is None:
+        yield None
+        return
+
+    parent = _span_courant.get()
+    correspondance = TRACEPARENT.match(traceparent or "")
+    if correspondance:
+        id_trace, id_parent = correspondance.groups()
+    elif parent is not None:
+        id_trace, id_parent = parent.id_trace, parent.id_span
+    else:
+        id_trace, id_parent = secrets.token_hex(16), None
+    span = Span(nom, id_trace, id_parent, attributs)
+    jeton = _span_courant.set(span)
+    try:
+        yield span
+    except BaseException as erreur:
+        if not isinstance(erreur, GeneratorExit):
+            span.erreur = f"{type(erreur).__name__}: {erreur}"
+        raise
+    finally:
+        span.fin = time.time_ns()
+        try:
+            _span_courant.reset(jeton)
+        except ValueError:
+            # Un générateur asynchrone fermé depuis un autre contexte que celui
+            # où il a démarré : le span courant de ce contexte est déjà le bon.
+            pass
+        exportateur.exporte(span)
+
+
+def fabrique_exportateur_traces(
+    configuration: Traces,
+) -> Optional[ExportateurTraces]:
+    match configuration.type_exportateur:
+        case TypeExportateurTraces.FICHIER:
+            return ExportateurTracesFichier(
+                Path(configuration.fichier), configuration.nom_service
+            )
+        case TypeExportateurTraces.OTLP:
+            return ExportateurTracesOtlp(
+                configuration.url_otlp, configuration.nom_service
+            )
+    return None
@@ -5,6 +5,7 @@ import uvicorn
 from adaptateurs.chiffrement import fabrique_adaptateur_chiffrement
 from configuration import recupere_configuration
 from infra.logger import log
+from infra.traces import fabrique_exportateur_traces
 from serveur import fabrique_serveur
 
 try:
@@ -18,6 +19,8 @@ serveur = fabrique_serveur(
     configuration.max_requetes_par_minute,
     configuration.mode,
     mode_maintenance=configuration.mode_maintenance,
+    expose_metriques=configuration.expose_metriques,
+    exportateur_traces=fabrique_exportateur_traces(configuration.traces),
 )
 
 log(
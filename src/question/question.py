@@ -1,6 +1,7 @@
+import asyncio
 import uuid
 from enum import StrEnum
-from typing import NamedTuple, Union, Type
+from typing import AsyncIterator, NamedTuple, Union, Type
 from uuid import UUID
 
 from adaptateurs import AdaptateurBaseDeDonnees
@@ -13,7 +14,8 @@ from adaptateurs.journal import (
     DonneesConversationCreee,
     ParagrapheRetourne,
 )
-from schemas.albert import ReponseQuestion
+from infra.traces import trace
+from schemas.albert import FragmentReponse, ReponseQuestion
 from schemas.retour_utilisatrice import (
     Interaction,
     RetourUtilisatrice,
@@ -24,6 +26,13 @@ from schemas.type_utilisateur import TypeUtilisateur
 from services.exceptions import (
     ErreurAlbert,
 )
+from services.durees import (
+    EtapeMesuree,
+    demarre_la_mesure_des_durees,
+    durees_courantes,
+    journalise_les_durees,
+    mesure,
+)
 from services.service_albert import ServiceAlbert
 
 
@@ -78,103 +87,201 @@ class DemandeInteractionUtilisateur(NamedTuple):
     conversation: uuid.UUID
 
 
-def cree_conversation(
+async def cree_conversation(
     configuration: ConfigurationQuestion,
     question_utilisateur: DemandeConversationUtilisateur,
     type_utilisateur: TypeUtilisateur,
 ) -> Union[ResultatConversation, ResultatConversationEnErreur]:
+    demarre_la_mesure_des_durees()
     try:
-        reponse_question = configuration.service_albert.pose_question(
-            question=question_utilisateur.question
-        )
-        interaction, reponse_question = __cree_interaction(
-            question_utilisateur.question, reponse_question
-        )
-        conversation = Conversation(interaction)
-        configuration.adaptateur_base_de_donnees.sauvegarde_conversation(conversation)
-        id_interaction_hachee = configuration.adaptateur_chiffrement.hache(
-            str(interaction.id)
-        )
-        __consigne_l_evenement(
-            TypeEvenement.CONVERSATION_CREEE,
-            DonneesConversationCreee,
-            configuration.adaptateur_journal,
-            configuration.adaptateur_chiffrement.hache(
-                str(conversation.id_conversation)
-            ),
-            id_interaction_hachee,
-            reponse_question,
-            type_utilisateur,
-            configuration.est_alpha_test,
-        )
-
-        if reponse_question.violation is not None:
-            __consigne_la_violation(
-                configuration.adaptateur_journal,
-                id_interaction_hachee,
-                reponse_question,
+        with trace("pose_question"):
+            reponse_question = await configuration.service_albert.pose_question(
+                question=question_utilisateur.question
             )
-        return ResultatConversation(
-            conversation.id_conversation,
+        return await asyncio.to_thread(
+            __enregistre_la_conversation_creee,
+            configuration,
+            question_utilisateur.question,
             reponse_question,
-            interaction,
-            str(interaction.id),
+            type_utilisateur,
         )
     except Exception as e:
         return ResultatConversationEnErreur(e)
 
 
-def ajoute_interaction(
+async def cree_conversation_en_flux(
+    configuration: ConfigurationQuestion,
+    question_utilisateur: DemandeConversationUtilisateur,
+    type_utilisateur: TypeUtilisateur,
+) -> AsyncIterator[
+    Union[FragmentReponse, ResultatConversation, ResultatConversationEnErreur]
+]:
+    demarre_la_mesure_des_durees()
+    try:
+        with trace("pose_question_en_flux"):
+            async for evenement in configuration.service_albert.pose_question_en_flux(
+                question=question_utilisateur.question
+            ):
+                if isinstance(evenement, ReponseQuestion):
+                    yield await asyncio.to_thread(
+                        __enregistre_la_conversation_creee,
+                        configuration,
+                        question_utilisateur.question,
+                        evenement,
+                        type_utilisateur,
+                    )
+                else:
+                    yield evenement
+    except Exception as e:
+        yield ResultatConversationEnErreur(e)
+
+
+async def ajoute_interaction(
     configuration: ConfigurationQuestion,
     question_utilisateur: DemandeInteractionUtilisateur,
     type_utilisateur: TypeUtilisateur,
 ) -> Union[
     ResultatConversation, ResultatConversationEnErreur, ResultatConversationInconnue
 ]:
+    demarre_la_mesure_des_durees()
     try:
-        conversation = configuration.adaptateur_base_de_donnees.recupere_conversation(
-            question_utilisateur.conversation
+        conversation = await asyncio.to_thread(
+            configuration.adaptateur_base_de_donnees.recupere_conversation,
+            question_utilisateur.conversation,
         )
         if conversation is None:
             return ResultatConversationInconnue()
-        reponse_question = configuration.service_albert.pose_question(
-            question=question_utilisateur.question, conversation=conversation
+        with trace("pose_question"):
+            reponse_question = await configuration.service_albert.pose_question(
+                question=question_utilisateur.question, conversation=conversation
+            )
+        return await asyncio.to_thread(
+            __enregistre_l_interaction_ajoutee,
+            configuration,
+            conversation,
+            question_utilisateur.question,
+            reponse_question,
+            type_utilisateur,
         )
-        interaction, reponse_question = __cree_interaction(
-            question_utilisateur.question, reponse_question
+    except Exception as e:
+        return ResultatConversationEnErreur(e)
+
+
+async def ajoute_interaction_en_flux(
+    configuration: ConfigurationQuestion,
+    question_utilisateur: DemandeInteractionUtilisateur,
+    type_utilisateur: TypeUtilisateur,
+) -> AsyncIterator[
+    Union[
+        FragmentReponse,
+        ResultatConversation,
+        ResultatConversationEnErreur,
+        ResultatConversationInconnue,
+    ]
+]:
+    demarre_la_mesure_des_durees()
+    try:
+        conversation = await asyncio.to_thread(
+            configuration.adaptateur_base_de_donnees.recupere_conversation,
+            question_utilisateur.conversation,
         )
-        conversation.ajoute_interaction(interaction)
+        if conversation is None:
+            yield ResultatConversationInconnue()
+            return
+        with trace("pose_question_en_flux"):
+            async for evenement in configuration.service_albert.pose_question_en_flux(
+                question=question_utilisateur.question, conversation=conversation
+            ):
+                if isinstance(evenement, ReponseQuestion):
+                    yield await asyncio.to_thread(
+                        __enregistre_l_interaction_ajoutee,
+                        configuration,
+                        conversation,
+                        question_utilisateur.question,
+                        evenement,
+                        type_utilisateur,
+                    )
+                else:
+                    yield evenement
+    except Exception as e:
+        yield ResultatConversationEnErreur(e)
+
+
+def __enregistre_la_conversation_creee(
+    configuration: ConfigurationQuestion,
+    question: str,
+    reponse_question: ReponseQuestion,
+    type_utilisateur: TypeUtilisateur,
+) -> ResultatConversation:
+    interaction, reponse_question = __cree_interaction(question, reponse_question)
+    conversation = Conversation(interaction)
+    with mesure(EtapeMesuree.SAUVEGARDE):
         configuration.adaptateur_base_de_donnees.sauvegarde_conversation(conversation)
-        id_interaction_hachee = configuration.adaptateur_chiffrement.hache(
-            str(interaction.id)
-        )
-        __consigne_l_evenement(
-            TypeEvenement.INTERACTION_AJOUTEE,
-            DonneesInteractionAjoutee,
+    id_interaction_hachee = configuration.adaptateur_chiffrement.hache(
+        str(interaction.id)
+    )
+    __consigne_l_evenement(
+        TypeEvenement.CONVERSATION_CREEE,
+        DonneesConversationCreee,
+        configuration.adaptateur_journal,
+        configuration.adaptateur_chiffrement.hache(str(conversation.id_conversation)),
+        id_interaction_hachee,
+        reponse_question,
+        type_utilisateur,
+        configuration.est_alpha_test,
+    )
+
+    if reponse_question.violation is not None:
+        __consigne_la_violation(
             configuration.adaptateur_journal,
-            configuration.adaptateur_chiffrement.hache(
-                str(conversation.id_conversation)
-            ),
             id_interaction_hachee,
             reponse_question,
-            type_utilisateur,
-            configuration.est_alpha_test,
         )
+    return ResultatConversation(
+        conversation.id_conversation,
+        reponse_question,
+        interaction,
+        str(interaction.id),
+    )
 
-        if reponse_question.violation is not None:
-            __consigne_la_violation(
-                configuration.adaptateur_journal,
-                id_interaction_hachee,
-                reponse_question,
-            )
-        return ResultatConversation(
-            conversation.id_conversation,
+
+def __enregistre_l_interaction_ajoutee(
+    configuration: ConfigurationQuestion,
+    conversation: Conversation,
+    question: str,
+    reponse_question: ReponseQuestion,
+    type_utilisateur: TypeUtilisateur,
+) -> ResultatConversation:
+    interaction, reponse_question = __cree_interaction(question, reponse_question)
+    conversation.ajoute_interaction(interaction)
+    with mesure(EtapeMesuree.SAUVEGARDE):
+        configuration.adaptateur_base_de_donnees.sauvegarde_conversation(conversation)
+    id_interaction_hachee = configuration.adaptateur_chiffrement.hache(
+        str(interaction.id)
+    )
+    __consigne_l_evenement(
+        TypeEvenement.INTERACTION_AJOUTEE,
+        DonneesInteractionAjoutee,
+        configuration.adaptateur_journal,
+        configuration.adaptateur_chiffrement.hache(str(conversation.id_conversation)),
+        id_interaction_hachee,
+        reponse_question,
+        type_utilisateur,
+        configuration.est_alpha_test,
+    )
+
+    if reponse_question.violation is not None:
+        __consigne_la_violation(
+            configuration.adaptateur_journal,
+            id_interaction_hachee,
             reponse_question,
-            interaction,
-            str(interaction.id),
         )
-    except Exception as e:
-        return ResultatConversationEnErreur(e)
+    return ResultatConversation(
+        conversation.id_conversation,
+        reponse_question,
+        interaction,
+        str(interaction.id),
+    )
 
 
 def __consigne_la_violation(
@@ -199,6 +306,9 @@ def __consigne_l_evenement(
     type_utilisateur: TypeUtilisateur,
     est_alpha_test: bool = False,
 ) -> None:
+    durees = durees_courantes()
+    if durees is not None:
+        journalise_les_durees(durees)
     adaptateur_journal.consigne_evenement(
         type=type_evenement,
         donnees=class_donnees(
@@ -221,6 +331,10 @@ def __consigne_l_evenement(
             )
             if est_alpha_test
             else None,
+            durees=durees.en_nanosecondes if durees is not None else None,
+            nombre_jetons_prompt=(
+                durees.nombre_jetons_prompt if durees is not None else None
+            ),
         ),
     )
 
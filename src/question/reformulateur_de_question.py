@@ -1,22 +1,33 @@
+import hashlib
+import json
 from typing import Optional
 
 from openai.types.chat import ChatCompletionMessageParam
+
+from adaptateurs.cache import AdaptateurCache
 from schemas.retour_utilisatrice import Conversation
 from services.client_albert import ClientAlbert
 
 
+def _empreinte(texte: str) -> str:
+    return hashlib.sha256(texte.encode()).hexdigest()
+
+
 class ReformulateurDeQuestion:
     def __init__(
         self,
         client_albert: ClientAlbert,
         prompt_de_reformulation: str,
         modele_reformulation: str,
+        cache: Optional[AdaptateurCache] = None,
     ):
         self.client_albert = client_albert
         self.prompt_de_reformulation = prompt_de_reformulation
         self.modele_reformulation = modele_reformulation
+        self.cache = cache
+        self.version_prompt = _empreinte(prompt_de_reformulation)
 
-    def reformule(
+    async def reformule(
         self, question: str, conversation: Optional[Conversation] = None
     ) -> str | None:
         messages: list[ChatCompletionMessageParam] = [
@@ -37,7 +48,27 @@ class ReformulateurDeQuestion:
                     ]
                 )
         messages.append({"role": "user", "content": question})
-        reponse = self.client_albert.recupere_propositions(
+
+        cle = self.__cle(messages[1:-1], question)
+        if self.cache is not None:
+            en_cache = await self.cache.recupere(cle)
+            if en_cache is not None:
+                return en_cache["reformulation"]
+
+        reponse = await self.client_albert.recupere_propositions(
             messages, modele=self.modele_reformulation, temperature=0
         )
-        return reponse[0].message.content
+        reformulation = reponse[0].message.content
+        if self.cache is not None:
+            await self.cache.enregistre(cle, {"reformulation": reformulation})
+        return reformulation
+
+    def __cle(self, historique: list[ChatCompletionMessageParam], question: str) -> str:
+        return json.dumps(
+            [
+                self.modele_reformulation,
+                self.version_prompt,
+                _empreinte(json.dumps(historique, ensure_ascii=False)),
+                _empreinte(question),
+            ]
+        )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import NamedTuple, Optional
+from typing import Literal, NamedTuple, Optional
 from schemas.violations import Violation
 
 
@@ -38,6 +38,10 @@ class ReponseQuestion(BaseModel):
     violation: Optional[Violation]
 
 
+class FragmentReponse(NamedTuple):
+    contenu: str
+
+
 class RecherchePayload(NamedTuple):
     collection_ids: list[int]
     limit: int
@@ -78,6 +82,16 @@ class ResultatRecherche(NamedTuple):
     chunk: RechercheChunk
     score: float
 
+    @staticmethod
+    def vide() -> "ResultatRecherche":
+        return ResultatRecherche(
+            chunk=RechercheChunk(
+                content="",
+                metadata=RechercheMetadonnees(source_url="", page=0, nom_document=""),
+            ),
+            score=0.0,
+        )
+
 
 class ResultatRechercheJeopardy(NamedTuple):
     chunk: RechercheChunkJeopardy
@@ -101,3 +115,20 @@ class ReclasseReponse(BaseModel):
 
     class Config:
         extra = "allow"
+
+
+class EvaluationPassage(BaseModel):
+    id: int
+    categorie: Literal[
+        "hors_sujet",
+        "dans_la_thematique_sans_apport",
+        "element_de_reponse",
+        "preuve_principale",
+    ]
+    extrait_probant: str = ""
+    justification_courte: str = ""
+
+
+class ReponseReclassementLLM(BaseModel):
+    evaluations: list[EvaluationPassage]
+    ids_retenus: list[int]
@@ -1,4 +1,6 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Optional
 
 from fastapi import FastAPI, Depends, Request
 from fastapi.responses import HTMLResponse
@@ -9,6 +11,7 @@ from slowapi.middleware import SlowAPIMiddleware
 from slowapi.util import get_remote_address
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
+from adaptateurs.adaptateur_executeur_de_requetes import AdaptateurExecuteurDeRequetes
 from adaptateurs.chiffrement import (
     AdaptateurChiffrement,
     fabrique_adaptateur_chiffrement,
@@ -16,8 +19,13 @@ from adaptateurs.chiffrement import (
 from adaptateurs.sentry import fabrique_adaptateur_sentry
 from api.api import api, api_developpement
 from api.route_document_source import document_source
+from api.route_metriques import metriques
 from configuration import Mode
+from infra.fast_api.middleware_metriques import MiddlewareMetriques
+from infra.fast_api.middleware_traces import MiddlewareTraces
+from infra.traces import ExportateurTraces, configure_l_exportateur_de_traces
 from infra.ui_kit.version_ui_kit import version_ui_kit
+from services.fabrique_service_albert import fabrique_client_albert_de_l_application
 
 HEADERS_SECURITE = {
     "cross-origin-embedder-policy": "credentialless",
@@ -39,9 +47,24 @@ def fabrique_serveur(
     la_version_ui_kit=version_ui_kit,
     adaptateur_sentry=fabrique_adaptateur_sentry,
     mode_maintenance: bool = False,
+    expose_metriques: bool = False,
+    exportateur_traces: Optional[ExportateurTraces] = None,
 ) -> FastAPI:
     adaptateur_sentry()
-    serveur = FastAPI()
+    configure_l_exportateur_de_traces(exportateur_traces)
+
+    @asynccontextmanager
+    async def cycle_de_vie(application: FastAPI):
+        application.state.client_albert = fabrique_client_albert_de_l_application()
+        application.state.executeur_de_requetes = AdaptateurExecuteurDeRequetes()
+        yield
+        await application.state.client_albert.ferme()
+        await application.state.executeur_de_requetes.ferme()
+        if exportateur_traces is not None:
+            configure_l_exportateur_de_traces(None)
+            exportateur_traces.ferme()
+
+    serveur = FastAPI(lifespan=cycle_de_vie)
 
     limiteur = Limiter(
         key_func=get_remote_address,
@@ -56,6 +79,10 @@ def fabrique_serveur(
     # Les problèmes de types apparaissants ici sont résolus côté `Starlette`, mais ne semblent pas encore avoir atteint `FastAPI` ;
     # _c.f._ https://github.com/Kludex/starlette/discussions/2451#discussioncomment-14855204 .
     serveur.add_middleware(ProxyHeadersMiddleware, trusted_hosts=["*"])  # type: ignore [arg-type]
+    if expose_metriques:
+        serveur.add_middleware(MiddlewareMetriques)
+    if exportateur_traces is not None:
+        serveur.add_middleware(MiddlewareTraces)
 
     ressources_statiques = ["assets", "fonts", "icons", "images"]
     if mode_maintenance:
@@ -81,6 +108,9 @@ def fabrique_serveur(
     if mode == Mode.DEVELOPPEMENT:
         serveur.include_router(api_developpement)
 
+    if expose_metriques:
+        serveur.include_router(metriques)
+
     for static in ressources_statiques:
         serveur.mount(
             f"/{static}", StaticFiles(directory=f"{static_root_directory}{static}")
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from enum import StrEnum
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from configuration import logging
+from services.exceptions import ErreurDelaiDepasse
+
+T = TypeVar("T")
+
+
+class Etape(StrEnum):
+    REFORMULATION = "reformulation"
+    RECHERCHE = "recherche"
+    RECLASSEMENT = "reclassement"
+    GENERATION = "generation"
+
+
+PARTS_DU_BUDGET: dict[Etape, float] = {
+    Etape.REFORMULATION: 0.15,
+    Etape.RECHERCHE: 0.2,
+    Etape.RECLASSEMENT: 0.15,
+    Etape.GENERATION: 0.5,
+}
+
+
+def abandonne(tache: Optional[asyncio.Future]) -> None:
+    if tache is None:
+        return
+    tache.cancel()
+    tache.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+class BudgetDeTemps:
+    """
+    Délai global accordé à une question, réparti entre les étapes du pipeline.
+    Chaque étape reçoit une part du temps restant, proportionnelle à son poids
+    parmi les étapes qui restent à parcourir : le temps non consommé par une
+    étape profite donc aux suivantes.
+    Sans `delai_total`, les étapes ne sont pas limitées dans le temps ni
+    doublées.
+    """
+
+    def __init__(
+        self,
+        delai_total: Optional[float],
+        part_avant_doublon: float,
+        horloge: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.horloge = horloge
+        self.echeance = None if delai_total is None else horloge() + delai_total
+        self.part_avant_doublon = part_avant_doublon
+
+    def restant(self) -> Optional[float]:
+        if self.echeance is None:
+            return None
+        return max(0.0, self.echeance - self.horloge())
+
+    def delai_pour(self, etape: Etape) -> Optional[float]:
+        restant = self.restant()
+        if restant is None:
+            return None
+        etapes = list(Etape)
+        poids_restant = sum(PARTS_DU_BUDGET[e] for e in etapes[etapes.index(etape) :])
+        return restant * PARTS_DU_BUDGET[etape] / poids_restant
+
+    async def execute(
+        self,
+        etape: Etape,
+        appel: Callable[[], Awaitable[T]],
+        doublon: Optional[Callable[[], Awaitable[T]]] = None,
+    ) -> T:
+        """
+        Exécute `appel` dans le délai accordé à l'étape. Si `doublon` est fourni
+        et que l'appel n'a pas abouti après `part_avant_doublon` de ce délai, une
+        requête en doublon est lancée : la première réponse obtenue est retenue.
+        """
+        delai = self.delai_pour(etape)
+        if delai is None:
+            return await appel()
+        debut = self.horloge()
+        echeance_etape = debut + delai
+        instant_doublon = debut + delai * self.part_avant_doublon
+        doublon_a_lancer = doublon is not None and 0 < self.part_avant_doublon < 1
+        en_cours: set[asyncio.Future[T]] = {asyncio.ensure_future(appel())}
+        derniere_erreur: Optional[BaseException] = None
+        try:
+            while en_cours:
+                maintenant = self.horloge()
+                if maintenant >= echeance_etape:
+                    break
+                prochaine_echeance = (
+                    instant_doublon if doublon_a_lancer else echeance_etape
+                )
+                terminees, en_cours = await asyncio.wait(
+                    en_cours,
+                    timeout=max(0.0, prochaine_echeance - maintenant),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for tache in terminees:
+                    if tache.exception() is None:
+                        return tache.result()
+                    derniere_erreur = tache.exception()
+                if (
+                    doublon is not None
+                    and doublon_a_lancer
+                    and en_cours
+                    and self.horloge() >= instant_doublon
+                ):
+                    logging.info(f"Requête doublée pour l'étape {etape}")
+                    en_cours.add(asyncio.ensure_future(doublon()))
+                    doublon_a_lancer = False
+        finally:
+            for tache in en_cours:
+                abandonne(tache)
+
+        if derniere_erreur is not None and not en_cours:
+            raise derniere_erreur
+        logging.warning(f"Délai de {delai:.2f}s dépassé pour l'étape {etape}")
+        raise ErreurDelaiDepasse(etape)
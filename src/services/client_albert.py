@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
+from typing import AsyncGenerator
 
 from openai.types.chat import ChatCompletionMessageParam
 from openai.types.chat.chat_completion import Choice
+from openai.types.shared_params import ResponseFormatJSONSchema
 
 from schemas.albert import (
     RecherchePayload,
@@ -14,30 +16,40 @@ from schemas.albert import (
 
 class ClientAlbert(ABC):
     @abstractmethod
-    def recherche(self, payload: RecherchePayload) -> list[ResultatRecherche]:
+    async def recherche(self, payload: RecherchePayload) -> list[ResultatRecherche]:
         pass
 
     @abstractmethod
-    def recherche_jeopardy(
+    async def recherche_jeopardy(
         self, payload: RecherchePayload
     ) -> list[ResultatRechercheJeopardy]:
         pass
 
     @abstractmethod
-    def recherche_chunk_par_id(
+    async def recherche_chunk_par_id(
         self, id_document: str, id_chunk: int
     ) -> ResultatRecherche:
         pass
 
     @abstractmethod
-    def recupere_propositions(
+    async def recupere_propositions(
         self,
         messages: list[ChatCompletionMessageParam],
         modele: str | None = None,
         temperature: float | None = None,
+        format_reponse: ResponseFormatJSONSchema | None = None,
     ) -> list[Choice]:
         pass
 
     @abstractmethod
-    def reclasse(self, payload: ReclassePayload) -> ReclasseReponse:
+    def recupere_propositions_en_flux(
+        self,
+        messages: list[ChatCompletionMessageParam],
+        modele: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncGenerator[str, None]:
+        pass
+
+    @abstractmethod
+    async def reclasse(self, payload: ReclassePayload) -> ReclasseReponse:
         pass
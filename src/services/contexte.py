@@ -0,0 +1,171 @@
+import math
+from typing import NamedTuple
+
+from openai.types.chat import ChatCompletionMessageParam
+
+from configuration import DispositionMessages
+
+CARACTERES_PAR_JETON = 3.5
+JETONS_PAR_MESSAGE = 4
+JETONS_MINIMUM_TRONCATURE = 100
+SEPARATEUR_PARAGRAPHES = "\n\n\n"
+MARQUE_TRONCATURE = " […]"
+RENVOI_AUX_DOCUMENTS = (
+    "(les documents sont joints au dernier message de l'utilisateur, avant sa question)"
+)
+DOCUMENTS_JOINTS = "<<<DOCUMENTS_DEBUT>>>\n{chunks}\n<<<DOCUMENTS_FIN>>>"
+
+
+def estime_les_jetons(texte: str) -> int:
+    """
+    Estimation prudente, sans tokeniseur : un jeton pour 3,5 caractères, ce qui
+    majore le plus souvent le décompte réel sur du texte en français.
+    """
+    return math.ceil(len(texte) / CARACTERES_PAR_JETON)
+
+
+def tronque(texte: str, nombre_jetons: int) -> str:
+    longueur = int(nombre_jetons * CARACTERES_PAR_JETON) - len(MARQUE_TRONCATURE)
+    if len(texte) <= longueur:
+        return texte
+    coupe = texte[:longueur]
+    if " " in coupe:
+        coupe = coupe.rsplit(" ", 1)[0]
+    return coupe + MARQUE_TRONCATURE
+
+
+class Echange(NamedTuple):
+    question: str
+    reponse: str
+
+    @property
+    def nombre_jetons(self) -> int:
+        return (
+            estime_les_jetons(self.question)
+            + estime_les_jetons(self.reponse)
+            + 2 * JETONS_PAR_MESSAGE
+        )
+
+
+class ContexteAssemble(NamedTuple):
+    paragraphes: list[str]
+    echanges: list[Echange]
+    nombre_jetons: int
+    nombre_paragraphes_ecartes: int
+    nombre_echanges_ecartes: int
+    dernier_paragraphe_tronque: bool
+
+
+class AssembleurDeContexte:
+    """
+    Compose le contexte du prompt de génération dans un budget de jetons
+    estimé, par ordre de priorité :
+    - le prompt système et la question, toujours présents ;
+    - l'échange le plus récent, auquel une relance fait le plus souvent suite ;
+    - les paragraphes, du mieux classé au moins bien classé ; le premier qui ne
+      tient plus est tronqué s'il en reste au moins `jetons_minimum_troncature`,
+      les suivants sont écartés ;
+    - les échanges plus anciens, du plus récent au plus ancien.
+    """
+
+    def __init__(
+        self,
+        budget_jetons: int,
+        jetons_minimum_troncature: int = JETONS_MINIMUM_TRONCATURE,
+    ) -> None:
+        self.budget_jetons = budget_jetons
+        self.jetons_minimum_troncature = jetons_minimum_troncature
+
+    def assemble(
+        self,
+        prompt_systeme: str,
+        question: str,
+        paragraphes: list[str],
+        echanges: list[Echange],
+    ) -> ContexteAssemble:
+        """`echanges` est ordonné du plus récent au plus ancien."""
+        utilises = (
+            estime_les_jetons(prompt_systeme)
+            + estime_les_jetons(question)
+            + 2 * JETONS_PAR_MESSAGE
+        )
+        echanges_retenus: list[Echange] = []
+        if echanges and utilises + echanges[0].nombre_jetons <= self.budget_jetons:
+            echanges_retenus.append(echanges[0])
+            utilises += echanges[0].nombre_jetons
+
+        paragraphes_retenus: list[str] = []
+        dernier_tronque = False
+        cout_separateur = estime_les_jetons(SEPARATEUR_PARAGRAPHES)
+        for paragraphe in paragraphes:
+            restant = self.budget_jetons - utilises - cout_separateur
+            cout = estime_les_jetons(paragraphe)
+            if cout <= restant:
+                paragraphes_retenus.append(paragraphe)
+                utilises += cout + cout_separateur
+                continue
+            if restant >= self.jetons_minimum_troncature:
+                paragraphe_tronque = tronque(paragraphe, restant)
+                paragraphes_retenus.append(paragraphe_tronque)
+                utilises += estime_les_jetons(paragraphe_tronque) + cout_separateur
+                dernier_tronque = True
+            break
+
+        if len(echanges_retenus) == 1:
+            for echange in echanges[1:]:
+                if utilises + echange.nombre_jetons > self.budget_jetons:
+                    break
+                echanges_retenus.append(echange)
+                utilises += echange.nombre_jetons
+
+        return ContexteAssemble(
+            paragraphes=paragraphes_retenus,
+            echanges=echanges_retenus,
+            nombre_jetons=utilises,
+            nombre_paragraphes_ecartes=len(paragraphes) - len(paragraphes_retenus),
+            nombre_echanges_ecartes=len(echanges) - len(echanges_retenus),
+            dernier_paragraphe_tronque=dernier_tronque,
+        )
+
+
+def compose_les_messages(
+    disposition: DispositionMessages,
+    prompt_systeme: str,
+    contexte: ContexteAssemble,
+    question: str,
+) -> list[ChatCompletionMessageParam]:
+    """
+    Avec `PREFIXE_STABLE`, le message système ne dépend plus des documents :
+    il forme avec l'historique un préfixe identique d'une requête à l'autre
+    (et d'un tour au suivant d'une conversation), dont le serveur d'inférence
+    peut réutiliser le cache. Les documents sont alors joints à la question,
+    sous l'en-tête de la base de connaissance que garde le message système.
+    """
+    chunks = SEPARATEUR_PARAGRAPHES.join(contexte.paragraphes)
+    prefixe_stable = disposition is DispositionMessages.PREFIXE_STABLE
+    messages: list[ChatCompletionMessageParam] = [
+        {
+            "role": "system",
+            "content": prompt_systeme.format(
+                chunks=RENVOI_AUX_DOCUMENTS if prefixe_stable else chunks
+            ),
+        },
+    ]
+    for echange in reversed(contexte.echanges):
+        messages.extend(
+            [
+                {"role": "user", "content": echange.question},
+                {"role": "assistant", "content": echange.reponse},
+            ]
+        )
+    messages.append(
+        {
+            "role": "user",
+            "content": (
+                f"{DOCUMENTS_JOINTS.format(chunks=chunks)}\n\n{question}"
+                if prefixe_stable
+                else question
+            ),
+        }
+    )
+    return messages
@@ -0,0 +1,115 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import StrEnum
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar
+
+from infra.traces import trace
+
+journal_des_durees = logging.getLogger("durees_etapes")
+
+T = TypeVar("T")
+
+
+class EtapeMesuree(StrEnum):
+    REFORMULATION = "reformulation"
+    RECHERCHE = "recherche"
+    RECHERCHE_JEOPARDY = "recherche_jeopardy"
+    CHUNKS_JEOPARDY = "chunks_jeopardy"
+    RECLASSEMENT = "reclassement"
+    GUIDES_MSC = "guides_msc"
+    GENERATION = "generation"
+    SAUVEGARDE = "sauvegarde"
+
+
+class DureesDesEtapes:
+    """
+    Durées, en nanosecondes, des étapes du traitement d'une requête. Une étape
+    exécutée plusieurs fois (requêtes doublées, recherche spéculative) couvre
+    l'intervalle allant de son premier début à sa dernière fin.
+    """
+
+    def __init__(self) -> None:
+        self._intervalles: dict[EtapeMesuree, tuple[int, int]] = {}
+        self.nombre_jetons_prompt: Optional[int] = None
+
+    def enregistre(self, etape: EtapeMesuree, debut: int, fin: int) -> None:
+        if etape in self._intervalles:
+            debut_connu, fin_connue = self._intervalles[etape]
+            debut, fin = min(debut, debut_connu), max(fin, fin_connue)
+        self._intervalles[etape] = (debut, fin)
+
+    def reprend(self, autres: "DureesDesEtapes") -> None:
+        for etape, (debut, fin) in autres._intervalles.items():
+            self.enregistre(etape, debut, fin)
+        if autres.nombre_jetons_prompt is not None:
+            self.nombre_jetons_prompt = autres.nombre_jetons_prompt
+
+    @property
+    def en_nanosecondes(self) -> dict[str, int]:
+        return {
+            str(etape): fin - debut
+            for etape, (debut, fin) in sorted(
+                self._intervalles.items(), key=lambda e: e[1][0]
+            )
+        }
+
+
+_durees_courantes: ContextVar[Optional[DureesDesEtapes]] = ContextVar(
+    "durees_courantes", default=None
+)
+
+
+def demarre_la_mesure_des_durees() -> DureesDesEtapes:
+    durees = DureesDesEtapes()
+    _durees_courantes.set(durees)
+    return durees
+
+
+def durees_courantes() -> Optional[DureesDesEtapes]:
+    return _durees_courantes.get()
+
+
+async def mesure_a_part(
+    durees: DureesDesEtapes, calcule: Callable[[], Awaitable[T]]
+) -> T:
+    """
+    À exécuter dans sa propre tâche : les étapes du calcul sont mesurées dans
+    `durees` plutôt que dans celles de la requête qui a créé la tâche.
+    """
+    _durees_courantes.set(durees)
+    return await calcule()
+
+
+def reprends_les_durees(durees: DureesDesEtapes) -> None:
+    courantes = _durees_courantes.get()
+    if courantes is not None:
+        courantes.reprend(durees)
+
+
+def enregistre_la_taille_du_prompt(nombre_jetons: int) -> None:
+    durees = _durees_courantes.get()
+    if durees is not None:
+        durees.nombre_jetons_prompt = nombre_jetons
+
+
+@contextmanager
+def mesure(etape: EtapeMesuree) -> Iterator[None]:
+    """
+    Mesure l'étape pour la requête en cours ; sans mesure démarrée dans le
+    contexte courant, ne fait rien. L'étape est aussi tracée.
+    """
+    debut = time.monotonic_ns()
+    try:
+        with trace(str(etape)):
+            yield
+    finally:
+        durees = _durees_courantes.get()
+        if durees is not None:
+            durees.enregistre(etape, debut, time.monotonic_ns())
+
+
+def journalise_les_durees(durees: DureesDesEtapes) -> None:
+    journal_des_durees.info(json.dumps(durees.en_nanosecondes))
@@ -12,3 +12,11 @@ class ErreurCommunicationModele(ErreurAlbert):
 
 class ErreurCommunicationAlbert(ErreurAlbert):
     pass
+
+
+class ErreurDelaiDepasse(ErreurAlbert):
+    def __init__(self, etape: str):
+        super().__init__(
+            f"Le délai imparti à la question a été dépassé lors de l'étape : {etape}"
+        )
+        self.etape = etape
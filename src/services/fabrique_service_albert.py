@@ -1,15 +1,52 @@
 import threading
 from pathlib import Path
+from typing import Optional
 
 import requests
+from fastapi import Request
 
 from adaptateurs.adaptateur_executeur_de_requetes import AdaptateurExecuteurDeRequetes
-from configuration import TypeReclasseur, recupere_configuration
-from infra.albert.client_albert import fabrique_client_albert
+from adaptateurs.cache import (
+    AdaptateurCache,
+    StatistiquesCache,
+    fabrique_adaptateur_cache,
+)
+from adaptateurs.entrepot_chunks import (
+    AdaptateurEntrepotChunks,
+    fabrique_adaptateur_entrepot_chunks,
+)
+from configuration import (
+    Albert,
+    BaseDeDonnees,
+    Cache,
+    EntrepotChunks,
+    TypeReclasseur,
+    recupere_configuration,
+)
+from infra.albert.client_albert import ClientAlbertApi, fabrique_client_albert
 from infra.mapping_reponses_maitrisees import MappingReponsesMaitrisees
 from question.reformulateur_de_question import ReformulateurDeQuestion
-from services.reclasseur import ReclasseurBGE, ReclasseurLLM
-from services.service_albert import ServiceAlbert, Prompts
+from services.client_albert import ClientAlbert
+from services.reclasseur import (
+    Reclasseur,
+    ReclasseurBGE,
+    ReclasseurEnCascade,
+    ReclasseurLLM,
+)
+from services.service_albert import (
+    CompteurRechercheSpeculative,
+    MutualisationDesQuestions,
+    ServiceAlbert,
+    Prompts,
+)
+
+COMPTEUR_RECHERCHE_SPECULATIVE = CompteurRechercheSpeculative()
+MUTUALISATION_DES_QUESTIONS = MutualisationDesQuestions()
+
+ESPACE_CACHE_RECHERCHE = "recherche"
+ESPACE_CACHE_RECLASSEMENT = "reclassement"
+ESPACE_CACHE_REFORMULATION = "reformulation"
+ESPACE_CACHE_REPONSES = "reponses"
 
 URL_MAPPING_PAR_DEFAUT = "https://raw.githubusercontent.com/betagouv/anssi-recommandations-cyber-data/refs/heads/main/donnees/collection_reponses_maitrisees/faq_reponses_maitrisees.mapping.json"
 
@@ -34,15 +71,91 @@ class DepotMappingReponses:
             DepotMappingReponses._mapping = None
 
 
-def fabrique_service_albert() -> ServiceAlbert:
+class DepotCaches:
+    _caches: dict[str, AdaptateurCache | None] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def recupere(
+        espace: str, configuration: Cache, base_de_donnees: BaseDeDonnees
+    ) -> AdaptateurCache | None:
+        if espace not in DepotCaches._caches:
+            with DepotCaches._lock:
+                if espace not in DepotCaches._caches:
+                    DepotCaches._caches[espace] = fabrique_adaptateur_cache(
+                        configuration, espace, base_de_donnees
+                    )
+        return DepotCaches._caches[espace]
+
+    @staticmethod
+    def statistiques() -> dict[str, StatistiquesCache]:
+        return {
+            espace: cache.statistiques
+            for espace, cache in DepotCaches._caches.items()
+            if cache is not None
+        }
+
+    @staticmethod
+    def _reinitialiser() -> None:
+        with DepotCaches._lock:
+            DepotCaches._caches = {}
+
+
+class DepotEntrepotChunks:
+    _entrepot: AdaptateurEntrepotChunks | None = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def recupere(
+        configuration: EntrepotChunks, id_collection: int
+    ) -> AdaptateurEntrepotChunks:
+        if DepotEntrepotChunks._entrepot is None:
+            with DepotEntrepotChunks._lock:
+                if DepotEntrepotChunks._entrepot is None:
+                    DepotEntrepotChunks._entrepot = fabrique_adaptateur_entrepot_chunks(
+                        configuration, id_collection
+                    )
+        return DepotEntrepotChunks._entrepot
+
+    @staticmethod
+    def _reinitialiser() -> None:
+        with DepotEntrepotChunks._lock:
+            DepotEntrepotChunks._entrepot = None
+
+
+def fabrique_client_albert_de_l_application() -> ClientAlbertApi:
+    configuration = recupere_configuration()
+    return fabrique_client_albert(
+        configuration.albert.client,
+        cache_recherche=DepotCaches.recupere(
+            ESPACE_CACHE_RECHERCHE,
+            configuration.cache_recherche,
+            configuration.base_de_donnees,
+        ),
+    )
+
+
+def fabrique_service_albert(request: Request) -> ServiceAlbert:
+    return fabrique_service_albert_pour(
+        request.app.state.client_albert, request.app.state.executeur_de_requetes
+    )
+
+
+def fabrique_service_albert_pour(
+    client_albert_api: ClientAlbertApi,
+    executeur_de_requetes: AdaptateurExecuteurDeRequetes,
+) -> ServiceAlbert:
+    """
+    Le client Albert et l'exécuteur de requêtes sont créés au démarrage de
+    l'application et partagés par toutes les requêtes.
+    """
     configuration = recupere_configuration()
 
-    client_albert_api = fabrique_client_albert(configuration.albert.client)
     prompt_systeme = lis_fichier_prompt("prompt_assistant_cyber.txt")
     nom_fichier_prompt_reclassement = (
-        "prompt_reclassement_llm.txt"
-        if configuration.albert.service.type_reclasseur is TypeReclasseur.LLM
-        else "prompt_reclassement.txt"
+        "prompt_reclassement.txt"
+        if configuration.albert.service.type_reclasseur is TypeReclasseur.BGE
+        else "prompt_reclassement_llm.txt"
     )
     prompt_reclassement = lis_fichier_prompt(nom_fichier_prompt_reclassement)
     prompt_reformulation = lis_fichier_prompt("prompt_reformulation.txt")
@@ -51,17 +164,24 @@ def fabrique_service_albert() -> ServiceAlbert:
         client_albert=client_albert_api,
         prompt_de_reformulation=prompt_reformulation,
         modele_reformulation=configuration.albert.client.modele_reformulation,
+        cache=DepotCaches.recupere(
+            ESPACE_CACHE_REFORMULATION,
+            configuration.cache_reformulation,
+            configuration.base_de_donnees,
+        ),
     )
 
-    reclasseur = (
-        ReclasseurLLM(client_albert_api, prompt_reclassement)
-        if configuration.albert.service.type_reclasseur is TypeReclasseur.LLM
-        else ReclasseurBGE(
-            client_albert_api,
-            configuration.albert.service.modele_reclassement,
-            prompt_reclassement,
-            configuration.albert.service.nombre_paragraphes,
-        )
+    cache_reclassement = DepotCaches.recupere(
+        ESPACE_CACHE_RECLASSEMENT,
+        configuration.cache_reclassement,
+        configuration.base_de_donnees,
+    )
+    reclasseur = fabrique_reclasseur(
+        client_albert_api,
+        configuration.albert.service,
+        configuration.albert.client.modele_reponse,
+        prompt_reclassement,
+        cache_reclassement,
     )
 
     return ServiceAlbert(
@@ -78,7 +198,64 @@ def fabrique_service_albert() -> ServiceAlbert:
             requests.Session(),
         ),
         reclasseur=reclasseur,
-        executeur_de_requetes=AdaptateurExecuteurDeRequetes(),
+        executeur_de_requetes=executeur_de_requetes,
+        entrepot_chunks=DepotEntrepotChunks.recupere(
+            configuration.entrepot_chunks,
+            configuration.albert.service.id_collection_anssi_lab,
+        ),
+        compteur_recherche_speculative=COMPTEUR_RECHERCHE_SPECULATIVE,
+        cache_reponses=DepotCaches.recupere(
+            ESPACE_CACHE_REPONSES,
+            configuration.cache_reponses,
+            configuration.base_de_donnees,
+        ),
+        version_cache_reponses=configuration.cache_reponses.version,
+        modele_reponse=configuration.albert.client.modele_reponse,
+        mutualisation=MUTUALISATION_DES_QUESTIONS,
+    )
+
+
+def fabrique_reclasseur(
+    client: ClientAlbert,
+    configuration: Albert.Service,  # type: ignore [name-defined]
+    modele_llm: str,
+    prompt_reclassement: str,
+    cache: Optional[AdaptateurCache],
+) -> Reclasseur:
+    """
+    Le reclasseur BGE sert de repli au reclasseur LLM, et de premier étage au
+    reclasseur en cascade, dont le juge LLM se replie sur l'ordre BGE.
+    """
+    reclasseur_bge = ReclasseurBGE(
+        client,
+        configuration.modele_reclassement,
+        (
+            prompt_reclassement
+            if configuration.type_reclasseur is TypeReclasseur.BGE
+            else lis_fichier_prompt("prompt_reclassement.txt")
+        ),
+        configuration.nombre_paragraphes,
+        cache,
+    )
+    if configuration.type_reclasseur is TypeReclasseur.BGE:
+        return reclasseur_bge
+    en_cascade = configuration.type_reclasseur is TypeReclasseur.CASCADE
+    reclasseur_llm = ReclasseurLLM(
+        client,
+        modele_llm,
+        prompt_reclassement,
+        cache,
+        jetons_maximum_par_passage=configuration.jetons_maximum_par_passage_reclasseur_llm,
+        sortie_structuree=configuration.sortie_structuree_reclasseur_llm,
+        repli=None if en_cascade else reclasseur_bge,
+    )
+    if not en_cascade:
+        return reclasseur_llm
+    return ReclasseurEnCascade(
+        reclasseur_bge,
+        reclasseur_llm,
+        configuration.taille_selection_reclasseur_cascade,
+        configuration.marge_reclasseur_cascade,
     )
 
 
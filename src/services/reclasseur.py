@@ -1,10 +1,18 @@
-import json
+import hashlib
 from abc import ABC, abstractmethod
 from openai.types.chat import ChatCompletionMessageParam
-from typing import NamedTuple, cast
+from openai.types.chat.chat_completion import Choice
+from openai.types.shared_params import ResponseFormatJSONSchema
+from pydantic import ValidationError
+from typing import Awaitable, Callable, NamedTuple, Optional
 
-from schemas.albert import Paragraphe, ReclassePayload
+from adaptateurs.cache import AdaptateurCache
+from configuration import logging
+from infra.metriques import RECLASSEMENTS_EN_CASCADE
+from schemas.albert import Paragraphe, ReclassePayload, ReponseReclassementLLM
 from services.client_albert import ClientAlbert
+from services.contexte import tronque
+from services.exceptions import ErreurCommunicationModele
 
 
 class ResultatReclassement(NamedTuple):
@@ -13,9 +21,48 @@ class ResultatReclassement(NamedTuple):
     aucune_source_utile: bool = False
 
 
+class ScoreCandidat(NamedTuple):
+    indice: int
+    score: float
+
+
+def cle_de_reclassement(modele: str, requete: str, contenus: list[str]) -> str:
+    empreinte = hashlib.sha256()
+    for element in [
+        modele,
+        requete,
+        *(hashlib.sha256(c.encode()).hexdigest() for c in contenus),
+    ]:
+        empreinte.update(element.encode())
+        empreinte.update(b"\x1f")
+    return empreinte.hexdigest()
+
+
+async def _scores_avec_cache(
+    cache: Optional[AdaptateurCache],
+    cle: str,
+    calcule: Callable[[], Awaitable[Optional[list[ScoreCandidat]]]],
+) -> Optional[list[ScoreCandidat]]:
+    """
+    Les scores sont conservés sous la forme compacte de couples (indice du
+    candidat, score), du plus au moins pertinent. `calcule` retourne `None`
+    lorsque son résultat ne doit pas être mémorisé.
+    """
+    if cache is not None:
+        en_cache = await cache.recupere(cle)
+        if en_cache is not None:
+            return [ScoreCandidat(*score) for score in en_cache]
+    scores = await calcule()
+    if cache is not None and scores is not None:
+        await cache.enregistre(cle, [list(score) for score in scores])
+    return scores
+
+
 class Reclasseur(ABC):
+    sollicite_un_llm: bool = False
+
     @abstractmethod
-    def reclasse(
+    async def reclasse(
         self, question: str, paragraphes: list[Paragraphe]
     ) -> ResultatReclassement:
         pass
@@ -28,13 +75,15 @@ class ReclasseurBGE(Reclasseur):
         modele: str,
         prompt: str,
         nombre_paragraphes: int,
+        cache: Optional[AdaptateurCache] = None,
     ) -> None:
         self.client = client
         self.modele = modele
         self.prompt = prompt
         self.nombre_paragraphes = nombre_paragraphes
+        self.cache = cache
 
-    def reclasse(
+    async def reclasse(
         self, question: str, paragraphes: list[Paragraphe]
     ) -> ResultatReclassement:
         payload = ReclassePayload(
@@ -42,72 +91,98 @@ class ReclasseurBGE(Reclasseur):
             documents=[p.contenu for p in paragraphes],
             model=self.modele,
         )
-        reclassement = self.__reclasse_payload(payload)
-        contenus_tries = reclassement["paragraphes_tries"]
-        scores_tries = reclassement["scores_tries"]
+        scores = await _scores_avec_cache(
+            self.cache,
+            cle_de_reclassement(payload.model, payload.query, payload.documents),
+            lambda: self.__reclasse_payload(payload),
+        )
 
-        if not contenus_tries:
+        if not scores:
             return ResultatReclassement(
                 paragraphes_retenus=paragraphes[: self.nombre_paragraphes],
                 tous_les_candidats=paragraphes,
             )
 
         paragraphes_tries = [
-            next(p for p in paragraphes if p.contenu == contenu).model_copy(
-                update={"score_reclassement": score}
-            )
-            for contenu, score in zip(contenus_tries, scores_tries)
+            paragraphes[indice].model_copy(update={"score_reclassement": score})
+            for indice, score in scores
         ]
         return ResultatReclassement(
             paragraphes_retenus=paragraphes_tries[: self.nombre_paragraphes],
             tous_les_candidats=paragraphes_tries,
         )
 
-    def __reclasse_payload(self, payload: ReclassePayload) -> dict[str, list]:
-        resultat = self.client.reclasse(payload)
+    async def __reclasse_payload(
+        self, payload: ReclassePayload
+    ) -> Optional[list[ScoreCandidat]]:
+        resultat = await self.client.reclasse(payload)
         donnees = sorted(resultat.data, key=lambda data: data.score, reverse=True)
-        return {
-            "paragraphes_tries": [payload.documents[data.index] for data in donnees],
-            "scores_tries": [data.score for data in donnees],
-        }
+        if not donnees:
+            return None
+        return [ScoreCandidat(indice=data.index, score=data.score) for data in donnees]
 
 
 class ReclasseurLLM(Reclasseur):
+    """
+    Sans réponse exploitable du modèle (erreur de communication, JSON invalide
+    ou non conforme), le reclassement est délégué au `repli`, ou à défaut
+    conserve l'ordre initial des candidats : il ne fait jamais échouer la
+    question.
+    """
+
+    sollicite_un_llm = True
     _CATEGORIE_RETENUE = "preuve_principale"
     _SCORE_PREUVE_PRINCIPALE = 1.0
+    _FORMAT_REPONSE: ResponseFormatJSONSchema = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "reclassement",
+            "schema": ReponseReclassementLLM.model_json_schema(),
+        },
+    }
 
-    def __init__(self, client: ClientAlbert, prompt: str) -> None:
+    def __init__(
+        self,
+        client: ClientAlbert,
+        modele: str,
+        prompt: str,
+        cache: Optional[AdaptateurCache] = None,
+        jetons_maximum_par_passage: Optional[int] = None,
+        sortie_structuree: bool = False,
+        repli: Optional[Reclasseur] = None,
+    ) -> None:
         self.client = client
+        self.modele = modele
         self.prompt = prompt
+        self.cache = cache
+        self.jetons_maximum_par_passage = jetons_maximum_par_passage
+        self.sortie_structuree = sortie_structuree
+        self.repli = repli
 
-    def reclasse(
+    async def reclasse(
         self, question: str, paragraphes: list[Paragraphe]
     ) -> ResultatReclassement:
-        messages: list[ChatCompletionMessageParam] = [
-            {
-                "role": "system",
-                "content": self.prompt.format(
-                    QUESTION=question,
-                    CANDIDATS=self._formate_candidats(paragraphes),
-                ),
-            }
-        ]
-        propositions = self.client.recupere_propositions(messages, temperature=0)
-        contenu = cast(str, propositions[0].message.content)
-        resultat = json.loads(contenu)
-        categories = {
-            evaluation["id"]: evaluation["categorie"]
-            for evaluation in resultat["evaluations"]
-        }
-        paragraphes_par_id = {
-            identifiant: p for identifiant, p in enumerate(paragraphes, 1)
-        }
+        contenu_systeme = self.prompt.format(
+            QUESTION=question,
+            CANDIDATS=self._formate_candidats(
+                paragraphes, self.jetons_maximum_par_passage
+            ),
+        )
+        scores = await _scores_avec_cache(
+            self.cache,
+            cle_de_reclassement(
+                self.modele, contenu_systeme, [p.contenu for p in paragraphes]
+            ),
+            lambda: self.__evalue_les_candidats(contenu_systeme, len(paragraphes)),
+        )
+        if scores is None:
+            return await self.__reclasse_par_repli(question, paragraphes)
+        paragraphes_par_indice = dict(enumerate(paragraphes))
         paragraphes_retenus = [
-            paragraphes_par_id[identifiant].model_copy(
-                update={"score_reclassement": self._SCORE_PREUVE_PRINCIPALE}
+            paragraphes_par_indice[indice].model_copy(
+                update={"score_reclassement": score}
             )
-            for identifiant in resultat["ids_retenus"]
-            if categories[identifiant] == self._CATEGORIE_RETENUE
+            for indice, score in scores
         ]
         return ResultatReclassement(
             paragraphes_retenus=paragraphes_retenus,
@@ -115,14 +190,124 @@ class ReclasseurLLM(Reclasseur):
             aucune_source_utile=not paragraphes_retenus,
         )
 
+    async def __reclasse_par_repli(
+        self, question: str, paragraphes: list[Paragraphe]
+    ) -> ResultatReclassement:
+        if self.repli is None:
+            return ResultatReclassement(
+                paragraphes_retenus=paragraphes, tous_les_candidats=paragraphes
+            )
+        return await self.repli.reclasse(question, paragraphes)
+
+    async def __evalue_les_candidats(
+        self, contenu_systeme: str, nombre_candidats: int
+    ) -> Optional[list[ScoreCandidat]]:
+        messages: list[ChatCompletionMessageParam] = [
+            {"role": "system", "content": contenu_systeme}
+        ]
+        try:
+            propositions = await self.client.recupere_propositions(
+                messages,
+                modele=self.modele,
+                temperature=0,
+                format_reponse=self._FORMAT_REPONSE if self.sortie_structuree else None,
+            )
+        except ErreurCommunicationModele as erreur:
+            logging.warning(f"Reclassement LLM impossible, repli : {erreur}")
+            return None
+        resultat = _lis_la_reponse_de_reclassement(propositions)
+        if resultat is None:
+            logging.warning("Réponse du reclassement LLM inexploitable, repli")
+            return None
+        categories = {
+            evaluation.id: evaluation.categorie for evaluation in resultat.evaluations
+        }
+        identifiants_retenus = dict.fromkeys(
+            identifiant
+            for identifiant in resultat.ids_retenus
+            if 1 <= identifiant <= nombre_candidats
+            and categories.get(identifiant) == self._CATEGORIE_RETENUE
+        )
+        return [
+            ScoreCandidat(indice=identifiant - 1, score=self._SCORE_PREUVE_PRINCIPALE)
+            for identifiant in identifiants_retenus
+        ]
+
     @staticmethod
-    def _formate_candidats(paragraphes: list[Paragraphe]) -> str:
+    def _formate_candidats(
+        paragraphes: list[Paragraphe], jetons_maximum_par_passage: Optional[int] = None
+    ) -> str:
         return "\n\n".join(
             (
-                f"[PASSAGE id={identifiant} rang_initial={p.rang_initial} "
-                f"document={p.nom_document!r} "
-                f"page={p.numero_page} score_initial={p.score_similarite}]\n"
-                f"{p.contenu}\n[/PASSAGE]"
+                f"[{identifiant}|{p.nom_document}|p{p.numero_page}]\n"
+                + (
+                    tronque(p.contenu, jetons_maximum_par_passage)
+                    if jetons_maximum_par_passage
+                    else p.contenu
+                )
             )
             for identifiant, p in enumerate(paragraphes, 1)
         )
+
+
+class ReclasseurEnCascade(Reclasseur):
+    """
+    Le reclasseur BGE ordonne tous les candidats, puis seuls les
+    `taille_selection` premiers sont soumis au juge LLM. Le juge n'est pas
+    sollicité lorsque le meilleur candidat devance le suivant d'au moins
+    `marge` : le classement BGE est alors conservé tel quel.
+    """
+
+    sollicite_un_llm = True
+
+    def __init__(
+        self,
+        premier: ReclasseurBGE,
+        juge: ReclasseurLLM,
+        taille_selection: int,
+        marge: float,
+    ) -> None:
+        self.premier = premier
+        self.juge = juge
+        self.taille_selection = taille_selection
+        self.marge = marge
+
+    async def reclasse(
+        self, question: str, paragraphes: list[Paragraphe]
+    ) -> ResultatReclassement:
+        resultat_bge = await self.premier.reclasse(question, paragraphes)
+        candidats = resultat_bge.tous_les_candidats
+        if self.__est_nettement_separe(candidats):
+            RECLASSEMENTS_EN_CASCADE.incremente(juge_llm="evite")
+            return resultat_bge
+        RECLASSEMENTS_EN_CASCADE.incremente(juge_llm="sollicite")
+        resultat_llm = await self.juge.reclasse(
+            question, candidats[: self.taille_selection]
+        )
+        return ResultatReclassement(
+            paragraphes_retenus=resultat_llm.paragraphes_retenus,
+            tous_les_candidats=candidats,
+            aucune_source_utile=resultat_llm.aucune_source_utile,
+        )
+
+    def __est_nettement_separe(self, candidats: list[Paragraphe]) -> bool:
+        return (
+            len(candidats) >= 2
+            and candidats[0].score_reclassement - candidats[1].score_reclassement
+            >= self.marge
+        )
+
+
+def _lis_la_reponse_de_reclassement(
+    propositions: list[Choice],
+) -> Optional[ReponseReclassementLLM]:
+    """Tolère un texte ou un bloc Markdown autour de l'objet JSON attendu."""
+    contenu = propositions[0].message.content if propositions else None
+    if not contenu:
+        return None
+    try:
+        return ReponseReclassementLLM.model_validate_json(
+            contenu[contenu.find("{") : contenu.rfind("}") + 1]
+        )
+    except ValidationError:
+        return None
@@ -1,21 +1,41 @@
-from openai.types.chat import (
-    ChatCompletionMessageParam,
-    ChatCompletionUserMessageParam,
-)
+import asyncio
+import hashlib
+import json
+from contextlib import aclosing
+from difflib import SequenceMatcher
+
+from openai.types.chat import ChatCompletionMessageParam
 from openai.types.chat.chat_completion import Choice
 from pydantic import BaseModel
-from typing import Optional, cast, NamedTuple, Union, Any
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Optional,
+    cast,
+    NamedTuple,
+    Union,
+    Any,
+)
 
 from adaptateurs.adaptateur_executeur_de_requetes import AdaptateurExecuteurDeRequetes
-from configuration import Albert
+from adaptateurs.cache import AdaptateurCache
+from adaptateurs.entrepot_chunks import AdaptateurEntrepotChunks
+from configuration import Albert, logging
+from infra.albert.client_albert import etiquette_collection, normalise_question
 from infra.mapping_reponses_maitrisees import MappingReponsesMaitrisees
+from infra.metriques import JETONS_PROMPT
+from infra.traces import span_courant
 from question.reformulateur_de_question import ReformulateurDeQuestion
 from schemas.albert import (
+    FragmentReponse,
     Paragraphe,
     RecherchePayload,
     ReponseQuestion,
     ParagrapheReponseMaitrisee,
     ParagrapheReponseQuestion,
+    ResultatRecherche,
+    ResultatRechercheJeopardy,
 )
 from schemas.retour_utilisatrice import Conversation
 from schemas.violations import (
@@ -27,7 +47,23 @@ from schemas.violations import (
     ViolationQuestionNonComprise,
     REPONSE_PAR_DEFAUT,
 )
+from services.budget import BudgetDeTemps, Etape, abandonne
 from services.client_albert import ClientAlbert
+from services.contexte import (
+    AssembleurDeContexte,
+    ContexteAssemble,
+    Echange,
+    compose_les_messages,
+)
+from services.durees import (
+    DureesDesEtapes,
+    EtapeMesuree,
+    enregistre_la_taille_du_prompt,
+    mesure,
+    mesure_a_part,
+    reprends_les_durees,
+)
+from services.exceptions import ErreurRechercheDocuments
 from services.reclasseur import (
     Reclasseur,
     ResultatReclassement,
@@ -59,11 +95,161 @@ def _filtre_reponses_maitrisees(
     return maitrisees if maitrisees else paragraphes
 
 
+MARQUEURS_DE_VIOLATION: dict[str, type[Violation]] = {
+    "ERREUR_IDENTITÉ": ViolationIdentite,
+    "ERREUR_THÉMATIQUE": ViolationThematique,
+    "ERREUR_MALVEILLANCE": ViolationMalveillance,
+    "ERREUR_MECONNAISSANCE": ViolationMeconnaissance,
+}
+LONGUEUR_MAXIMUM_MARQUEUR = max(len(m) for m in MARQUEURS_DE_VIOLATION)
+CARACTERES_AVANT_MARQUEUR = " \n\"'«"
+
+
+def _violation_annoncee(texte: str) -> Violation | None:
+    for marqueur, violation in MARQUEURS_DE_VIOLATION.items():
+        if marqueur in texte:
+            return violation()
+    return None
+
+
+def _peut_encore_annoncer_une_violation(texte: str) -> bool:
+    debut = texte.lstrip(CARACTERES_AVANT_MARQUEUR)
+    return any(marqueur.startswith(debut) for marqueur in MARQUEURS_DE_VIOLATION)
+
+
+def similarite_questions(question: str, autre_question: str) -> float:
+    def _normalise(texte: str) -> str:
+        return " ".join(texte.casefold().split())
+
+    return SequenceMatcher(
+        None, _normalise(question), _normalise(autre_question)
+    ).ratio()
+
+
+def _enregistre_la_taille_du_prompt(contexte: ContexteAssemble) -> None:
+    enregistre_la_taille_du_prompt(contexte.nombre_jetons)
+    JETONS_PROMPT.observe(contexte.nombre_jetons)
+    span = span_courant()
+    if span is not None:
+        span.attributs["prompt.jetons"] = contexte.nombre_jetons
+    if contexte.nombre_paragraphes_ecartes or contexte.nombre_echanges_ecartes:
+        logging.info(
+            f"Budget de jetons du prompt atteint : {contexte.nombre_paragraphes_ecartes} paragraphe(s) et {contexte.nombre_echanges_ecartes} échange(s) écartés"
+        )
+
+
+def _reponse_depuis_le_cache(donnees: dict, question: str) -> ReponseQuestion:
+    violation = donnees["violation"]
+    return ReponseQuestion.model_validate(
+        {**donnees, "question": question, "violation": None}
+    ).model_copy(
+        update={
+            "violation": (
+                Violation.model_validate(violation["reponse"]) if violation else None
+            )
+        }
+    )
+
+
+class StatistiquesRechercheSpeculative(NamedTuple):
+    nombre_speculations: int
+    nombre_reutilisations: int
+
+    @property
+    def taux_reutilisation(self) -> float:
+        if self.nombre_speculations == 0:
+            return 0.0
+        return self.nombre_reutilisations / self.nombre_speculations
+
+
+class CompteurRechercheSpeculative:
+    def __init__(self) -> None:
+        self.nombre_speculations = 0
+        self.nombre_reutilisations = 0
+
+    def enregistre(self, reutilisee: bool) -> None:
+        self.nombre_speculations += 1
+        if reutilisee:
+            self.nombre_reutilisations += 1
+
+    @property
+    def statistiques(self) -> StatistiquesRechercheSpeculative:
+        return StatistiquesRechercheSpeculative(
+            nombre_speculations=self.nombre_speculations,
+            nombre_reutilisations=self.nombre_reutilisations,
+        )
+
+
+class StatistiquesMutualisation(NamedTuple):
+    nombre_calculs: int
+    nombre_requetes_mutualisees: int
+
+    @property
+    def taux_mutualisation(self) -> float:
+        nombre_requetes = self.nombre_calculs + self.nombre_requetes_mutualisees
+        if nombre_requetes == 0:
+            return 0.0
+        return self.nombre_requetes_mutualisees / nombre_requetes
+
+
+class MutualisationDesQuestions:
+    """
+    Partage un même calcul entre les requêtes identiques reçues pendant qu'il
+    est en cours : seule la première déclenche le pipeline, les suivantes en
+    attendent le résultat. Le calcul est protégé de l'annulation d'une requête
+    pour ne pas priver les autres de la réponse. Ses durées d'étapes sont
+    mesurées à part, puis reprises par chacune des requêtes.
+    """
+
+    def __init__(self) -> None:
+        self._en_cours: dict[
+            str, tuple[asyncio.Future[ReponseQuestion], DureesDesEtapes]
+        ] = {}
+        self.nombre_calculs = 0
+        self.nombre_requetes_mutualisees = 0
+
+    async def execute(
+        self, cle: str, calcule: Callable[[], Awaitable[ReponseQuestion]]
+    ) -> ReponseQuestion:
+        en_cours = self._en_cours.get(cle)
+        if en_cours is not None:
+            self.nombre_requetes_mutualisees += 1
+            tache, durees = en_cours
+        else:
+            durees = DureesDesEtapes()
+            tache = asyncio.ensure_future(mesure_a_part(durees, calcule))
+            self._en_cours[cle] = (tache, durees)
+            self.nombre_calculs += 1
+
+            def _termine(t: asyncio.Future[ReponseQuestion]) -> None:
+                self._en_cours.pop(cle, None)
+                if not t.cancelled():
+                    t.exception()
+
+            tache.add_done_callback(_termine)
+        reponse = await asyncio.shield(tache)
+        reprends_les_durees(durees)
+        return reponse
+
+    @property
+    def statistiques(self) -> StatistiquesMutualisation:
+        return StatistiquesMutualisation(
+            nombre_calculs=self.nombre_calculs,
+            nombre_requetes_mutualisees=self.nombre_requetes_mutualisees,
+        )
+
+
 class Prompts(NamedTuple):
     prompt_systeme: str
     prompt_reclassement: str
 
 
+class GenerationPreparee(NamedTuple):
+    question_reformulee: str | None
+    paragraphes: list[Paragraphe]
+    messages: list[ChatCompletionMessageParam]
+
+
 class ServiceAlbert:
     def __init__(
         self,
@@ -75,6 +261,12 @@ class ServiceAlbert:
         mapping_reponses: MappingReponsesMaitrisees,
         reclasseur: Reclasseur,
         executeur_de_requetes: Optional[AdaptateurExecuteurDeRequetes],
+        entrepot_chunks: Optional[AdaptateurEntrepotChunks] = None,
+        compteur_recherche_speculative: Optional[CompteurRechercheSpeculative] = None,
+        cache_reponses: Optional[AdaptateurCache] = None,
+        version_cache_reponses: str = "",
+        modele_reponse: str = "",
+        mutualisation: Optional[MutualisationDesQuestions] = None,
     ) -> None:
         self.id_collection = configuration_service_albert.id_collection_anssi_lab
         self.id_collection_jeopardy = (
@@ -95,9 +287,51 @@ class ServiceAlbert:
         self.mapping_reponses = mapping_reponses
         self.reclasseur: Reclasseur = reclasseur
         self.executeur_de_requetes = executeur_de_requetes
+        self.entrepot_chunks = entrepot_chunks
         self.url_msc = configuration_service_albert.url_msc
+        self.concurrence_maximum_chunks_jeopardy = (
+            configuration_service_albert.concurrence_maximum_chunks_jeopardy
+        )
+        self.delai_maximum_chunks_jeopardy = (
+            configuration_service_albert.delai_maximum_chunks_jeopardy
+        )
+        self.delai_maximum_recherche_jeopardy = (
+            configuration_service_albert.delai_maximum_recherche_jeopardy
+        )
+        self.recherche_speculative_active = (
+            configuration_service_albert.recherche_speculative_active
+        )
+        self.seuil_similarite_recherche_speculative = (
+            configuration_service_albert.seuil_similarite_recherche_speculative
+        )
+        self.compteur_recherche_speculative = (
+            compteur_recherche_speculative or CompteurRechercheSpeculative()
+        )
+        self.delai_maximum_pose_question = (
+            configuration_service_albert.delai_maximum_pose_question
+        )
+        self.part_budget_avant_doublon = (
+            configuration_service_albert.part_budget_avant_doublon
+        )
+        self.cache_reponses = cache_reponses
+        self.cache_reponses_sert_les_violations = (
+            configuration_service_albert.cache_reponses_sert_les_violations
+        )
+        self.version_cache_reponses = version_cache_reponses
+        self.modele_reponse = modele_reponse
+        self.mutualisation = mutualisation or MutualisationDesQuestions()
+        self.reponse_maitrisee_locale_active = (
+            configuration_service_albert.reponse_maitrisee_locale_active
+        )
+        self.seuil_reponse_maitrisee_locale = (
+            configuration_service_albert.seuil_reponse_maitrisee_locale
+        )
+        self.assembleur_de_contexte = AssembleurDeContexte(
+            configuration_service_albert.budget_jetons_prompt
+        )
+        self.disposition_messages = configuration_service_albert.disposition_messages
 
-    def recherche_paragraphes(self, question: str) -> list[Paragraphe]:
+    async def recherche_paragraphes(self, question: str) -> list[Paragraphe]:
         methode_recherche = "hybrid" if self.utilise_recherche_hybride else "semantic"
         payload_classique = RecherchePayload(
             collection_ids=[self.id_collection],
@@ -130,28 +364,61 @@ class ServiceAlbert:
                 rang_initial=rang,
             )
 
-        donnees_classiques = self.client.recherche(payload_classique)
+        if not self.jeopardy_active:
+            with mesure(EtapeMesuree.RECHERCHE):
+                donnees_classiques = await self.client.recherche(payload_classique)
+            return [
+                _transforme_en_paragraphe(donnee, rang)
+                for rang, donnee in enumerate(donnees_classiques, 1)
+            ]
+
+        recherche_jeopardy = asyncio.ensure_future(
+            self.__recherche_dans_collection_jeopardy_dans_le_delai(question)
+        )
+        try:
+            with mesure(EtapeMesuree.RECHERCHE):
+                donnees_classiques = await self.client.recherche(payload_classique)
+        except BaseException:
+            recherche_jeopardy.cancel()
+            raise
         paragraphes_classiques = [
             _transforme_en_paragraphe(donnee, rang)
             for rang, donnee in enumerate(donnees_classiques, 1)
         ]
+        paragraphes_jeopardy = await recherche_jeopardy
+
+        paragraphes_fusionnes = paragraphes_classiques + paragraphes_jeopardy
+
+        paragraphes_uniques = []
+        contenus_vus = set()
+        for p in paragraphes_fusionnes:
+            if p.contenu not in contenus_vus:
+                paragraphes_uniques.append(p)
+                contenus_vus.add(p.contenu)
+
+        return paragraphes_uniques
+
+    async def __recherche_dans_collection_jeopardy_dans_le_delai(
+        self, question: str
+    ) -> list[Paragraphe]:
+        try:
+            return await asyncio.wait_for(
+                self.__recherche_dans_collection_jeopardy(question),
+                timeout=self.delai_maximum_recherche_jeopardy,
+            )
+        except asyncio.TimeoutError:
+            logging.warning(
+                "Recherche jeopardy non terminée dans le délai imparti : seuls les résultats classiques sont utilisés"
+            )
+        except ErreurRechercheDocuments:
+            logging.warning(
+                "Recherche jeopardy en erreur : seuls les résultats classiques sont utilisés"
+            )
+        return []
 
-        if self.jeopardy_active:
-            paragraphes_jeopardy = self.__recherche_dans_collection_jeopardy(question)
-            paragraphes_fusionnes = paragraphes_classiques + paragraphes_jeopardy
-
-            paragraphes_uniques = []
-            contenus_vus = set()
-            for p in paragraphes_fusionnes:
-                if p.contenu not in contenus_vus:
-                    paragraphes_uniques.append(p)
-                    contenus_vus.add(p.contenu)
-
-            return paragraphes_uniques
-        else:
-            return paragraphes_classiques
-
-    def __recherche_dans_collection_jeopardy(self, question: str) -> list[Paragraphe]:
+    async def __recherche_dans_collection_jeopardy(
+        self, question: str
+    ) -> list[Paragraphe]:
         methode_recherche = "hybrid" if self.utilise_recherche_hybride else "semantic"
         payload = RecherchePayload(
             collection_ids=[self.id_collection_jeopardy],
@@ -160,40 +427,265 @@ class ServiceAlbert:
             method=methode_recherche,
         )
 
-        resultats_jeopardy = self.client.recherche_jeopardy(payload)
+        with mesure(EtapeMesuree.RECHERCHE_JEOPARDY):
+            resultats_jeopardy = await self.client.recherche_jeopardy(payload)
 
         if not resultats_jeopardy:
             return []
 
-        paragraphes = []
-        for rang, resultat in enumerate(resultats_jeopardy, 1):
+        with mesure(EtapeMesuree.CHUNKS_JEOPARDY):
+            donnees = await self.__recupere_les_chunks_sources(resultats_jeopardy)
+        return [
+            Paragraphe(
+                contenu=donnee.chunk.content,
+                url=donnee.chunk.metadata.source_url,
+                score_similarite=resultat.score,
+                numero_page=donnee.chunk.metadata.page,
+                nom_document=donnee.chunk.metadata.nom_document,
+                rang_initial=rang,
+            )
+            for rang, (resultat, donnee) in enumerate(
+                zip(resultats_jeopardy, donnees), 1
+            )
+        ]
+
+    async def __recupere_les_chunks_sources(
+        self, resultats_jeopardy: list[ResultatRechercheJeopardy]
+    ) -> list[ResultatRecherche]:
+        semaphore = asyncio.Semaphore(self.concurrence_maximum_chunks_jeopardy)
+
+        async def _recupere(resultat: ResultatRechercheJeopardy) -> ResultatRecherche:
             id_document = resultat.chunk.metadata.source_id_document
             id_chunk = resultat.chunk.metadata.source_id_chunk
-            donnee = self.client.recherche_chunk_par_id(id_document, id_chunk)
-            paragraphes.append(
-                Paragraphe(
-                    contenu=donnee.chunk.content,
-                    url=donnee.chunk.metadata.source_url,
-                    score_similarite=resultat.score,
-                    numero_page=donnee.chunk.metadata.page,
-                    nom_document=donnee.chunk.metadata.nom_document,
-                    rang_initial=rang,
-                )
+            if self.entrepot_chunks is not None:
+                chunk_connu = await self.entrepot_chunks.recupere(id_document, id_chunk)
+                if chunk_connu is not None:
+                    return chunk_connu
+            async with semaphore:
+                chunk = await self.client.recherche_chunk_par_id(id_document, id_chunk)
+            if self.entrepot_chunks is not None and chunk.chunk.content:
+                await self.entrepot_chunks.enregistre(id_document, id_chunk, chunk)
+            return chunk
+
+        taches = [asyncio.ensure_future(_recupere(r)) for r in resultats_jeopardy]
+        try:
+            _, en_attente = await asyncio.wait(
+                taches, timeout=self.delai_maximum_chunks_jeopardy
             )
-        return paragraphes
+        finally:
+            # Annulées aussi quand l'appelant l'est, pour ne pas laisser de
+            # récupérations orphelines.
+            inachevees = [tache for tache in taches if not tache.done()]
+            for tache in inachevees:
+                tache.cancel()
+            await asyncio.gather(*inachevees, return_exceptions=True)
+        if en_attente:
+            logging.warning(
+                f"{len(en_attente)} chunk(s) source(s) jeopardy non récupéré(s) dans le délai imparti"
+            )
+        return [
+            ResultatRecherche.vide() if tache in en_attente else tache.result()
+            for tache in taches
+        ]
 
-    def pose_question(
+    async def pose_question(
         self,
         *,
         question: str,
         prompt: Optional[str] = None,
         conversation: Optional[Conversation] = None,
+        delai_maximum: Optional[float] = None,
     ) -> ReponseQuestion:
-        question_reformulee = self.reformulateur.reformule(
-            question, conversation=conversation
+        """
+        Le délai maximum (par défaut celui de la configuration, s'il est
+        défini) est réparti entre les étapes ; l'`ErreurDelaiDepasse` levée
+        indique l'étape fautive.
+        Sans historique, la réponse peut être servie depuis le cache des réponses,
+        et les questions identiques posées simultanément partagent un même calcul.
+        """
+        if conversation is not None and conversation.interactions_sans_violation:
+            return await self.__genere_la_reponse(
+                question, prompt, conversation, delai_maximum
+            )
+
+        cle = self.__cle_de_reponse(question, prompt)
+        if self.cache_reponses is not None:
+            en_cache = await self.cache_reponses.recupere(cle)
+            if en_cache is not None:
+                return _reponse_depuis_le_cache(en_cache, question)
+
+        async def _genere_et_met_en_cache() -> ReponseQuestion:
+            reponse_question = await self.__genere_la_reponse(
+                question, prompt, conversation, delai_maximum
+            )
+            if (
+                self.cache_reponses is not None
+                and reponse_question.reponse != REPONSE_PAR_DEFAUT
+                and (
+                    reponse_question.violation is None
+                    or self.cache_reponses_sert_les_violations
+                )
+            ):
+                await self.cache_reponses.enregistre(
+                    cle,
+                    reponse_question.model_dump(mode="json"),
+                    [etiquette_collection(self.id_collection)],
+                )
+            return reponse_question
+
+        reponse_question = await self.mutualisation.execute(
+            cle, _genere_et_met_en_cache
         )
+        return reponse_question.model_copy(update={"question": question})
+
+    async def __genere_la_reponse(
+        self,
+        question: str,
+        prompt: Optional[str],
+        conversation: Optional[Conversation],
+        delai_maximum: Optional[float],
+    ) -> ReponseQuestion:
+        budget = self.__nouveau_budget(delai_maximum)
+        preparation = await self.__prepare_la_generation(
+            question, prompt, conversation, budget
+        )
+        if isinstance(preparation, ReponseQuestion):
+            return preparation
+
+        with mesure(EtapeMesuree.GENERATION):
+            propositions_albert = await budget.execute(
+                Etape.GENERATION,
+                lambda: self.client.recupere_propositions(
+                    preparation.messages, temperature=0
+                ),
+            )
+
+        (reponse, paragraphes, violation_resultat) = (
+            self._recupere_reponse_paragraphes_et_violation(
+                propositions_albert, preparation.paragraphes
+            )
+        )
+
+        return ReponseQuestion(
+            reponse=reponse,
+            paragraphes=(
+                await self._mappe_en_paragraphes_pour_la_reponse(
+                    paragraphes, delai_maximum=budget.restant()
+                )
+            ),
+            question=question,
+            question_reformulee=preparation.question_reformulee,
+            violation=violation_resultat,
+        )
+
+    async def pose_question_en_flux(
+        self,
+        *,
+        question: str,
+        prompt: Optional[str] = None,
+        conversation: Optional[Conversation] = None,
+        delai_maximum: Optional[float] = None,
+    ) -> AsyncIterator[FragmentReponse | ReponseQuestion]:
+        """
+        Transmet la réponse d'Albert au fil de sa génération, puis termine par la
+        `ReponseQuestion` complète, qui fait foi (notamment en cas de violation).
+        Tant que le début de la réponse peut encore être un marqueur `ERREUR_*`,
+        il est retenu ; dès qu'un marqueur est reconnu, la génération est
+        interrompue et la violation correspondante est retournée.
+        Le délai maximum ne s'applique qu'aux étapes précédant la génération.
+        """
+        preparation = await self.__prepare_la_generation(
+            question, prompt, conversation, self.__nouveau_budget(delai_maximum)
+        )
+        if isinstance(preparation, ReponseQuestion):
+            yield preparation
+            return
+
+        texte = ""
+        en_attente_du_debut = True
+        violation_annoncee: Violation | None = None
+        with mesure(EtapeMesuree.GENERATION):
+            async with aclosing(
+                self.client.recupere_propositions_en_flux(
+                    preparation.messages, temperature=0
+                )
+            ) as flux:
+                async for fragment in flux:
+                    texte += fragment
+                    violation_annoncee = _violation_annoncee(
+                        texte[-(len(fragment) + LONGUEUR_MAXIMUM_MARQUEUR) :]
+                    )
+                    if violation_annoncee is not None:
+                        break
+                    if not en_attente_du_debut:
+                        yield FragmentReponse(contenu=fragment)
+                    elif not _peut_encore_annoncer_une_violation(texte):
+                        en_attente_du_debut = False
+                        yield FragmentReponse(contenu=texte)
+
+        if violation_annoncee is not None:
+            logging.info(
+                f"Génération interrompue : {violation_annoncee.__class__.__name__} annoncée par le modèle"
+            )
+            yield ReponseQuestion(
+                reponse=violation_annoncee.reponse,
+                paragraphes=[],
+                question=question,
+                question_reformulee=preparation.question_reformulee,
+                violation=violation_annoncee,
+            )
+            return
+        if en_attente_du_debut and texte:
+            yield FragmentReponse(contenu=texte)
+
+        (reponse, paragraphes, violation_resultat) = self._analyse_la_reponse(
+            texte if texte else None, preparation.paragraphes
+        )
+
+        yield ReponseQuestion(
+            reponse=reponse,
+            paragraphes=(await self._mappe_en_paragraphes_pour_la_reponse(paragraphes)),
+            question=question,
+            question_reformulee=preparation.question_reformulee,
+            violation=violation_resultat,
+        )
+
+    async def __prepare_la_generation(
+        self,
+        question: str,
+        prompt: Optional[str],
+        conversation: Optional[Conversation],
+        budget: BudgetDeTemps,
+    ) -> GenerationPreparee | ReponseQuestion:
+        if self.reponse_maitrisee_locale_active and (
+            conversation is None or not conversation.interactions_sans_violation
+        ):
+            reponse_maitrisee = self.__reponse_maitrisee_locale(question)
+            if reponse_maitrisee is not None:
+                return reponse_maitrisee
+
+        recherche_speculative = (
+            asyncio.ensure_future(self.recherche_paragraphes(question))
+            if self.recherche_speculative_active
+            else None
+        )
+
+        async def _reformule():
+            with mesure(EtapeMesuree.REFORMULATION):
+                return await self.reformulateur.reformule(
+                    question, conversation=conversation
+                )
+
+        try:
+            question_reformulee = await budget.execute(
+                Etape.REFORMULATION, _reformule, doublon=_reformule
+            )
+        except BaseException:
+            abandonne(recherche_speculative)
+            raise
 
         if question_reformulee == "QUESTION_NON_COMPRISE":
+            abandonne(recherche_speculative)
             violation = ViolationQuestionNonComprise()
             return ReponseQuestion(
                 reponse=violation.reponse,
@@ -205,9 +697,23 @@ class ServiceAlbert:
         question_pour_recherche = (
             question_reformulee if question_reformulee else question
         )
-        recherche_paragraphes = self.recherche_paragraphes(question_pour_recherche)
-        resultat_reclassement = self.__effectue_reclassement(
-            recherche_paragraphes, question_pour_recherche
+        recherche_paragraphes = await budget.execute(
+            Etape.RECHERCHE,
+            lambda: self.__recherche_paragraphes_en_reutilisant(
+                recherche_speculative, question, question_pour_recherche
+            ),
+            doublon=lambda: self.recherche_paragraphes(question_pour_recherche),
+        )
+
+        def _reclasse():
+            return self.__effectue_reclassement(
+                recherche_paragraphes, question_pour_recherche
+            )
+
+        resultat_reclassement = await budget.execute(
+            Etape.RECLASSEMENT,
+            _reclasse,
+            doublon=None if self.reclasseur.sollicite_un_llm else _reclasse,
         )
         if resultat_reclassement.aucune_source_utile:
             violation_meconnaissance = ViolationMeconnaissance()
@@ -218,31 +724,67 @@ class ServiceAlbert:
                 question_reformulee=question_reformulee,
                 violation=violation_meconnaissance,
             )
-        paragraphes = resultat_reclassement.paragraphes_retenus
-        propositions_albert = self.__effectue_recuperation_propositions(
-            paragraphes, prompt, question_pour_recherche, conversation
+        paragraphes, messages = self.__genere_les_messages_pour_les_propositions(
+            resultat_reclassement.paragraphes_retenus,
+            prompt,
+            question_pour_recherche,
+            conversation,
         )
-
-        (reponse, paragraphes, violation_resultat) = (
-            self._recupere_reponse_paragraphes_et_violation(
-                propositions_albert, paragraphes
-            )
+        return GenerationPreparee(
+            question_reformulee=question_reformulee,
+            paragraphes=paragraphes,
+            messages=messages,
         )
 
+    def __reponse_maitrisee_locale(self, question: str) -> Optional[ReponseQuestion]:
+        trouvee = self.mapping_reponses.cherche(question)
+        if trouvee is None or trouvee.confiance < self.seuil_reponse_maitrisee_locale:
+            return None
+        logging.info(
+            f"Réponse maîtrisée `{trouvee.id_reponse}` servie sans appel à Albert (confiance {trouvee.confiance:.2f})"
+        )
         return ReponseQuestion(
-            reponse=reponse,
-            paragraphes=(self._mappe_en_paragraphes_pour_la_reponse(paragraphes)),
+            reponse=trouvee.reponse,
+            paragraphes=[],
             question=question,
-            question_reformulee=question_reformulee,
-            violation=violation_resultat,
+            question_reformulee=None,
+            violation=None,
+        )
+
+    def __cle_de_reponse(self, question: str, prompt: Optional[str]) -> str:
+        prompt_systeme = prompt if prompt else self.prompt_systeme
+        return hashlib.sha256(
+            json.dumps(
+                [
+                    hashlib.sha256(prompt_systeme.encode()).hexdigest(),
+                    self.id_collection,
+                    self.id_collection_jeopardy if self.jeopardy_active else None,
+                    self.version_cache_reponses,
+                    self.modele_reponse,
+                    normalise_question(question),
+                ],
+                ensure_ascii=False,
+            ).encode()
+        ).hexdigest()
+
+    def __nouveau_budget(self, delai_maximum: Optional[float]) -> BudgetDeTemps:
+        return BudgetDeTemps(
+            delai_total=(
+                delai_maximum
+                if delai_maximum is not None
+                else self.delai_maximum_pose_question or None
+            ),
+            part_avant_doublon=self.part_budget_avant_doublon,
         )
 
-    def _mappe_en_paragraphes_pour_la_reponse(
-        self, paragraphes_a_mapper: list[Paragraphe]
+    async def _mappe_en_paragraphes_pour_la_reponse(
+        self,
+        paragraphes_a_mapper: list[Paragraphe],
+        delai_maximum: Optional[float] = None,
     ) -> list[Any]:
         guides_msc: list[ReponseGuideMSC] = (
-            self.executeur_de_requetes.recupere(
-                f"{self.url_msc}/api/guides", ReponseGuideMSC
+            await self.__recupere_les_guides_msc(
+                self.executeur_de_requetes, delai_maximum
             )
             if self.executeur_de_requetes
             else []
@@ -269,71 +811,96 @@ class ServiceAlbert:
             )
         return paragraphes
 
-    def __effectue_recuperation_propositions(
+    async def __recupere_les_guides_msc(
+        self,
+        executeur_de_requetes: AdaptateurExecuteurDeRequetes,
+        delai_maximum: Optional[float],
+    ) -> list[ReponseGuideMSC]:
+        try:
+            with mesure(EtapeMesuree.GUIDES_MSC):
+                return await asyncio.wait_for(
+                    executeur_de_requetes.recupere(
+                        f"{self.url_msc}/api/guides", ReponseGuideMSC
+                    ),
+                    timeout=delai_maximum,
+                )
+        except asyncio.TimeoutError:
+            logging.warning(
+                "Guides MSC non récupérés dans le délai imparti : les titres des guides ne sont pas renseignés"
+            )
+            return []
+
+    async def __recherche_paragraphes_en_reutilisant(
+        self,
+        recherche_speculative: Optional[asyncio.Future[list[Paragraphe]]],
+        question: str,
+        question_pour_recherche: str,
+    ) -> list[Paragraphe]:
+        if recherche_speculative is None:
+            return await self.recherche_paragraphes(question_pour_recherche)
+
+        if (
+            similarite_questions(question, question_pour_recherche)
+            >= self.seuil_similarite_recherche_speculative
+        ):
+            try:
+                paragraphes = await recherche_speculative
+                self.compteur_recherche_speculative.enregistre(reutilisee=True)
+                return paragraphes
+            except ErreurRechercheDocuments:
+                logging.warning(
+                    "Recherche spéculative en erreur : nouvelle recherche sur la question reformulée"
+                )
+        else:
+            abandonne(recherche_speculative)
+        self.compteur_recherche_speculative.enregistre(reutilisee=False)
+        return await self.recherche_paragraphes(question_pour_recherche)
+
+    def __genere_les_messages_pour_les_propositions(
         self,
         paragraphes: list[Paragraphe],
         prompt: str | None,
         question: str,
         conversation: Conversation | None,
-    ) -> list[Choice]:
-        def _contenu_pour_llm(p: Paragraphe) -> str:
-            return p.contexte_dans_le_document
-
-        paragraphes_concatenes = "\n\n\n".join(
-            [_contenu_pour_llm(p) for p in paragraphes]
-        )
-
+    ) -> tuple[list[Paragraphe], list[ChatCompletionMessageParam]]:
+        """
+        Les paragraphes et échanges les moins prioritaires qui ne tiennent pas
+        dans le budget de jetons sont écartés ; seuls les paragraphes transmis
+        à Albert sont retournés, pour servir de sources à la réponse.
+        """
         prompt_systeme = prompt if prompt else self.prompt_systeme
-
-        messages = self.__genere_les_messages_de_completion(
-            conversation, paragraphes_concatenes, prompt_systeme, question
-        )
-        propositions_albert = self.client.recupere_propositions(messages, temperature=0)
-        return propositions_albert
-
-    def __genere_les_messages_de_completion(
-        self,
-        conversation: Conversation | None,
-        paragraphes_concatenes: str,
-        prompt_systeme: str,
-        question: str,
-    ) -> list[ChatCompletionMessageParam]:
-        question_en_cours: ChatCompletionUserMessageParam = {
-            "role": "user",
-            "content": f"Question :\n{question}",
-        }
-        messages: list[ChatCompletionMessageParam] = [
-            {
-                "role": "system",
-                "content": prompt_systeme.format(chunks=paragraphes_concatenes),
-            },
-        ]
-        if conversation is not None:
-            interactions_limitees = conversation.interactions_sans_violation[
-                : self.taille_fenetre_historique
-            ]
-            for interaction in reversed(interactions_limitees):
-                messages.extend(
-                    [
-                        {
-                            "role": "user",
-                            "content": f"Question :\n{interaction.reponse_question.question}",
-                        },
-                        {
-                            "role": "assistant",
-                            "content": interaction.reponse_question.reponse,
-                        },
-                    ]
+        echanges = (
+            [
+                Echange(
+                    question=f"Question :\n{interaction.reponse_question.question}",
+                    reponse=interaction.reponse_question.reponse,
                 )
+                for interaction in conversation.interactions_sans_violation[
+                    : self.taille_fenetre_historique
+                ]
+            ]
+            if conversation is not None
+            else []
+        )
+        question_en_cours = f"Question :\n{question}"
+        contexte = self.assembleur_de_contexte.assemble(
+            prompt_systeme.format(chunks=""),
+            question_en_cours,
+            [p.contexte_dans_le_document for p in paragraphes],
+            echanges,
+        )
+        _enregistre_la_taille_du_prompt(contexte)
+        messages = compose_les_messages(
+            self.disposition_messages, prompt_systeme, contexte, question_en_cours
+        )
+        return paragraphes[: len(contexte.paragraphes)], messages
 
-        messages.append(question_en_cours)
-        return messages
-
-    def __effectue_reclassement(
+    async def __effectue_reclassement(
         self, paragraphes: list[Paragraphe], question: str
     ) -> ResultatReclassement:
         if len(paragraphes) > 0:
-            resultat = self.reclasseur.reclasse(question, paragraphes)
+            with mesure(EtapeMesuree.RECLASSEMENT):
+                resultat = await self.reclasseur.reclasse(question, paragraphes)
             return ResultatReclassement(
                 paragraphes_retenus=_filtre_reponses_maitrisees(
                     resultat.paragraphes_retenus,
@@ -350,21 +917,20 @@ class ServiceAlbert:
     def _recupere_reponse_paragraphes_et_violation(
         self, propositions_albert: list[Choice], paragraphes: list[Paragraphe]
     ) -> tuple[str, list[Paragraphe], Violation | None]:
-        def retourne_violation(v: Violation):
-            return v.reponse, [], v
-
-        reponse_presente = len(propositions_albert) > 0
-
-        if reponse_presente:
-            reponse_albert = cast(str, propositions_albert[0].message.content)
-            if "ERREUR_IDENTITÉ" in reponse_albert:
-                return retourne_violation(ViolationIdentite())
-            elif "ERREUR_THÉMATIQUE" in reponse_albert:
-                return retourne_violation(ViolationThematique())
-            elif "ERREUR_MALVEILLANCE" in reponse_albert:
-                return retourne_violation(ViolationMalveillance())
-            elif "ERREUR_MECONNAISSANCE" in reponse_albert:
-                return retourne_violation(ViolationMeconnaissance())
+        reponse_albert = (
+            cast(str, propositions_albert[0].message.content)
+            if len(propositions_albert) > 0
+            else None
+        )
+        return self._analyse_la_reponse(reponse_albert, paragraphes)
+
+    def _analyse_la_reponse(
+        self, reponse_albert: str | None, paragraphes: list[Paragraphe]
+    ) -> tuple[str, list[Paragraphe], Violation | None]:
+        if reponse_albert is not None:
+            violation = _violation_annoncee(reponse_albert)
+            if violation is not None:
+                return violation.reponse, [], violation
             return reponse_albert, paragraphes, None
         else:
             return REPONSE_PAR_DEFAUT, [], None
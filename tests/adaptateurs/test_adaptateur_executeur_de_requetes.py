@@ -0,0 +1,33 @@
+import httpx
+import pytest
+from pydantic import BaseModel
+
+from adaptateurs.adaptateur_executeur_de_requetes import AdaptateurExecuteurDeRequetes
+
+
+class Element(BaseModel):
+    id: int
+
+
+@pytest.mark.anyio
+async def test_les_requetes_reutilisent_le_meme_client_http() -> None:
+    urls_appelees: list[str] = []
+
+    def repond(requete: httpx.Request) -> httpx.Response:
+        urls_appelees.append(str(requete.url))
+        return httpx.Response(200, json=[{"id": 1}])
+
+    client_http = httpx.AsyncClient(transport=httpx.MockTransport(repond))
+    executeur = AdaptateurExecuteurDeRequetes(client_http)
+
+    elements = await executeur.recupere("https://example.com/elements", Element)
+    reponse = await executeur.get_asynchrone("https://example.com/document.pdf")
+    await executeur.ferme()
+
+    assert elements == [Element(id=1)]
+    assert reponse.status_code == 200
+    assert urls_appelees == [
+        "https://example.com/elements",
+        "https://example.com/document.pdf",
+    ]
+    assert client_http.is_closed
@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from psycopg2.pool import PoolError
+
+from adaptateurs.cache import (
+    AdaptateurCacheMemoire,
+    AdaptateurCachePostgres,
+    fabrique_adaptateur_cache,
+)
+from configuration import BaseDeDonnees, Cache, TypeCache
+
+
+BASE_INJOIGNABLE = BaseDeDonnees(
+    hote="127.0.0.1",
+    port=1,
+    utilisateur="utilisateur",
+    mot_de_passe="mot_de_passe",
+    nom="base",
+)
+
+
+class HorlogeDeTest:
+    def __init__(self):
+        self.maintenant = 0.0
+
+    def __call__(self) -> float:
+        return self.maintenant
+
+
+@pytest.mark.anyio
+async def test_le_cache_memoire_retourne_la_valeur_enregistree():
+    cache = AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60)
+
+    await cache.enregistre("cle", [{"contenu": "Paragraphe"}])
+
+    assert await cache.recupere("cle") == [{"contenu": "Paragraphe"}]
+
+
+@pytest.mark.anyio
+async def test_le_cache_memoire_compte_les_succes_et_les_echecs():
+    cache = AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60)
+    await cache.enregistre("cle", "valeur")
+
+    await cache.recupere("cle")
+    await cache.recupere("cle")
+    await cache.recupere("autre cle")
+
+    assert cache.statistiques.nombre_succes == 2
+    assert cache.statistiques.nombre_echecs == 1
+    assert cache.statistiques.taux_succes == 2 / 3
+
+
+@pytest.mark.anyio
+async def test_une_entree_expiree_n_est_plus_retournee():
+    horloge = HorlogeDeTest()
+    cache = AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60, horloge=horloge)
+    await cache.enregistre("cle", "valeur")
+
+    horloge.maintenant = 60
+
+    assert await cache.recupere("cle") is None
+
+
+@pytest.mark.anyio
+async def test_l_entree_la_moins_recemment_utilisee_est_evincee():
+    cache = AdaptateurCacheMemoire(taille_maximum=2, duree_de_vie=60)
+    await cache.enregistre("a", "A")
+    await cache.enregistre("b", "B")
+    await cache.recupere("a")
+
+    await cache.enregistre("c", "C")
+
+    assert await cache.recupere("a") == "A"
+    assert await cache.recupere("b") is None
+    assert await cache.recupere("c") == "C"
+
+
+@pytest.mark.anyio
+async def test_la_purge_par_etiquette_ne_supprime_que_les_entrees_concernees():
+    cache = AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60)
+    await cache.enregistre("a", "A", ["collection:1"])
+    await cache.enregistre("b", "B", ["collection:2"])
+
+    nombre = cache.purge("collection:1")
+
+    assert nombre == 1
+    assert await cache.recupere("a") is None
+    assert await cache.recupere("b") == "B"
+
+
+@pytest.mark.anyio
+async def test_la_purge_sans_etiquette_vide_le_cache():
+    cache = AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60)
+    await cache.enregistre("a", "A", ["collection:1"])
+    await cache.enregistre("b", "B")
+
+    assert cache.purge() == 2
+    assert await cache.recupere("b") is None
+
+
+def test_aucun_cache_n_est_fabrique_s_il_est_desactive():
+    configuration = Cache(
+        type_cache=TypeCache.AUCUN, duree_de_vie=60, taille_maximum=10
+    )
+
+    assert fabrique_adaptateur_cache(configuration, "recherche", None) is None  # type: ignore [arg-type]
+
+
+@pytest.mark.anyio
+async def test_une_base_injoignable_equivaut_a_un_cache_vide():
+    cache = AdaptateurCachePostgres(
+        BASE_INJOIGNABLE,
+        "recherche",
+        taille_maximum=10,
+        duree_de_vie=60,
+    )
+
+    await cache.enregistre("cle", "valeur")
+
+    assert await cache.recupere("cle") is None
+    assert cache.statistiques.nombre_echecs == 1
+
+
+class CurseurDeTest:
+    def execute(self, *_) -> None:
+        time.sleep(0.01)
+
+    def fetchone(self) -> dict:
+        return {"valeur": "valeur"}
+
+
+class ConnexionDeTest:
+    autocommit = False
+
+    def cursor(self, cursor_factory=None) -> CurseurDeTest:
+        return CurseurDeTest()
+
+
+class PoolDeTest:
+    def __init__(self, taille: int) -> None:
+        self.taille = taille
+        self.connexions_ouvertes = 0
+        self.connexions_ouvertes_maximum = 0
+        self._lock = threading.Lock()
+
+    def getconn(self) -> ConnexionDeTest:
+        with self._lock:
+            if self.connexions_ouvertes >= self.taille:
+                raise PoolError("connection pool exhausted")
+            self.connexions_ouvertes += 1
+            self.connexions_ouvertes_maximum = max(
+                self.connexions_ouvertes_maximum, self.connexions_ouvertes
+            )
+        return ConnexionDeTest()
+
+    def putconn(self, connexion: ConnexionDeTest, close: bool = False) -> None:
+        with self._lock:
+            self.connexions_ouvertes -= 1
+
+
+@pytest.mark.anyio
+async def test_les_lectures_au_dela_de_la_taille_du_pool_attendent_une_connexion():
+    cache = AdaptateurCachePostgres(
+        BASE_INJOIGNABLE, "recherche", taille_maximum=10, duree_de_vie=60, taille_pool=2
+    )
+    pool = PoolDeTest(taille=2)
+    cache._pool = pool  # type: ignore [assignment]
+
+    valeurs = await asyncio.gather(*(cache.recupere(f"cle {i}") for i in range(10)))
+
+    assert valeurs == ["valeur"] * 10
+    assert cache.statistiques.nombre_succes == 10
+    assert pool.connexions_ouvertes_maximum == 2
+
+
+def test_la_taille_du_pool_du_cache_postgres_vient_de_la_configuration():
+    configuration = Cache(
+        type_cache=TypeCache.POSTGRES,
+        duree_de_vie=60,
+        taille_maximum=10,
+        taille_pool=12,
+    )
+
+    cache = fabrique_adaptateur_cache(configuration, "recherche", BASE_INJOIGNABLE)
+
+    assert isinstance(cache, AdaptateurCachePostgres)
+    assert cache._pool.maxconn == 12
@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from adaptateurs.entrepot_chunks import (
+    AdaptateurEntrepotChunksMemoire,
+    AdaptateurEntrepotChunksSQLite,
+)
+from client_albert_de_test import un_resultat_de_recherche
+from infra.entrepot_chunks.pre_remplis_entrepot_chunks import lis_export_collection
+
+
+def _un_chunk(contenu: str):
+    return un_resultat_de_recherche().ayant_pour_contenu(contenu).construis()
+
+
+@pytest.mark.anyio
+async def test_l_entrepot_memoire_evince_le_chunk_le_moins_recemment_utilise():
+    entrepot = AdaptateurEntrepotChunksMemoire(taille_maximum=2)
+    await entrepot.enregistre("doc", 1, _un_chunk("Chunk 1"))
+    await entrepot.enregistre("doc", 2, _un_chunk("Chunk 2"))
+    await entrepot.recupere("doc", 1)
+
+    await entrepot.enregistre("doc", 3, _un_chunk("Chunk 3"))
+
+    assert await entrepot.recupere("doc", 2) is None
+    assert (await entrepot.recupere("doc", 1)).chunk.content == "Chunk 1"
+    assert (await entrepot.recupere("doc", 3)).chunk.content == "Chunk 3"
+
+
+@pytest.mark.anyio
+async def test_l_entrepot_sqlite_conserve_les_chunks_entre_deux_ouvertures(tmp_path):
+    chemin = str(tmp_path / "chunks.db")
+    entrepot = AdaptateurEntrepotChunksSQLite(chemin, 42, "v1", 10)
+    await entrepot.enregistre("doc", 73, _un_chunk("Contenu du chunk 73"))
+    entrepot.ferme()
+
+    entrepot_rouvert = AdaptateurEntrepotChunksSQLite(chemin, 42, "v1", 10)
+
+    chunk = await entrepot_rouvert.recupere("doc", 73)
+    assert chunk is not None
+    assert chunk.chunk.content == "Contenu du chunk 73"
+
+
+@pytest.mark.anyio
+async def test_l_entrepot_sqlite_purge_la_collection_lorsque_sa_version_change(
+    tmp_path,
+):
+    chemin = str(tmp_path / "chunks.db")
+    entrepot = AdaptateurEntrepotChunksSQLite(chemin, 42, "v1", 10)
+    await entrepot.enregistre("doc", 73, _un_chunk("Ancien contenu"))
+    entrepot.ferme()
+
+    entrepot_reindexe = AdaptateurEntrepotChunksSQLite(chemin, 42, "v2", 10)
+
+    assert await entrepot_reindexe.recupere("doc", 73) is None
+
+
+@pytest.mark.anyio
+async def test_l_entrepot_sqlite_se_pre_remplit_depuis_un_export_de_collection(
+    tmp_path,
+):
+    export = [
+        '{"id": 73, "content": "Chunk 73", "metadata": {"document_id": 4065642, "page": 16, "nom_document": "guide.pdf"}}',
+        "",
+        '{"id": 74, "id_document": "4065642", "content": "Chunk 74", "metadata": {"page": 17}}',
+    ]
+    entrepot = AdaptateurEntrepotChunksSQLite(str(tmp_path / "chunks.db"), 42, "v1", 1)
+
+    nombre = entrepot.pre_remplis(lis_export_collection(export, 1))
+
+    assert nombre == 2
+    chunk_73 = await entrepot.recupere("4065642", 73)
+    assert chunk_73.chunk.content == "Chunk 73"
+    assert chunk_73.chunk.metadata.page == 17
+    assert chunk_73.chunk.metadata.nom_document == "guide.pdf"
+    assert (await entrepot.recupere("4065642", 74)).chunk.content == "Chunk 74"
+
+
+@pytest.mark.anyio
+async def test_l_entrepot_sqlite_lit_et_ecrit_hors_de_la_boucle_d_evenements(tmp_path):
+    fils: list[int] = []
+
+    class EntrepotQuiNoteLeFil(AdaptateurEntrepotChunksSQLite):
+        def _lis(self, id_document, id_chunk):
+            fils.append(threading.get_ident())
+            return super()._lis(id_document, id_chunk)
+
+        def pre_remplis(self, chunks):
+            fils.append(threading.get_ident())
+            return super().pre_remplis(chunks)
+
+    entrepot = EntrepotQuiNoteLeFil(str(tmp_path / "chunks.db"), 42, "v1", 10)
+
+    await entrepot.recupere("doc", 73)
+    await entrepot.enregistre("doc", 73, _un_chunk("Contenu du chunk 73"))
+
+    assert len(fils) == 2
+    assert threading.get_ident() not in fils
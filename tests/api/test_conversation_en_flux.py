@@ -0,0 +1,143 @@
+import json
+import uuid
+
+from client_albert_de_test import (
+    ConstructeurClientHttp,
+    ConstructeurClientOpenai,
+    ConstructeurRetourRouteSearch,
+)
+from fastapi.testclient import TestClient
+
+from adaptateurs import AdaptateurBaseDeDonneesEnMemoire
+from adaptateurs.journal import TypeEvenement
+from infra.albert.client_albert import ClientAlbertApi
+from schemas.api import QuestionRequete
+
+
+def _lis_les_evenements(flux: str) -> list[tuple[str, dict]]:
+    evenements = []
+    for bloc in flux.strip().split("\n\n"):
+        lignes = dict(ligne.split(": ", 1) for ligne in bloc.splitlines())
+        evenements.append((lignes["event"], json.loads(lignes["data"])))
+    return evenements
+
+
+def test_route_initie_conversation_en_flux_emet_les_fragments_puis_la_reponse_complete(
+    un_serveur_de_test_complet, un_constructeur_de_reponse_question
+):
+    serveur, _, adaptateur_base_de_donnees, _, service_albert = (
+        un_serveur_de_test_complet()
+    )
+    service_albert.ajoute_reponse(
+        un_constructeur_de_reponse_question()
+        .a_partir_d_une_requete(QuestionRequete(question="Qui es-tu"))
+        .donnant_en_reponse("Réponse de test")
+        .construis()
+    )
+
+    reponse = TestClient(serveur).post(
+        "/api/conversation/flux", json={"question": "Qui es-tu"}
+    )
+
+    assert reponse.status_code == 200
+    assert reponse.headers["content-type"].startswith("text/event-stream")
+    evenements = _lis_les_evenements(reponse.text)
+    assert evenements[:2] == [
+        ("fragment", {"contenu": "Réponse"}),
+        ("fragment", {"contenu": "de"}),
+    ]
+    type_fin, donnees_fin = evenements[-1]
+    assert type_fin == "fin"
+    assert donnees_fin["reponse"] == "Réponse de test"
+    assert donnees_fin["id_interaction"]
+    assert (
+        adaptateur_base_de_donnees.recupere_conversation(
+            uuid.UUID(donnees_fin["id_conversation"])
+        )
+        is not None
+    )
+
+
+def test_route_ajoute_interaction_en_flux_consigne_l_interaction_avant_la_fin_du_flux(
+    un_serveur_de_test_complet, un_constructeur_de_conversation
+):
+    serveur, _, adaptateur_base_de_donnees, adaptateur_journal, _ = (
+        un_serveur_de_test_complet()
+    )
+    conversation = un_constructeur_de_conversation().construis()
+    adaptateur_base_de_donnees.sauvegarde_conversation(conversation)
+
+    reponse = TestClient(serveur).post(
+        f"/api/conversation/{conversation.id_conversation}/flux",
+        json={"question": "Comment s’en prémunir ?"},
+    )
+
+    type_fin, donnees_fin = _lis_les_evenements(reponse.text)[-1]
+    assert type_fin == "fin"
+    assert donnees_fin["id_interaction"] in [
+        str(i.id) for i in conversation.interactions
+    ]
+    assert (
+        adaptateur_journal.les_evenements()[-1]["type"]
+        == TypeEvenement.INTERACTION_AJOUTEE
+    )
+
+
+def test_route_ajoute_interaction_en_flux_emet_une_erreur_si_la_conversation_n_existe_pas(
+    un_serveur_de_test_complet,
+):
+    serveur, _, _, _, _ = un_serveur_de_test_complet()
+
+    reponse = TestClient(serveur).post(
+        f"/api/conversation/{uuid.uuid4()}/flux", json={"question": "Une question"}
+    )
+
+    assert _lis_les_evenements(reponse.text) == [
+        ("erreur", {"message": "La conversation demandée n'existe pas"})
+    ]
+
+
+def test_route_initie_conversation_en_flux_emet_une_erreur_si_echec_appel_albert(
+    un_serveur_de_test_complet,
+):
+    serveur, _, _, _, service_albert = un_serveur_de_test_complet()
+    service_albert.qui_leve_une_erreur_de_communication_vers_albert()
+
+    reponse = TestClient(serveur).post(
+        "/api/conversation/flux", json={"question": "Une question"}
+    )
+
+    assert _lis_les_evenements(reponse.text) == [
+        ("erreur", {"message": "Erreur message sur pose_question."})
+    ]
+
+
+def test_route_initie_conversation_en_flux_emet_une_erreur_de_communication_si_albert_retourne_une_erreur_500(
+    un_serveur_de_test,
+    un_service_albert,
+    une_configuration_albert_client,
+):
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().qui_echoue().construis(),
+        ConstructeurClientHttp()
+        .qui_retourne(
+            ConstructeurRetourRouteSearch().avec_contenu("contenu").construis()
+        )
+        .construis(),
+        une_configuration_albert_client,
+    )
+    serveur = un_serveur_de_test(
+        service_albert=un_service_albert(client_albert),
+        adaptateur_base_de_donnees=AdaptateurBaseDeDonneesEnMemoire("id-interaction"),
+    )
+
+    reponse = TestClient(serveur).post(
+        "/api/conversation/flux", json={"question": "Une question"}
+    )
+
+    assert _lis_les_evenements(reponse.text) == [
+        (
+            "erreur",
+            {"message": "Impossible de récupérer une réponse pour la question posée."},
+        )
+    ]
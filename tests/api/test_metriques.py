@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+
+from configuration import Mode
+
+
+def test_route_metriques_expose_la_duree_des_requetes_par_route(
+    un_serveur_de_test, un_adaptateur_de_chiffrement
+) -> None:
+    serveur = un_serveur_de_test(
+        mode=Mode.PRODUCTION,
+        adaptateur_chiffrement=un_adaptateur_de_chiffrement(),
+        expose_metriques=True,
+    )
+    client: TestClient = TestClient(serveur)
+    client.get("/")
+    client.get("/un/chemin/inconnu")
+
+    reponse = client.get("/metrics")
+
+    assert reponse.status_code == 200
+    assert reponse.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE mqc_requetes_http_duree_secondes histogram" in reponse.text
+    assert "# TYPE mqc_journal_evenements_en_attente gauge" in reponse.text
+    assert (
+        'mqc_requetes_http_duree_secondes_count{methode="GET",route="/",statut="200"}'
+        in reponse.text
+    )
+    assert (
+        'mqc_requetes_http_duree_secondes_count{methode="GET",route="autre",statut="404"}'
+        in reponse.text
+    )
+    assert "/un/chemin/inconnu" not in reponse.text
+    assert "mqc_requetes_http_en_cours 1\n" in reponse.text
+
+
+def test_route_metriques_n_est_pas_exposee_par_defaut(
+    un_serveur_de_test, un_adaptateur_de_chiffrement
+) -> None:
+    serveur = un_serveur_de_test(
+        mode=Mode.DEVELOPPEMENT, adaptateur_chiffrement=un_adaptateur_de_chiffrement()
+    )
+    client: TestClient = TestClient(serveur)
+
+    reponse = client.get("/metrics")
+
+    assert reponse.status_code == 404
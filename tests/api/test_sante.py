@@ -29,3 +29,21 @@ def test_route_sante_n_est_pas_exposee_en_production(
 
     assert reponse.status_code == 404
     assert reponse.json() == {"detail": "Not Found"}
+
+
+def test_le_client_albert_est_partage_par_l_application_jusqu_a_son_arret(
+    un_serveur_de_test, un_adaptateur_de_chiffrement
+) -> None:
+    serveur = un_serveur_de_test(
+        mode=Mode.DEVELOPPEMENT, adaptateur_chiffrement=un_adaptateur_de_chiffrement()
+    )
+
+    with TestClient(serveur) as client:
+        client_albert = serveur.state.client_albert
+        executeur_de_requetes = serveur.state.executeur_de_requetes
+        reponse = client.get("/api/sante/connexions-albert")
+
+    assert reponse.status_code == 200
+    assert "taux_reutilisation" in reponse.json()
+    assert client_albert.client_http.is_closed
+    assert executeur_de_requetes.client_http.is_closed
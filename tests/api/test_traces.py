@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+
+from adaptateurs import AdaptateurBaseDeDonneesEnMemoire
+from serveur_de_test import ServiceAlbertMemoire
+
+
+def test_une_question_est_tracee_sous_la_trace_de_la_requete(
+    un_serveur_de_test, un_adaptateur_de_chiffrement, un_exportateur_de_traces
+) -> None:
+    serveur = un_serveur_de_test(
+        adaptateur_chiffrement=un_adaptateur_de_chiffrement(),
+        service_albert=ServiceAlbertMemoire(),
+        adaptateur_base_de_donnees=AdaptateurBaseDeDonneesEnMemoire("id-interaction"),
+        exportateur_traces=un_exportateur_de_traces,
+    )
+    client: TestClient = TestClient(serveur)
+
+    client.post(
+        "/api/conversation",
+        json={"question": "Qui es-tu"},
+        headers={
+            "traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        },
+    )
+
+    spans = {span.nom: span for span in un_exportateur_de_traces.spans}
+    requete = spans["POST /api/conversation/"]
+    assert requete.id_trace == "0af7651916cd43dd8448eb211c80319c"
+    assert requete.id_parent == "b7ad6b7169203331"
+    assert requete.attributs["http.status_code"] == 200
+    assert spans["pose_question"].id_trace == requete.id_trace
+    assert spans["pose_question"].id_parent == requete.id_span
+    assert spans["sauvegarde"].id_parent == requete.id_span
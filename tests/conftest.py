@@ -14,8 +14,14 @@ from adaptateurs.adaptateur_executeur_de_requetes import AdaptateurExecuteurDeRe
 from adaptateurs.chiffrement import AdaptateurChiffrement
 from adaptateurs.horloge import Horloge
 from adaptateurs.journal import AdaptateurJournal, AdaptateurJournalMemoire
-from configuration import Albert, TypeReclasseur
+from configuration import Albert, DispositionMessages, TypeReclasseur
 from configuration import Mode
+from infra.mapping_reponses_maitrisees import MappingReponsesMaitrisees
+from infra.traces import (
+    ExportateurTraces,
+    ExportateurTracesMemoire,
+    configure_l_exportateur_de_traces,
+)
 from schemas.albert import (
     Paragraphe,
     ReponseQuestion,
@@ -26,12 +32,19 @@ from schemas.api import QuestionRequete
 from schemas.retour_utilisatrice import Interaction, Conversation, RetourUtilisatrice
 from schemas.type_utilisateur import TypeUtilisateur
 from schemas.violations import Violation
+from reformulateur_de_question_de_test import ReformulateurDeQuestionDeTest
 from serveur_de_test import (
     ConstructeurServeur,
     ServiceAlbertMemoire,
 )
+from services.client_albert import ClientAlbert
 from services.reclasseur import Reclasseur, ResultatReclassement
-from services.service_albert import ServiceAlbert
+from services.service_albert import Prompts, ServiceAlbert
+
+PROMPTS_DE_TEST = Prompts(
+    prompt_systeme="Utilisez ces documents:\n\n{chunks}",
+    prompt_reclassement="Prompt reclassement",
+)
 
 
 class ConstructeurDeParagraphe:
@@ -176,6 +189,11 @@ def une_reponse_question(un_constructeur_de_reponse_question):
     )
 
 
+@pytest.fixture()
+def anyio_backend() -> str:
+    return "asyncio"
+
+
 @pytest.fixture(autouse=True)
 def pages_statiques(tmp_path) -> Path:
     def crees_la_page_statique(page: Path):
@@ -248,7 +266,7 @@ class AdaptateurExecuteurDeRequetesMemoire(AdaptateurExecuteurDeRequetes):
             status_code=self.status_code,
         )
 
-    def recupere(self, url: str, klass: type[BaseModel]):
+    async def recupere(self, url: str, klass: type[BaseModel]):
         if isinstance(self.reponse, list):
             return [klass.model_validate(item) for item in self.reponse]
         return klass.model_validate(self.reponse)
@@ -268,6 +286,8 @@ def un_serveur_de_test(
         ),
         DefaultNamedArg(type=Optional[int], name="rate_limit"),
         DefaultNamedArg(type=Optional[bool], name="mode_maintenance"),
+        DefaultNamedArg(type=Optional[bool], name="expose_metriques"),
+        DefaultNamedArg(type=Optional[ExportateurTraces], name="exportateur_traces"),
         DefaultNamedArg(type=Optional[ServiceAlbert], name="service_albert"),
         DefaultNamedArg(
             type=Optional[AdaptateurBaseDeDonnees], name="adaptateur_base_de_donnees"
@@ -284,6 +304,8 @@ def un_serveur_de_test(
         ] = un_adaptateur_de_chiffrement(nonce="un-nonce"),
         rate_limit: Optional[int] = 600,
         mode_maintenance: Optional[bool] = False,
+        expose_metriques: Optional[bool] = False,
+        exportateur_traces: Optional[ExportateurTraces] = None,
         service_albert: Optional[ServiceAlbert] = None,
         adaptateur_base_de_donnees: Optional[AdaptateurBaseDeDonnees] = None,
         adaptateur_journal: Optional[AdaptateurJournal] = AdaptateurJournalMemoire(),
@@ -296,6 +318,8 @@ def un_serveur_de_test(
             adaptateur_chiffrement=adaptateur_chiffrement,  # type: ignore[arg-type]
             max_requetes_par_minute=rate_limit,  # type: ignore[arg-type]
             mode_maintenance=mode_maintenance,  # type: ignore[arg-type]
+            expose_metriques=expose_metriques,  # type: ignore[arg-type]
+            exportateur_traces=exportateur_traces,
         ).avec_pages_statiques(pages_statiques)
         if service_albert:
             serveur = serveur.avec_service_albert(service_albert)
@@ -486,7 +510,7 @@ class ReclasseurDeTest(Reclasseur):
         self.paragraphes_retenus = paragraphes_retenus
         self.question_recue: str | None = None
 
-    def reclasse(
+    async def reclasse(
         self, question: str, paragraphes: list[Paragraphe]
     ) -> ResultatReclassement:
         self.question_recue = question
@@ -524,6 +548,20 @@ def un_constructeur_de_reclasseur() -> Callable[[], ConstructeurReclasseurDeTest
     return _un_constructeur_de_reclasseur
 
 
+@pytest.fixture
+def une_configuration_albert_client():
+    return Albert.Client(  # type: ignore [attr-defined]
+        api_key="",
+        base_url="",
+        modele_reponse="",
+        modele_reformulation="",
+        temps_reponse_maximum_pose_question=10.0,
+        temps_reponse_maximum_recherche_paragraphes=1.0,
+        utilise_recherche_hybride=False,
+        decalage_index_Albert_et_numero_de_page_lecteur=0,
+    )
+
+
 @pytest.fixture()  # type:ignore[attr-defined, name-defined]
 def une_configuration_de_service_albert() -> Callable[
     [
@@ -537,6 +575,28 @@ def une_configuration_de_service_albert() -> Callable[
         DefaultNamedArg(type=Optional[int], name="nombre_paragraphes"),
         DefaultNamedArg(type=Optional[str], name="url_msc"),
         DefaultNamedArg(type=Optional[TypeReclasseur], name="type_reclasseur"),
+        DefaultNamedArg(type=Optional[int], name="concurrence_maximum_chunks_jeopardy"),
+        DefaultNamedArg(type=Optional[float], name="delai_maximum_chunks_jeopardy"),
+        DefaultNamedArg(type=Optional[float], name="delai_maximum_recherche_jeopardy"),
+        DefaultNamedArg(type=Optional[bool], name="recherche_speculative_active"),
+        DefaultNamedArg(
+            type=Optional[float], name="seuil_similarite_recherche_speculative"
+        ),
+        DefaultNamedArg(type=Optional[float], name="delai_maximum_pose_question"),
+        DefaultNamedArg(type=Optional[float], name="part_budget_avant_doublon"),
+        DefaultNamedArg(type=Optional[bool], name="cache_reponses_sert_les_violations"),
+        DefaultNamedArg(type=Optional[bool], name="reponse_maitrisee_locale_active"),
+        DefaultNamedArg(type=Optional[float], name="seuil_reponse_maitrisee_locale"),
+        DefaultNamedArg(type=Optional[int], name="budget_jetons_prompt"),
+        DefaultNamedArg(
+            type=Optional[DispositionMessages], name="disposition_messages"
+        ),
+        DefaultNamedArg(
+            type=Optional[int], name="jetons_maximum_par_passage_reclasseur_llm"
+        ),
+        DefaultNamedArg(type=Optional[bool], name="sortie_structuree_reclasseur_llm"),
+        DefaultNamedArg(type=Optional[int], name="taille_selection_reclasseur_cascade"),
+        DefaultNamedArg(type=Optional[float], name="marge_reclasseur_cascade"),
     ],
     Any,
 ]:
@@ -552,6 +612,24 @@ def une_configuration_de_service_albert() -> Callable[
         nombre_paragraphes: Optional[int] = 5,
         url_msc: Optional[str] = "",
         type_reclasseur: Optional[TypeReclasseur] = TypeReclasseur.BGE,
+        concurrence_maximum_chunks_jeopardy: Optional[int] = 5,
+        delai_maximum_chunks_jeopardy: Optional[float] = 3.0,
+        delai_maximum_recherche_jeopardy: Optional[float] = 5.0,
+        recherche_speculative_active: Optional[bool] = False,
+        seuil_similarite_recherche_speculative: Optional[float] = 0.9,
+        delai_maximum_pose_question: Optional[float] = 0.0,
+        part_budget_avant_doublon: Optional[float] = 1.0,
+        cache_reponses_sert_les_violations: Optional[bool] = False,
+        reponse_maitrisee_locale_active: Optional[bool] = False,
+        seuil_reponse_maitrisee_locale: Optional[float] = 0.9,
+        budget_jetons_prompt: Optional[int] = 8000,
+        disposition_messages: Optional[
+            DispositionMessages
+        ] = DispositionMessages.DOCUMENTS_DANS_LE_SYSTEME,
+        jetons_maximum_par_passage_reclasseur_llm: Optional[int] = 0,
+        sortie_structuree_reclasseur_llm: Optional[bool] = False,
+        taille_selection_reclasseur_cascade: Optional[int] = 8,
+        marge_reclasseur_cascade: Optional[float] = 0.2,
     ) -> Albert.Service:  # type:ignore[attr-defined, name-defined]
         return Albert.Service(  # type:ignore[attr-defined, name-defined]
             collection_nom_anssi_lab=collection_nom_anssi_lab,
@@ -564,6 +642,56 @@ def une_configuration_de_service_albert() -> Callable[
             nombre_paragraphes=nombre_paragraphes,
             url_msc=url_msc,
             type_reclasseur=type_reclasseur,
+            concurrence_maximum_chunks_jeopardy=concurrence_maximum_chunks_jeopardy,
+            delai_maximum_chunks_jeopardy=delai_maximum_chunks_jeopardy,
+            delai_maximum_recherche_jeopardy=delai_maximum_recherche_jeopardy,
+            recherche_speculative_active=recherche_speculative_active,
+            seuil_similarite_recherche_speculative=seuil_similarite_recherche_speculative,
+            delai_maximum_pose_question=delai_maximum_pose_question,
+            part_budget_avant_doublon=part_budget_avant_doublon,
+            cache_reponses_sert_les_violations=cache_reponses_sert_les_violations,
+            reponse_maitrisee_locale_active=reponse_maitrisee_locale_active,
+            seuil_reponse_maitrisee_locale=seuil_reponse_maitrisee_locale,
+            budget_jetons_prompt=budget_jetons_prompt,
+            disposition_messages=disposition_messages,
+            jetons_maximum_par_passage_reclasseur_llm=jetons_maximum_par_passage_reclasseur_llm,
+            sortie_structuree_reclasseur_llm=sortie_structuree_reclasseur_llm,
+            taille_selection_reclasseur_cascade=taille_selection_reclasseur_cascade,
+            marge_reclasseur_cascade=marge_reclasseur_cascade,
         )
 
     return _une_configuration_de_service_albert
+
+
+@pytest.fixture()
+def un_exportateur_de_traces():
+    exportateur = ExportateurTracesMemoire()
+    configure_l_exportateur_de_traces(exportateur)
+    yield exportateur
+    configure_l_exportateur_de_traces(None)
+
+
+@pytest.fixture()
+def un_service_albert(
+    un_reclasseur,
+    un_adaptateur_executeur_de_requetes,
+    une_configuration_de_service_albert,
+) -> Callable[..., ServiceAlbert]:
+    """
+    Un service Albert autour du client donné ; les autres paramètres du
+    service peuvent être surchargés par leur nom.
+    """
+
+    def _un_service_albert(client_albert: ClientAlbert, **surcharges) -> ServiceAlbert:
+        parametres: dict[str, Any] = {
+            "configuration_service_albert": une_configuration_de_service_albert(),
+            "utilise_recherche_hybride": False,
+            "prompts": PROMPTS_DE_TEST,
+            "reformulateur": ReformulateurDeQuestionDeTest(),
+            "mapping_reponses": MappingReponsesMaitrisees({}),
+            "reclasseur": un_reclasseur,
+            "executeur_de_requetes": un_adaptateur_executeur_de_requetes,
+        }
+        return ServiceAlbert(client=client_albert, **(parametres | surcharges))
+
+    return _un_service_albert
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from client_albert_de_test import (
     ConstructeurClientOpenai,
@@ -5,9 +7,14 @@ from client_albert_de_test import (
     ConstructeurRetourRouteSearch,
     RetourRouteRerank,
     ClientAlbertMemoire,
+    FluxCompletionDeTest,
+    une_erreur_interne_d_albert,
 )
 
+from adaptateurs.cache import AdaptateurCacheMemoire
 from infra.albert.client_albert import ClientAlbertApi
+from infra.albert.disjoncteur import EtatDisjoncteur
+from infra.metriques import DUREE_APPELS_ALBERT, ERREURS_APPELS_ALBERT
 from schemas.albert import RechercheChunk, RechercheMetadonnees
 from schemas.albert import (
     RechercheMetadonneesJeopardy,
@@ -27,7 +34,8 @@ FAUX_RETOURS_ALBERT_API = (
 )
 
 
-def test_recupere_propositions(une_configuration_albert_client):
+@pytest.mark.anyio
+async def test_recupere_propositions(une_configuration_albert_client):
     mock_client_http = (
         ConstructeurClientHttp()
         .qui_retourne(ConstructeurRetourRouteSearch().construis())
@@ -42,13 +50,14 @@ def test_recupere_propositions(une_configuration_albert_client):
         une_configuration_albert_client,
     )
 
-    propositions = mock_service_avec_reponse.recupere_propositions([])
+    propositions = await mock_service_avec_reponse.recupere_propositions([])
 
     mock_service_avec_reponse.client_openai.chat.completions.create.assert_called_once()
     assert propositions[0].message.content == REPONSE
 
 
-def test_leve_une_erreur_de_communication_avec_le_modele_si_timeout_lorsque_l_on_recupere_les_propositions(
+@pytest.mark.anyio
+async def test_leve_une_erreur_de_communication_avec_le_modele_si_timeout_lorsque_l_on_recupere_les_propositions(
     une_configuration_albert_client,
 ):
     mock_client_http = (
@@ -65,10 +74,111 @@ def test_leve_une_erreur_de_communication_avec_le_modele_si_timeout_lorsque_l_on
     )
 
     with pytest.raises(ErreurCommunicationModele):
-        mock_service_avec_reponse.recupere_propositions([])
+        await mock_service_avec_reponse.recupere_propositions([])
+
+
+@pytest.mark.anyio
+async def test_leve_une_erreur_de_communication_avec_le_modele_si_la_requete_est_refusee_lorsque_l_on_recupere_les_propositions(
+    une_configuration_albert_client,
+):
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().qui_refuse_la_requete().construis(),
+        ConstructeurClientHttp().construis(),
+        une_configuration_albert_client,
+    )
+
+    with pytest.raises(ErreurCommunicationModele):
+        await client_albert.recupere_propositions([])
 
 
-def test_leve_une_erreur_recherche_documents_si_timeout(
+@pytest.mark.anyio
+async def test_recupere_propositions_en_flux(une_configuration_albert_client):
+    flux = FluxCompletionDeTest(["Bon", "jour", None, " !"])
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().qui_complete_en_flux_avec(flux).construis(),
+        ConstructeurClientHttp().construis(),
+        une_configuration_albert_client,
+    )
+
+    fragments = [
+        fragment async for fragment in client_albert.recupere_propositions_en_flux([])
+    ]
+
+    assert fragments == ["Bon", "jour", " !"]
+    assert (
+        client_albert.client_openai.chat.completions.create.call_args.kwargs["stream"]
+        is True
+    )
+    assert flux.est_ferme
+
+
+@pytest.mark.anyio
+async def test_interrompre_les_propositions_en_flux_ferme_le_flux_amont(
+    une_configuration_albert_client,
+):
+    flux = FluxCompletionDeTest(["ERREUR", "_IDENTITÉ", " et la suite"])
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().qui_complete_en_flux_avec(flux).construis(),
+        ConstructeurClientHttp().construis(),
+        une_configuration_albert_client,
+    )
+    propositions = client_albert.recupere_propositions_en_flux([])
+
+    await anext(propositions)
+    await propositions.aclose()
+
+    assert flux.est_ferme
+
+
+@pytest.mark.anyio
+async def test_leve_une_erreur_de_communication_avec_le_modele_si_timeout_lorsque_l_on_recupere_les_propositions_en_flux(
+    une_configuration_albert_client,
+):
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().qui_timeout().construis(),
+        ConstructeurClientHttp().construis(),
+        une_configuration_albert_client,
+    )
+
+    with pytest.raises(ErreurCommunicationModele):
+        async for _ in client_albert.recupere_propositions_en_flux([]):
+            pass
+
+
+@pytest.mark.anyio
+async def test_leve_une_erreur_de_communication_avec_le_modele_si_albert_echoue_lorsque_l_on_recupere_les_propositions_en_flux(
+    une_configuration_albert_client,
+):
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().qui_echoue().construis(),
+        ConstructeurClientHttp().construis(),
+        une_configuration_albert_client,
+    )
+
+    with pytest.raises(ErreurCommunicationModele):
+        async for _ in client_albert.recupere_propositions_en_flux([]):
+            pass
+
+
+@pytest.mark.anyio
+async def test_leve_une_erreur_de_communication_avec_le_modele_si_albert_echoue_en_cours_de_flux(
+    une_configuration_albert_client,
+):
+    flux = FluxCompletionDeTest(["Bon"], erreur=une_erreur_interne_d_albert())
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().qui_complete_en_flux_avec(flux).construis(),
+        ConstructeurClientHttp().construis(),
+        une_configuration_albert_client,
+    )
+
+    with pytest.raises(ErreurCommunicationModele):
+        async for _ in client_albert.recupere_propositions_en_flux([]):
+            pass
+    assert flux.est_ferme
+
+
+@pytest.mark.anyio
+async def test_leve_une_erreur_recherche_documents_si_timeout(
     une_configuration_albert_client,
 ):
     payload = RecherchePayload(
@@ -86,10 +196,13 @@ def test_leve_une_erreur_recherche_documents_si_timeout(
         une_configuration_albert_client,
     )
     with pytest.raises(ErreurRechercheDocuments):
-        mock_service_avec_reponse.recherche(payload)
+        await mock_service_avec_reponse.recherche(payload)
 
 
-def test_recherche_appelle_la_route_search_d_albert(une_configuration_albert_client):
+@pytest.mark.anyio
+async def test_recherche_appelle_la_route_search_d_albert(
+    une_configuration_albert_client,
+):
     mock_client_http = (
         ConstructeurClientHttp().qui_retourne(FAUX_RETOURS_ALBERT_API).construis()
     )
@@ -103,14 +216,15 @@ def test_recherche_appelle_la_route_search_d_albert(une_configuration_albert_cli
     )
 
     payload = RecherchePayload([], 0, "un prompt", "semantic")
-    mock_client_albert_api.recherche(payload)
+    await mock_client_albert_api.recherche(payload)
 
     mock_client_albert_api.client_http.post.assert_called_once()
     _, call_kwargs = mock_client_albert_api.client_http.post.call_args
     assert call_kwargs["json"] == payload._asdict()
 
 
-def test_recherche_retourne_une_liste_de_chunks_et_de_scores_associes(
+@pytest.mark.anyio
+async def test_recherche_retourne_une_liste_de_chunks_et_de_scores_associes(
     une_configuration_albert_client,
 ):
     mock_client_http = (
@@ -127,7 +241,7 @@ def test_recherche_retourne_une_liste_de_chunks_et_de_scores_associes(
     )
 
     payload = RecherchePayload([], 0, "un prompt", "semantic")
-    retour = mock_client_albert_api.recherche(payload)
+    retour = await mock_client_albert_api.recherche(payload)
 
     chunks = list(map(lambda r: r.chunk, retour))
     scores = list(map(lambda r: r.score, retour))
@@ -141,24 +255,27 @@ def test_recherche_retourne_une_liste_de_chunks_et_de_scores_associes(
     assert scores == [0.9]
 
 
+@pytest.mark.anyio
 @pytest.mark.parametrize(
-    "erreur",
+    "erreur,code",
     [
         pytest.param(
             "404 Client Error: Not Found for url: https://albert.api.etalab.gouv.fr/v1/search",
+            404,
             id="si_api_retourne_404",
         ),
         pytest.param(
             "500 Server Error: Internal Server Error for url: http://albert.api.etalab.gouv.fr/v1/search",
+            500,
             id="si_api_retourne_500",
         ),
     ],
 )
-def test_leve_une_erreur_recherche_document_en_cas_de_probleme(
-    erreur, une_configuration_albert_client
+async def test_leve_une_erreur_recherche_document_en_cas_de_probleme(
+    erreur, code, une_configuration_albert_client
 ):
     mock_client_http = (
-        ConstructeurClientHttp().qui_retourne_une_erreur(erreur).construis()
+        ConstructeurClientHttp().qui_retourne_une_erreur(erreur, code).construis()
     )
     mock_client_openai_sans_reponse = (
         ConstructeurClientOpenai().qui_ne_complete_pas().construis()
@@ -172,10 +289,11 @@ def test_leve_une_erreur_recherche_document_en_cas_de_probleme(
 
     with pytest.raises(ErreurRechercheDocuments):
         payload = RecherchePayload([], 0, "un prompt", "semantic")
-        mock_client_albert_api.recherche(payload)
+        await mock_client_albert_api.recherche(payload)
 
 
-def test_reclasse_conserve_le_score(une_configuration_albert_client):
+@pytest.mark.anyio
+async def test_reclasse_conserve_le_score(une_configuration_albert_client):
     reponse_rerank = RetourRouteRerank(
         resultats=[
             {"relevance_score": 0.99, "index": 0},
@@ -192,7 +310,7 @@ def test_reclasse_conserve_le_score(une_configuration_albert_client):
     payload = ReclassePayload(
         query="question ?", documents=["doc0", "doc1"], model="rerank"
     )
-    resultat = mock_client_albert_api.reclasse(payload)
+    resultat = await mock_client_albert_api.reclasse(payload)
 
     assert len(resultat.data) == 2
     assert resultat.data[0].score == 0.99
@@ -200,11 +318,12 @@ def test_reclasse_conserve_le_score(une_configuration_albert_client):
     assert resultat.data[1].score == 0.42
 
 
-def test_leve_une_erreur_communication_avec_albert_en_cas_de_probleme_lors_du_reclassement(
+@pytest.mark.anyio
+async def test_leve_une_erreur_communication_avec_albert_en_cas_de_probleme_lors_du_reclassement(
     une_configuration_albert_client,
 ):
     mock_client_http = (
-        ConstructeurClientHttp().qui_retourne_une_erreur("Erreur 401").construis()
+        ConstructeurClientHttp().qui_retourne_une_erreur("Erreur 401", 401).construis()
     )
     mock_client_openai_sans_reponse = (
         ConstructeurClientOpenai().qui_ne_complete_pas().construis()
@@ -218,10 +337,40 @@ def test_leve_une_erreur_communication_avec_albert_en_cas_de_probleme_lors_du_re
 
     with pytest.raises(ErreurCommunicationAlbert):
         payload = ReclassePayload(query="", documents=[], model="modele")
-        mock_client_albert_api.reclasse(payload)
+        await mock_client_albert_api.reclasse(payload)
+
 
+@pytest.mark.anyio
+async def test_les_appels_en_erreur_sont_comptes_par_route_et_par_modele(
+    une_configuration_albert_client,
+):
+    mock_client_albert_api = ClientAlbertApi(
+        ConstructeurClientOpenai().qui_ne_complete_pas().construis(),
+        ConstructeurClientHttp().qui_retourne_une_erreur("Erreur 500").construis(),
+        une_configuration_albert_client,
+    )
+    erreurs_avant = ERREURS_APPELS_ALBERT.valeur(route="/rerank", modele="un-modele")
+    appels_avant = DUREE_APPELS_ALBERT.nombre_observations(
+        route="/rerank", modele="un-modele"
+    )
 
-def test_recherche_jeopardy_retourne_des_resultats_avec_source_id_chunk():
+    with pytest.raises(ErreurCommunicationAlbert):
+        await mock_client_albert_api.reclasse(
+            ReclassePayload(query="", documents=[], model="un-modele")
+        )
+
+    assert (
+        ERREURS_APPELS_ALBERT.valeur(route="/rerank", modele="un-modele")
+        == erreurs_avant + 1
+    )
+    assert (
+        DUREE_APPELS_ALBERT.nombre_observations(route="/rerank", modele="un-modele")
+        == appels_avant + 1
+    )
+
+
+@pytest.mark.anyio
+async def test_recherche_jeopardy_retourne_des_resultats_avec_source_id_chunk():
     client_albert_memoire = ClientAlbertMemoire()
     resultats_jeopardy = [
         ResultatRechercheJeopardy(
@@ -252,9 +401,164 @@ def test_recherche_jeopardy_retourne_des_resultats_avec_source_id_chunk():
     payload = RecherchePayload(
         collection_ids=[161155], limit=10, prompt="Ma question ?", method="semantic"
     )
-    resultats = client_albert_memoire.recherche_jeopardy(payload)
+    resultats = await client_albert_memoire.recherche_jeopardy(payload)
 
     assert len(resultats) == 2
     assert resultats[0].chunk.content == "Question générée 1 ?"
     assert resultats[0].chunk.metadata.source_id_chunk == 73
     assert resultats[1].chunk.metadata.source_id_chunk == 74
+
+
+@pytest.mark.anyio
+async def test_la_recherche_echoue_immediatement_une_fois_le_disjoncteur_ouvert(
+    une_configuration_albert_client,
+):
+    mock_client_http = ConstructeurClientHttp().qui_timeout().construis()
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().construis(),
+        mock_client_http,
+        une_configuration_albert_client._replace(seuil_echecs_disjoncteur=2),
+    )
+    payload = RecherchePayload(
+        collection_ids=[42], limit=5, prompt="question", method="semantic"
+    )
+
+    for _ in range(3):
+        with pytest.raises(ErreurRechercheDocuments):
+            await client_albert.recherche(payload)
+
+    etats = {etat.route: etat.etat for etat in client_albert.etats_disjoncteurs()}
+    assert mock_client_http.post.call_count == 2
+    assert etats["/search"] == EtatDisjoncteur.OUVERT
+
+
+@pytest.mark.anyio
+async def test_le_disjoncteur_d_une_route_n_affecte_pas_les_autres_routes(
+    une_configuration_albert_client,
+):
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().qui_timeout().construis(),
+        ConstructeurClientHttp()
+        .qui_retourne(RetourRouteRerank([{"index": 0, "relevance_score": 0.9}]))
+        .construis(),
+        une_configuration_albert_client._replace(seuil_echecs_disjoncteur=1),
+    )
+
+    with pytest.raises(ErreurCommunicationModele):
+        await client_albert.recupere_propositions([])
+    reponse = await client_albert.reclasse(
+        ReclassePayload(query="question", documents=["a"], model="rerank")
+    )
+
+    etats = {etat.route: etat.etat for etat in client_albert.etats_disjoncteurs()}
+    assert etats["/chat/completions"] == EtatDisjoncteur.OUVERT
+    assert len(reponse.data) == 1
+
+
+@pytest.mark.anyio
+async def test_une_recherche_coupee_par_nos_delais_ouvre_le_disjoncteur(
+    une_configuration_albert_client,
+):
+    async def _repond_trop_tard(*args, **kwargs):
+        await asyncio.sleep(1)
+
+    mock_client_http = ConstructeurClientHttp().construis()
+    mock_client_http.post.side_effect = _repond_trop_tard
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().construis(),
+        mock_client_http,
+        une_configuration_albert_client._replace(
+            seuil_echecs_disjoncteur=2, duree_appel_lent_disjoncteur=0.01
+        ),
+    )
+    payload = RecherchePayload(
+        collection_ids=[42], limit=5, prompt="question", method="semantic"
+    )
+
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client_albert.recherche(payload), timeout=0.05)
+
+    etats = {etat.route: etat.etat for etat in client_albert.etats_disjoncteurs()}
+    assert etats["/search"] == EtatDisjoncteur.OUVERT
+
+
+@pytest.mark.anyio
+async def test_une_erreur_en_cours_de_flux_est_comptee_par_le_disjoncteur(
+    une_configuration_albert_client,
+):
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai()
+        .qui_complete_en_flux_avec(
+            FluxCompletionDeTest(["Bon"], erreur=une_erreur_interne_d_albert())
+        )
+        .construis(),
+        ConstructeurClientHttp().construis(),
+        une_configuration_albert_client._replace(seuil_echecs_disjoncteur=1),
+    )
+
+    with pytest.raises(ErreurCommunicationModele):
+        async for _ in client_albert.recupere_propositions_en_flux([]):
+            pass
+
+    etats = {etat.route: etat.etat for etat in client_albert.etats_disjoncteurs()}
+    assert etats["/chat/completions"] == EtatDisjoncteur.OUVERT
+
+
+@pytest.mark.anyio
+async def test_une_recherche_proche_d_une_recherche_en_cache_n_interroge_pas_albert(
+    une_configuration_albert_client,
+):
+    mock_client_http = (
+        ConstructeurClientHttp().qui_retourne(FAUX_RETOURS_ALBERT_API).construis()
+    )
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().construis(),
+        mock_client_http,
+        une_configuration_albert_client,
+        cache_recherche=AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+    )
+
+    premiers_resultats = await client_albert.recherche(
+        RecherchePayload(
+            collection_ids=[42],
+            limit=5,
+            prompt="Qu'est-ce que le MFA ?",
+            method="semantic",
+        )
+    )
+    seconds_resultats = await client_albert.recherche(
+        RecherchePayload(
+            collection_ids=[42],
+            limit=5,
+            prompt="qu'est-ce que le  mfa",
+            method="semantic",
+        )
+    )
+
+    assert mock_client_http.post.call_count == 1
+    assert seconds_resultats == premiers_resultats
+
+
+@pytest.mark.anyio
+async def test_la_purge_d_une_collection_invalide_ses_recherches_en_cache(
+    une_configuration_albert_client,
+):
+    mock_client_http = (
+        ConstructeurClientHttp().qui_retourne(FAUX_RETOURS_ALBERT_API).construis()
+    )
+    client_albert = ClientAlbertApi(
+        ConstructeurClientOpenai().construis(),
+        mock_client_http,
+        une_configuration_albert_client,
+        cache_recherche=AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+    )
+    payload = RecherchePayload(
+        collection_ids=[42], limit=5, prompt="question", method="semantic"
+    )
+    await client_albert.recherche(payload)
+
+    client_albert.purge_cache_recherche(42)
+    await client_albert.recherche(payload)
+
+    assert mock_client_http.post.call_count == 2
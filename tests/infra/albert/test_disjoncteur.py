@@ -0,0 +1,193 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import BadRequestError
+
+from infra.albert.disjoncteur import (
+    Disjoncteur,
+    DisjoncteurOuvert,
+    EtatDisjoncteur,
+)
+
+
+class HorlogeDeTest:
+    def __init__(self):
+        self.maintenant = 0.0
+
+    def __call__(self) -> float:
+        return self.maintenant
+
+
+def _un_disjoncteur(horloge=None) -> Disjoncteur:
+    return Disjoncteur(
+        "/search",
+        seuil_echecs=2,
+        duree_ouverture=10,
+        duree_appel_lent=3,
+        horloge=horloge or HorlogeDeTest(),
+    )
+
+
+def _echoue(disjoncteur: Disjoncteur) -> None:
+    with pytest.raises(httpx.TimeoutException):
+        with disjoncteur.protege():
+            raise httpx.TimeoutException("timeout simulé")
+
+
+def _reussit(disjoncteur: Disjoncteur) -> None:
+    with disjoncteur.protege():
+        pass
+
+
+def test_le_disjoncteur_s_ouvre_apres_le_seuil_d_echecs_consecutifs():
+    disjoncteur = _un_disjoncteur()
+
+    _echoue(disjoncteur)
+    assert disjoncteur.etat is EtatDisjoncteur.FERME
+    _echoue(disjoncteur)
+
+    assert disjoncteur.etat is EtatDisjoncteur.OUVERT
+
+
+def test_un_succes_remet_a_zero_les_echecs_consecutifs():
+    disjoncteur = _un_disjoncteur()
+
+    _echoue(disjoncteur)
+    _reussit(disjoncteur)
+    _echoue(disjoncteur)
+
+    assert disjoncteur.etat is EtatDisjoncteur.FERME
+
+
+def test_un_disjoncteur_ouvert_rejette_les_appels_sans_les_executer():
+    disjoncteur = _un_disjoncteur()
+    _echoue(disjoncteur)
+    _echoue(disjoncteur)
+    appels = []
+
+    with pytest.raises(DisjoncteurOuvert):
+        with disjoncteur.protege():
+            appels.append("appel")
+
+    assert appels == []
+    assert disjoncteur.etat_courant.nombre_rejets == 1
+
+
+def test_une_erreur_qui_n_est_pas_une_defaillance_d_albert_n_est_pas_comptee():
+    disjoncteur = _un_disjoncteur()
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            with disjoncteur.protege():
+                raise ValueError("Erreur de mapping")
+
+    assert disjoncteur.etat is EtatDisjoncteur.FERME
+
+
+def _une_erreur_http(code: int) -> httpx.HTTPStatusError:
+    requete = httpx.Request("POST", "/search")
+    return httpx.HTTPStatusError(
+        f"Erreur {code}",
+        request=requete,
+        response=httpx.Response(code, request=requete),
+    )
+
+
+@pytest.mark.parametrize("code", [500, 503, 429])
+def test_une_erreur_serveur_ou_une_limitation_de_debit_est_une_defaillance(code):
+    disjoncteur = _un_disjoncteur()
+
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            with disjoncteur.protege():
+                raise _une_erreur_http(code)
+
+    assert disjoncteur.etat is EtatDisjoncteur.OUVERT
+
+
+@pytest.mark.parametrize("code", [400, 401, 404, 422])
+def test_une_autre_erreur_client_n_est_pas_une_defaillance(code):
+    disjoncteur = _un_disjoncteur()
+
+    for _ in range(3):
+        with pytest.raises(httpx.HTTPStatusError):
+            with disjoncteur.protege():
+                raise _une_erreur_http(code)
+
+    assert disjoncteur.etat is EtatDisjoncteur.FERME
+
+
+def test_une_requete_refusee_par_le_modele_n_est_pas_une_defaillance():
+    disjoncteur = _un_disjoncteur()
+
+    for _ in range(3):
+        with pytest.raises(BadRequestError):
+            with disjoncteur.protege():
+                raise BadRequestError(
+                    "Format de réponse non pris en charge",
+                    response=httpx.Response(
+                        400, request=httpx.Request("POST", "/chat/completions")
+                    ),
+                    body=None,
+                )
+
+    assert disjoncteur.etat is EtatDisjoncteur.FERME
+
+
+def test_un_appel_d_essai_reussi_referme_le_disjoncteur():
+    horloge = HorlogeDeTest()
+    disjoncteur = _un_disjoncteur(horloge)
+    _echoue(disjoncteur)
+    _echoue(disjoncteur)
+    horloge.maintenant = 10
+
+    with disjoncteur.protege():
+        assert disjoncteur.etat is EtatDisjoncteur.SEMI_OUVERT
+        with pytest.raises(DisjoncteurOuvert):
+            with disjoncteur.protege():
+                pass
+
+    assert disjoncteur.etat is EtatDisjoncteur.FERME
+
+
+def test_un_appel_d_essai_en_echec_rouvre_le_disjoncteur():
+    horloge = HorlogeDeTest()
+    disjoncteur = _un_disjoncteur(horloge)
+    _echoue(disjoncteur)
+    _echoue(disjoncteur)
+    horloge.maintenant = 10
+
+    _echoue(disjoncteur)
+
+    assert disjoncteur.etat is EtatDisjoncteur.OUVERT
+    horloge.maintenant = 15
+    with pytest.raises(DisjoncteurOuvert):
+        _reussit(disjoncteur)
+
+
+def _est_annule(disjoncteur: Disjoncteur, horloge: HorlogeDeTest, duree: float):
+    with pytest.raises(asyncio.CancelledError):
+        with disjoncteur.protege():
+            horloge.maintenant += duree
+            raise asyncio.CancelledError()
+
+
+def test_un_appel_annule_apres_un_long_delai_est_une_defaillance():
+    horloge = HorlogeDeTest()
+    disjoncteur = _un_disjoncteur(horloge)
+
+    _est_annule(disjoncteur, horloge, duree=3)
+    _est_annule(disjoncteur, horloge, duree=5)
+
+    assert disjoncteur.etat is EtatDisjoncteur.OUVERT
+
+
+def test_un_appel_annule_rapidement_n_est_pas_une_defaillance():
+    horloge = HorlogeDeTest()
+    disjoncteur = _un_disjoncteur(horloge)
+
+    for _ in range(3):
+        _est_annule(disjoncteur, horloge, duree=0.5)
+
+    assert disjoncteur.etat is EtatDisjoncteur.FERME
@@ -1,5 +1,10 @@
-from openai import OpenAI
-from infra.albert.client_albert import fabrique_client_albert, ClientAlbertHttp
+from openai import AsyncOpenAI
+from infra.albert.client_albert import (
+    fabrique_client_albert,
+    ClientAlbertHttp,
+    StatistiquesConnexions,
+    TransportAlbert,
+)
 
 
 def test_peut_fabriquer_un_client_albert_avec_une_configuration_par_defaut(
@@ -7,5 +12,30 @@ def test_peut_fabriquer_un_client_albert_avec_une_configuration_par_defaut(
 ) -> None:
     client = fabrique_client_albert(une_configuration_albert_client)
 
-    assert isinstance(client.client_openai, OpenAI)
+    assert isinstance(client.client_openai, AsyncOpenAI)
     assert isinstance(client.client_http, ClientAlbertHttp)
+
+
+def test_le_client_http_et_le_client_openai_partagent_le_meme_pool_de_connexions(
+    une_configuration_albert_client,
+) -> None:
+    configuration = une_configuration_albert_client._replace(taille_pool_connexions=12)
+
+    client = fabrique_client_albert(configuration)
+
+    assert isinstance(client.transport, TransportAlbert)
+    assert client.client_http._transport is client.transport
+    assert client.client_openai._client._transport is client.transport
+    assert client.statistiques_connexions() == StatistiquesConnexions(
+        taille_pool=12, nombre_requetes=0, nombre_connexions_ouvertes=0
+    )
+
+
+def test_le_taux_de_reutilisation_mesure_la_part_des_requetes_sans_nouvelle_connexion() -> (
+    None
+):
+    statistiques = StatistiquesConnexions(
+        taille_pool=10, nombre_requetes=8, nombre_connexions_ouvertes=2
+    )
+
+    assert statistiques.taux_reutilisation == 0.75
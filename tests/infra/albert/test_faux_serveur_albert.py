@@ -0,0 +1,222 @@
+import json
+import random
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from infra.albert.client_albert import (
+    ROUTE_RECHERCHE,
+    ClientAlbertApi,
+    ClientAlbertHttp,
+)
+from infra.albert.faux_serveur_albert import (
+    CacheDePrefixes,
+    ComportementRoute,
+    CorpusFauxServeur,
+    LoiDeLatence,
+    ParametresFauxServeur,
+    fabrique_faux_serveur_albert,
+    lis_les_parametres,
+)
+from schemas.albert import RecherchePayload, ReclassePayload
+from services.exceptions import ErreurRechercheDocuments
+
+URL_FAUX_SERVEUR = "http://faux-albert"
+CORPUS = CorpusFauxServeur.depuis_lignes(
+    [
+        json.dumps(
+            {
+                "id": 1,
+                "content": "Activez l'authentification multifacteur (MFA).",
+                "metadata": {
+                    "document_id": 10,
+                    "source_url": "https://cyber.gouv.fr/mfa",
+                    "page": 3,
+                    "nom_document": "mfa.pdf",
+                },
+            }
+        ),
+        json.dumps(
+            {
+                "id": 2,
+                "content": "Sauvegardez régulièrement vos données.",
+                "metadata": {
+                    "document_id": 10,
+                    "source_url": "https://cyber.gouv.fr/sauvegardes",
+                    "page": 7,
+                    "nom_document": "sauvegardes.pdf",
+                },
+            }
+        ),
+    ]
+)
+
+
+def _un_client_albert(
+    configuration, parametres: ParametresFauxServeur
+) -> ClientAlbertApi:
+    serveur = fabrique_faux_serveur_albert(CORPUS, parametres)
+    return ClientAlbertApi(
+        AsyncOpenAI(
+            base_url=URL_FAUX_SERVEUR,
+            api_key="cle",
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                transport=httpx.ASGITransport(app=serveur)
+            ),
+        ),
+        ClientAlbertHttp(
+            URL_FAUX_SERVEUR, "cle", transport=httpx.ASGITransport(app=serveur)
+        ),
+        configuration,
+    )
+
+
+def _une_recherche(prompt: str) -> RecherchePayload:
+    return RecherchePayload(
+        collection_ids=[42], limit=5, prompt=prompt, method="semantic"
+    )
+
+
+@pytest.mark.anyio
+async def test_le_client_albert_recherche_dans_le_corpus_du_faux_serveur(
+    une_configuration_albert_client,
+):
+    client = _un_client_albert(une_configuration_albert_client, ParametresFauxServeur())
+
+    resultats = await client.recherche(_une_recherche("Comment activer le MFA ?"))
+
+    assert (
+        resultats[0].chunk.content == "Activez l'authentification multifacteur (MFA)."
+    )
+    assert resultats[0].chunk.metadata.nom_document == "mfa.pdf"
+    assert 0 < resultats[0].score <= 1
+
+
+@pytest.mark.anyio
+async def test_le_client_albert_recupere_un_chunk_et_reclasse_aupres_du_faux_serveur(
+    une_configuration_albert_client,
+):
+    client = _un_client_albert(une_configuration_albert_client, ParametresFauxServeur())
+
+    chunk = await client.recherche_chunk_par_id("10", 2)
+    reclassement = await client.reclasse(
+        ReclassePayload(
+            query="sauvegardes des données",
+            documents=["Activez le MFA.", "Sauvegardez vos données."],
+            model="reclasseur",
+        )
+    )
+
+    assert chunk.chunk.metadata.page == 7
+    assert [r.index for r in reclassement.data] == [1, 0]
+
+
+@pytest.mark.anyio
+async def test_le_faux_serveur_complete_avec_et_sans_flux(
+    une_configuration_albert_client,
+):
+    client = _un_client_albert(
+        une_configuration_albert_client,
+        ParametresFauxServeur(nombre_mots_reponse=3),
+    )
+    messages = [
+        {"role": "system", "content": "Documents : MFA"},
+        {"role": "user", "content": "Question :\nQu'est-ce que le MFA ?"},
+    ]
+
+    propositions = await client.recupere_propositions(messages)  # type: ignore[arg-type]
+    fragments = [
+        f
+        async for f in client.recupere_propositions_en_flux(messages)  # type: ignore[arg-type]
+    ]
+
+    attendu = "Qu'est-ce que le MFA ? Documents : MFA"
+    assert propositions[0].message.content == attendu
+    assert "".join(fragments) == attendu
+    assert len(fragments) > 1
+
+
+@pytest.mark.anyio
+async def test_le_faux_serveur_simule_des_erreurs_et_des_limites_de_debit(
+    une_configuration_albert_client,
+):
+    en_erreur = _un_client_albert(
+        une_configuration_albert_client,
+        ParametresFauxServeur(
+            comportements={ROUTE_RECHERCHE: ComportementRoute(taux_erreur=1.0)}
+        ),
+    )
+    limite = _un_client_albert(
+        une_configuration_albert_client,
+        ParametresFauxServeur(
+            comportements={
+                ROUTE_RECHERCHE: ComportementRoute(requetes_par_seconde=0.001)
+            }
+        ),
+    )
+
+    with pytest.raises(ErreurRechercheDocuments):
+        await en_erreur.recherche(_une_recherche("MFA"))
+    await limite.recherche(_une_recherche("MFA"))
+    with pytest.raises(ErreurRechercheDocuments):
+        await limite.recherche(_une_recherche("MFA"))
+
+
+def test_les_lois_de_latence_se_lisent_depuis_la_ligne_de_commande():
+    _, parametres = lis_les_parametres(
+        ["corpus.jsonl", "--latence", "/search=lognormale:0.2:1.5"]
+    )
+    latence = parametres.comportements[ROUTE_RECHERCHE].latence
+    tirages = [latence.tire(random.Random(graine)) for graine in range(200)]
+
+    assert latence == LoiDeLatence("lognormale", (0.2, 1.5))
+    assert 0.1 < sorted(tirages)[100] < 0.4
+    with pytest.raises(ValueError):
+        LoiDeLatence.depuis_texte("gaussienne:1")
+
+
+def test_le_cache_de_prefixes_ne_retient_que_le_plus_long_prefixe_deja_vu():
+    cache = CacheDePrefixes(capacite=100, taille_bloc=4)
+
+    assert cache.consulte("aaaabbbbcccc") == 0
+    assert cache.consulte("aaaabbbbdddd") == 8
+    assert cache.consulte("xxxxbbbbcccc") == 0
+    assert cache.consulte("aaaabbbbcccceeee") == 12
+
+
+def test_le_cache_de_prefixes_evince_les_blocs_les_moins_recemment_utilises():
+    cache = CacheDePrefixes(capacite=2, taille_bloc=4)
+
+    cache.consulte("aaaabbbb")
+    cache.consulte("cccc")
+
+    assert cache.consulte("aaaabbbb") == 0
+
+
+@pytest.mark.anyio
+async def test_le_faux_serveur_indique_les_jetons_du_prompt_servis_depuis_le_cache():
+    serveur = fabrique_faux_serveur_albert(
+        CORPUS, ParametresFauxServeur(capacite_cache_de_prefixes=100)
+    )
+    client = AsyncOpenAI(
+        base_url=URL_FAUX_SERVEUR,
+        api_key="cle",
+        http_client=DefaultAsyncHttpxClient(transport=httpx.ASGITransport(app=serveur)),
+    )
+
+    async def _complete(question: str):
+        return await client.chat.completions.create(
+            model="modele",
+            messages=[
+                {"role": "system", "content": "Instructions stables. " * 20},
+                {"role": "user", "content": question},
+            ],
+        )
+
+    premiere = await _complete("Question :\nQu'est-ce que le MFA ?")
+    seconde = await _complete("Question :\nComment sauvegarder ?")
+
+    assert premiere.usage.prompt_tokens_details.cached_tokens == 0
+    assert seconde.usage.prompt_tokens_details.cached_tokens > 100
@@ -0,0 +1,73 @@
+import random
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from infra.albert.faux_serveur_albert import (
+    CorpusFauxServeur,
+    ParametresFauxServeur,
+    fabrique_faux_serveur_albert,
+)
+from infra.albert.mesure_cache_de_prefixes import (
+    ParametresMesure,
+    mesure_les_dispositions,
+    prepare_les_conversations,
+)
+
+PROMPT_SYSTEME = "Consigne stable. " * 100 + "Documents :\n{chunks}"
+
+
+def test_les_conversations_sont_preparees_tour_par_tour():
+    conversations = prepare_les_conversations(
+        ["a", "b", "c"],
+        ParametresMesure(nombre_conversations=2, nombre_tours=3, nombre_paragraphes=2),
+        random.Random(1),
+    )
+
+    assert len(conversations) == 2
+    assert all(len(conversation) == 3 for conversation in conversations)
+    assert all(
+        len(tour.paragraphes) == 2 and tour.question.startswith("Question :\n")
+        for conversation in conversations
+        for tour in conversation
+    )
+
+
+@pytest.mark.anyio
+async def test_le_prefixe_stable_reduit_le_temps_jusqu_au_premier_jeton_des_relances():
+    serveur = fabrique_faux_serveur_albert(
+        CorpusFauxServeur([]),
+        ParametresFauxServeur(
+            nombre_mots_reponse=300,
+            jetons_prefill_par_seconde=10_000,
+            capacite_cache_de_prefixes=10_000,
+        ),
+    )
+    client = AsyncOpenAI(
+        base_url="http://faux-albert",
+        api_key="cle",
+        http_client=DefaultAsyncHttpxClient(transport=httpx.ASGITransport(app=serveur)),
+    )
+    parametres = ParametresMesure(
+        nombre_conversations=1, nombre_tours=3, nombre_paragraphes=3
+    )
+    conversations = prepare_les_conversations(
+        [f"Paragraphe {i} d'un guide." for i in range(20)],
+        parametres,
+        random.Random(1),
+    )
+
+    statistiques = {
+        s.route: s
+        for s in await mesure_les_dispositions(
+            client, PROMPT_SYSTEME, conversations, parametres
+        )
+    }
+
+    assert len(statistiques) == 6
+    assert all(s.nombre_erreurs == 0 for s in statistiques.values())
+    assert (
+        statistiques["prefixe_stable #3"].p50
+        < statistiques["documents_dans_le_systeme #3"].p50
+    )
@@ -0,0 +1,108 @@
+import random
+
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+
+from infra.charge.generateur_de_charge import (
+    ROUTE_AJOUTE_INTERACTION,
+    ROUTE_INITIE_CONVERSATION,
+    ROUTE_RETOUR,
+    ROUTE_SOURCE,
+    GenerateurDeCharge,
+    MesureRequete,
+    ScenarioDeCharge,
+    calcule_les_statistiques,
+    centile,
+    formate_en_tableau,
+)
+
+
+def _un_serveur_de_conversation() -> FastAPI:
+    serveur = FastAPI()
+    reponse = {
+        "reponse": "Réponse",
+        "paragraphes": [{"url": "/source?document=guide.pdf&page=1&interaction=i"}],
+        "question": "Question",
+        "id_interaction": "i",
+        "id_conversation": "c",
+    }
+
+    @serveur.post("/api/conversation/")
+    def initie_conversation() -> dict:
+        return reponse
+
+    @serveur.post("/api/conversation/{id_conversation}", status_code=201)
+    def ajoute_interaction(id_conversation: str) -> dict:
+        return reponse
+
+    @serveur.post("/api/retour/")
+    def ajoute_retour() -> Response:
+        return Response(status_code=500)
+
+    @serveur.get("/source")
+    def source() -> Response:
+        return Response(status_code=301, headers={"Location": "https://cyber.gouv.fr"})
+
+    return serveur
+
+
+@pytest.mark.anyio
+async def test_un_parcours_enchaine_conversation_relances_sources_et_retours():
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=_un_serveur_de_conversation()),
+        base_url="http://serveur",
+    )
+    generateur = GenerateurDeCharge(
+        client,
+        ScenarioDeCharge(
+            questions=["Qu'est-ce que le MFA ?"],
+            relances=["Peux-tu détailler ?"],
+            probabilite_relance=1.0,
+            nombre_maximum_tours=3,
+            probabilite_retour=1.0,
+            probabilite_clic_source=1.0,
+        ),
+        random.Random(0),
+    )
+
+    await generateur.parcours_utilisateur()
+
+    routes = [m.route for m in generateur.mesures]
+    assert routes.count(ROUTE_INITIE_CONVERSATION) == 1
+    assert routes.count(ROUTE_AJOUTE_INTERACTION) == 2
+    assert routes.count(ROUTE_SOURCE) == 3
+    assert routes.count(ROUTE_RETOUR) == 3
+    statistiques = {
+        s.route: s for s in calcule_les_statistiques(generateur.mesures, 1.0)
+    }
+    assert statistiques[ROUTE_SOURCE].taux_erreur == 0
+    assert statistiques[ROUTE_RETOUR].taux_erreur == 1
+
+
+def test_les_centiles_sont_calcules_au_rang_le_plus_proche():
+    durees = [float(d) for d in range(1, 101)]
+
+    assert centile(durees, 0.5) == 50.0
+    assert centile(durees, 0.95) == 95.0
+    assert centile(durees, 0.99) == 99.0
+    assert centile([], 0.5) == 0.0
+
+
+def test_les_statistiques_par_route_sont_restituees_en_tableau():
+    statistiques = calcule_les_statistiques(
+        [
+            MesureRequete(ROUTE_INITIE_CONVERSATION, 0.2, 200),
+            MesureRequete(ROUTE_INITIE_CONVERSATION, 0.4, None),
+            MesureRequete(ROUTE_RETOUR, 0.01, 200),
+        ],
+        duree_totale=2.0,
+    )
+
+    conversation = statistiques[0]
+    assert conversation.route == ROUTE_INITIE_CONVERSATION
+    assert conversation.taux_erreur == 0.5
+    assert conversation.requetes_par_seconde == 1.0
+    tableau = formate_en_tableau(statistiques).splitlines()
+    assert tableau[0].startswith("Route")
+    assert "50.0%" in tableau[1]
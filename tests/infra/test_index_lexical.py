@@ -0,0 +1,54 @@
+from infra.index_lexical import IndexBM25, tokenise
+
+
+def test_tokenise_ignore_accents_casse_et_apostrophes():
+    assert tokenise("Qui est le Directeur de l'ANSSI ? Était-ce...") == [
+        "qui",
+        "est",
+        "le",
+        "directeur",
+        "de",
+        "lanssi",
+        "etait",
+        "ce",
+    ]
+
+
+def test_le_document_le_plus_specifique_est_le_mieux_classe():
+    index = IndexBM25(
+        {
+            "court": (["mot", "de", "passe"], []),
+            "long": (["mot", "de", "passe", "oublie", "que", "faire"], []),
+        }
+    )
+
+    correspondances = index.meilleures_correspondances(["mot", "de", "passe"])
+
+    assert [c.identifiant for c in correspondances] == ["court", "long"]
+    assert correspondances[0].couverture == 1.0
+
+
+def test_le_champ_secondaire_classe_sans_compter_dans_la_couverture():
+    index = IndexBM25(
+        {
+            "directeur": (["qui", "est", "le", "directeur"], ["vincent", "strubel"]),
+            "faille": (["signaler", "une", "faille"], ["cert"]),
+        }
+    )
+
+    correspondance = index.meilleure_correspondance(["vincent", "strubel"], marge=0)
+
+    assert correspondance is not None
+    assert correspondance.identifiant == "directeur"
+    assert correspondance.couverture == 0
+
+
+def test_aucune_correspondance_si_les_deux_meilleurs_sont_trop_proches():
+    index = IndexBM25(
+        {
+            "a": (["directeur", "anssi", "avant"], []),
+            "b": (["directeur", "anssi", "apres"], []),
+        }
+    )
+
+    assert index.meilleure_correspondance(["directeur", "anssi"], marge=0.2) is None
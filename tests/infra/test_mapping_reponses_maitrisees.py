@@ -1,5 +1,5 @@
 import json
-from client_albert_de_test import ConstructeurClientHttp, RetourHttpJson
+from client_albert_de_test import SessionDeTestQuiCompte
 
 from infra.mapping_reponses_maitrisees import MappingReponsesMaitrisees
 
@@ -23,16 +23,39 @@ def test_resoudre_retourne_none_pour_un_id_inconnu(tmp_path):
 
 
 def test_depuis_url_charge_le_mapping_depuis_une_url():
-    session = (
-        ConstructeurClientHttp()
-        .qui_retourne_sur_get(
-            RetourHttpJson({"qui-est-le-directeur": "Vincent Strubel."})
-        )
-        .construis()
-    )
+    session = SessionDeTestQuiCompte({"qui-est-le-directeur": "Vincent Strubel."})
 
     mapping = MappingReponsesMaitrisees.depuis_url(
         "https://example.com/mapping.json", session
     )
 
     assert mapping.resoudre("qui-est-le-directeur") == "Vincent Strubel."
+
+
+def test_cherche_retrouve_la_reponse_maitrisee_d_une_question_reformulee():
+    mapping = MappingReponsesMaitrisees(
+        {
+            "qui-est-le-directeur-de-lanssi": "Vincent Strubel.",
+            "qui-etait-le-directeur-de-lanssi-avant-vincent-strubel": "Guillaume Poupard.",
+            "comment-signaler-une-faille-de-securite": "Contactez le CERT-FR.",
+        }
+    )
+
+    trouvee = mapping.cherche("Qui était le directeur avant Vincent Strubel ?")
+
+    assert trouvee is not None
+    assert trouvee.reponse == "Guillaume Poupard."
+    assert trouvee.confiance == 1.0
+
+
+def test_cherche_donne_une_faible_confiance_a_une_question_sans_rapport():
+    mapping = MappingReponsesMaitrisees(
+        {
+            "qui-est-le-directeur-de-lanssi": "Vincent Strubel.",
+            "comment-signaler-une-faille-de-securite": "Contactez le CERT-FR.",
+        }
+    )
+
+    trouvee = mapping.cherche("Comment sécuriser mon mot de passe ?")
+
+    assert trouvee is None or trouvee.confiance < 0.5
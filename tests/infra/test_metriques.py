@@ -0,0 +1,66 @@
+from infra.metriques import (
+    Compteur,
+    Histogramme,
+    Jauge,
+    MetriqueCalculee,
+    RegistreMetriques,
+)
+
+
+def test_un_compteur_expose_une_serie_par_combinaison_d_etiquettes():
+    compteur = Compteur("appels_total", "Appels", ["route"])
+
+    compteur.incremente(route="/search")
+    compteur.incremente(2, route="/search")
+    compteur.incremente(route='/chemin "bizarre"')
+
+    assert compteur.expose().splitlines() == [
+        "# HELP appels_total Appels",
+        "# TYPE appels_total counter",
+        'appels_total{route="/search"} 3',
+        'appels_total{route="/chemin \\"bizarre\\""} 1',
+    ]
+
+
+def test_une_jauge_sans_etiquette_est_exposee_a_zero_et_suit_les_executions_en_cours():
+    jauge = Jauge("en_cours", "En cours")
+
+    with jauge.suit():
+        pendant = jauge.valeur()
+
+    assert pendant == 1
+    assert jauge.expose().splitlines()[-1] == "en_cours 0"
+
+
+def test_un_histogramme_expose_des_compteurs_cumules_par_borne():
+    histogramme = Histogramme("duree_secondes", "Durée", ["route"], bornes=[0.1, 1])
+
+    histogramme.observe(0.05, route="/")
+    histogramme.observe(0.5, route="/")
+    histogramme.observe(3, route="/")
+
+    assert histogramme.expose().splitlines()[2:] == [
+        'duree_secondes_bucket{route="/",le="0.1"} 1',
+        'duree_secondes_bucket{route="/",le="1"} 2',
+        'duree_secondes_bucket{route="/",le="+Inf"} 3',
+        'duree_secondes_sum{route="/"} 3.55',
+        'duree_secondes_count{route="/"} 3',
+    ]
+
+
+def test_le_registre_expose_les_metriques_calculees_a_la_lecture():
+    registre = RegistreMetriques()
+    statistiques = {"recherche": 0.25}
+    registre.enregistre(
+        MetriqueCalculee(
+            "cache_taux_succes",
+            "Taux de succès",
+            "gauge",
+            ["espace"],
+            lambda: [((espace,), taux) for espace, taux in statistiques.items()],
+        )
+    )
+
+    statistiques["recherche"] = 0.75
+
+    assert 'cache_taux_succes{espace="recherche"} 0.75\n' in registre.expose()
@@ -0,0 +1,97 @@
+import json
+
+import httpx
+import pytest
+
+from infra.traces import (
+    ExportateurTracesFichier,
+    ExportateurTracesOtlp,
+    Span,
+    configure_l_exportateur_de_traces,
+    trace,
+)
+
+
+def test_sans_exportateur_les_traces_ne_font_rien():
+    configure_l_exportateur_de_traces(None)
+
+    with trace("etape") as span:
+        assert span is None
+
+
+def test_les_spans_imbriques_partagent_la_trace_de_leur_parent(
+    un_exportateur_de_traces,
+):
+    with trace("parent") as parent:
+        with trace("enfant", {"cle": "valeur"}):
+            pass
+
+    enfant, parent_exporte = un_exportateur_de_traces.spans
+    assert parent_exporte is parent
+    assert enfant.id_trace == parent.id_trace
+    assert enfant.id_parent == parent.id_span
+    assert parent.id_parent is None
+    assert enfant.attributs == {"cle": "valeur"}
+
+
+def test_un_span_continue_la_trace_recue(un_exportateur_de_traces):
+    traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+    with trace("requete", traceparent=traceparent) as span:
+        pass
+
+    assert span is not None
+    assert span.id_trace == "0af7651916cd43dd8448eb211c80319c"
+    assert span.id_parent == "b7ad6b7169203331"
+
+
+def test_un_span_interrompu_par_une_erreur_est_en_erreur(un_exportateur_de_traces):
+    with pytest.raises(ValueError):
+        with trace("etape"):
+            raise ValueError("boum")
+
+    assert un_exportateur_de_traces.spans[0].en_otlp()["status"] == {
+        "code": 2,
+        "message": "ValueError: boum",
+    }
+
+
+def test_l_exportateur_fichier_ecrit_une_requete_otlp_par_lot(tmp_path):
+    chemin = tmp_path / "traces.jsonl"
+    exportateur = ExportateurTracesFichier(chemin, "mqc", intervalle=0.01)
+
+    exportateur.exporte(Span("etape", "a" * 32, None, {"nombre": 3}))
+    exportateur.ferme()
+
+    requete = json.loads(chemin.read_text())
+    ressource = requete["resourceSpans"][0]
+    assert ressource["resource"]["attributes"][0]["value"] == {"stringValue": "mqc"}
+    span = ressource["scopeSpans"][0]["spans"][0]
+    assert span["name"] == "etape"
+    assert span["traceId"] == "a" * 32
+    assert span["attributes"] == [{"key": "nombre", "value": {"intValue": "3"}}]
+
+
+def test_l_exportateur_otlp_envoie_les_spans_au_collecteur():
+    requetes: list[httpx.Request] = []
+
+    def _collecteur(requete: httpx.Request) -> httpx.Response:
+        requetes.append(requete)
+        return httpx.Response(200, json={})
+
+    exportateur = ExportateurTracesOtlp(
+        "http://collecteur:4318/",
+        "mqc",
+        client=httpx.Client(transport=httpx.MockTransport(_collecteur)),
+        intervalle=0.01,
+    )
+
+    exportateur.exporte(Span("etape", "b" * 32, "c" * 16))
+    exportateur.ferme()
+
+    assert len(requetes) == 1
+    assert str(requetes[0].url) == "http://collecteur:4318/v1/traces"
+    span = json.loads(requetes[0].content)["resourceSpans"][0]["scopeSpans"][0][
+        "spans"
+    ][0]
+    assert span["parentSpanId"] == "c" * 16
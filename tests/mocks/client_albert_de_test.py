@@ -1,10 +1,12 @@
+import asyncio
 import random
-from typing import NamedTuple, Optional
-from unittest.mock import Mock
-import requests
-from openai import APITimeoutError, OpenAI
+from typing import AsyncGenerator, NamedTuple, Optional
+from unittest.mock import AsyncMock, Mock
+import httpx
+from openai import APITimeoutError, AsyncOpenAI, BadRequestError, InternalServerError
 from openai.types.chat import ChatCompletionMessageParam
 from openai.types.chat.chat_completion import Choice, ChatCompletionMessage
+from openai.types.shared_params import ResponseFormatJSONSchema
 from schemas.albert import (
     RecherchePayload,
     ResultatRecherche,
@@ -85,7 +87,9 @@ class SessionDeTestQuiCompte:
 
 class ConstructeurClientHttp:
     def __init__(self):
-        self._mock = Mock(requests.Session)
+        self._mock = Mock(httpx.AsyncClient)
+        self._mock.post = AsyncMock()
+        self._mock.get = AsyncMock()
 
     def qui_retourne(self, retour):
         self._mock.post.return_value = retour
@@ -95,12 +99,15 @@ class ConstructeurClientHttp:
         self._mock.get.return_value = retour
         return self
 
-    def qui_retourne_une_erreur(self, erreur):
-        self._mock.post.side_effect = requests.HTTPError(erreur)
+    def qui_retourne_une_erreur(self, erreur, code: int = 500):
+        requete = httpx.Request("POST", "/")
+        self._mock.post.side_effect = httpx.HTTPStatusError(
+            erreur, request=requete, response=httpx.Response(code, request=requete)
+        )
         return self
 
     def qui_timeout(self):
-        self._mock.post.side_effect = requests.Timeout("timeout simulé")
+        self._mock.post.side_effect = httpx.TimeoutException("timeout simulé")
         return self
 
     def construis(self):
@@ -120,32 +127,92 @@ class Reponse:
         self.choices = choix
 
 
+class FluxCompletionDeTest:
+    class Morceau:
+        class Choix:
+            class Delta:
+                def __init__(self, c: str | None):
+                    self.content = c
+
+            def __init__(self, c: str | None):
+                self.delta = FluxCompletionDeTest.Morceau.Choix.Delta(c)
+
+        def __init__(self, c: str | None):
+            self.choices = [FluxCompletionDeTest.Morceau.Choix(c)]
+
+    def __init__(self, fragments: list[str | None], erreur: Exception | None = None):
+        self._fragments = fragments
+        self._erreur = erreur
+        self.est_ferme = False
+
+    async def __aiter__(self):
+        for fragment in self._fragments:
+            yield FluxCompletionDeTest.Morceau(fragment)
+        if self._erreur is not None:
+            raise self._erreur
+
+    async def close(self):
+        self.est_ferme = True
+
+
 class ConstructeurClientOpenai:
     def __init__(self):
-        self._mock = Mock(OpenAI)
+        self._mock = Mock(AsyncOpenAI)
 
     def qui_ne_complete_pas(self):
-        self._mock.chat.completions.create = Mock(return_value=Reponse([]))
+        self._mock.chat.completions.create = AsyncMock(return_value=Reponse([]))
         return self
 
     def qui_complete_avec(self, reponse):
-        self._mock.chat.completions.create = Mock(
+        self._mock.chat.completions.create = AsyncMock(
             return_value=Reponse([Reponse.Message(reponse)])
         )
         return self
 
+    def qui_complete_en_flux_avec(self, flux: FluxCompletionDeTest):
+        self._mock.chat.completions.create = AsyncMock(return_value=flux)
+        return self
+
     def qui_timeout(self):
-        self._mock.chat.completions.create = Mock(
+        self._mock.chat.completions.create = AsyncMock(
             side_effect=APITimeoutError(
                 "Simulation d'un délai de réponse trop long d'OpenAI."
             )
         )
         return self
 
+    def qui_refuse_la_requete(self):
+        self._mock.chat.completions.create = AsyncMock(
+            side_effect=BadRequestError(
+                "Simulation d'une requête refusée par OpenAI.",
+                response=httpx.Response(
+                    400, request=httpx.Request("POST", "/chat/completions")
+                ),
+                body=None,
+            )
+        )
+        return self
+
+    def qui_echoue(self):
+        self._mock.chat.completions.create = AsyncMock(
+            side_effect=une_erreur_interne_d_albert()
+        )
+        return self
+
     def construis(self):
         return self._mock
 
 
+def une_erreur_interne_d_albert() -> InternalServerError:
+    return InternalServerError(
+        "Simulation d'une erreur interne d'OpenAI.",
+        response=httpx.Response(
+            500, request=httpx.Request("POST", "/chat/completions")
+        ),
+        body=None,
+    )
+
+
 class ClientAlbertMemoire(ClientAlbert):
     def __init__(self):
         self.payload_reclassement_recu = None
@@ -164,15 +231,30 @@ class ClientAlbertMemoire(ClientAlbert):
         self.messages_envoyes_pour_les_propositions = []
         self.contextes_recus = []
         self.temperatures_recues = []
+        self.formats_reponse_recus = []
         self.appels_recherche = 0
         self.resultats_par_appel = []
         self.chunks_par_id = []
         self.appels_recherche_chunk_par_id = []
         self.id_document_recu = None
         self.id_chunk_recu = None
-
-    def recherche(self, payload: RecherchePayload) -> list[ResultatRecherche]:
+        self.delais_chunks_par_id: dict[int, float] = {}
+        self.recuperations_de_chunks_en_cours = 0
+        self.recuperations_de_chunks_simultanees_maximum = 0
+        self.delai_recherche = 0.0
+        self.delais_recherche_par_appel: list[float] = []
+        self.delai_recherche_jeopardy = 0.0
+        self.leve_une_erreur_sur_recherche_jeopardy = False
+        self.taille_fragments_en_flux = 5
+        self.fragments_emis_en_flux = 0
+
+    async def recherche(self, payload: RecherchePayload) -> list[ResultatRecherche]:
         self.payload_recu = payload
+        await asyncio.sleep(
+            self.delais_recherche_par_appel.pop(0)
+            if self.delais_recherche_par_appel
+            else self.delai_recherche
+        )
         if self.leve_une_erreur_sur_recherche:
             raise ErreurRechercheDocuments(
                 "Une erreur est survenue lors de la recherche des guides de l'ANSSI."
@@ -189,38 +271,71 @@ class ClientAlbertMemoire(ClientAlbert):
 
         return self.resultats if self.resultats_vides is False else []
 
-    def recherche_jeopardy(
+    async def recherche_jeopardy(
         self, payload: RecherchePayload
     ) -> list[ResultatRechercheJeopardy]:
         self.payload_jeopardy_recu = payload
+        await asyncio.sleep(self.delai_recherche_jeopardy)
+        if self.leve_une_erreur_sur_recherche_jeopardy:
+            raise ErreurRechercheDocuments(
+                "Une erreur est survenue lors de la recherche jeopardy."
+            )
         return self.resultats_jeopardy[: payload.limit]
 
-    def recherche_chunk_par_id(
+    async def recherche_chunk_par_id(
         self, id_document: str, id_chunk: int
     ) -> ResultatRecherche:
         self.id_document_recu = id_document
         self.id_chunk_recu = id_chunk
         self.appels_recherche_chunk_par_id.append((id_document, id_chunk))
-        if self.chunks_par_id:
-            return self.chunks_par_id.pop(0)
-        return un_resultat_de_recherche().construis()
+        chunk = (
+            self.chunks_par_id.pop(0)
+            if self.chunks_par_id
+            else un_resultat_de_recherche().construis()
+        )
+        self.recuperations_de_chunks_en_cours += 1
+        self.recuperations_de_chunks_simultanees_maximum = max(
+            self.recuperations_de_chunks_simultanees_maximum,
+            self.recuperations_de_chunks_en_cours,
+        )
+        try:
+            await asyncio.sleep(self.delais_chunks_par_id.get(id_chunk, 0))
+        finally:
+            self.recuperations_de_chunks_en_cours -= 1
+        return chunk
 
-    def recupere_propositions(
+    async def recupere_propositions(
         self,
         messages: list[ChatCompletionMessageParam],
         modele: str | None = None,
         temperature: float | None = None,
+        format_reponse: ResponseFormatJSONSchema | None = None,
     ) -> list[Choice]:
         self.messages_recus = messages
         self.messages_envoyes_pour_les_propositions.append(messages)
         self.temperatures_recues.append(temperature)
+        self.formats_reponse_recus.append(format_reponse)
         if self.choix_par_appel:
             choix = self.choix_par_appel[self.appels_recupere_propositions]
             self.appels_recupere_propositions += 1
             return choix
         return self.choix if self.propositions_vides is False else []
 
-    def reclasse(self, payload: ReclassePayload) -> ReclasseReponse:
+    async def recupere_propositions_en_flux(
+        self,
+        messages: list[ChatCompletionMessageParam],
+        modele: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncGenerator[str, None]:
+        choix = await self.recupere_propositions(messages, modele, temperature)
+        if not choix:
+            return
+        contenu = choix[0].message.content or ""
+        for debut in range(0, len(contenu), self.taille_fragments_en_flux):
+            self.fragments_emis_en_flux += 1
+            yield contenu[debut : debut + self.taille_fragments_en_flux]
+
+    async def reclasse(self, payload: ReclassePayload) -> ReclasseReponse:
         self.payload_reclassement_recu = payload
         return self.reclassement
 
@@ -241,6 +356,18 @@ class ClientAlbertMemoire(ClientAlbert):
     def avec_chunks_par_id(self, chunks: list[ResultatRecherche]):
         self.chunks_par_id.extend(chunks)
 
+    def avec_un_delai_pour_le_chunk(self, id_chunk: int, delai: float):
+        self.delais_chunks_par_id[id_chunk] = delai
+
+    def avec_un_delai_pour_la_recherche(self, delai: float):
+        self.delai_recherche = delai
+
+    def avec_des_delais_pour_la_recherche_par_appel(self, delais: list[float]):
+        self.delais_recherche_par_appel = delais
+
+    def avec_un_delai_pour_la_recherche_jeopardy(self, delai: float):
+        self.delai_recherche_jeopardy = delai
+
     def avec_les_propositions(self, choix: list[Choice]):
         self.choix.extend(choix)
 
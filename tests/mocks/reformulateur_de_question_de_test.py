@@ -9,7 +9,7 @@ class ReformulateurDeQuestionDeTest(ReformulateurDeQuestion):
     def __init__(self):
         super().__init__(ClientAlbertMemoire(), "", "")
 
-    def reformule(
+    async def reformule(
         self, question: str, conversation: Optional[Conversation] = None
     ) -> str | None:
         return question
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Callable, Dict, Optional
+from typing import AsyncIterator, Callable, Dict, Optional
 
 from openai.types.chat.chat_completion import Choice
 
@@ -24,8 +24,15 @@ from infra.fast_api.fabrique_adaptateur_base_de_donnees import (
     fabrique_adaptateur_base_de_donnees,
 )
 from infra.mapping_reponses_maitrisees import MappingReponsesMaitrisees
+from infra.traces import ExportateurTraces
 from question.reformulateur_de_question import ReformulateurDeQuestion
-from schemas.albert import Paragraphe, ReponseQuestion, ReclassePayload, ReclasseReponse
+from schemas.albert import (
+    FragmentReponse,
+    Paragraphe,
+    ReponseQuestion,
+    ReclassePayload,
+    ReclasseReponse,
+)
 from schemas.retour_utilisatrice import Conversation
 from schemas.violations import Violation
 from serveur import fabrique_serveur
@@ -42,12 +49,12 @@ class AdaptateurExecuteurDeRequetesMemoire(AdaptateurExecuteurDeRequetes):
     def __init__(self) -> None:
         self.requetes_effectuees: list[str] = []
 
-    def recupere(self, url: str, klass):
+    async def recupere(self, url: str, klass):
         return []
 
 
 class ReclasseurDeTest(Reclasseur):
-    def reclasse(
+    async def reclasse(
         self, question: str, paragraphes: list[Paragraphe]
     ) -> ResultatReclassement:
         return ResultatReclassement(
@@ -90,16 +97,17 @@ class ServiceAlbertMemoire(ServiceAlbert):
             AdaptateurExecuteurDeRequetesMemoire(),
         )
 
-    def recherche_paragraphes(self, question: str) -> list[Paragraphe]:
+    async def recherche_paragraphes(self, question: str) -> list[Paragraphe]:
         self.recherche_paragraphes_a_ete_appele = True
         return self.paragraphes
 
-    def pose_question(
+    async def pose_question(
         self,
         *,
         question: str,
         prompt: Optional[str] = None,
         conversation: Optional[Conversation] = None,
+        delai_maximum: Optional[float] = None,
     ) -> ReponseQuestion:
         self.question_recue = question
         if self.leve_une_erreur_de_communication_vers_albert:
@@ -116,6 +124,21 @@ class ServiceAlbertMemoire(ServiceAlbert):
             violation=None,
         )
 
+    async def pose_question_en_flux(
+        self,
+        *,
+        question: str,
+        prompt: Optional[str] = None,
+        conversation: Optional[Conversation] = None,
+        delai_maximum: Optional[float] = None,
+    ) -> AsyncIterator[FragmentReponse | ReponseQuestion]:
+        reponse = await self.pose_question(
+            question=question, prompt=prompt, conversation=conversation
+        )
+        for mot in reponse.reponse.split(" "):
+            yield FragmentReponse(contenu=mot)
+        yield reponse
+
     def reclasse(self, payload: ReclassePayload):
         return ReclasseReponse(data=[])
 
@@ -144,6 +167,8 @@ class ConstructeurServeur:
         max_requetes_par_minute: int = 600,
         mode: Mode = Mode.PRODUCTION,
         mode_maintenance: bool = False,
+        expose_metriques: bool = False,
+        exportateur_traces: Optional[ExportateurTraces] = None,
     ):
         self._adaptateur_chiffrement = (
             adaptateur_chiffrement or fabrique_adaptateur_chiffrement()
@@ -151,6 +176,8 @@ class ConstructeurServeur:
         self._max_requetes_par_minute = max_requetes_par_minute
         self._mode = mode
         self._mode_maintenance = mode_maintenance
+        self._expose_metriques = expose_metriques
+        self._exportateur_traces = exportateur_traces
         self._dependances: Dict[Callable, Callable] = {}
         self._dependances[fabrique_adaptateur_chiffrement] = (
             lambda: adaptateur_chiffrement
@@ -201,6 +228,8 @@ class ConstructeurServeur:
             lambda: "1",
             AdaptateurSentryMemoire,
             self._mode_maintenance,
+            self._expose_metriques,
+            self._exportateur_traces,
         )
         for clef, dependance in self._dependances.items():
             self._serveur.dependency_overrides[clef] = dependance
@@ -24,10 +24,13 @@ from schemas.violations import (
 from services.service_albert import Prompts
 
 
-def test_retourne_none_si_la_conversation_n_existe_pas(une_configuration_complete):
+@pytest.mark.anyio
+async def test_retourne_none_si_la_conversation_n_existe_pas(
+    une_configuration_complete,
+):
     la_configuration, _, _, _, _ = une_configuration_complete()
 
-    resultat_interaction = ajoute_interaction(
+    resultat_interaction = await ajoute_interaction(
         la_configuration,
         question_utilisateur=DemandeInteractionUtilisateur(
             question="une question ?", conversation="id-conversation-inconnu"
@@ -38,7 +41,8 @@ def test_retourne_none_si_la_conversation_n_existe_pas(une_configuration_complet
     assert resultat_interaction.message_mqc == "La conversation demandée n'existe pas"
 
 
-def test_ajoute_l_interaction_a_la_conversation(
+@pytest.mark.anyio
+async def test_ajoute_l_interaction_a_la_conversation(
     une_configuration_complete,
     un_constructeur_de_conversation,
     un_constructeur_d_interaction,
@@ -61,7 +65,7 @@ def test_ajoute_l_interaction_a_la_conversation(
     )
     service_albert.ajoute_reponse(reponse_question)
 
-    resultat_interaction = ajoute_interaction(
+    resultat_interaction = await ajoute_interaction(
         la_configuration,
         question_utilisateur=DemandeInteractionUtilisateur(
             question="une autre question ?",
@@ -73,7 +77,8 @@ def test_ajoute_l_interaction_a_la_conversation(
     assert resultat_interaction.reponse_question == reponse_question
 
 
-def test_ajoute_une_interaction_a_une_conversation(
+@pytest.mark.anyio
+async def test_ajoute_une_interaction_a_une_conversation(
     une_configuration_complete,
     un_adaptateur_de_chiffrement,
     un_constructeur_de_conversation,
@@ -95,7 +100,7 @@ def test_ajoute_une_interaction_a_une_conversation(
         .construis()
     )
 
-    reponse = ajoute_interaction(
+    reponse = await ajoute_interaction(
         la_configuration,
         question_utilisateur=DemandeInteractionUtilisateur(
             question="une question", conversation=conversation.id_conversation
@@ -111,7 +116,8 @@ def test_ajoute_une_interaction_a_une_conversation(
     assert conversation_recuperee.interactions[1].date_creation == premiere_interaction
 
 
-def test_interroge_albert_en_mode_conversationnel(
+@pytest.mark.anyio
+async def test_interroge_albert_en_mode_conversationnel(
     un_service_albert_avec_un_client_memoire,
     une_configuration_complete,
     un_adaptateur_de_chiffrement,
@@ -138,7 +144,7 @@ def test_interroge_albert_en_mode_conversationnel(
     ).construis()
     adaptateur_base_de_donnees.sauvegarde_conversation(conversation)
 
-    ajoute_interaction(
+    await ajoute_interaction(
         la_configuration,
         question_utilisateur=DemandeInteractionUtilisateur(
             question="Une seconde question", conversation=conversation.id_conversation
@@ -167,7 +173,8 @@ def test_interroge_albert_en_mode_conversationnel(
     ]
 
 
-def test_ajoute_interaction_emet_un_evenement_journal_interaction_ajoutee(
+@pytest.mark.anyio
+async def test_ajoute_interaction_emet_un_evenement_journal_interaction_ajoutee(
     une_configuration_complete,
     un_constructeur_de_paragraphe,
     un_constructeur_de_reponse_question,
@@ -196,7 +203,7 @@ def test_ajoute_interaction_emet_un_evenement_journal_interaction_ajoutee(
 
     interaction = cast(
         ResultatConversation,
-        ajoute_interaction(
+        await ajoute_interaction(
             configuration,
             question_utilisateur=DemandeInteractionUtilisateur(
                 question="Une seconde question",
@@ -221,7 +228,8 @@ def test_ajoute_interaction_emet_un_evenement_journal_interaction_ajoutee(
     assert evenements[0]["donnees"].type_utilisateur == TypeUtilisateur.EXPERT_SSI
 
 
-def test_ajoute_interaction_emet_un_evenement_donnant_la_longueur_totale_des_paragraphes(
+@pytest.mark.anyio
+async def test_ajoute_interaction_emet_un_evenement_donnant_la_longueur_totale_des_paragraphes(
     une_configuration_complete,
     un_constructeur_de_paragraphe,
     un_constructeur_de_reponse_question,
@@ -253,7 +261,7 @@ def test_ajoute_interaction_emet_un_evenement_donnant_la_longueur_totale_des_par
 
     (
         ResultatConversation,
-        ajoute_interaction(
+        await ajoute_interaction(
             configuration,
             question_utilisateur=DemandeInteractionUtilisateur(
                 question="Une seconde question",
@@ -267,6 +275,7 @@ def test_ajoute_interaction_emet_un_evenement_donnant_la_longueur_totale_des_par
     assert evenements[0]["donnees"].longueur_paragraphes == 18
 
 
+@pytest.mark.anyio
 @pytest.mark.parametrize(
     "violation",
     [
@@ -276,7 +285,7 @@ def test_ajoute_interaction_emet_un_evenement_donnant_la_longueur_totale_des_par
         ViolationMeconnaissance(),
     ],
 )
-def test_ajoute_interaction_emet_un_evenement_journal_indiquant_la_detection_d_une_question_illegale(
+async def test_ajoute_interaction_emet_un_evenement_journal_indiquant_la_detection_d_une_question_illegale(
     violation,
     une_configuration_complete,
     un_constructeur_de_conversation,
@@ -301,7 +310,7 @@ def test_ajoute_interaction_emet_un_evenement_journal_indiquant_la_detection_d_u
     ).construis()
     adaptateur_base_de_donnees.sauvegarde_conversation(conversation)
 
-    ajoute_interaction(
+    await ajoute_interaction(
         configuration,
         question_utilisateur=DemandeInteractionUtilisateur(
             question="Une seconde question", conversation=conversation.id_conversation
@@ -315,7 +324,8 @@ def test_ajoute_interaction_emet_un_evenement_journal_indiquant_la_detection_d_u
     assert evenements[1]["donnees"].type_violation == violation.__class__.__name__
 
 
-def test_ajoute_interaction_emet_un_evenement_journal_avec_la_question_et_les_sources_en_mode_alpha_test(
+@pytest.mark.anyio
+async def test_ajoute_interaction_emet_un_evenement_journal_avec_la_question_et_les_sources_en_mode_alpha_test(
     une_configuration_complete,
     un_constructeur_de_conversation,
     un_constructeur_de_reponse_question,
@@ -353,7 +363,7 @@ def test_ajoute_interaction_emet_un_evenement_journal_avec_la_question_et_les_so
     adaptateur_base_de_donnees.sauvegarde_conversation(conversation)
     monkeypatch.setenv("ALPHA_TEST", "True")
 
-    ajoute_interaction(
+    await ajoute_interaction(
         ConfigurationQuestion(
             service_albert=configuration.service_albert,
             adaptateur_journal=configuration.adaptateur_journal,
@@ -376,7 +386,8 @@ def test_ajoute_interaction_emet_un_evenement_journal_avec_la_question_et_les_so
     assert evenements[0]["donnees"].sources[1].numero_page == 42
 
 
-def test_cree_conversation_emet_un_evenement_journal_avec_la_question_et_les_sources_en_mode_alpha_test(
+@pytest.mark.anyio
+async def test_cree_conversation_emet_un_evenement_journal_avec_la_question_et_les_sources_en_mode_alpha_test(
     une_configuration_complete,
     un_constructeur_de_reponse_question,
     un_constructeur_de_paragraphe,
@@ -407,7 +418,7 @@ def test_cree_conversation_emet_un_evenement_journal_avec_la_question_et_les_sou
     )
     monkeypatch.setenv("ALPHA_TEST", "True")
 
-    cree_conversation(
+    await cree_conversation(
         ConfigurationQuestion(
             service_albert=configuration.service_albert,
             adaptateur_journal=configuration.adaptateur_journal,
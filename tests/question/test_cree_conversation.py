@@ -1,4 +1,5 @@
 import datetime as dt
+import threading
 import uuid
 from typing import cast
 
@@ -27,12 +28,13 @@ from schemas.violations import (
 from services.service_albert import Prompts
 
 
-def test_cree_conversation_retourne_un_resultat_de_conversation_en_erreur(
+@pytest.mark.anyio
+async def test_cree_conversation_retourne_un_resultat_de_conversation_en_erreur(
     une_configuration_complete,
 ):
     la_configuration, service_albert, _, _, _ = une_configuration_complete()
     service_albert.qui_leve_une_erreur_de_communication_vers_albert()
-    resultat_conversation = cree_conversation(
+    resultat_conversation = await cree_conversation(
         la_configuration,
         DemandeConversationUtilisateur(question="une question"),
         TypeUtilisateur.EXPERT_SSI,
@@ -42,7 +44,8 @@ def test_cree_conversation_retourne_un_resultat_de_conversation_en_erreur(
     assert resultat_conversation.message_mqc == "Erreur message sur pose_question."
 
 
-def test_cree_conversation_retourne_un_resultat_de_conversation_en_erreur_si_recherche_paragraphes_echoue(
+@pytest.mark.anyio
+async def test_cree_conversation_retourne_un_resultat_de_conversation_en_erreur_si_recherche_paragraphes_echoue(
     une_configuration_complete,
     un_service_albert_avec_un_client_memoire,
 ):
@@ -54,7 +57,7 @@ def test_cree_conversation_retourne_un_resultat_de_conversation_en_erreur_si_rec
     )
     la_configuration, _, _, _, _ = une_configuration_complete(service_albert)
 
-    resultat_conversation = cree_conversation(
+    resultat_conversation = await cree_conversation(
         la_configuration,
         DemandeConversationUtilisateur(question="une question"),
         TypeUtilisateur.EXPERT_SSI,
@@ -67,7 +70,8 @@ def test_cree_conversation_retourne_un_resultat_de_conversation_en_erreur_si_rec
     )
 
 
-def test_cree_conversation_retourne_une_conversation(
+@pytest.mark.anyio
+async def test_cree_conversation_retourne_une_conversation(
     une_configuration_complete, un_constructeur_de_reponse_question
 ):
     la_configuration, service_albert, _, _, _ = une_configuration_complete()
@@ -79,7 +83,7 @@ def test_cree_conversation_retourne_une_conversation(
     )
     service_albert.ajoute_reponse(reponse_question)
 
-    resultat_interaction = cree_conversation(
+    resultat_interaction = await cree_conversation(
         la_configuration,
         DemandeConversationUtilisateur(question="une question"),
         TypeUtilisateur.EXPERT_SSI,
@@ -90,7 +94,42 @@ def test_cree_conversation_retourne_une_conversation(
     assert resultat_interaction.interaction.retour_utilisatrice is None
 
 
-def test_ne_conserve_pas_les_paragraphes_en_cas_de_violation(
+class AdaptateurBaseDeDonneesQuiNoteLeFil(AdaptateurBaseDeDonneesEnMemoire):
+    def __init__(self):
+        super().__init__()
+        self.fil_de_sauvegarde: int | None = None
+
+    def sauvegarde_conversation(self, conversation):
+        self.fil_de_sauvegarde = threading.get_ident()
+        super().sauvegarde_conversation(conversation)
+
+
+@pytest.mark.anyio
+async def test_cree_conversation_sauvegarde_hors_de_la_boucle_d_evenements(
+    une_configuration_complete, un_constructeur_de_reponse_question
+):
+    la_configuration, service_albert, _, _, _ = une_configuration_complete()
+    service_albert.ajoute_reponse(
+        un_constructeur_de_reponse_question()
+        .avec_une_question("une question")
+        .construis()
+    )
+    adaptateur_base_de_donnees = AdaptateurBaseDeDonneesQuiNoteLeFil()
+
+    await cree_conversation(
+        la_configuration._replace(
+            adaptateur_base_de_donnees=adaptateur_base_de_donnees
+        ),
+        DemandeConversationUtilisateur(question="une question"),
+        TypeUtilisateur.EXPERT_SSI,
+    )
+
+    assert adaptateur_base_de_donnees.fil_de_sauvegarde is not None
+    assert adaptateur_base_de_donnees.fil_de_sauvegarde != threading.get_ident()
+
+
+@pytest.mark.anyio
+async def test_ne_conserve_pas_les_paragraphes_en_cas_de_violation(
     une_configuration_complete, un_constructeur_de_reponse_question
 ):
     la_configuration, service_albert, _, _, _ = une_configuration_complete()
@@ -117,7 +156,7 @@ def test_ne_conserve_pas_les_paragraphes_en_cas_de_violation(
     ).construis()
     service_albert.ajoute_reponse(reponse_question)
 
-    resultat_interaction = cree_conversation(
+    resultat_interaction = await cree_conversation(
         la_configuration,
         DemandeConversationUtilisateur(question="une question"),
         TypeUtilisateur.EXPERT_SSI,
@@ -126,7 +165,8 @@ def test_ne_conserve_pas_les_paragraphes_en_cas_de_violation(
     assert resultat_interaction.interaction.reponse_question.paragraphes == []
 
 
-def test_cree_conversation_une_interaction_a_une_date(
+@pytest.mark.anyio
+async def test_cree_conversation_une_interaction_a_une_date(
     un_adaptateur_de_chiffrement, un_constructeur_de_reponse_question
 ):
     Horloge.frise(dt.datetime(2026, 2, 15, 3, 4, 5))
@@ -139,7 +179,7 @@ def test_cree_conversation_une_interaction_a_une_date(
     )
     service_albert.ajoute_reponse(question)
     adaptateur_base_de_donnees = AdaptateurBaseDeDonneesEnMemoire()
-    reponse = cree_conversation(
+    reponse = await cree_conversation(
         ConfigurationQuestion(
             adaptateur_chiffrement=un_adaptateur_de_chiffrement(),
             adaptateur_base_de_donnees=adaptateur_base_de_donnees,
@@ -155,7 +195,8 @@ def test_cree_conversation_une_interaction_a_une_date(
     ).date_creation == dt.datetime(2026, 2, 15, 3, 4, 5)
 
 
-def test_cree_une_conversation(
+@pytest.mark.anyio
+async def test_cree_une_conversation(
     une_configuration_complete, un_constructeur_de_reponse_question
 ):
     Horloge.frise(dt.datetime(2026, 2, 15, 3, 4, 5))
@@ -169,7 +210,7 @@ def test_cree_une_conversation(
         .construis()
     )
 
-    reponse = cree_conversation(
+    reponse = await cree_conversation(
         la_configuration,
         DemandeConversationUtilisateur(question="une question"),
         TypeUtilisateur.EXPERT_SSI,
@@ -182,7 +223,8 @@ def test_cree_une_conversation(
     assert len(conversation.interactions) == 1
 
 
-def test_cree_conversation_emet_un_evenement_journal_conversation_creee(
+@pytest.mark.anyio
+async def test_cree_conversation_emet_un_evenement_journal_conversation_creee(
     une_configuration_complete,
     un_constructeur_de_paragraphe,
     un_constructeur_de_reponse_question,
@@ -204,7 +246,7 @@ def test_cree_conversation_emet_un_evenement_journal_conversation_creee(
 
     conversation = cast(
         ResultatConversation,
-        cree_conversation(
+        await cree_conversation(
             configuration=configuration,
             question_utilisateur=DemandeConversationUtilisateur(
                 question="une question"
@@ -229,7 +271,32 @@ def test_cree_conversation_emet_un_evenement_journal_conversation_creee(
     assert evenements[0]["donnees"].type_utilisateur == TypeUtilisateur.EXPERT_SSI
 
 
-def test_cree_conversation_emet_un_evenement_donnant_la_longueur_totale_des_paragraphes(
+@pytest.mark.anyio
+async def test_cree_conversation_emet_un_evenement_donnant_la_duree_des_etapes(
+    une_configuration_complete, un_constructeur_de_reponse_question
+) -> None:
+    configuration, service_albert, _, adaptateur_journal, _ = (
+        une_configuration_complete()
+    )
+    service_albert.ajoute_reponse(
+        un_constructeur_de_reponse_question()
+        .avec_une_question("une question")
+        .construis()
+    )
+
+    await cree_conversation(
+        configuration=configuration,
+        question_utilisateur=DemandeConversationUtilisateur(question="une question"),
+        type_utilisateur=TypeUtilisateur.EXPERT_SSI,
+    )
+
+    durees = adaptateur_journal.les_evenements()[0]["donnees"].durees
+    assert list(durees) == ["sauvegarde"]
+    assert durees["sauvegarde"] >= 0
+
+
+@pytest.mark.anyio
+async def test_cree_conversation_emet_un_evenement_donnant_la_longueur_totale_des_paragraphes(
     une_configuration_complete,
     un_constructeur_de_paragraphe,
     un_constructeur_de_reponse_question,
@@ -260,7 +327,7 @@ def test_cree_conversation_emet_un_evenement_donnant_la_longueur_totale_des_para
         )
     )
 
-    cree_conversation(
+    await cree_conversation(
         configuration=configuration,
         question_utilisateur=DemandeConversationUtilisateur(question="une question"),
         type_utilisateur=TypeUtilisateur.EXPERT_SSI,
@@ -270,6 +337,7 @@ def test_cree_conversation_emet_un_evenement_donnant_la_longueur_totale_des_para
     assert evenements[0]["donnees"].longueur_paragraphes == 18
 
 
+@pytest.mark.anyio
 @pytest.mark.parametrize(
     "violation",
     [
@@ -279,7 +347,7 @@ def test_cree_conversation_emet_un_evenement_donnant_la_longueur_totale_des_para
         ViolationMeconnaissance(),
     ],
 )
-def test_cree_conversation_emet_un_evenement_journal_indiquant_la_detection_d_une_question_illegale(
+async def test_cree_conversation_emet_un_evenement_journal_indiquant_la_detection_d_une_question_illegale(
     violation, une_configuration_complete, un_constructeur_de_reponse_question
 ) -> None:
     configuration, service_albert, _, adaptateur_journal, _ = (
@@ -295,7 +363,7 @@ def test_cree_conversation_emet_un_evenement_journal_indiquant_la_detection_d_un
         )
     )
 
-    cree_conversation(
+    await cree_conversation(
         configuration=configuration,
         question_utilisateur=DemandeConversationUtilisateur(question="une question"),
         type_utilisateur=TypeUtilisateur.EXPERT_SSI,
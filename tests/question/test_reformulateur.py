@@ -1,3 +1,5 @@
+import pytest
+from adaptateurs.cache import AdaptateurCacheMemoire
 from configuration import Albert
 from infra.albert.client_albert import ClientAlbertApi
 from question.reformulateur_de_question import ReformulateurDeQuestion
@@ -10,7 +12,8 @@ from client_albert_de_test import (
 )
 
 
-def test_reformule_une_question():
+@pytest.mark.anyio
+async def test_reformule_une_question():
     question = "ma question ?"
     mon_choix = (
         ConstructeurDeChoix().ayant_pour_contenu("Ma question reformulee").construis()
@@ -18,7 +21,7 @@ def test_reformule_une_question():
     client_albert = ClientAlbertMemoire()
     client_albert.avec_les_propositions([mon_choix])
 
-    question_reformulee = ReformulateurDeQuestion(
+    question_reformulee = await ReformulateurDeQuestion(
         client_albert=client_albert,
         prompt_de_reformulation="Mon prompt",
         modele_reformulation="albert-small",
@@ -28,7 +31,8 @@ def test_reformule_une_question():
     assert client_albert.temperatures_recues == [0]
 
 
-def test_reformule_la_question_avec_un_prompt_de_reformulation():
+@pytest.mark.anyio
+async def test_reformule_la_question_avec_un_prompt_de_reformulation():
     question = "ma question ?"
     le_prompt = "Mon prompt de reformulation"
     mon_choix = (
@@ -37,7 +41,7 @@ def test_reformule_la_question_avec_un_prompt_de_reformulation():
     client_albert = ClientAlbertMemoire()
     client_albert.avec_les_propositions([mon_choix])
 
-    ReformulateurDeQuestion(
+    await ReformulateurDeQuestion(
         client_albert=client_albert,
         prompt_de_reformulation=le_prompt,
         modele_reformulation="albert-small",
@@ -50,7 +54,8 @@ def test_reformule_la_question_avec_un_prompt_de_reformulation():
     assert client_albert.messages_recus[1]["content"] == "ma question ?"
 
 
-def test_reformule_la_question_avec_l_historique_de_conversation(
+@pytest.mark.anyio
+async def test_reformule_la_question_avec_l_historique_de_conversation(
     un_constructeur_de_conversation, un_constructeur_d_interaction
 ):
     interaction = (
@@ -72,7 +77,7 @@ def test_reformule_la_question_avec_l_historique_de_conversation(
     client_albert = ClientAlbertMemoire()
     client_albert.avec_les_propositions([mon_choix])
 
-    ReformulateurDeQuestion(
+    await ReformulateurDeQuestion(
         client_albert=client_albert,
         prompt_de_reformulation="Mon prompt",
         modele_reformulation="albert-small",
@@ -87,7 +92,8 @@ def test_reformule_la_question_avec_l_historique_de_conversation(
     assert client_albert.messages_recus[3]["content"] == "Comment s'en protéger ?"
 
 
-def test_reformulateur_utilise_le_modele_de_reformulation_de_la_configuration():
+@pytest.mark.anyio
+async def test_reformulateur_utilise_le_modele_de_reformulation_de_la_configuration():
     client_http = (
         ConstructeurClientHttp()
         .qui_retourne(ConstructeurRetourRouteSearch().construis())
@@ -116,7 +122,7 @@ def test_reformulateur_utilise_le_modele_de_reformulation_de_la_configuration():
         modele_reformulation="modele-reformulation",
     )
 
-    reformulateur.reformule("Ma question ?")
+    await reformulateur.reformule("Ma question ?")
 
     client_openai.chat.completions.create.assert_called_once()
     call_kwargs = client_openai.chat.completions.create.call_args[1]
@@ -124,7 +130,8 @@ def test_reformulateur_utilise_le_modele_de_reformulation_de_la_configuration():
     assert call_kwargs["temperature"] == 0
 
 
-def test_reformule_la_question_avec_l_historique_dans_l_ordre_inverse(
+@pytest.mark.anyio
+async def test_reformule_la_question_avec_l_historique_dans_l_ordre_inverse(
     un_constructeur_de_conversation, un_constructeur_d_interaction
 ):
     interaction1 = (
@@ -146,7 +153,7 @@ def test_reformule_la_question_avec_l_historique_dans_l_ordre_inverse(
     client_albert = ClientAlbertMemoire()
     client_albert.avec_les_propositions([mon_choix])
 
-    ReformulateurDeQuestion(
+    await ReformulateurDeQuestion(
         client_albert=client_albert,
         prompt_de_reformulation="Mon prompt",
         modele_reformulation="albert-small",
@@ -158,3 +165,90 @@ def test_reformule_la_question_avec_l_historique_dans_l_ordre_inverse(
     assert client_albert.messages_recus[2]["role"] == "assistant"
     assert client_albert.messages_recus[3]["content"] == "Question 2 ?"
     assert client_albert.messages_recus[4]["role"] == "assistant"
+
+
+@pytest.mark.anyio
+async def test_une_question_deja_reformulee_ne_sollicite_pas_le_modele():
+    client_albert = ClientAlbertMemoire()
+    client_albert.avec_les_propositions_par_appel(
+        [[ConstructeurDeChoix().ayant_pour_contenu("Question reformulée").construis()]]
+    )
+    reformulateur = ReformulateurDeQuestion(
+        client_albert=client_albert,
+        prompt_de_reformulation="Mon prompt",
+        modele_reformulation="albert-small",
+        cache=AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+    )
+    await reformulateur.reformule("ma question ?")
+
+    question_reformulee = await reformulateur.reformule("ma question ?")
+
+    assert question_reformulee == "Question reformulée"
+    assert client_albert.appels_recupere_propositions == 1
+
+
+@pytest.mark.anyio
+async def test_une_question_non_comprise_est_memorisee():
+    client_albert = ClientAlbertMemoire()
+    client_albert.avec_les_propositions_par_appel(
+        [
+            [
+                ConstructeurDeChoix()
+                .ayant_pour_contenu("QUESTION_NON_COMPRISE")
+                .construis()
+            ]
+        ]
+    )
+    reformulateur = ReformulateurDeQuestion(
+        client_albert=client_albert,
+        prompt_de_reformulation="Mon prompt",
+        modele_reformulation="albert-small",
+        cache=AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+    )
+    await reformulateur.reformule("blabla")
+
+    assert await reformulateur.reformule("blabla") == "QUESTION_NON_COMPRISE"
+    assert client_albert.appels_recupere_propositions == 1
+
+
+@pytest.mark.anyio
+async def test_la_meme_question_avec_un_autre_historique_est_reformulee(
+    un_constructeur_de_conversation, un_constructeur_d_interaction
+):
+    conversation = (
+        un_constructeur_de_conversation()
+        .avec_interaction(
+            un_constructeur_d_interaction()
+            .avec_question("Qu'est-ce que le défacement ?")
+            .construis()
+        )
+        .construis()
+    )
+    client_albert = ClientAlbertMemoire()
+    client_albert.avec_les_propositions_par_appel(
+        [
+            [
+                ConstructeurDeChoix()
+                .ayant_pour_contenu("Comment se protéger ?")
+                .construis()
+            ],
+            [
+                ConstructeurDeChoix()
+                .ayant_pour_contenu("Comment se protéger du défacement ?")
+                .construis()
+            ],
+        ]
+    )
+    reformulateur = ReformulateurDeQuestion(
+        client_albert=client_albert,
+        prompt_de_reformulation="Mon prompt",
+        modele_reformulation="albert-small",
+        cache=AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+    )
+    await reformulateur.reformule("Comment s'en protéger ?")
+
+    question_reformulee = await reformulateur.reformule(
+        "Comment s'en protéger ?", conversation=conversation
+    )
+
+    assert question_reformulee == "Comment se protéger du défacement ?"
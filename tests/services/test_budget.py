@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from services.budget import BudgetDeTemps, Etape
+from services.exceptions import ErreurDelaiDepasse, ErreurRechercheDocuments
+
+
+class HorlogeDeTest:
+    def __init__(self):
+        self.maintenant = 0.0
+
+    def __call__(self) -> float:
+        return self.maintenant
+
+
+def test_le_budget_est_reparti_selon_les_etapes_restantes():
+    horloge = HorlogeDeTest()
+    budget = BudgetDeTemps(delai_total=10, part_avant_doublon=1, horloge=horloge)
+
+    assert budget.delai_pour(Etape.REFORMULATION) == pytest.approx(1.5)
+    horloge.maintenant = 1
+    assert budget.delai_pour(Etape.RECHERCHE) == pytest.approx(9 * 0.2 / 0.85)
+    horloge.maintenant = 5
+    assert budget.delai_pour(Etape.GENERATION) == pytest.approx(5)
+    horloge.maintenant = 12
+    assert budget.delai_pour(Etape.GENERATION) == 0
+
+
+@pytest.mark.anyio
+async def test_l_etape_retourne_le_resultat_de_l_appel():
+    async def _appel():
+        return "résultat"
+
+    budget = BudgetDeTemps(delai_total=1, part_avant_doublon=0.5)
+
+    assert await budget.execute(Etape.RECHERCHE, _appel) == "résultat"
+
+
+@pytest.mark.anyio
+async def test_l_erreur_indique_l_etape_ayant_depasse_son_delai():
+    async def _appel_trop_long():
+        await asyncio.sleep(1)
+
+    budget = BudgetDeTemps(delai_total=0.05, part_avant_doublon=0.5)
+
+    with pytest.raises(ErreurDelaiDepasse) as erreur:
+        await budget.execute(Etape.RECLASSEMENT, _appel_trop_long)
+
+    assert erreur.value.etape == Etape.RECLASSEMENT
+    assert "reclassement" in str(erreur.value)
+
+
+@pytest.mark.anyio
+async def test_un_doublon_est_envoye_apres_la_part_configuree_du_delai():
+    appels = []
+
+    async def _appel():
+        appels.append("appel")
+        await asyncio.sleep(1)
+        return "appel"
+
+    async def _doublon():
+        appels.append("doublon")
+        return "doublon"
+
+    budget = BudgetDeTemps(delai_total=0.5, part_avant_doublon=0.1)
+
+    resultat = await budget.execute(Etape.GENERATION, _appel, doublon=_doublon)
+
+    assert resultat == "doublon"
+    assert appels == ["appel", "doublon"]
+
+
+@pytest.mark.anyio
+async def test_aucun_doublon_n_est_envoye_si_l_appel_aboutit_a_temps():
+    appels = []
+
+    async def _appel():
+        appels.append("appel")
+        return "appel"
+
+    budget = BudgetDeTemps(delai_total=1, part_avant_doublon=0.5)
+
+    await budget.execute(Etape.RECHERCHE, _appel, doublon=_appel)
+
+    assert appels == ["appel"]
+
+
+@pytest.mark.anyio
+async def test_l_erreur_de_l_appel_est_propagee():
+    async def _appel_en_erreur():
+        raise ErreurRechercheDocuments("Recherche impossible")
+
+    budget = BudgetDeTemps(delai_total=1, part_avant_doublon=0.5)
+
+    with pytest.raises(ErreurRechercheDocuments):
+        await budget.execute(Etape.RECHERCHE, _appel_en_erreur)
+
+
+@pytest.mark.anyio
+async def test_sans_delai_total_l_etape_n_est_ni_limitee_ni_doublee():
+    appels = []
+
+    async def _appel():
+        appels.append("appel")
+        await asyncio.sleep(0.1)
+        return "appel"
+
+    budget = BudgetDeTemps(delai_total=None, part_avant_doublon=0.1)
+
+    resultat = await budget.execute(Etape.RECLASSEMENT, _appel, doublon=_appel)
+
+    assert resultat == "appel"
+    assert appels == ["appel"]
+    assert budget.restant() is None
@@ -0,0 +1,166 @@
+from configuration import DispositionMessages
+from services.contexte import (
+    MARQUE_TRONCATURE,
+    AssembleurDeContexte,
+    ContexteAssemble,
+    Echange,
+    compose_les_messages,
+    estime_les_jetons,
+)
+
+PROMPT_SYSTEME = "Vous êtes un assistant."
+QUESTION = "Question :\nQue faire ?"
+PARAGRAPHE = "mot " * 100
+
+
+def _budget_pour(*textes: str, marge: int = 0) -> int:
+    return sum(estime_les_jetons(t) + 5 for t in textes) + marge
+
+
+def test_conserve_tous_les_elements_lorsque_le_budget_le_permet():
+    echanges = [
+        Echange("Question :\nA ?", "Réponse A"),
+        Echange("Question :\nB ?", "B"),
+    ]
+
+    contexte = AssembleurDeContexte(8000).assemble(
+        PROMPT_SYSTEME, QUESTION, [PARAGRAPHE, PARAGRAPHE], echanges
+    )
+
+    assert contexte.paragraphes == [PARAGRAPHE, PARAGRAPHE]
+    assert contexte.echanges == echanges
+    assert contexte.nombre_paragraphes_ecartes == 0
+    assert contexte.nombre_echanges_ecartes == 0
+    assert contexte.nombre_jetons <= 8000
+
+
+def test_le_prompt_systeme_et_la_question_sont_conserves_meme_hors_budget():
+    contexte = AssembleurDeContexte(1).assemble(
+        PROMPT_SYSTEME, QUESTION, [PARAGRAPHE], [Echange("Question :\nA ?", "A")]
+    )
+
+    assert contexte.paragraphes == []
+    assert contexte.echanges == []
+    assert contexte.nombre_jetons > 1
+
+
+def test_tronque_le_premier_paragraphe_qui_ne_tient_plus_et_ecarte_les_suivants():
+    budget = _budget_pour(PROMPT_SYSTEME, QUESTION, PARAGRAPHE, marge=80)
+
+    contexte = AssembleurDeContexte(budget, jetons_minimum_troncature=50).assemble(
+        PROMPT_SYSTEME, QUESTION, ["premier " + PARAGRAPHE, PARAGRAPHE, "dernier"], []
+    )
+
+    assert contexte.paragraphes[0] == "premier " + PARAGRAPHE
+    assert contexte.paragraphes[1].endswith(MARQUE_TRONCATURE)
+    assert len(contexte.paragraphes) == 2
+    assert contexte.dernier_paragraphe_tronque
+    assert contexte.nombre_paragraphes_ecartes == 1
+    assert contexte.nombre_jetons <= budget
+
+
+def test_ecarte_le_paragraphe_plutot_que_d_en_garder_un_fragment_trop_court():
+    budget = _budget_pour(PROMPT_SYSTEME, QUESTION, PARAGRAPHE, marge=20)
+
+    contexte = AssembleurDeContexte(budget, jetons_minimum_troncature=50).assemble(
+        PROMPT_SYSTEME, QUESTION, [PARAGRAPHE, PARAGRAPHE], []
+    )
+
+    assert contexte.paragraphes == [PARAGRAPHE]
+    assert not contexte.dernier_paragraphe_tronque
+
+
+def test_l_echange_le_plus_recent_passe_avant_les_paragraphes():
+    plus_recent = Echange("Question :\nRécente ?", PARAGRAPHE)
+    budget = _budget_pour(PROMPT_SYSTEME, QUESTION, PARAGRAPHE, marge=30)
+
+    contexte = AssembleurDeContexte(budget).assemble(
+        PROMPT_SYSTEME, QUESTION, [PARAGRAPHE], [plus_recent]
+    )
+
+    assert contexte.echanges == [plus_recent]
+    assert contexte.paragraphes == []
+
+
+def test_les_echanges_les_plus_anciens_sont_ecartes_en_premier():
+    echanges = [
+        Echange("Question :\nTroisième ?", PARAGRAPHE),
+        Echange("Question :\nDeuxième ?", PARAGRAPHE),
+        Echange("Question :\nPremière ?", PARAGRAPHE),
+    ]
+    budget = _budget_pour(
+        PROMPT_SYSTEME, QUESTION, PARAGRAPHE, PARAGRAPHE, PARAGRAPHE, marge=40
+    )
+
+    contexte = AssembleurDeContexte(budget).assemble(
+        PROMPT_SYSTEME, QUESTION, [PARAGRAPHE], echanges
+    )
+
+    assert contexte.paragraphes == [PARAGRAPHE]
+    assert contexte.echanges == echanges[:2]
+    assert contexte.nombre_echanges_ecartes == 1
+
+
+def _un_contexte(paragraphes: list[str]) -> ContexteAssemble:
+    return ContexteAssemble(
+        paragraphes=paragraphes,
+        echanges=[Echange("Question :\nB ?", "B"), Echange("Question :\nA ?", "A")],
+        nombre_jetons=0,
+        nombre_paragraphes_ecartes=0,
+        nombre_echanges_ecartes=0,
+        dernier_paragraphe_tronque=False,
+    )
+
+
+def test_par_defaut_les_documents_sont_inseres_dans_le_prompt_systeme():
+    messages = compose_les_messages(
+        DispositionMessages.DOCUMENTS_DANS_LE_SYSTEME,
+        "Documents :\n{chunks}",
+        _un_contexte(["p1", "p2"]),
+        QUESTION,
+    )
+
+    assert messages == [
+        {"role": "system", "content": "Documents :\np1\n\n\np2"},
+        {"role": "user", "content": "Question :\nA ?"},
+        {"role": "assistant", "content": "A"},
+        {"role": "user", "content": "Question :\nB ?"},
+        {"role": "assistant", "content": "B"},
+        {"role": "user", "content": QUESTION},
+    ]
+
+
+def test_avec_un_prefixe_stable_les_documents_sont_joints_a_la_question():
+    premiers = compose_les_messages(
+        DispositionMessages.PREFIXE_STABLE,
+        "Documents :\n{chunks}",
+        _un_contexte(["p1", "p2"]),
+        QUESTION,
+    )
+    seconds = compose_les_messages(
+        DispositionMessages.PREFIXE_STABLE,
+        "Documents :\n{chunks}",
+        _un_contexte(["p3"]),
+        QUESTION,
+    )
+
+    assert premiers[:-1] == seconds[:-1]
+    assert "p1" not in premiers[0]["content"]
+    assert premiers[-1]["role"] == "user"
+    assert "p1\n\n\np2" in premiers[-1]["content"]
+    assert premiers[-1]["content"].endswith(QUESTION)
+
+
+def test_avec_un_prefixe_stable_l_en_tete_des_documents_n_apparait_qu_une_fois():
+    messages = compose_les_messages(
+        DispositionMessages.PREFIXE_STABLE,
+        "BASE DE CONNAISSANCE :\n<<<DOCUMENTS_DEBUT>>>\n{chunks}\n<<<DOCUMENTS_FIN>>>",
+        _un_contexte(["p1"]),
+        QUESTION,
+    )
+
+    contenus = "".join(str(message["content"]) for message in messages)
+    assert contenus.count("BASE DE CONNAISSANCE") == 1
+    assert messages[-1]["content"] == (
+        f"<<<DOCUMENTS_DEBUT>>>\np1\n<<<DOCUMENTS_FIN>>>\n\n{QUESTION}"
+    )
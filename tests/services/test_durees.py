@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from services.durees import (
+    DureesDesEtapes,
+    EtapeMesuree,
+    demarre_la_mesure_des_durees,
+    durees_courantes,
+    mesure,
+)
+
+
+def test_une_etape_executee_plusieurs_fois_couvre_l_intervalle_de_ses_executions():
+    durees = DureesDesEtapes()
+
+    durees.enregistre(EtapeMesuree.RECHERCHE, 100, 150)
+    durees.enregistre(EtapeMesuree.RECHERCHE, 120, 300)
+    durees.enregistre(EtapeMesuree.REFORMULATION, 10, 90)
+
+    assert durees.en_nanosecondes == {"reformulation": 80, "recherche": 200}
+
+
+def test_des_durees_reprises_s_ajoutent_aux_etapes_deja_mesurees():
+    durees = DureesDesEtapes()
+    durees.enregistre(EtapeMesuree.SAUVEGARDE, 400, 450)
+    autres = DureesDesEtapes()
+    autres.enregistre(EtapeMesuree.RECHERCHE, 100, 300)
+    autres.nombre_jetons_prompt = 1200
+
+    durees.reprend(autres)
+
+    assert durees.en_nanosecondes == {"recherche": 200, "sauvegarde": 50}
+    assert durees.nombre_jetons_prompt == 1200
+
+
+@pytest.mark.anyio
+async def test_la_mesure_ne_fait_rien_sans_mesure_demarree():
+    async def _sans_mesure() -> None:
+        with mesure(EtapeMesuree.GENERATION):
+            pass
+
+    await asyncio.create_task(_sans_mesure())
+
+    assert durees_courantes() is None
+
+
+@pytest.mark.anyio
+async def test_les_etapes_executees_dans_des_taches_sont_mesurees():
+    durees = demarre_la_mesure_des_durees()
+
+    async def _recherche() -> None:
+        with mesure(EtapeMesuree.RECHERCHE):
+            await asyncio.sleep(0)
+
+    await asyncio.gather(asyncio.create_task(_recherche()), _recherche())
+    with mesure(EtapeMesuree.GENERATION):
+        pass
+
+    assert list(durees.en_nanosecondes) == ["recherche", "generation"]
@@ -1,16 +1,22 @@
-from client_albert_de_test import SessionDeTestQuiCompte
+from client_albert_de_test import ClientAlbertMemoire, SessionDeTestQuiCompte
 
-from configuration import recupere_configuration
+from adaptateurs.adaptateur_executeur_de_requetes import AdaptateurExecuteurDeRequetes
+from configuration import TypeReclasseur, recupere_configuration
 from infra.albert.client_albert import ClientAlbertApi
 from question.reformulateur_de_question import ReformulateurDeQuestion
 from services.fabrique_service_albert import (
     DepotMappingReponses,
-    fabrique_service_albert,
+    fabrique_client_albert_de_l_application,
+    fabrique_reclasseur,
+    fabrique_service_albert_pour,
 )
+from services.reclasseur import ReclasseurBGE, ReclasseurEnCascade, ReclasseurLLM
 
 
 def test_peut_fabriquer_un_service_albert_avec_une_configuration_par_defaut() -> None:
-    service_albert = fabrique_service_albert()
+    service_albert = fabrique_service_albert_pour(
+        fabrique_client_albert_de_l_application(), AdaptateurExecuteurDeRequetes()
+    )
 
     assert isinstance(service_albert.client, ClientAlbertApi)
     assert "Tu es un service développé par l'ANSSI" in service_albert.prompt_systeme
@@ -23,7 +29,9 @@ def test_la_configuration_contient_la_taille_de_la_fenetre_historique() -> None:
 
 
 def test_fabrique_un_service_albert_avec_un_reformulateur(monkeypatch) -> None:
-    service_albert = fabrique_service_albert()
+    service_albert = fabrique_service_albert_pour(
+        fabrique_client_albert_de_l_application(), AdaptateurExecuteurDeRequetes()
+    )
 
     assert service_albert.reformulateur is not None
     assert isinstance(service_albert.reformulateur, ReformulateurDeQuestion)
@@ -55,3 +63,25 @@ def test_lit_collection_id_jeopardy_depuis_env() -> None:
     assert isinstance(
         configuration.albert.service.id_collection_anssi_lab_jeopardy, int
     )
+
+
+def test_fabrique_le_reclasseur_selon_son_type(une_configuration_de_service_albert):
+    def _reclasseur(type_reclasseur: TypeReclasseur):
+        return fabrique_reclasseur(
+            ClientAlbertMemoire(),
+            une_configuration_de_service_albert(type_reclasseur=type_reclasseur),
+            "albert-large",
+            "{QUESTION} {CANDIDATS}",
+            None,
+        )
+
+    llm = _reclasseur(TypeReclasseur.LLM)
+    cascade = _reclasseur(TypeReclasseur.CASCADE)
+
+    assert isinstance(_reclasseur(TypeReclasseur.BGE), ReclasseurBGE)
+    assert isinstance(llm, ReclasseurLLM)
+    assert llm.modele == "albert-large"
+    assert isinstance(llm.repli, ReclasseurBGE)
+    assert isinstance(cascade, ReclasseurEnCascade)
+    assert cascade.juge.repli is None
+    assert cascade.taille_selection == 8
@@ -1,3 +1,4 @@
+import pytest
 from client_albert_de_test import (
     ClientAlbertMemoire,
     un_resultat_de_recherche,
@@ -15,7 +16,8 @@ PROMPTS = Prompts(
 )
 
 
-def test_retourne_uniquement_le_paragraphe_maitrise(
+@pytest.mark.anyio
+async def test_retourne_uniquement_le_paragraphe_maitrise(
     un_reclasseur, une_configuration_de_service_albert
 ):
     client = ClientAlbertMemoire()
@@ -40,7 +42,7 @@ def test_retourne_uniquement_le_paragraphe_maitrise(
         [un_choix_de_proposition().ayant_pour_contenu("Réponse").construis()]
     )
 
-    reponse = ServiceAlbert(
+    reponse = await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client,
         utilise_recherche_hybride=False,
@@ -57,7 +59,8 @@ def test_retourne_uniquement_le_paragraphe_maitrise(
     assert reponse.paragraphes[0].contenu == "Question maîtrisée"
 
 
-def test_retourne_uniquement_les_chunks_maitrisees_si_score_combine_superieur_au_seuil(
+@pytest.mark.anyio
+async def test_retourne_uniquement_les_chunks_maitrisees_si_score_combine_superieur_au_seuil(
     un_reclasseur, une_configuration_de_service_albert
 ):
     client = ClientAlbertMemoire()
@@ -82,7 +85,7 @@ def test_retourne_uniquement_les_chunks_maitrisees_si_score_combine_superieur_au
         [un_choix_de_proposition().ayant_pour_contenu("Réponse").construis()]
     )
 
-    reponse = ServiceAlbert(
+    reponse = await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client,
         utilise_recherche_hybride=False,
@@ -1,9 +1,12 @@
+import pytest
+from adaptateurs.cache import AdaptateurCacheMemoire
 from client_albert_de_test import ClientAlbertMemoire
 from schemas.albert import ReclasseReponse, ResultatReclasse
 from services.reclasseur import ReclasseurBGE
 
 
-def test_reclasse_les_paragraphes(un_constructeur_de_paragraphe):
+@pytest.mark.anyio
+async def test_reclasse_les_paragraphes(un_constructeur_de_paragraphe):
     client_albert_memoire = ClientAlbertMemoire()
     client_albert_memoire.avec_le_reclassement(
         ReclasseReponse(
@@ -14,7 +17,7 @@ def test_reclasse_les_paragraphes(un_constructeur_de_paragraphe):
         )
     )
 
-    reclasseur = ReclasseurBGE(
+    reclasseur = await ReclasseurBGE(
         client_albert_memoire, "un-modele", "un-prompt", 2
     ).reclasse(
         "une question",
@@ -28,10 +31,11 @@ def test_reclasse_les_paragraphes(un_constructeur_de_paragraphe):
     assert reclasseur.paragraphes_retenus[1].contenu == "texte1"
 
 
-def test_fournit_le_prompt_de_reclassement():
+@pytest.mark.anyio
+async def test_fournit_le_prompt_de_reclassement():
     client_albert_memoire = ClientAlbertMemoire()
 
-    ReclasseurBGE(
+    await ReclasseurBGE(
         client_albert_memoire,
         "un-modele",
         "Prompt de reclassement :\n\n{QUESTION}\n\n, fin prompt",
@@ -44,23 +48,25 @@ def test_fournit_le_prompt_de_reclassement():
     )
 
 
-def test_lis_le_nom_du_modele_de_reclassement(un_reclasseur):
+@pytest.mark.anyio
+async def test_lis_le_nom_du_modele_de_reclassement(un_reclasseur):
     client_albert_memoire = ClientAlbertMemoire()
 
-    ReclasseurBGE(client_albert_memoire, "rerank-small", "Prompt", 2).reclasse(
+    await ReclasseurBGE(client_albert_memoire, "rerank-small", "Prompt", 2).reclasse(
         "Une question", []
     )
 
     assert client_albert_memoire.payload_reclassement_recu.model == "rerank-small"
 
 
-def test_retourne_au_maximum_5_paragraphes_meme_si_le_reclassement_echoue(
+@pytest.mark.anyio
+async def test_retourne_au_maximum_5_paragraphes_meme_si_le_reclassement_echoue(
     un_constructeur_de_paragraphe,
 ):
     client_albert_memoire = ClientAlbertMemoire()
     client_albert_memoire.reclassement_vide()
 
-    paragraphes = ReclasseurBGE(
+    paragraphes = await ReclasseurBGE(
         client_albert_memoire, "rerank-small", "Prompt", 5
     ).reclasse(
         "Une question",
@@ -75,3 +81,66 @@ def test_retourne_au_maximum_5_paragraphes_meme_si_le_reclassement_echoue(
     )
 
     assert len(paragraphes.paragraphes_retenus) == 5
+
+
+@pytest.mark.anyio
+async def test_un_reclassement_deja_calcule_n_interroge_pas_albert(
+    un_constructeur_de_paragraphe,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_le_reclassement(
+        ReclasseReponse(
+            data=[
+                ResultatReclasse(object="rerank", score=0.5, index=1),
+                ResultatReclasse(object="rerank", score=0.4, index=0),
+            ],
+        )
+    )
+    reclasseur = ReclasseurBGE(
+        client_albert_memoire,
+        "un-modele",
+        "un-prompt",
+        2,
+        AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+    )
+    paragraphes = [
+        un_constructeur_de_paragraphe().avec_contenu("texte1").construis(),
+        un_constructeur_de_paragraphe().avec_contenu("texte2").construis(),
+    ]
+    await reclasseur.reclasse("une question", paragraphes)
+    client_albert_memoire.payload_reclassement_recu = None
+
+    resultat = await reclasseur.reclasse("une question", paragraphes)
+
+    assert client_albert_memoire.payload_reclassement_recu is None
+    assert [p.contenu for p in resultat.paragraphes_retenus] == ["texte2", "texte1"]
+    assert [p.score_reclassement for p in resultat.paragraphes_retenus] == [0.5, 0.4]
+
+
+@pytest.mark.anyio
+async def test_un_autre_ensemble_de_candidats_est_reclasse_par_albert(
+    un_constructeur_de_paragraphe,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_le_reclassement(
+        ReclasseReponse(data=[ResultatReclasse(object="rerank", score=0.5, index=0)])
+    )
+    reclasseur = ReclasseurBGE(
+        client_albert_memoire,
+        "un-modele",
+        "un-prompt",
+        2,
+        AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+    )
+    await reclasseur.reclasse(
+        "une question",
+        [un_constructeur_de_paragraphe().avec_contenu("texte1").construis()],
+    )
+    client_albert_memoire.payload_reclassement_recu = None
+
+    await reclasseur.reclasse(
+        "une question",
+        [un_constructeur_de_paragraphe().avec_contenu("texte2").construis()],
+    )
+
+    assert client_albert_memoire.payload_reclassement_recu is not None
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from client_albert_de_test import ClientAlbertMemoire, un_choix_de_proposition
+from infra.metriques import RECLASSEMENTS_EN_CASCADE
+from schemas.albert import ReclasseReponse, ResultatReclasse
+from services.reclasseur import ReclasseurBGE, ReclasseurEnCascade, ReclasseurLLM
+
+
+def _un_reclasseur_en_cascade(
+    client: ClientAlbertMemoire, taille_selection: int = 2, marge: float = 0.2
+) -> ReclasseurEnCascade:
+    return ReclasseurEnCascade(
+        ReclasseurBGE(client, "un-modele", "{QUESTION}", 3),
+        ReclasseurLLM(client, "albert-large", "{QUESTION} {CANDIDATS}"),
+        taille_selection,
+        marge,
+    )
+
+
+def _avec_les_scores_bge(client: ClientAlbertMemoire, scores: list[float]) -> None:
+    client.avec_le_reclassement(
+        ReclasseReponse(
+            data=[
+                ResultatReclasse(object="rerank", score=score, index=index)
+                for index, score in enumerate(scores)
+            ]
+        )
+    )
+
+
+@pytest.fixture
+def des_paragraphes(un_constructeur_de_paragraphe):
+    return [
+        un_constructeur_de_paragraphe().avec_contenu(contenu).construis()
+        for contenu in ["A", "B", "C"]
+    ]
+
+
+@pytest.mark.anyio
+async def test_ne_soumet_au_juge_llm_que_les_mieux_classes_par_bge(des_paragraphes):
+    client = ClientAlbertMemoire()
+    _avec_les_scores_bge(client, [0.3, 0.5, 0.45])
+    client.avec_les_propositions_par_appel(
+        [
+            [
+                un_choix_de_proposition()
+                .ayant_pour_contenu(
+                    json.dumps(
+                        {
+                            "evaluations": [
+                                {"id": 1, "categorie": "element_de_reponse"},
+                                {"id": 2, "categorie": "preuve_principale"},
+                            ],
+                            "ids_retenus": [2],
+                        }
+                    )
+                )
+                .construis()
+            ]
+        ]
+    )
+
+    resultat = await _un_reclasseur_en_cascade(client).reclasse(
+        "Une question ?", des_paragraphes
+    )
+
+    candidats_soumis = client.messages_envoyes_pour_les_propositions[0][0]["content"]
+    assert "]\nB" in candidats_soumis
+    assert "]\nC" in candidats_soumis
+    assert "]\nA" not in candidats_soumis
+    assert [p.contenu for p in resultat.paragraphes_retenus] == ["C"]
+    assert [p.contenu for p in resultat.tous_les_candidats] == ["B", "C", "A"]
+
+
+@pytest.mark.anyio
+async def test_se_passe_du_juge_llm_si_le_meilleur_candidat_est_nettement_devant(
+    des_paragraphes,
+):
+    client = ClientAlbertMemoire()
+    _avec_les_scores_bge(client, [0.1, 0.9, 0.4])
+    evites_avant = RECLASSEMENTS_EN_CASCADE.valeur(juge_llm="evite")
+
+    resultat = await _un_reclasseur_en_cascade(client, marge=0.3).reclasse(
+        "Une question ?", des_paragraphes
+    )
+
+    assert client.appels_recupere_propositions == 0
+    assert client.messages_envoyes_pour_les_propositions == []
+    assert [p.contenu for p in resultat.paragraphes_retenus] == ["B", "C", "A"]
+    assert RECLASSEMENTS_EN_CASCADE.valeur(juge_llm="evite") == evites_avant + 1
+
+
+@pytest.mark.anyio
+async def test_conserve_la_selection_bge_si_le_juge_llm_est_inexploitable(
+    des_paragraphes,
+):
+    client = ClientAlbertMemoire()
+    _avec_les_scores_bge(client, [0.3, 0.5, 0.45])
+    client.avec_les_propositions_par_appel(
+        [[un_choix_de_proposition().ayant_pour_contenu("pas du JSON").construis()]]
+    )
+
+    resultat = await _un_reclasseur_en_cascade(client).reclasse(
+        "Une question ?", des_paragraphes
+    )
+
+    assert [p.contenu for p in resultat.paragraphes_retenus] == ["B", "C"]
+    assert not resultat.aucune_source_utile
@@ -1,19 +1,30 @@
+import pytest
 import json
 
+from adaptateurs.cache import AdaptateurCacheMemoire
 from client_albert_de_test import (
     ClientAlbertMemoire,
+    ConstructeurClientHttp,
+    ConstructeurClientOpenai,
+    RetourRouteRerank,
     un_choix_de_proposition,
 )
-from services.reclasseur import ReclasseurLLM
+from configuration import Albert
+from infra.albert.client_albert import ClientAlbertApi
+from services.exceptions import ErreurCommunicationModele
+from services.reclasseur import ReclasseurBGE, ReclasseurLLM, ResultatReclassement
 
 
-def test_envoie_les_candidats_et_ne_conserve_que_les_preuves_principales(
+@pytest.mark.anyio
+async def test_envoie_les_candidats_et_ne_conserve_que_les_preuves_principales(
     un_constructeur_de_paragraphe,
 ):
     client = ClientAlbertMemoire()
     paragraphe_sans_reponse = (
         un_constructeur_de_paragraphe()
         .avec_rang_initial(3)
+        .dans_le_document("guide.pdf")
+        .a_la_page(12)
         .avec_contenu("Passage dans la thématique, sans réponse")
         .construis()
     )
@@ -53,7 +64,9 @@ def test_envoie_les_candidats_et_ne_conserve_que_les_preuves_principales(
         ]
     )
 
-    reponse = ReclasseurLLM(client, "Un prompt {QUESTION} {CANDIDATS}").reclasse(
+    reponse = await ReclasseurLLM(
+        client, "albert-large", "Un prompt {QUESTION} {CANDIDATS}"
+    ).reclasse(
         "Une question ?",
         [
             paragraphe_sans_reponse,
@@ -71,12 +84,12 @@ def test_envoie_les_candidats_et_ne_conserve_que_les_preuves_principales(
     assert reponse.paragraphes_retenus[0].score_reclassement == 1.0
     assert client.temperatures_recues == [0]
     assert (
-        "[PASSAGE id=1"
+        "[1|guide.pdf|p12]\nPassage dans la thématique"
         in client.messages_envoyes_pour_les_propositions[0][0]["content"]
     )
     assert (
-        "rang_initial=1"
-        in client.messages_envoyes_pour_les_propositions[0][0]["content"]
+        "rang_initial"
+        not in client.messages_envoyes_pour_les_propositions[0][0]["content"]
     )
     assert (
         "R50 Stocker les mots de passe dans un coffre-fort."
@@ -92,7 +105,8 @@ def test_envoie_les_candidats_et_ne_conserve_que_les_preuves_principales(
     )
 
 
-def test_conserve_l_ordre_des_preuves_principales_pour_l_affichage_des_sources(
+@pytest.mark.anyio
+async def test_conserve_l_ordre_des_preuves_principales_pour_l_affichage_des_sources(
     un_constructeur_de_paragraphe,
 ):
     client = ClientAlbertMemoire()
@@ -137,12 +151,259 @@ def test_conserve_l_ordre_des_preuves_principales_pour_l_affichage_des_sources(
         ]
     )
 
-    reponse = ReclasseurLLM(client, "Un prompt {QUESTION} {CANDIDATS}").reclasse(
-        "Une question ?", paragraphes
-    )
+    reponse = await ReclasseurLLM(
+        client, "albert-large", "Un prompt {QUESTION} {CANDIDATS}"
+    ).reclasse("Une question ?", paragraphes)
 
     assert [p.nom_document for p in reponse.paragraphes_retenus] == [
         "guide-anssi.pdf",
         "guide-anssi.pdf",
         "document-contextuel.pdf",
     ]
+
+
+@pytest.mark.anyio
+async def test_un_reclassement_deja_evalue_ne_sollicite_pas_le_modele(
+    un_constructeur_de_paragraphe,
+):
+    client = ClientAlbertMemoire()
+    paragraphes = [
+        un_constructeur_de_paragraphe().avec_contenu("Passage hors sujet").construis(),
+        un_constructeur_de_paragraphe().avec_contenu("Recommandation R50").construis(),
+    ]
+    client.avec_les_propositions_par_appel(
+        [
+            [
+                un_choix_de_proposition()
+                .ayant_pour_contenu(
+                    json.dumps(
+                        {
+                            "evaluations": [
+                                {"id": 1, "categorie": "hors_sujet"},
+                                {"id": 2, "categorie": "preuve_principale"},
+                            ],
+                            "ids_retenus": [2],
+                        }
+                    )
+                )
+                .construis()
+            ]
+        ]
+    )
+    reclasseur = ReclasseurLLM(
+        client,
+        "albert-large",
+        "Un prompt {QUESTION} {CANDIDATS}",
+        AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+    )
+    await reclasseur.reclasse("Une question ?", paragraphes)
+
+    reponse = await reclasseur.reclasse("Une question ?", paragraphes)
+
+    assert client.appels_recupere_propositions == 1
+    assert [p.contenu for p in reponse.paragraphes_retenus] == ["Recommandation R50"]
+
+
+class ReclasseurDeRepli:
+    def __init__(self) -> None:
+        self.appels = 0
+
+    async def reclasse(self, question, paragraphes) -> ResultatReclassement:
+        self.appels += 1
+        return ResultatReclassement(
+            paragraphes_retenus=list(reversed(paragraphes)),
+            tous_les_candidats=paragraphes,
+        )
+
+
+def _une_reponse(contenu: str):
+    return [un_choix_de_proposition().ayant_pour_contenu(contenu).construis()]
+
+
+@pytest.mark.anyio
+async def test_un_reclassement_evalue_par_un_autre_modele_n_est_pas_reutilise(
+    un_constructeur_de_paragraphe,
+):
+    client = ClientAlbertMemoire()
+    client.avec_les_propositions_par_appel(
+        [_une_reponse('{"evaluations": [], "ids_retenus": []}')] * 2
+    )
+    cache = AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60)
+    paragraphes = [un_constructeur_de_paragraphe().construis()]
+
+    for modele in ["albert-large", "albert-small"]:
+        await ReclasseurLLM(client, modele, "{QUESTION} {CANDIDATS}", cache).reclasse(
+            "Une question ?", paragraphes
+        )
+
+    assert client.appels_recupere_propositions == 2
+
+
+@pytest.mark.anyio
+async def test_tronque_chaque_passage_au_nombre_de_jetons_demande(
+    un_constructeur_de_paragraphe,
+):
+    client = ClientAlbertMemoire()
+    client.avec_les_propositions_par_appel(
+        [_une_reponse('{"evaluations": [], "ids_retenus": []}')]
+    )
+
+    await ReclasseurLLM(
+        client, "albert-large", "{QUESTION} {CANDIDATS}", jetons_maximum_par_passage=10
+    ).reclasse(
+        "Une question ?",
+        [un_constructeur_de_paragraphe().avec_contenu("mot " * 100).construis()],
+    )
+
+    contenu = client.messages_envoyes_pour_les_propositions[0][0]["content"]
+    assert contenu.endswith(" […]")
+    assert contenu.count("mot") < 10
+
+
+@pytest.mark.anyio
+async def test_demande_une_sortie_structuree_lorsqu_elle_est_activee(
+    un_constructeur_de_paragraphe,
+):
+    client = ClientAlbertMemoire()
+    client.avec_les_propositions_par_appel(
+        [_une_reponse('{"evaluations": [], "ids_retenus": []}')]
+    )
+
+    await ReclasseurLLM(
+        client, "albert-large", "{QUESTION} {CANDIDATS}", sortie_structuree=True
+    ).reclasse("Une question ?", [un_constructeur_de_paragraphe().construis()])
+
+    format_reponse = client.formats_reponse_recus[0]
+    assert format_reponse["type"] == "json_schema"
+    assert format_reponse["json_schema"]["schema"]["required"] == [
+        "evaluations",
+        "ids_retenus",
+    ]
+
+
+@pytest.mark.anyio
+async def test_lit_le_json_entoure_d_un_bloc_markdown(un_constructeur_de_paragraphe):
+    client = ClientAlbertMemoire()
+    client.avec_les_propositions_par_appel(
+        [
+            _une_reponse(
+                '```json\n{"evaluations": [{"id": 1, "categorie": "preuve_principale"}],'
+                ' "ids_retenus": [1, 1, 7]}\n```'
+            )
+        ]
+    )
+
+    reponse = await ReclasseurLLM(
+        client, "albert-large", "{QUESTION} {CANDIDATS}"
+    ).reclasse("Une question ?", [un_constructeur_de_paragraphe().construis()])
+
+    assert len(reponse.paragraphes_retenus) == 1
+
+
+@pytest.mark.anyio
+async def test_se_replie_sur_le_reclasseur_de_repli_si_la_reponse_est_inexploitable(
+    un_constructeur_de_paragraphe,
+):
+    client = ClientAlbertMemoire()
+    client.avec_les_propositions_par_appel(
+        [_une_reponse('{"evaluations": [{"id": 1, "categorie": "inconnue"}]}')] * 2
+    )
+    repli = ReclasseurDeRepli()
+    paragraphes = [
+        un_constructeur_de_paragraphe().avec_contenu("A").construis(),
+        un_constructeur_de_paragraphe().avec_contenu("B").construis(),
+    ]
+    reclasseur = ReclasseurLLM(
+        client,
+        "albert-large",
+        "{QUESTION} {CANDIDATS}",
+        AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+        repli=repli,  # type: ignore[arg-type]
+    )
+
+    await reclasseur.reclasse("Une question ?", paragraphes)
+    reponse = await reclasseur.reclasse("Une question ?", paragraphes)
+
+    assert repli.appels == 2
+    assert client.appels_recupere_propositions == 2
+    assert [p.contenu for p in reponse.paragraphes_retenus] == ["B", "A"]
+
+
+@pytest.mark.anyio
+async def test_conserve_l_ordre_initial_sans_reponse_exploitable_ni_repli(
+    un_constructeur_de_paragraphe,
+):
+    client = ClientAlbertMemoire()
+    client.avec_les_propositions_par_appel([_une_reponse("Désolé, je ne peux pas.")])
+    paragraphes = [
+        un_constructeur_de_paragraphe().avec_contenu("A").construis(),
+        un_constructeur_de_paragraphe().avec_contenu("B").construis(),
+    ]
+
+    reponse = await ReclasseurLLM(
+        client, "albert-large", "{QUESTION} {CANDIDATS}"
+    ).reclasse("Une question ?", paragraphes)
+
+    assert [p.contenu for p in reponse.paragraphes_retenus] == ["A", "B"]
+    assert not reponse.aucune_source_utile
+
+
+@pytest.mark.anyio
+async def test_se_replie_si_le_modele_est_injoignable(un_constructeur_de_paragraphe):
+    class ClientAlbertInjoignable(ClientAlbertMemoire):
+        async def recupere_propositions(self, *args, **kwargs):
+            raise ErreurCommunicationModele("Injoignable")
+
+    repli = ReclasseurDeRepli()
+
+    await ReclasseurLLM(
+        ClientAlbertInjoignable(),
+        "albert-large",
+        "{QUESTION} {CANDIDATS}",
+        repli=repli,  # type: ignore[arg-type]
+    ).reclasse("Une question ?", [un_constructeur_de_paragraphe().construis()])
+
+    assert repli.appels == 1
+
+
+@pytest.mark.anyio
+async def test_se_replie_sur_le_reclasseur_bge_si_albert_refuse_la_requete(
+    un_constructeur_de_paragraphe,
+):
+    client = ClientAlbertApi(
+        ConstructeurClientOpenai().qui_refuse_la_requete().construis(),
+        ConstructeurClientHttp()
+        .qui_retourne(
+            RetourRouteRerank(
+                [
+                    {"index": 1, "relevance_score": 0.9},
+                    {"index": 0, "relevance_score": 0.2},
+                ]
+            )
+        )
+        .construis(),
+        Albert.Client(  # type: ignore [attr-defined]
+            api_key="",
+            base_url="",
+            modele_reponse="",
+            modele_reformulation="",
+            temps_reponse_maximum_pose_question=10.0,
+            temps_reponse_maximum_recherche_paragraphes=1.0,
+            utilise_recherche_hybride=False,
+            decalage_index_Albert_et_numero_de_page_lecteur=0,
+        ),
+    )
+    paragraphes = [
+        un_constructeur_de_paragraphe().avec_contenu("A").construis(),
+        un_constructeur_de_paragraphe().avec_contenu("B").construis(),
+    ]
+
+    reponse = await ReclasseurLLM(
+        client,
+        "albert-large",
+        "{QUESTION} {CANDIDATS}",
+        sortie_structuree=True,
+        repli=ReclasseurBGE(client, "rerank", "{QUESTION}", 2),
+    ).reclasse("Une question ?", paragraphes)
+
+    assert [p.contenu for p in reponse.paragraphes_retenus] == ["B", "A"]
@@ -32,7 +32,7 @@ def construit_service(
         )
     else:
         prompt_reclassement = PROMPTS.prompt_reclassement
-        reclasseur = ReclasseurLLM(client, prompt_reclassement)
+        reclasseur = ReclasseurLLM(client, "albert-large", prompt_reclassement)
     return ServiceAlbert(
         configuration_service_albert=configuration,
         client=client,
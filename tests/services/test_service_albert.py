@@ -8,7 +8,7 @@ from client_albert_de_test import (
     un_constructeur_de_reponse_de_reclassement,
 )
 from client_albert_de_test import ConstructeurDeChoix
-from configuration import Albert, TypeReclasseur
+from configuration import Albert, DispositionMessages, TypeReclasseur
 from infra.mapping_reponses_maitrisees import MappingReponsesMaitrisees
 from question.reformulateur_de_question import ReformulateurDeQuestion
 from reformulateur_de_question_de_test import ReformulateurDeQuestionDeTest
@@ -24,6 +24,7 @@ from schemas.violations import (
     ViolationQuestionNonComprise,
     ViolationMeconnaissance,
 )
+from services.contexte import RENVOI_AUX_DOCUMENTS
 from services.reclasseur import ReclasseurBGE, ReclasseurLLM, Reclasseur
 from services.service_albert import ServiceAlbert, Prompts
 from tests.conftest import AdaptateurExecuteurDeRequetesMemoire
@@ -40,7 +41,8 @@ REPONSE = "Patates et reblochon"
 FAUX_CONTENU = "La tartiflette est une recette de cuisine à base de gratin de pommes de terre, d'oignons et de lardons, le tout gratiné au reblochon."
 
 
-def test_pose_question_retourne_une_reponse(
+@pytest.mark.anyio
+async def test_pose_question_retourne_une_reponse(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -67,7 +69,7 @@ def test_pose_question_retourne_une_reponse(
         executeur_de_requetes=un_adaptateur_executeur_de_requetes,
     )
 
-    reponse = service_albert.pose_question(question=QUESTION)
+    reponse = await service_albert.pose_question(question=QUESTION)
 
     assert reponse.reponse == REPONSE
     assert len(reponse.paragraphes) == 1
@@ -75,7 +77,8 @@ def test_pose_question_retourne_une_reponse(
     assert reponse.violation is None
 
 
-def test_pose_question_separe_la_question_de_l_utilisatrice_des_instructions_systeme(
+@pytest.mark.anyio
+async def test_pose_question_separe_la_question_de_l_utilisatrice_des_instructions_systeme(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -92,7 +95,7 @@ def test_pose_question_separe_la_question_de_l_utilisatrice_des_instructions_sys
         executeur_de_requetes=un_adaptateur_executeur_de_requetes,
     )
 
-    service_albert.pose_question(question=QUESTION)
+    await service_albert.pose_question(question=QUESTION)
 
     messages = client_albert_memoire.messages_recus
     assert len(messages) == 2
@@ -105,7 +108,8 @@ def test_pose_question_separe_la_question_de_l_utilisatrice_des_instructions_sys
     assert messages[1]["content"] == f"Question :\n{QUESTION}"
 
 
-def test_pose_question_recupere_les_details_du_document_depuis_MSC(
+@pytest.mark.anyio
+async def test_pose_question_recupere_les_details_du_document_depuis_MSC(
     un_reclasseur,
     un_constructeur_d_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -160,13 +164,14 @@ def test_pose_question_recupere_les_details_du_document_depuis_MSC(
         executeur_de_requetes=executeur_de_requetes,
     )
 
-    reponse = service_albert.pose_question(question=QUESTION)
+    reponse = await service_albert.pose_question(question=QUESTION)
 
     assert reponse.paragraphes[0].titre == "Un Nom"
     assert reponse.paragraphes[0].date_mise_a_jour == "2026-06-15T10:00:00:000Z"
 
 
-def test_pose_question_envoie_contenu_et_reponse_pour_un_paragraphe_maitrise(
+@pytest.mark.anyio
+async def test_pose_question_envoie_contenu_et_reponse_pour_un_paragraphe_maitrise(
     tmp_path,
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
@@ -202,7 +207,7 @@ def test_pose_question_envoie_contenu_et_reponse_pour_un_paragraphe_maitrise(
         executeur_de_requetes=un_adaptateur_executeur_de_requetes,
     )
 
-    service_albert.pose_question(question=QUESTION)
+    await service_albert.pose_question(question=QUESTION)
 
     messages = client_albert_memoire.messages_recus
     messages_systeme = list(filter(lambda m: m["role"] == "system", messages))
@@ -211,7 +216,8 @@ def test_pose_question_envoie_contenu_et_reponse_pour_un_paragraphe_maitrise(
     assert reponse_maitrisee in messages_systeme[0]["content"]
 
 
-def test_pose_question_les_documents_sont_ajoutes_aux_instructions_systeme(
+@pytest.mark.anyio
+async def test_pose_question_les_documents_sont_ajoutes_aux_instructions_systeme(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -238,7 +244,7 @@ def test_pose_question_les_documents_sont_ajoutes_aux_instructions_systeme(
         executeur_de_requetes=un_adaptateur_executeur_de_requetes,
     )
 
-    service_albert.pose_question(question=QUESTION)
+    await service_albert.pose_question(question=QUESTION)
 
     messages = client_albert_memoire.messages_recus
     messages_systeme = list(filter(lambda m: m["role"] == "system", messages))
@@ -246,7 +252,45 @@ def test_pose_question_les_documents_sont_ajoutes_aux_instructions_systeme(
     assert FAUX_CONTENU in messages_systeme[0]["content"]
 
 
-def test_pose_question_retourne_une_reponse_generique_et_pas_de_violation_si_albert_ne_retourne_rien(
+@pytest.mark.anyio
+async def test_avec_un_prefixe_stable_les_documents_sont_joints_a_la_question(
+    un_reclasseur,
+    un_adaptateur_executeur_de_requetes,
+    une_configuration_de_service_albert,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats(
+        [un_resultat_de_recherche().ayant_pour_contenu(FAUX_CONTENU).construis()]
+    )
+    client_albert_memoire.avec_les_propositions(
+        [un_choix_de_proposition().ayant_pour_contenu(REPONSE).construis()]
+    )
+    service_albert = ServiceAlbert(
+        une_configuration_de_service_albert(
+            disposition_messages=DispositionMessages.PREFIXE_STABLE
+        ),
+        client_albert_memoire,
+        False,
+        PROMPTS,
+        reformulateur=ReformulateurDeQuestionDeTest(),
+        mapping_reponses=MappingReponsesMaitrisees({}),
+        reclasseur=un_reclasseur,
+        executeur_de_requetes=un_adaptateur_executeur_de_requetes,
+    )
+
+    await service_albert.pose_question(question=QUESTION)
+
+    systeme, question = client_albert_memoire.messages_recus
+    assert systeme["content"] == PROMPT_SYSTEME_ALTERNATIF.format(
+        chunks=RENVOI_AUX_DOCUMENTS
+    )
+    assert FAUX_CONTENU in question["content"]
+    assert "BASE DE CONNAISSANCE" not in question["content"]
+    assert question["content"].endswith(f"Question :\n{QUESTION}")
+
+
+@pytest.mark.anyio
+async def test_pose_question_retourne_une_reponse_generique_et_pas_de_violation_si_albert_ne_retourne_rien(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -265,13 +309,14 @@ def test_pose_question_retourne_une_reponse_generique_et_pas_de_violation_si_alb
         executeur_de_requetes=un_adaptateur_executeur_de_requetes,
     )
 
-    retour = service_albert.pose_question(question=QUESTION)
+    retour = await service_albert.pose_question(question=QUESTION)
 
     assert retour.reponse == REPONSE_PAR_DEFAUT
     assert retour.paragraphes == []
     assert retour.violation is None
 
 
+@pytest.mark.anyio
 @pytest.mark.parametrize(
     "erreur,violation_attendue",
     [
@@ -292,7 +337,7 @@ def test_pose_question_retourne_une_reponse_generique_et_pas_de_violation_si_alb
         ),
     ],
 )
-def test_pose_question_illegale(
+async def test_pose_question_illegale(
     erreur: str,
     violation_attendue: Violation,
     un_reclasseur,
@@ -321,14 +366,15 @@ def test_pose_question_illegale(
         executeur_de_requetes=un_adaptateur_executeur_de_requetes,
     )
 
-    retour = service_albert.pose_question(question="question illégale ?")
+    retour = await service_albert.pose_question(question="question illégale ?")
 
     assert retour.reponse == violation_attendue.reponse
     assert retour.paragraphes == []
     assert retour.violation == violation_attendue
 
 
-def test_le_score_reclassement_est_propage_sur_le_paragraphe(
+@pytest.mark.anyio
+async def test_le_score_reclassement_est_propage_sur_le_paragraphe(
     un_constructeur_de_reclasseur,
     un_constructeur_de_paragraphe,
     un_adaptateur_executeur_de_requetes,
@@ -356,7 +402,7 @@ def test_le_score_reclassement_est_propage_sur_le_paragraphe(
         [un_choix_de_proposition().ayant_pour_contenu(REPONSE).construis()]
     )
 
-    reponse_de_pose_question = ServiceAlbert(
+    reponse_de_pose_question = await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_memoire,
         utilise_recherche_hybride=False,
@@ -370,7 +416,8 @@ def test_le_score_reclassement_est_propage_sur_le_paragraphe(
     assert reponse_de_pose_question.paragraphes[0].score_reclassement == 0.92
 
 
-def test_en_cas_de_reclassement_recherche_paragraphes_retourne_les_5_paragraphes_les_mieux_classes_parmi_les_20_retournes(
+@pytest.mark.anyio
+async def test_en_cas_de_reclassement_recherche_paragraphes_retourne_les_5_paragraphes_les_mieux_classes_parmi_les_20_retournes(
     un_constructeur_de_reclasseur,
     un_constructeur_de_paragraphe,
     un_adaptateur_executeur_de_requetes,
@@ -425,7 +472,7 @@ def test_en_cas_de_reclassement_recherche_paragraphes_retourne_les_5_paragraphes
         ]
     )
 
-    reponse_de_pose_question = ServiceAlbert(
+    reponse_de_pose_question = await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_memoire,
         utilise_recherche_hybride=False,
@@ -445,7 +492,8 @@ def test_en_cas_de_reclassement_recherche_paragraphes_retourne_les_5_paragraphes
     ]
 
 
-def test_les_paragraphes_reclasses_sont_envoyes_a_albert(
+@pytest.mark.anyio
+async def test_les_paragraphes_reclasses_sont_envoyes_a_albert(
     un_constructeur_de_reclasseur,
     un_constructeur_de_paragraphe,
     un_adaptateur_executeur_de_requetes,
@@ -506,7 +554,7 @@ def test_les_paragraphes_reclasses_sont_envoyes_a_albert(
         executeur_de_requetes=un_adaptateur_executeur_de_requetes,
     )
 
-    reponse = service_albert.pose_question(question=QUESTION)
+    reponse = await service_albert.pose_question(question=QUESTION)
 
     messages = client_albert_memoire.messages_recus
     assert len(messages) == 2
@@ -517,7 +565,8 @@ def test_les_paragraphes_reclasses_sont_envoyes_a_albert(
     )
 
 
-def test_retourne_20_paragraphes_en_effectuant_le_reclassement(
+@pytest.mark.anyio
+async def test_retourne_20_paragraphes_en_effectuant_le_reclassement(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -531,7 +580,7 @@ def test_retourne_20_paragraphes_en_effectuant_le_reclassement(
         ]
     )
 
-    ServiceAlbert(
+    await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(
             nombre_paragraphes=20
         ),
@@ -548,7 +597,8 @@ def test_retourne_20_paragraphes_en_effectuant_le_reclassement(
     assert client_albert_memoire.payload_recu.limit == 20
 
 
-def test_appelle_le_reclassement_uniquement_quand_active(
+@pytest.mark.anyio
+async def test_appelle_le_reclassement_uniquement_quand_active(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -560,7 +610,7 @@ def test_appelle_le_reclassement_uniquement_quand_active(
         ]
     )
 
-    ServiceAlbert(
+    await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_memoire,
         utilise_recherche_hybride=False,
@@ -574,7 +624,8 @@ def test_appelle_le_reclassement_uniquement_quand_active(
     assert client_albert_memoire.payload_reclassement_recu is None
 
 
-def test_ne_reclasse_pas_si_la_recherche_de_paragraphes_retourne_un_resultat_vide(
+@pytest.mark.anyio
+async def test_ne_reclasse_pas_si_la_recherche_de_paragraphes_retourne_un_resultat_vide(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -582,7 +633,7 @@ def test_ne_reclasse_pas_si_la_recherche_de_paragraphes_retourne_un_resultat_vid
     client_albert_memoire = ClientAlbertMemoire()
     client_albert_memoire.sans_resultats()
 
-    reponse = ServiceAlbert(
+    reponse = await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_memoire,
         utilise_recherche_hybride=False,
@@ -597,7 +648,8 @@ def test_ne_reclasse_pas_si_la_recherche_de_paragraphes_retourne_un_resultat_vid
     assert reponse.reponse == REPONSE_PAR_DEFAUT
 
 
-def test_retourne_les_resultats_de_recherche_si_le_reclassement_ne_retourne_pas_de_donnees(
+@pytest.mark.anyio
+async def test_retourne_les_resultats_de_recherche_si_le_reclassement_ne_retourne_pas_de_donnees(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -615,7 +667,7 @@ def test_retourne_les_resultats_de_recherche_si_le_reclassement_ne_retourne_pas_
         ]
     )
 
-    reponse = ServiceAlbert(
+    reponse = await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_memoire,
         utilise_recherche_hybride=False,
@@ -631,7 +683,8 @@ def test_retourne_les_resultats_de_recherche_si_le_reclassement_ne_retourne_pas_
     assert reponse.question == "Une question de test ?"
 
 
-def test_initie_une_conversation(
+@pytest.mark.anyio
+async def test_initie_une_conversation(
     un_constructeur_de_conversation,
     un_constructeur_d_interaction,
     un_reclasseur,
@@ -655,7 +708,7 @@ def test_initie_une_conversation(
         .construis()
     )
 
-    ServiceAlbert(
+    await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_memoire,
         utilise_recherche_hybride=False,
@@ -697,7 +750,8 @@ def test_initie_une_conversation(
     ]
 
 
-def test_limite_l_historique_a_2_interactions_passees(
+@pytest.mark.anyio
+async def test_limite_l_historique_a_2_interactions_passees(
     un_constructeur_de_conversation,
     un_constructeur_d_interaction,
     un_reclasseur,
@@ -714,7 +768,7 @@ def test_limite_l_historique_a_2_interactions_passees(
         taille_fenetre_historique=2
     )
 
-    ServiceAlbert(
+    await ServiceAlbert(
         configuration_service_albert=configuration_avec_fenetre_limitee,
         client=client_albert_memoire,
         utilise_recherche_hybride=False,
@@ -754,7 +808,8 @@ def test_limite_l_historique_a_2_interactions_passees(
     ]
 
 
-def test_peut_reformuler_une_question(
+@pytest.mark.anyio
+async def test_peut_reformuler_une_question(
     une_configuration_de_service_albert,
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
@@ -770,7 +825,7 @@ def test_peut_reformuler_une_question(
     )
     client_albert_memoire.avec_les_propositions([mon_choix])
 
-    reponse_question = ServiceAlbert(
+    reponse_question = await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=ClientAlbertMemoire(),
         utilise_recherche_hybride=False,
@@ -784,7 +839,8 @@ def test_peut_reformuler_une_question(
     assert reponse_question.question_reformulee == "Ma question reformulee"
 
 
-def test_recherche_paragraphes_utilise_la_question_reformulee(
+@pytest.mark.anyio
+async def test_recherche_paragraphes_utilise_la_question_reformulee(
     une_configuration_de_service_albert,
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
@@ -803,7 +859,7 @@ def test_recherche_paragraphes_utilise_la_question_reformulee(
     )
     client_albert_reformulation.avec_les_propositions([choix_reformulation])
 
-    ServiceAlbert(
+    await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_recherche,
         utilise_recherche_hybride=False,
@@ -820,7 +876,8 @@ def test_recherche_paragraphes_utilise_la_question_reformulee(
     )
 
 
-def test_reclassement_utilise_la_question_reformulee(
+@pytest.mark.anyio
+async def test_reclassement_utilise_la_question_reformulee(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -844,7 +901,7 @@ def test_reclassement_utilise_la_question_reformulee(
     )
     client_albert_reformulation.avec_les_propositions([choix_reformulation])
 
-    ServiceAlbert(
+    await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_recherche,
         utilise_recherche_hybride=False,
@@ -858,7 +915,8 @@ def test_reclassement_utilise_la_question_reformulee(
     assert un_reclasseur.question_recue == "Question reformulee pour reclassement"
 
 
-def test_pose_question_passe_la_conversation_au_reformulateur(
+@pytest.mark.anyio
+async def test_pose_question_passe_la_conversation_au_reformulateur(
     un_constructeur_de_conversation,
     un_constructeur_d_interaction,
     un_reclasseur,
@@ -888,7 +946,7 @@ def test_pose_question_passe_la_conversation_au_reformulateur(
     )
     client_albert_reformulation.avec_les_propositions([choix_reformulation])
 
-    ServiceAlbert(
+    await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_recherche,
         utilise_recherche_hybride=False,
@@ -914,7 +972,8 @@ def test_pose_question_passe_la_conversation_au_reformulateur(
     )
 
 
-def test_recuperation_propositions_utilise_la_question_reformulee(
+@pytest.mark.anyio
+async def test_recuperation_propositions_utilise_la_question_reformulee(
     un_constructeur_de_conversation,
     un_constructeur_d_interaction,
     un_reclasseur,
@@ -947,7 +1006,7 @@ def test_recuperation_propositions_utilise_la_question_reformulee(
         [un_choix_de_proposition().ayant_pour_contenu(REPONSE).construis()]
     )
 
-    ServiceAlbert(
+    await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_recherche,
         utilise_recherche_hybride=False,
@@ -968,7 +1027,8 @@ def test_recuperation_propositions_utilise_la_question_reformulee(
     assert messages_recus[3]["content"] == "Question :\nQuestion actuelle reformulee"
 
 
-def test_pose_question_reformule_la_question_sans_les_violations_precedentes(
+@pytest.mark.anyio
+async def test_pose_question_reformule_la_question_sans_les_violations_precedentes(
     un_constructeur_de_conversation,
     un_constructeur_d_interaction,
     un_reclasseur,
@@ -1002,7 +1062,7 @@ def test_pose_question_reformule_la_question_sans_les_violations_precedentes(
     )
     client_albert_reformulation.avec_les_propositions([choix_reformulation])
 
-    ServiceAlbert(
+    await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=ClientAlbertMemoire(),
         utilise_recherche_hybride=False,
@@ -1019,7 +1079,8 @@ def test_pose_question_reformule_la_question_sans_les_violations_precedentes(
     assert "Qui es-tu ?" not in str(messages_reformulation)
 
 
-def test_pose_question_recherche_les_paragraphes_sans_les_violations_precedentes(
+@pytest.mark.anyio
+async def test_pose_question_recherche_les_paragraphes_sans_les_violations_precedentes(
     un_constructeur_de_conversation,
     un_constructeur_d_interaction,
     un_reclasseur,
@@ -1057,7 +1118,7 @@ def test_pose_question_recherche_les_paragraphes_sans_les_violations_precedentes
         [un_choix_de_proposition().ayant_pour_contenu(REPONSE).construis()]
     )
 
-    ServiceAlbert(
+    await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_recherche,
         utilise_recherche_hybride=False,
@@ -1074,7 +1135,8 @@ def test_pose_question_recherche_les_paragraphes_sans_les_violations_precedentes
     assert "Qui es-tu ?" not in str(messages_recherche)
 
 
-def test_retourne_violation_question_non_comprise_si_reformulateur_retourne_QUESTION_NON_COMPRISE(
+@pytest.mark.anyio
+async def test_retourne_violation_question_non_comprise_si_reformulateur_retourne_QUESTION_NON_COMPRISE(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -1091,7 +1153,7 @@ def test_retourne_violation_question_non_comprise_si_reformulateur_retourne_QUES
     )
     client_albert_reformulation.avec_les_propositions([choix_reformulation])
 
-    reponse = ServiceAlbert(
+    reponse = await ServiceAlbert(
         configuration_service_albert=une_configuration_de_service_albert(),
         client=client_albert_recherche,
         utilise_recherche_hybride=False,
@@ -1108,7 +1170,8 @@ def test_retourne_violation_question_non_comprise_si_reformulateur_retourne_QUES
     assert client_albert_recherche.payload_recu is None
 
 
-def test_recherche_paragraphes_retourne_un_paragraphe_de_reponse_maitrisee(
+@pytest.mark.anyio
+async def test_recherche_paragraphes_retourne_un_paragraphe_de_reponse_maitrisee(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -1136,7 +1199,7 @@ def test_recherche_paragraphes_retourne_un_paragraphe_de_reponse_maitrisee(
         executeur_de_requetes=un_adaptateur_executeur_de_requetes,
     )
 
-    paragraphes = service_albert.recherche_paragraphes("Ma question ?")
+    paragraphes = await service_albert.recherche_paragraphes("Ma question ?")
 
     paragraphe_attendu = ParagrapheReponseMaitrisee(
         contenu="Quel est le directeur de l'ANSSI ?",
@@ -1169,7 +1232,7 @@ def construit_service(
         )
     else:
         prompt_reclassement = PROMPTS.prompt_reclassement
-        reclasseur = ReclasseurLLM(client, prompt_reclassement)
+        reclasseur = ReclasseurLLM(client, "albert-large", prompt_reclassement)
 
     return ServiceAlbert(
         configuration_service_albert=configuration,
@@ -1186,7 +1249,8 @@ def construit_service(
     )
 
 
-def test_reclassement_llm_retourne_une_meconnaissance_sans_appeler_la_generation_si_aucun_passage_n_est_utile(
+@pytest.mark.anyio
+async def test_reclassement_llm_retourne_une_meconnaissance_sans_appeler_la_generation_si_aucun_passage_n_est_utile(
     une_configuration_de_service_albert,
 ):
     client = ClientAlbertMemoire()
@@ -1216,7 +1280,7 @@ def test_reclassement_llm_retourne_une_meconnaissance_sans_appeler_la_generation
         ]
     )
 
-    reponse = construit_service(
+    reponse = await construit_service(
         client, une_configuration_de_service_albert(type_reclasseur=TypeReclasseur.LLM)
     ).pose_question(question="Question ?")
 
@@ -1225,7 +1289,8 @@ def test_reclassement_llm_retourne_une_meconnaissance_sans_appeler_la_generation
     assert len(client.messages_envoyes_pour_les_propositions) == 1
 
 
-def test_reclasseur_filtre_les_reponses_maitrisees(
+@pytest.mark.anyio
+async def test_reclasseur_filtre_les_reponses_maitrisees(
     un_reclasseur,
     un_adaptateur_executeur_de_requetes,
     une_configuration_de_service_albert,
@@ -1279,12 +1344,13 @@ def test_reclasseur_filtre_les_reponses_maitrisees(
         executeur_de_requetes=un_adaptateur_executeur_de_requetes,
     )
 
-    reponse = service.pose_question(question="Question ?")
+    reponse = await service.pose_question(question="Question ?")
 
     assert [p.contenu for p in reponse.paragraphes] == ["Réponse maîtrisée"]
 
 
-def test_reclasseur_ne_filtre_pas_les_reponses_maitrisees_sous_le_seuil(
+@pytest.mark.anyio
+async def test_reclasseur_ne_filtre_pas_les_reponses_maitrisees_sous_le_seuil(
     un_reclasseur,
     un_constructeur_de_paragraphe,
     un_constructeur_de_paragraphe_reponse_maitrisee,
@@ -1341,9 +1407,150 @@ def test_reclasseur_ne_filtre_pas_les_reponses_maitrisees_sous_le_seuil(
         executeur_de_requetes=un_adaptateur_executeur_de_requetes,
     )
 
-    reponse = service.pose_question(question="Question ?")
+    reponse = await service.pose_question(question="Question ?")
 
     assert [p.contenu for p in reponse.paragraphes] == [
         "Réponse maîtrisée",
         "Autre preuve",
     ]
+
+
+@pytest.mark.anyio
+async def test_pose_question_sert_directement_une_reponse_maitrisee_reconnue_localement(
+    un_reclasseur,
+    un_adaptateur_executeur_de_requetes,
+    une_configuration_de_service_albert,
+):
+    client = ClientAlbertMemoire()
+    service = ServiceAlbert(
+        configuration_service_albert=une_configuration_de_service_albert(
+            reponse_maitrisee_locale_active=True
+        ),
+        client=client,
+        utilise_recherche_hybride=False,
+        prompts=PROMPTS,
+        reformulateur=ReformulateurDeQuestionDeTest(),
+        mapping_reponses=MappingReponsesMaitrisees(
+            {
+                "qui-est-le-directeur-de-lanssi": "Vincent Strubel.",
+                "comment-signaler-une-faille-de-securite": "Contactez le CERT-FR.",
+            }
+        ),
+        reclasseur=un_reclasseur,
+        executeur_de_requetes=un_adaptateur_executeur_de_requetes,
+    )
+
+    reponse = await service.pose_question(question="Qui est le directeur de l'ANSSI ?")
+
+    assert reponse.reponse == "Vincent Strubel."
+    assert reponse.violation is None
+    assert client.payload_recu is None
+    assert client.messages_recus == []
+
+
+@pytest.mark.anyio
+async def test_pose_question_ne_sert_pas_de_reponse_maitrisee_locale_en_cours_de_conversation(
+    un_reclasseur,
+    un_adaptateur_executeur_de_requetes,
+    une_configuration_de_service_albert,
+    un_constructeur_de_conversation,
+    un_constructeur_d_interaction,
+):
+    client = ClientAlbertMemoire()
+    client.avec_les_resultats(
+        [un_resultat_de_recherche().ayant_pour_contenu(FAUX_CONTENU).construis()]
+    )
+    client.avec_les_propositions(
+        [un_choix_de_proposition().ayant_pour_contenu(REPONSE).construis()]
+    )
+    service = ServiceAlbert(
+        configuration_service_albert=une_configuration_de_service_albert(
+            reponse_maitrisee_locale_active=True
+        ),
+        client=client,
+        utilise_recherche_hybride=False,
+        prompts=PROMPTS,
+        reformulateur=ReformulateurDeQuestionDeTest(),
+        mapping_reponses=MappingReponsesMaitrisees(
+            {"qui-est-le-directeur-de-lanssi": "Vincent Strubel."}
+        ),
+        reclasseur=un_reclasseur,
+        executeur_de_requetes=un_adaptateur_executeur_de_requetes,
+    )
+
+    reponse = await service.pose_question(
+        question="Qui est le directeur de l'ANSSI ?",
+        conversation=un_constructeur_de_conversation()
+        .avec_interaction(un_constructeur_d_interaction().construis())
+        .construis(),
+    )
+
+    assert reponse.reponse == REPONSE
+
+
+@pytest.mark.anyio
+async def test_seuls_les_paragraphes_tenant_dans_le_budget_de_jetons_sont_envoyes_et_retournes(
+    un_reclasseur,
+    un_adaptateur_executeur_de_requetes,
+    une_configuration_de_service_albert,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats(
+        [
+            un_resultat_de_recherche()
+            .ayant_pour_contenu(f"paragraphe {i} " + "x" * 400)
+            .construis()
+            for i in range(3)
+        ]
+    )
+    client_albert_memoire.avec_les_propositions(
+        [un_choix_de_proposition().ayant_pour_contenu(REPONSE).construis()]
+    )
+    service_albert = ServiceAlbert(
+        une_configuration_de_service_albert(budget_jetons_prompt=300),
+        client_albert_memoire,
+        False,
+        PROMPTS,
+        reformulateur=ReformulateurDeQuestionDeTest(),
+        mapping_reponses=MappingReponsesMaitrisees({}),
+        reclasseur=un_reclasseur,
+        executeur_de_requetes=un_adaptateur_executeur_de_requetes,
+    )
+
+    reponse = await service_albert.pose_question(question=QUESTION)
+
+    prompt_systeme = client_albert_memoire.messages_recus[0]["content"]
+    assert "paragraphe 1 " in prompt_systeme
+    assert "paragraphe 2 " not in prompt_systeme
+    assert len(reponse.paragraphes) == 2
+
+
+@pytest.mark.anyio
+async def test_pose_question_ne_sert_pas_de_reponse_maitrisee_locale_par_defaut(
+    un_reclasseur,
+    un_adaptateur_executeur_de_requetes,
+    une_configuration_de_service_albert,
+):
+    client = ClientAlbertMemoire()
+    client.avec_les_resultats(
+        [un_resultat_de_recherche().ayant_pour_contenu(FAUX_CONTENU).construis()]
+    )
+    client.avec_les_propositions(
+        [un_choix_de_proposition().ayant_pour_contenu(REPONSE).construis()]
+    )
+    service = ServiceAlbert(
+        configuration_service_albert=une_configuration_de_service_albert(),
+        client=client,
+        utilise_recherche_hybride=False,
+        prompts=PROMPTS,
+        reformulateur=ReformulateurDeQuestionDeTest(),
+        mapping_reponses=MappingReponsesMaitrisees(
+            {"qui-est-le-directeur-de-lanssi": "Vincent Strubel."}
+        ),
+        reclasseur=un_reclasseur,
+        executeur_de_requetes=un_adaptateur_executeur_de_requetes,
+    )
+
+    reponse = await service.pose_question(question="Qui est le directeur de l'ANSSI ?")
+
+    assert reponse.reponse == REPONSE
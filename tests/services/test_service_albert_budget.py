@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from client_albert_de_test import (
+    ClientAlbertMemoire,
+    un_choix_de_proposition,
+    un_resultat_de_recherche,
+)
+from schemas.albert import Paragraphe
+from services.budget import Etape
+from services.exceptions import ErreurDelaiDepasse
+from services.reclasseur import Reclasseur, ResultatReclassement
+
+
+class ReclasseurLLMLent(Reclasseur):
+    sollicite_un_llm = True
+
+    def __init__(self) -> None:
+        self.appels = 0
+
+    async def reclasse(
+        self, question: str, paragraphes: list[Paragraphe]
+    ) -> ResultatReclassement:
+        self.appels += 1
+        await asyncio.sleep(0.3)
+        return ResultatReclassement(
+            paragraphes_retenus=paragraphes, tous_les_candidats=paragraphes
+        )
+
+
+def _un_client_albert() -> ClientAlbertMemoire:
+    client_albert = ClientAlbertMemoire()
+    client_albert.avec_les_resultats(
+        [un_resultat_de_recherche().ayant_pour_contenu("Paragraphe").construis()]
+    )
+    client_albert.avec_les_propositions(
+        [un_choix_de_proposition().ayant_pour_contenu("Réponse").construis()]
+    )
+    return client_albert
+
+
+@pytest.mark.anyio
+async def test_pose_question_indique_l_etape_ayant_depasse_le_delai(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert = _un_client_albert()
+    client_albert.avec_un_delai_pour_la_recherche(1)
+    service_albert = un_service_albert(
+        client_albert,
+        configuration_service_albert=une_configuration_de_service_albert(
+            part_budget_avant_doublon=1
+        ),
+    )
+
+    with pytest.raises(ErreurDelaiDepasse) as erreur:
+        await service_albert.pose_question(
+            question="Qu'est-ce qu'un MFA ?", delai_maximum=0.2
+        )
+
+    assert erreur.value.etape == Etape.RECHERCHE
+
+
+@pytest.mark.anyio
+async def test_une_recherche_trop_lente_est_doublee(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert = _un_client_albert()
+    client_albert.avec_des_delais_pour_la_recherche_par_appel([1, 0])
+    service_albert = un_service_albert(
+        client_albert,
+        configuration_service_albert=une_configuration_de_service_albert(
+            part_budget_avant_doublon=0.1
+        ),
+    )
+
+    reponse = await service_albert.pose_question(
+        question="Qu'est-ce qu'un MFA ?", delai_maximum=2
+    )
+
+    assert reponse.reponse == "Réponse"
+    assert [p.contenu for p in reponse.paragraphes] == ["Paragraphe"]
+
+
+@pytest.mark.anyio
+async def test_le_delai_par_defaut_est_celui_de_la_configuration(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert = _un_client_albert()
+    client_albert.avec_un_delai_pour_la_recherche(1)
+    service_albert = un_service_albert(
+        client_albert,
+        configuration_service_albert=une_configuration_de_service_albert(
+            delai_maximum_pose_question=0.2
+        ),
+    )
+
+    with pytest.raises(ErreurDelaiDepasse):
+        await service_albert.pose_question(question="Qu'est-ce qu'un MFA ?")
+
+
+@pytest.mark.anyio
+async def test_sans_delai_configure_une_etape_lente_n_echoue_pas(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert = _un_client_albert()
+    client_albert.avec_un_delai_pour_la_recherche(0.3)
+    service_albert = un_service_albert(
+        client_albert,
+        configuration_service_albert=une_configuration_de_service_albert(
+            part_budget_avant_doublon=0.1
+        ),
+    )
+
+    reponse = await service_albert.pose_question(question="Qu'est-ce qu'un MFA ?")
+
+    assert reponse.reponse == "Réponse"
+
+
+@pytest.mark.anyio
+async def test_un_reclassement_sollicitant_un_llm_n_est_pas_double(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    reclasseur = ReclasseurLLMLent()
+    service_albert = un_service_albert(
+        _un_client_albert(),
+        reclasseur=reclasseur,
+        configuration_service_albert=une_configuration_de_service_albert(
+            part_budget_avant_doublon=0.1
+        ),
+    )
+
+    reponse = await service_albert.pose_question(
+        question="Qu'est-ce qu'un MFA ?", delai_maximum=5
+    )
+
+    assert reponse.reponse == "Réponse"
+    assert reclasseur.appels == 1
@@ -0,0 +1,127 @@
+import pytest
+
+from adaptateurs.cache import AdaptateurCacheMemoire
+from client_albert_de_test import (
+    ClientAlbertMemoire,
+    un_choix_de_proposition,
+    un_resultat_de_recherche,
+)
+from schemas.violations import ViolationThematique
+
+
+def _un_client_albert(reponses: list[str]) -> ClientAlbertMemoire:
+    client_albert = ClientAlbertMemoire()
+    client_albert.avec_les_resultats(
+        [un_resultat_de_recherche().ayant_pour_contenu("Paragraphe").construis()]
+    )
+    client_albert.avec_les_propositions_par_appel(
+        [
+            [un_choix_de_proposition().ayant_pour_contenu(reponse).construis()]
+            for reponse in reponses
+        ]
+    )
+    return client_albert
+
+
+@pytest.mark.anyio
+async def test_une_premiere_question_deja_posee_est_servie_depuis_le_cache(
+    un_service_albert,
+):
+    client_albert = _un_client_albert(["Réponse MFA"])
+    service_albert = un_service_albert(
+        client_albert,
+        cache_reponses=AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+    )
+    await service_albert.pose_question(question="Qu'est-ce que le MFA ?")
+
+    reponse = await service_albert.pose_question(question="qu'est-ce que le MFA?")
+
+    assert client_albert.appels_recupere_propositions == 1
+    assert reponse.reponse == "Réponse MFA"
+    assert reponse.question == "qu'est-ce que le MFA?"
+    assert [p.contenu for p in reponse.paragraphes] == ["Paragraphe"]
+
+
+@pytest.mark.anyio
+async def test_une_question_avec_historique_n_utilise_pas_le_cache(
+    un_service_albert,
+    un_constructeur_de_conversation,
+    un_constructeur_d_interaction,
+):
+    client_albert = _un_client_albert(["Première réponse", "Seconde réponse"])
+    service_albert = un_service_albert(
+        client_albert,
+        cache_reponses=AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60),
+    )
+    await service_albert.pose_question(question="Comment s'en protéger ?")
+
+    reponse = await service_albert.pose_question(
+        question="Comment s'en protéger ?",
+        conversation=un_constructeur_de_conversation()
+        .avec_interaction(un_constructeur_d_interaction().construis())
+        .construis(),
+    )
+
+    assert reponse.reponse == "Seconde réponse"
+
+
+@pytest.mark.anyio
+async def test_un_changement_de_version_de_la_collection_invalide_le_cache(
+    un_service_albert,
+):
+    client_albert = _un_client_albert(["Ancienne réponse", "Nouvelle réponse"])
+    cache = AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60)
+    await un_service_albert(
+        client_albert, cache_reponses=cache, version_cache_reponses="v1"
+    ).pose_question(question="Qu'est-ce que le MFA ?")
+
+    reponse = await un_service_albert(
+        client_albert, cache_reponses=cache, version_cache_reponses="v2"
+    ).pose_question(question="Qu'est-ce que le MFA ?")
+
+    assert reponse.reponse == "Nouvelle réponse"
+
+
+@pytest.mark.anyio
+async def test_un_changement_de_modele_de_generation_invalide_le_cache(
+    un_service_albert,
+):
+    client_albert = _un_client_albert(["Ancienne réponse", "Nouvelle réponse"])
+    cache = AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60)
+    await un_service_albert(
+        client_albert, cache_reponses=cache, modele_reponse="albert-small"
+    ).pose_question(question="Qu'est-ce que le MFA ?")
+
+    reponse = await un_service_albert(
+        client_albert, cache_reponses=cache, modele_reponse="albert-large"
+    ).pose_question(question="Qu'est-ce que le MFA ?")
+
+    assert reponse.reponse == "Nouvelle réponse"
+
+
+@pytest.mark.anyio
+async def test_les_violations_ne_sont_servies_depuis_le_cache_que_sur_demande(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert = _un_client_albert(
+        ["ERREUR_THÉMATIQUE", "ERREUR_THÉMATIQUE", "Réponse"]
+    )
+    cache = AdaptateurCacheMemoire(taille_maximum=10, duree_de_vie=60)
+    service_sans_violations = un_service_albert(client_albert, cache_reponses=cache)
+    service_avec_violations = un_service_albert(
+        client_albert,
+        configuration_service_albert=une_configuration_de_service_albert(
+            cache_reponses_sert_les_violations=True
+        ),
+        cache_reponses=cache,
+    )
+
+    await service_sans_violations.pose_question(question="Une recette de gâteau ?")
+    await service_avec_violations.pose_question(question="Une recette de gâteau ?")
+    reponse = await service_avec_violations.pose_question(
+        question="Une recette de gâteau ?"
+    )
+
+    assert client_albert.appels_recupere_propositions == 2
+    assert isinstance(reponse.violation, ViolationThematique)
@@ -1,3 +1,4 @@
+import pytest
 from client_albert_de_test import (
     ClientAlbertMemoire,
     un_resultat_de_recherche,
@@ -15,7 +16,8 @@ from serveur_de_test import (
 from services.service_albert import ServiceAlbert, Prompts
 
 
-def test_recherche_chunk_par_id_utilise_api_documents():
+@pytest.mark.anyio
+async def test_recherche_chunk_par_id_utilise_api_documents():
     client_albert_memoire = ClientAlbertMemoire()
 
     chunk_source = (
@@ -23,7 +25,7 @@ def test_recherche_chunk_par_id_utilise_api_documents():
     )
     client_albert_memoire.avec_chunk_par_id(chunk_source)
 
-    resultat = client_albert_memoire.recherche_chunk_par_id(
+    resultat = await client_albert_memoire.recherche_chunk_par_id(
         id_document="4065642", id_chunk=73
     )
 
@@ -32,7 +34,8 @@ def test_recherche_chunk_par_id_utilise_api_documents():
     assert client_albert_memoire.id_chunk_recu == 73
 
 
-def test_recherche_jeopardy_utilise_recherche_chunk_par_id(
+@pytest.mark.anyio
+async def test_recherche_jeopardy_utilise_recherche_chunk_par_id(
     un_reclasseur, une_configuration_de_service_albert
 ):
     client_albert_memoire = ClientAlbertMemoire()
@@ -85,8 +88,10 @@ def test_recherche_jeopardy_utilise_recherche_chunk_par_id(
         reclasseur=un_reclasseur,
         executeur_de_requetes=AdaptateurExecuteurDeRequetesMemoire(),
     )
-    paragraphes = service_albert._ServiceAlbert__recherche_dans_collection_jeopardy(
-        "Ma question ?"
+    paragraphes = (
+        await service_albert._ServiceAlbert__recherche_dans_collection_jeopardy(
+            "Ma question ?"
+        )
     )
 
     assert len(paragraphes) == 2
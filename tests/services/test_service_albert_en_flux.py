@@ -0,0 +1,161 @@
+import pytest
+
+from client_albert_de_test import (
+    ClientAlbertMemoire,
+    ConstructeurDeChoix,
+    un_choix_de_proposition,
+    un_resultat_de_recherche,
+)
+from question.reformulateur_de_question import ReformulateurDeQuestion
+from schemas.albert import FragmentReponse, ReponseQuestion
+from schemas.violations import (
+    ViolationIdentite,
+    ViolationMalveillance,
+    ViolationQuestionNonComprise,
+)
+
+
+@pytest.mark.anyio
+async def test_pose_question_en_flux_emet_les_fragments_puis_la_reponse_complete(
+    un_service_albert,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats(
+        [un_resultat_de_recherche().ayant_pour_contenu("Un contenu").construis()]
+    )
+    client_albert_memoire.avec_les_propositions(
+        [
+            un_choix_de_proposition()
+            .ayant_pour_contenu("Patates et reblochon")
+            .construis()
+        ]
+    )
+    service_albert = un_service_albert(client_albert_memoire)
+
+    evenements = [
+        e async for e in service_albert.pose_question_en_flux(question="Tartiflette ?")
+    ]
+
+    assert evenements[:-1] == [
+        FragmentReponse(contenu="Patat"),
+        FragmentReponse(contenu="es et"),
+        FragmentReponse(contenu=" rebl"),
+        FragmentReponse(contenu="ochon"),
+    ]
+    reponse = evenements[-1]
+    assert isinstance(reponse, ReponseQuestion)
+    assert reponse.reponse == "Patates et reblochon"
+    assert len(reponse.paragraphes) == 1
+    assert reponse.violation is None
+
+
+@pytest.mark.anyio
+async def test_pose_question_en_flux_termine_par_la_violation_detectee(
+    un_service_albert,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats(
+        [un_resultat_de_recherche().ayant_pour_contenu("Un contenu").construis()]
+    )
+    client_albert_memoire.avec_les_propositions(
+        [un_choix_de_proposition().ayant_pour_contenu("ERREUR_IDENTITÉ").construis()]
+    )
+    service_albert = un_service_albert(client_albert_memoire)
+
+    evenements = [
+        e async for e in service_albert.pose_question_en_flux(question="Qui es-tu ?")
+    ]
+
+    reponse = evenements[-1]
+    assert reponse.violation == ViolationIdentite()
+    assert reponse.reponse == ViolationIdentite().reponse
+    assert reponse.paragraphes == []
+
+
+@pytest.mark.anyio
+async def test_pose_question_en_flux_ne_genere_rien_si_la_question_n_est_pas_comprise(
+    un_service_albert,
+):
+    client_albert_recherche = ClientAlbertMemoire()
+    client_albert_reformulation = ClientAlbertMemoire()
+    client_albert_reformulation.avec_les_propositions(
+        [ConstructeurDeChoix().ayant_pour_contenu("QUESTION_NON_COMPRISE").construis()]
+    )
+    service_albert = un_service_albert(
+        client_albert_recherche,
+        reformulateur=ReformulateurDeQuestion(
+            client_albert_reformulation, "Mon prompt", "albert-small"
+        ),
+    )
+
+    evenements = [
+        e
+        async for e in service_albert.pose_question_en_flux(
+            question="Raconte-moi une blague"
+        )
+    ]
+
+    assert len(evenements) == 1
+    assert evenements[0].violation == ViolationQuestionNonComprise()
+    assert client_albert_recherche.fragments_emis_en_flux == 0
+
+
+def _un_client_qui_genere(contenu: str) -> ClientAlbertMemoire:
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats(
+        [un_resultat_de_recherche().ayant_pour_contenu("Un contenu").construis()]
+    )
+    client_albert_memoire.avec_les_propositions(
+        [un_choix_de_proposition().ayant_pour_contenu(contenu).construis()]
+    )
+    return client_albert_memoire
+
+
+@pytest.mark.anyio
+async def test_pose_question_en_flux_interrompt_la_generation_des_qu_un_marqueur_de_violation_est_reconnu(
+    un_service_albert,
+):
+    client_albert_memoire = _un_client_qui_genere(
+        "ERREUR_IDENTITÉ, je suis un service développé par l'ANSSI..."
+    )
+    service_albert = un_service_albert(client_albert_memoire)
+
+    evenements = [
+        e async for e in service_albert.pose_question_en_flux(question="Qui es-tu ?")
+    ]
+
+    assert len(evenements) == 1
+    assert evenements[0].violation == ViolationIdentite()
+    assert client_albert_memoire.fragments_emis_en_flux == 3
+
+
+@pytest.mark.anyio
+async def test_pose_question_en_flux_reconnait_un_marqueur_entre_guillemets(
+    un_service_albert,
+):
+    service_albert = un_service_albert(_un_client_qui_genere('"ERREUR_MALVEILLANCE"'))
+
+    evenements = [
+        e async for e in service_albert.pose_question_en_flux(question="Pirater ?")
+    ]
+
+    assert len(evenements) == 1
+    assert evenements[0].violation == ViolationMalveillance()
+
+
+@pytest.mark.anyio
+async def test_pose_question_en_flux_transmet_le_debut_retenu_des_qu_il_ne_peut_plus_etre_un_marqueur(
+    un_service_albert,
+):
+    service_albert = un_service_albert(_un_client_qui_genere("ERREUR est humaine"))
+
+    evenements = [
+        e async for e in service_albert.pose_question_en_flux(question="Proverbe ?")
+    ]
+
+    assert evenements[:-1] == [
+        FragmentReponse(contenu="ERREUR est"),
+        FragmentReponse(contenu=" huma"),
+        FragmentReponse(contenu="ine"),
+    ]
+    assert evenements[-1].reponse == "ERREUR est humaine"
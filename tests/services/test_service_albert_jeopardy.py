@@ -1,3 +1,9 @@
+import asyncio
+import time
+
+import pytest
+
+from adaptateurs.entrepot_chunks import AdaptateurEntrepotChunksMemoire
 from client_albert_de_test import ClientAlbertMemoire, un_resultat_de_recherche
 from infra.mapping_reponses_maitrisees import MappingReponsesMaitrisees
 from question.reformulateur_de_question import ReformulateurDeQuestion
@@ -15,7 +21,8 @@ PROMPTS = Prompts(
 )
 
 
-def test_recherche_jeopardy_retourne_les_chunks_sources(
+@pytest.mark.anyio
+async def test_recherche_jeopardy_retourne_les_chunks_sources(
     un_reclasseur, une_configuration_de_service_albert
 ):
     client_albert_memoire = ClientAlbertMemoire()
@@ -67,8 +74,10 @@ def test_recherche_jeopardy_retourne_les_chunks_sources(
         executeur_de_requetes=AdaptateurExecuteurDeRequetesMemoire(),
     )
 
-    paragraphes = service_albert._ServiceAlbert__recherche_dans_collection_jeopardy(
-        "Ma question ?"
+    paragraphes = (
+        await service_albert._ServiceAlbert__recherche_dans_collection_jeopardy(
+            "Ma question ?"
+        )
     )
 
     assert len(paragraphes) == 2
@@ -77,7 +86,8 @@ def test_recherche_jeopardy_retourne_les_chunks_sources(
     assert client_albert_memoire.payload_jeopardy_recu.collection_ids == [161155]
 
 
-def test_recherche_paragraphes_fusionne_resultats_classique_et_jeopardy(
+@pytest.mark.anyio
+async def test_recherche_paragraphes_fusionne_resultats_classique_et_jeopardy(
     un_reclasseur, une_configuration_de_service_albert
 ):
     client_albert_memoire = ClientAlbertMemoire()
@@ -124,12 +134,13 @@ def test_recherche_paragraphes_fusionne_resultats_classique_et_jeopardy(
         executeur_de_requetes=AdaptateurExecuteurDeRequetesMemoire(),
     )
 
-    paragraphes = service_albert.recherche_paragraphes("Ma question ?")
+    paragraphes = await service_albert.recherche_paragraphes("Ma question ?")
 
     assert len(paragraphes) == 10
 
 
-def test_recherche_paragraphes_dedoublonne_les_chunks_communs(
+@pytest.mark.anyio
+async def test_recherche_paragraphes_dedoublonne_les_chunks_communs(
     un_reclasseur, une_configuration_de_service_albert
 ):
     client_albert_memoire = ClientAlbertMemoire()
@@ -169,14 +180,15 @@ def test_recherche_paragraphes_dedoublonne_les_chunks_communs(
         executeur_de_requetes=AdaptateurExecuteurDeRequetesMemoire(),
     )
 
-    paragraphes = service_albert.recherche_paragraphes("Ma question ?")
+    paragraphes = await service_albert.recherche_paragraphes("Ma question ?")
 
     contenus = [p.contenu for p in paragraphes]
     assert len(paragraphes) == 3
     assert contenus.count("Chunk commun") == 1
 
 
-def test_recherche_paragraphes_retourne_5_recherches_classique_et_5_recherches_jeopardy(
+@pytest.mark.anyio
+async def test_recherche_paragraphes_retourne_5_recherches_classique_et_5_recherches_jeopardy(
     un_reclasseur, une_configuration_de_service_albert
 ):
     client_albert_memoire = ClientAlbertMemoire()
@@ -226,6 +238,255 @@ def test_recherche_paragraphes_retourne_5_recherches_classique_et_5_recherches_j
         executeur_de_requetes=AdaptateurExecuteurDeRequetesMemoire(),
     )
 
-    paragraphes = service_albert.recherche_paragraphes("Ma question ?")
+    paragraphes = await service_albert.recherche_paragraphes("Ma question ?")
 
     assert len(paragraphes) == 10
+
+
+def _des_resultats_jeopardy(nombre: int) -> list[ResultatRechercheJeopardy]:
+    return [
+        ResultatRechercheJeopardy(
+            chunk=RechercheChunkJeopardy(
+                content=f"Question {i}",
+                metadata=RechercheMetadonneesJeopardy(
+                    source_id_document="4065642",
+                    source_id_chunk=i,
+                    source_numero_page=i,
+                ),
+            ),
+            score=0.9,
+        )
+        for i in range(nombre)
+    ]
+
+
+@pytest.mark.anyio
+async def test_les_chunks_sources_recuperes_en_parallele_conservent_le_rang_jeopardy(
+    un_service_albert,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats_jeopardy(_des_resultats_jeopardy(3))
+    client_albert_memoire.avec_chunks_par_id(
+        [
+            un_resultat_de_recherche().ayant_pour_contenu(f"Chunk {i}").construis()
+            for i in range(3)
+        ]
+    )
+    client_albert_memoire.avec_un_delai_pour_le_chunk(0, 0.05)
+    service_albert = un_service_albert(client_albert_memoire)
+
+    paragraphes = (
+        await service_albert._ServiceAlbert__recherche_dans_collection_jeopardy(
+            "Ma question ?"
+        )
+    )
+
+    assert [p.contenu for p in paragraphes] == ["Chunk 0", "Chunk 1", "Chunk 2"]
+    assert [p.rang_initial for p in paragraphes] == [1, 2, 3]
+
+
+@pytest.mark.anyio
+async def test_le_nombre_de_chunks_sources_recuperes_simultanement_est_limite(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats_jeopardy(_des_resultats_jeopardy(6))
+    for i in range(6):
+        client_albert_memoire.avec_un_delai_pour_le_chunk(i, 0.01)
+    service_albert = un_service_albert(
+        client_albert_memoire,
+        configuration_service_albert=une_configuration_de_service_albert(
+            nombre_paragraphes=6, concurrence_maximum_chunks_jeopardy=2
+        ),
+    )
+
+    await service_albert._ServiceAlbert__recherche_dans_collection_jeopardy(
+        "Ma question ?"
+    )
+
+    assert len(client_albert_memoire.appels_recherche_chunk_par_id) == 6
+    assert client_albert_memoire.recuperations_de_chunks_simultanees_maximum == 2
+
+
+@pytest.mark.anyio
+async def test_un_chunk_source_non_recupere_dans_le_delai_est_degrade_en_chunk_vide(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats_jeopardy(_des_resultats_jeopardy(2))
+    client_albert_memoire.avec_chunks_par_id(
+        [
+            un_resultat_de_recherche().ayant_pour_contenu("Chunk lent").construis(),
+            un_resultat_de_recherche().ayant_pour_contenu("Chunk rapide").construis(),
+        ]
+    )
+    client_albert_memoire.avec_un_delai_pour_le_chunk(0, 1)
+    service_albert = un_service_albert(
+        client_albert_memoire,
+        configuration_service_albert=une_configuration_de_service_albert(
+            delai_maximum_chunks_jeopardy=0.05
+        ),
+    )
+
+    paragraphes = (
+        await service_albert._ServiceAlbert__recherche_dans_collection_jeopardy(
+            "Ma question ?"
+        )
+    )
+
+    assert [p.contenu for p in paragraphes] == ["", "Chunk rapide"]
+    assert client_albert_memoire.recuperations_de_chunks_en_cours == 0
+
+
+@pytest.mark.anyio
+async def test_les_chunks_sources_en_cours_sont_annules_avec_la_recherche(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats_jeopardy(_des_resultats_jeopardy(2))
+    client_albert_memoire.avec_un_delai_pour_le_chunk(0, 1)
+    client_albert_memoire.avec_un_delai_pour_le_chunk(1, 1)
+    service_albert = un_service_albert(
+        client_albert_memoire,
+        configuration_service_albert=une_configuration_de_service_albert(
+            delai_maximum_chunks_jeopardy=3.0
+        ),
+    )
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(
+            service_albert._ServiceAlbert__recherche_dans_collection_jeopardy(
+                "Ma question ?"
+            ),
+            timeout=0.05,
+        )
+
+    assert client_albert_memoire.recuperations_de_chunks_en_cours == 0
+
+
+@pytest.mark.anyio
+async def test_les_chunks_sources_presents_dans_l_entrepot_ne_sollicitent_pas_albert(
+    un_service_albert,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats_jeopardy(_des_resultats_jeopardy(2))
+    entrepot = AdaptateurEntrepotChunksMemoire(taille_maximum=10)
+    await entrepot.enregistre(
+        "4065642",
+        0,
+        un_resultat_de_recherche().ayant_pour_contenu("Chunk 0").construis(),
+    )
+    await entrepot.enregistre(
+        "4065642",
+        1,
+        un_resultat_de_recherche().ayant_pour_contenu("Chunk 1").construis(),
+    )
+    service_albert = un_service_albert(client_albert_memoire, entrepot_chunks=entrepot)
+
+    paragraphes = (
+        await service_albert._ServiceAlbert__recherche_dans_collection_jeopardy(
+            "Ma question ?"
+        )
+    )
+
+    assert [p.contenu for p in paragraphes] == ["Chunk 0", "Chunk 1"]
+    assert client_albert_memoire.appels_recherche_chunk_par_id == []
+
+
+@pytest.mark.anyio
+async def test_les_chunks_sources_recuperes_aupres_d_albert_sont_enregistres_dans_l_entrepot(
+    un_service_albert,
+):
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats_jeopardy(_des_resultats_jeopardy(1))
+    client_albert_memoire.avec_chunks_par_id(
+        [un_resultat_de_recherche().ayant_pour_contenu("Chunk 0").construis()]
+    )
+    entrepot = AdaptateurEntrepotChunksMemoire(taille_maximum=10)
+    service_albert = un_service_albert(client_albert_memoire, entrepot_chunks=entrepot)
+
+    await service_albert._ServiceAlbert__recherche_dans_collection_jeopardy(
+        "Ma question ?"
+    )
+
+    assert (await entrepot.recupere("4065642", 0)).chunk.content == "Chunk 0"
+
+
+def _un_client_avec_resultats_classiques_et_jeopardy() -> ClientAlbertMemoire:
+    client_albert_memoire = ClientAlbertMemoire()
+    client_albert_memoire.avec_les_resultats(
+        [
+            un_resultat_de_recherche()
+            .ayant_pour_contenu("Chunk classique")
+            .construis(),
+        ]
+    )
+    client_albert_memoire.avec_les_resultats_jeopardy(_des_resultats_jeopardy(1))
+    client_albert_memoire.avec_chunks_par_id(
+        [un_resultat_de_recherche().ayant_pour_contenu("Chunk jeopardy").construis()]
+    )
+    return client_albert_memoire
+
+
+@pytest.mark.anyio
+async def test_les_recherches_classique_et_jeopardy_sont_lancees_en_parallele(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert_memoire = _un_client_avec_resultats_classiques_et_jeopardy()
+    client_albert_memoire.avec_un_delai_pour_la_recherche(0.2)
+    client_albert_memoire.avec_un_delai_pour_la_recherche_jeopardy(0.2)
+    service_albert = un_service_albert(
+        client_albert_memoire,
+        configuration_service_albert=une_configuration_de_service_albert(
+            jeopardy_active=True
+        ),
+    )
+
+    debut = time.perf_counter()
+    paragraphes = await service_albert.recherche_paragraphes("Ma question ?")
+    duree = time.perf_counter() - debut
+
+    assert [p.contenu for p in paragraphes] == ["Chunk classique", "Chunk jeopardy"]
+    assert duree < 0.35
+
+
+@pytest.mark.anyio
+async def test_une_recherche_jeopardy_trop_lente_ne_retarde_pas_les_resultats_classiques(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert_memoire = _un_client_avec_resultats_classiques_et_jeopardy()
+    client_albert_memoire.avec_un_delai_pour_la_recherche_jeopardy(1)
+    service_albert = un_service_albert(
+        client_albert_memoire,
+        configuration_service_albert=une_configuration_de_service_albert(
+            jeopardy_active=True, delai_maximum_recherche_jeopardy=0.05
+        ),
+    )
+
+    paragraphes = await service_albert.recherche_paragraphes("Ma question ?")
+
+    assert [p.contenu for p in paragraphes] == ["Chunk classique"]
+
+
+@pytest.mark.anyio
+async def test_une_recherche_jeopardy_en_erreur_retourne_les_resultats_classiques(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert_memoire = _un_client_avec_resultats_classiques_et_jeopardy()
+    client_albert_memoire.leve_une_erreur_sur_recherche_jeopardy = True
+    service_albert = un_service_albert(
+        client_albert_memoire,
+        configuration_service_albert=une_configuration_de_service_albert(
+            jeopardy_active=True
+        ),
+    )
+
+    paragraphes = await service_albert.recherche_paragraphes("Ma question ?")
+
+    assert [p.contenu for p in paragraphes] == ["Chunk classique"]
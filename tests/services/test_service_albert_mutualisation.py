@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from client_albert_de_test import (
+    ClientAlbertMemoire,
+    un_choix_de_proposition,
+    un_resultat_de_recherche,
+)
+from services.durees import demarre_la_mesure_des_durees
+from services.service_albert import (
+    MutualisationDesQuestions,
+)
+
+
+def _un_client_albert_lent() -> ClientAlbertMemoire:
+    client_albert = ClientAlbertMemoire()
+    client_albert.avec_les_resultats_par_appel(
+        [
+            [un_resultat_de_recherche().ayant_pour_contenu("Paragraphe").construis()],
+            [un_resultat_de_recherche().ayant_pour_contenu("Paragraphe").construis()],
+        ]
+    )
+    client_albert.avec_des_delais_pour_la_recherche_par_appel([0.05, 0.05])
+    client_albert.avec_les_propositions(
+        [un_choix_de_proposition().ayant_pour_contenu("Réponse").construis()]
+    )
+    return client_albert
+
+
+@pytest.mark.anyio
+async def test_des_questions_identiques_simultanees_partagent_un_meme_calcul(
+    un_service_albert,
+):
+    client_albert = _un_client_albert_lent()
+    mutualisation = MutualisationDesQuestions()
+    service_albert = un_service_albert(client_albert, mutualisation=mutualisation)
+
+    premiere, seconde = await asyncio.gather(
+        service_albert.pose_question(question="Qu'est-ce que le MFA ?"),
+        service_albert.pose_question(question="qu'est-ce que le MFA?"),
+    )
+
+    assert client_albert.appels_recherche == 1
+    assert premiere.reponse == seconde.reponse == "Réponse"
+    assert premiere.question == "Qu'est-ce que le MFA ?"
+    assert seconde.question == "qu'est-ce que le MFA?"
+    assert mutualisation.statistiques.nombre_calculs == 1
+    assert mutualisation.statistiques.nombre_requetes_mutualisees == 1
+
+
+@pytest.mark.anyio
+async def test_chaque_requete_mutualisee_reprend_les_durees_du_calcul_partage(
+    un_service_albert,
+):
+    mutualisation = MutualisationDesQuestions()
+    service_albert = un_service_albert(
+        _un_client_albert_lent(), mutualisation=mutualisation
+    )
+
+    async def _pose_la_question_en_mesurant():
+        durees = demarre_la_mesure_des_durees()
+        await service_albert.pose_question(question="Qu'est-ce que le MFA ?")
+        return durees.en_nanosecondes
+
+    premieres, secondes = await asyncio.gather(
+        _pose_la_question_en_mesurant(), _pose_la_question_en_mesurant()
+    )
+
+    assert mutualisation.statistiques.nombre_requetes_mutualisees == 1
+    assert premieres == secondes
+    assert {"recherche", "generation"} <= set(secondes)
+
+
+@pytest.mark.anyio
+async def test_une_question_posee_apres_la_fin_du_calcul_est_recalculee(
+    un_service_albert,
+):
+    client_albert = _un_client_albert_lent()
+    mutualisation = MutualisationDesQuestions()
+    service_albert = un_service_albert(client_albert, mutualisation=mutualisation)
+
+    await service_albert.pose_question(question="Qu'est-ce que le MFA ?")
+    await service_albert.pose_question(question="Qu'est-ce que le MFA ?")
+
+    assert client_albert.appels_recherche == 2
+    assert mutualisation.statistiques.nombre_requetes_mutualisees == 0
+
+
+@pytest.mark.anyio
+async def test_les_questions_avec_historique_ne_sont_pas_mutualisees(
+    un_service_albert,
+    un_constructeur_de_conversation,
+    un_constructeur_d_interaction,
+):
+    client_albert = _un_client_albert_lent()
+    service_albert = un_service_albert(
+        client_albert, mutualisation=MutualisationDesQuestions()
+    )
+    conversation = (
+        un_constructeur_de_conversation()
+        .avec_interaction(un_constructeur_d_interaction().construis())
+        .construis()
+    )
+
+    await asyncio.gather(
+        service_albert.pose_question(
+            question="Et ensuite ?", conversation=conversation
+        ),
+        service_albert.pose_question(
+            question="Et ensuite ?", conversation=conversation
+        ),
+    )
+
+    assert client_albert.appels_recherche == 2
+
+
+@pytest.mark.anyio
+async def test_l_annulation_de_la_premiere_requete_ne_prive_pas_les_suivantes(
+    un_service_albert,
+):
+    client_albert = _un_client_albert_lent()
+    service_albert = un_service_albert(
+        client_albert, mutualisation=MutualisationDesQuestions()
+    )
+
+    premiere = asyncio.ensure_future(
+        service_albert.pose_question(question="Qu'est-ce que le MFA ?")
+    )
+    await asyncio.sleep(0)
+    seconde = asyncio.ensure_future(
+        service_albert.pose_question(question="Qu'est-ce que le MFA ?")
+    )
+    await asyncio.sleep(0)
+    premiere.cancel()
+
+    assert (await seconde).reponse == "Réponse"
+    assert client_albert.appels_recherche == 1
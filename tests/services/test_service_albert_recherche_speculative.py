@@ -0,0 +1,141 @@
+import asyncio
+from typing import Optional
+
+import pytest
+
+from client_albert_de_test import (
+    ClientAlbertMemoire,
+    un_choix_de_proposition,
+    un_resultat_de_recherche,
+)
+from question.reformulateur_de_question import ReformulateurDeQuestion
+from schemas.retour_utilisatrice import Conversation
+from schemas.violations import ViolationQuestionNonComprise
+from services.service_albert import (
+    CompteurRechercheSpeculative,
+    similarite_questions,
+)
+
+
+class ReformulateurQuiRepond(ReformulateurDeQuestion):
+    def __init__(self, client_albert: ClientAlbertMemoire, reformulation: str):
+        super().__init__(client_albert, "", "")
+        self.client_albert_memoire = client_albert
+        self.reformulation = reformulation
+        self.recherche_lancee_pendant_la_reformulation = False
+
+    async def reformule(
+        self, question: str, conversation: Optional[Conversation] = None
+    ) -> str | None:
+        await asyncio.sleep(0)
+        self.recherche_lancee_pendant_la_reformulation = (
+            self.client_albert_memoire.payload_recu is not None
+        )
+        return self.reformulation
+
+
+def _un_client_albert() -> ClientAlbertMemoire:
+    client_albert = ClientAlbertMemoire()
+    client_albert.avec_les_resultats_par_appel(
+        [
+            [un_resultat_de_recherche().ayant_pour_contenu("Recherche 1").construis()],
+            [un_resultat_de_recherche().ayant_pour_contenu("Recherche 2").construis()],
+        ]
+    )
+    client_albert.avec_les_propositions(
+        [un_choix_de_proposition().ayant_pour_contenu("Réponse").construis()]
+    )
+    return client_albert
+
+
+def test_la_similarite_ignore_la_casse_et_les_espaces():
+    assert similarite_questions("Qu'est-ce  qu'un  MFA ?", "qu'est-ce qu'un mfa ?") == 1
+
+
+@pytest.mark.anyio
+async def test_la_recherche_speculative_est_reutilisee_si_la_reformulation_est_proche(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert = _un_client_albert()
+    reformulateur = ReformulateurQuiRepond(client_albert, "Qu'est-ce qu'un MFA ?")
+    compteur = CompteurRechercheSpeculative()
+    service_albert = un_service_albert(
+        client_albert,
+        reformulateur=reformulateur,
+        configuration_service_albert=une_configuration_de_service_albert(
+            recherche_speculative_active=True
+        ),
+        compteur_recherche_speculative=compteur,
+    )
+
+    reponse = await service_albert.pose_question(question="Qu'est-ce qu'un MFA?")
+
+    assert reformulateur.recherche_lancee_pendant_la_reformulation
+    assert client_albert.appels_recherche == 1
+    assert [p.contenu for p in reponse.paragraphes] == ["Recherche 1"]
+    assert compteur.statistiques.taux_reutilisation == 1
+
+
+@pytest.mark.anyio
+async def test_une_nouvelle_recherche_est_effectuee_si_la_reformulation_s_eloigne_de_la_question(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert = _un_client_albert()
+    reformulateur = ReformulateurQuiRepond(
+        client_albert, "Comment se protéger du défacement d'un site web ?"
+    )
+    compteur = CompteurRechercheSpeculative()
+    service_albert = un_service_albert(
+        client_albert,
+        reformulateur=reformulateur,
+        configuration_service_albert=une_configuration_de_service_albert(
+            recherche_speculative_active=True
+        ),
+        compteur_recherche_speculative=compteur,
+    )
+
+    await service_albert.pose_question(question="Et pour s'en prémunir ?")
+
+    assert client_albert.payload_recu.prompt == (
+        "Comment se protéger du défacement d'un site web ?"
+    )
+    assert compteur.statistiques.nombre_speculations == 1
+    assert compteur.statistiques.nombre_reutilisations == 0
+
+
+@pytest.mark.anyio
+async def test_la_recherche_speculative_est_abandonnee_si_la_question_n_est_pas_comprise(
+    un_service_albert,
+    une_configuration_de_service_albert,
+):
+    client_albert = _un_client_albert()
+    compteur = CompteurRechercheSpeculative()
+    service_albert = un_service_albert(
+        client_albert,
+        reformulateur=ReformulateurQuiRepond(client_albert, "QUESTION_NON_COMPRISE"),
+        configuration_service_albert=une_configuration_de_service_albert(
+            recherche_speculative_active=True
+        ),
+        compteur_recherche_speculative=compteur,
+    )
+
+    reponse = await service_albert.pose_question(question="Blabla")
+
+    assert reponse.violation == ViolationQuestionNonComprise()
+    assert compteur.statistiques.nombre_speculations == 0
+
+
+@pytest.mark.anyio
+async def test_aucune_recherche_n_est_lancee_pendant_la_reformulation_si_le_mode_speculatif_est_inactif(
+    un_service_albert,
+):
+    client_albert = _un_client_albert()
+    reformulateur = ReformulateurQuiRepond(client_albert, "Qu'est-ce qu'un MFA ?")
+    service_albert = un_service_albert(client_albert, reformulateur=reformulateur)
+
+    await service_albert.pose_question(question="Qu'est-ce qu'un MFA ?")
+
+    assert not reformulateur.recherche_lancee_pendant_la_reformulation
+    assert client_albert.appels_recherche == 1